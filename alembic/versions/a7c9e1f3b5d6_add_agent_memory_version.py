@@ -0,0 +1,29 @@
+"""add agent memory version
+
+Revision ID: a7c9e1f3b5d6
+Revises: f6b8d0e2a4c5
+Create Date: 2025-09-19 09:41:05.217436
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a7c9e1f3b5d6"
+down_revision: Union[str, None] = "f6b8d0e2a4c5"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("memory_version", sa.BigInteger(), server_default="0", nullable=False))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.drop_column("memory_version")
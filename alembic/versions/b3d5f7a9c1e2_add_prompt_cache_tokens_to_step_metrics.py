@@ -0,0 +1,31 @@
+"""add prompt cache tokens to step metrics
+
+Revision ID: b3d5f7a9c1e2
+Revises: a7c9e1f3b5d6
+Create Date: 2025-09-20 11:02:37.518204
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "b3d5f7a9c1e2"
+down_revision: Union[str, None] = "a7c9e1f3b5d6"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("step_metrics", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("cache_read_tokens", sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column("cache_creation_tokens", sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("step_metrics", schema=None) as batch_op:
+        batch_op.drop_column("cache_creation_tokens")
+        batch_op.drop_column("cache_read_tokens")
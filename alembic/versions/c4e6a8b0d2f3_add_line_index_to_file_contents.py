@@ -0,0 +1,29 @@
+"""add line index to file contents
+
+Revision ID: c4e6a8b0d2f3
+Revises: b3d5f7a9c1e2
+Create Date: 2025-09-24 15:41:08.209315
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "c4e6a8b0d2f3"
+down_revision: Union[str, None] = "b3d5f7a9c1e2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.batch_alter_table("file_contents", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("line_index", sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("file_contents", schema=None) as batch_op:
+        batch_op.drop_column("line_index")
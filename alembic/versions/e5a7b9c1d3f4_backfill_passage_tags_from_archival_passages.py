@@ -0,0 +1,47 @@
+"""backfill passage tags from archival passages
+
+Revision ID: e5a7b9c1d3f4
+Revises: d4f6a8c0e2b3
+Create Date: 2025-09-17 11:26:04.619382
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from letta.settings import settings
+
+# revision identifiers, used by Alembic.
+revision: str = "e5a7b9c1d3f4"
+down_revision: Union[str, None] = "d4f6a8c0e2b3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Skip this migration for SQLite
+    if not settings.letta_pg_uri_no_default:
+        return
+
+    # Passages created through the sync and bulk paths only stored tags in the JSON column,
+    # so tag filters (which read the junction table) never matched them.
+    connection = op.get_bind()
+    connection.execute(
+        sa.text(
+            """
+        INSERT INTO passage_tags (id, tag, passage_id, archive_id, organization_id, is_deleted)
+        SELECT 'passage-tag-' || md5(p.id || ':' || t.tag)::uuid, t.tag, p.id, p.archive_id, p.organization_id, FALSE
+        FROM archival_passages p
+        CROSS JOIN LATERAL json_array_elements_text(p.tags) AS t(tag)
+        WHERE p.tags IS NOT NULL AND json_typeof(p.tags) = 'array' AND p.is_deleted = FALSE
+        ON CONFLICT (passage_id, tag) DO NOTHING
+    """
+        )
+    )
+
+
+def downgrade() -> None:
+    # backfilled rows are indistinguishable from regular ones and stay valid
+    pass
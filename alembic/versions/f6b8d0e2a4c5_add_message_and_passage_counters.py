@@ -0,0 +1,38 @@
+"""add message and passage counters
+
+Revision ID: f6b8d0e2a4c5
+Revises: e5a7b9c1d3f4
+Create Date: 2025-09-18 10:12:47.338104
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f6b8d0e2a4c5"
+down_revision: Union[str, None] = "e5a7b9c1d3f4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # counters start out NULL and are counted on first read
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("message_count", sa.BigInteger(), nullable=True))
+
+    with op.batch_alter_table("archives", schema=None) as batch_op:
+        batch_op.add_column(sa.Column("passage_count", sa.BigInteger(), nullable=True))
+        batch_op.add_column(sa.Column("tag_counts", sa.JSON(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table("archives", schema=None) as batch_op:
+        batch_op.drop_column("tag_counts")
+        batch_op.drop_column("passage_count")
+
+    with op.batch_alter_table("agents", schema=None) as batch_op:
+        batch_op.drop_column("message_count")
@@ -79,6 +79,9 @@ class LettaLLMRequestAdapter(LettaLLMAdapter):
         self.usage.completion_tokens = self.chat_completions_response.usage.completion_tokens
         self.usage.prompt_tokens = self.chat_completions_response.usage.prompt_tokens
         self.usage.total_tokens = self.chat_completions_response.usage.total_tokens
+        if prompt_tokens_details := self.chat_completions_response.usage.prompt_tokens_details:
+            self.usage.cache_read_tokens = prompt_tokens_details.cached_tokens
+            self.usage.cache_creation_tokens = prompt_tokens_details.cache_creation_tokens
 
         self.log_provider_trace(step_id=step_id, actor=actor)
 
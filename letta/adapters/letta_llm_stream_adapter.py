@@ -113,6 +113,8 @@ class LettaLLMStreamAdapter(LettaLLMAdapter):
                 completion_tokens=output_tokens or 0,
                 prompt_tokens=input_tokens or 0,
                 total_tokens=(input_tokens or 0) + (output_tokens or 0),
+                cache_read_tokens=getattr(self.interface, "cache_read_tokens", 0),
+                cache_creation_tokens=getattr(self.interface, "cache_creation_tokens", 0),
             )
         else:
             # Default usage statistics if not available
@@ -4,6 +4,7 @@ from letta.agents.base_agent_v2 import BaseAgentV2
 from letta.agents.letta_agent_v2 import LettaAgentV2
 from letta.groups.sleeptime_multi_agent_v3 import SleeptimeMultiAgentV3
 from letta.schemas.agent import AgentState, AgentType
+from letta.schemas.message import Message
 
 if TYPE_CHECKING:
     from letta.orm import User
@@ -13,11 +14,14 @@ class AgentLoop:
     """Factory class for instantiating the agent execution loop based on agent type"""
 
     @staticmethod
-    def load(agent_state: AgentState, actor: "User") -> BaseAgentV2:
+    def load(agent_state: AgentState, actor: "User", in_context_messages: list[Message] | None = None) -> BaseAgentV2:
         if agent_state.enable_sleeptime and agent_state.agent_type != AgentType.voice_convo_agent:
-            return SleeptimeMultiAgentV3(agent_state=agent_state, actor=actor, group=agent_state.multi_agent_group)
+            return SleeptimeMultiAgentV3(
+                agent_state=agent_state, actor=actor, group=agent_state.multi_agent_group, in_context_messages=in_context_messages
+            )
         else:
             return LettaAgentV2(
                 agent_state=agent_state,
                 actor=actor,
+                in_context_messages=in_context_messages,
             )
@@ -112,7 +112,7 @@ class BaseAgent(ABC):
             )
 
             if archive:
-                archive_tags = await self.passage_manager.get_unique_tags_for_archive_async(
+                archive_tags = await self.passage_manager.get_archive_tags_async(
                     archive_id=archive.id,
                     actor=self.actor,
                 )
@@ -155,9 +155,9 @@ class BaseAgent(ABC):
 
             # size of messages and archival memories
             if num_messages is None:
-                num_messages = await self.message_manager.size_async(actor=self.actor, agent_id=agent_state.id)
+                num_messages = await self.message_manager.agent_message_count_async(actor=self.actor, agent_id=agent_state.id)
             if num_archival_memories is None:
-                num_archival_memories = await self.passage_manager.agent_passage_size_async(actor=self.actor, agent_id=agent_state.id)
+                num_archival_memories = await self.passage_manager.agent_passage_count_async(actor=self.actor, agent_id=agent_state.id)
 
             new_system_message_str = PromptGenerator.get_system_message_from_compiled_memory(
                 system_prompt=agent_state.system,
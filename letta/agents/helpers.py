@@ -129,6 +129,7 @@ async def _prepare_in_context_messages_no_persist_async(
     agent_state: AgentState,
     message_manager: MessageManager,
     actor: User,
+    prefetched_in_context_messages: Optional[List[Message]] = None,
 ) -> Tuple[List[Message], List[Message]]:
     """
     Prepares in-context messages for an agent, based on the current state and a new user input.
@@ -138,6 +139,8 @@ async def _prepare_in_context_messages_no_persist_async(
         agent_state (AgentState): The current state of the agent, including message buffer config.
         message_manager (MessageManager): The manager used to retrieve and create messages.
         actor (User): The user performing the action, used for access control and attribution.
+        prefetched_in_context_messages (Optional[List[Message]]): The agent's in-context messages if the caller already
+            loaded them, e.g. in bulk for many agents. Ignored unless they match `agent_state.message_ids`.
 
     Returns:
         Tuple[List[Message], List[Message]]: A tuple containing:
@@ -145,8 +148,11 @@ async def _prepare_in_context_messages_no_persist_async(
             - The new in-context messages (messages created from the new input).
     """
 
-    if agent_state.message_buffer_autoclear:
-        # If autoclear is enabled, only include the most recent system message (usually at index 0)
+    # If autoclear is enabled, only include the most recent system message (usually at index 0)
+    in_context_message_ids = agent_state.message_ids[:1] if agent_state.message_buffer_autoclear else agent_state.message_ids
+    if prefetched_in_context_messages is not None and [m.id for m in prefetched_in_context_messages] == in_context_message_ids:
+        current_in_context_messages = prefetched_in_context_messages
+    elif agent_state.message_buffer_autoclear:
         current_in_context_messages = [await message_manager.get_message_by_id_async(message_id=agent_state.message_ids[0], actor=actor)]
     else:
         # Otherwise, include the full list of messages by ID for context
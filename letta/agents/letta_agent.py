@@ -41,7 +41,7 @@ from letta.schemas.letta_response import LettaResponse
 from letta.schemas.letta_stop_reason import LettaStopReason, StopReasonType
 from letta.schemas.llm_config import LLMConfig
 from letta.schemas.message import Message, MessageCreateBase
-from letta.schemas.openai.chat_completion_response import ToolCall, UsageStatistics
+from letta.schemas.openai.chat_completion_response import ToolCall, UsageStatistics, UsageStatisticsPromptTokenDetails
 from letta.schemas.provider_trace import ProviderTraceCreate
 from letta.schemas.step import StepProgression
 from letta.schemas.step_metrics import StepMetrics
@@ -51,6 +51,7 @@ from letta.schemas.user import User
 from letta.server.rest_api.utils import create_approval_request_message_from_llm_response, create_letta_messages_from_llm_response
 from letta.services.agent_manager import AgentManager
 from letta.services.block_manager import BlockManager
+from letta.services.context_window_calculator.token_counter import ApproximateTokenCounter
 from letta.services.helpers.tool_parser_helper import runtime_override_tool_json_schema
 from letta.services.job_manager import JobManager
 from letta.services.message_manager import MessageManager
@@ -338,7 +339,9 @@ class LettaAgent(BaseAgent):
                     usage.step_count += 1
                     usage.completion_tokens += response.usage.completion_tokens
                     usage.prompt_tokens += response.usage.prompt_tokens
+                    self._calibrate_token_counter(agent_state, request_data, response.usage.prompt_tokens)
                     usage.total_tokens += response.usage.total_tokens
+                    self._record_prompt_cache_usage(usage, step_metrics, response.usage.prompt_tokens_details)
                     MetricRegistry().message_output_tokens.record(
                         response.usage.completion_tokens, dict(get_ctx_attributes(), **{"model.name": agent_state.llm_config.model})
                     )
@@ -682,7 +685,9 @@ class LettaAgent(BaseAgent):
                     usage.step_count += 1
                     usage.completion_tokens += response.usage.completion_tokens
                     usage.prompt_tokens += response.usage.prompt_tokens
+                    self._calibrate_token_counter(agent_state, request_data, response.usage.prompt_tokens)
                     usage.total_tokens += response.usage.total_tokens
+                    self._record_prompt_cache_usage(usage, step_metrics, response.usage.prompt_tokens_details)
                     usage.run_ids = [run_id] if run_id else None
                     MetricRegistry().message_output_tokens.record(
                         response.usage.completion_tokens, dict(get_ctx_attributes(), **{"model.name": agent_state.llm_config.model})
@@ -1062,6 +1067,7 @@ class LettaAgent(BaseAgent):
                             yield f"data: {chunk.model_dump_json()}\n\n"
 
                     stream_end_time_ns = get_utc_timestamp_ns()
+                    self._calibrate_token_counter(agent_state, request_data, interface.input_tokens)
 
                     # Some providers that rely on the OpenAI client currently e.g. LMStudio don't get usage metrics back on the last streaming chunk, fall back to manual values
                     if isinstance(interface, OpenAIStreamingInterface) and not interface.input_tokens and not interface.output_tokens:
@@ -1075,6 +1081,14 @@ class LettaAgent(BaseAgent):
                     usage.completion_tokens += interface.output_tokens
                     usage.prompt_tokens += interface.input_tokens
                     usage.total_tokens += interface.input_tokens + interface.output_tokens
+                    self._record_prompt_cache_usage(
+                        usage,
+                        step_metrics,
+                        UsageStatisticsPromptTokenDetails(
+                            cached_tokens=getattr(interface, "cache_read_tokens", 0),
+                            cache_creation_tokens=getattr(interface, "cache_creation_tokens", 0),
+                        ),
+                    )
                     MetricRegistry().message_output_tokens.record(
                         usage.completion_tokens, dict(get_ctx_attributes(), **{"model.name": agent_state.llm_config.model})
                     )
@@ -1367,6 +1381,8 @@ class LettaAgent(BaseAgent):
                 project_id=attrs.get("project.id") or agent_state.project_id,
                 template_id=attrs.get("template.id"),
                 base_template_id=attrs.get("base_template.id"),
+                cache_read_tokens=step_metrics.cache_read_tokens,
+                cache_creation_tokens=step_metrics.cache_creation_tokens,
             )
         except Exception as metrics_error:
             self.logger.warning(f"Failed to record step metrics: {metrics_error}")
@@ -1552,7 +1568,28 @@ class LettaAgent(BaseAgent):
             agent_id=self.agent_id, message_ids=[m.id for m in new_in_context_messages], actor=self.actor
         )
 
+    @staticmethod
+    def _record_prompt_cache_usage(
+        usage: LettaUsageStatistics, step_metrics: StepMetrics, prompt_tokens_details: Optional[UsageStatisticsPromptTokenDetails]
+    ) -> None:
+        """Add the prompt cache reads and writes of a step to the request usage and the step metrics."""
+        if prompt_tokens_details is None:
+            return
+        usage.cache_read_tokens += prompt_tokens_details.cached_tokens
+        usage.cache_creation_tokens += prompt_tokens_details.cache_creation_tokens
+        step_metrics.cache_read_tokens = prompt_tokens_details.cached_tokens
+        step_metrics.cache_creation_tokens = prompt_tokens_details.cache_creation_tokens
+
     @trace_method
+    def _calibrate_token_counter(self, agent_state: AgentState, request_data: dict, prompt_tokens: int) -> None:
+        """Feed the provider-reported prompt token count of a step into the local token counter's calibration."""
+        if settings.token_counter_mode != "local" or not request_data or not prompt_tokens:
+            return
+        try:
+            ApproximateTokenCounter.record_usage(agent_state.llm_config.model_endpoint_type, request_data, prompt_tokens)
+        except Exception as e:
+            logger.warning(f"Failed to calibrate local token counter: {e}")
+
     async def _create_llm_request_data_async(
         self,
         llm_client: LLMClientBase,
@@ -1561,12 +1598,12 @@ class LettaAgent(BaseAgent):
         tool_rules_solver: ToolRulesSolver,
     ) -> tuple[dict, list[str]]:
         if not self.num_messages:
-            self.num_messages = await self.message_manager.size_async(
+            self.num_messages = await self.message_manager.agent_message_count_async(
                 agent_id=agent_state.id,
                 actor=self.actor,
             )
         if not self.num_archival_memories:
-            self.num_archival_memories = await self.passage_manager.agent_passage_size_async(
+            self.num_archival_memories = await self.passage_manager.agent_passage_count_async(
                 agent_id=agent_state.id,
                 actor=self.actor,
             )
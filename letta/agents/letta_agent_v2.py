@@ -27,6 +27,8 @@ from letta.helpers.tool_execution_helper import enable_strict_mode
 from letta.llm_api.llm_client import LLMClient
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG
 from letta.log import get_logger
+from letta.otel.context import get_ctx_attributes
+from letta.otel.metric_registry import MetricRegistry
 from letta.otel.tracing import log_event, trace_method, tracer
 from letta.prompts.prompt_generator import PromptGenerator
 from letta.schemas.agent import AgentState, AgentType, UpdateAgent
@@ -51,6 +53,7 @@ from letta.services.job_manager import JobManager
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
 from letta.services.step_manager import StepManager
+from letta.services.step_write_buffer import StepWriteBuffer
 from letta.services.summarizer.enums import SummarizationMode
 from letta.services.summarizer.summarizer import Summarizer
 from letta.services.telemetry_manager import TelemetryManager
@@ -58,7 +61,7 @@ from letta.services.tool_executor.tool_execution_manager import ToolExecutionMan
 from letta.settings import model_settings, settings, summarizer_settings
 from letta.system import package_function_response
 from letta.types import JsonDict
-from letta.utils import log_telemetry, safe_create_task, united_diff, validate_function_response
+from letta.utils import log_telemetry, united_diff, validate_function_response
 
 
 class LettaAgentV2(BaseAgentV2):
@@ -74,10 +77,15 @@ class LettaAgentV2(BaseAgentV2):
         self,
         agent_state: AgentState,
         actor: User,
+        in_context_messages: list[Message] | None = None,
     ):
         super().__init__(agent_state, actor)
         self.logger = get_logger(agent_state.id)
+        # in-context messages loaded by the caller (e.g. in bulk for many agents), used by the next request only
+        self.prefetched_in_context_messages = in_context_messages
         self.tool_rules_solver = ToolRulesSolver(tool_rules=agent_state.tool_rules)
+        # (memory version, system message id, tool rule prompts) of the last system prompt checked against memory
+        self._memory_snapshot = None
         self.llm_client = LLMClient.create(
             provider_type=agent_state.llm_config.model_endpoint_type,
             put_inner_thoughts_first=True,
@@ -138,7 +146,7 @@ class LettaAgentV2(BaseAgentV2):
         """
         request = {}
         in_context_messages, input_messages_to_persist = await _prepare_in_context_messages_no_persist_async(
-            input_messages, self.agent_state, self.message_manager, self.actor
+            input_messages, self.agent_state, self.message_manager, self.actor, self._take_prefetched_in_context_messages()
         )
         response = self._step(
             messages=in_context_messages + input_messages_to_persist,
@@ -179,7 +187,7 @@ class LettaAgentV2(BaseAgentV2):
         request_span = self._request_checkpoint_start(request_start_timestamp_ns=request_start_timestamp_ns)
 
         in_context_messages, input_messages_to_persist = await _prepare_in_context_messages_no_persist_async(
-            input_messages, self.agent_state, self.message_manager, self.actor
+            input_messages, self.agent_state, self.message_manager, self.actor, self._take_prefetched_in_context_messages()
         )
         in_context_messages = in_context_messages + input_messages_to_persist
         response_letta_messages = []
@@ -273,7 +281,7 @@ class LettaAgentV2(BaseAgentV2):
 
         try:
             in_context_messages, input_messages_to_persist = await _prepare_in_context_messages_no_persist_async(
-                input_messages, self.agent_state, self.message_manager, self.actor
+                input_messages, self.agent_state, self.message_manager, self.actor, self._take_prefetched_in_context_messages()
             )
             in_context_messages = in_context_messages + input_messages_to_persist
             for i in range(max_steps):
@@ -373,6 +381,14 @@ class LettaAgentV2(BaseAgentV2):
             None,
             None,
         )
+        # the step's writes are buffered here and flushed in one transaction when the step finishes or fails
+        self.step_writes = StepWriteBuffer(
+            actor=self.actor,
+            step_manager=self.step_manager,
+            message_manager=self.message_manager,
+            job_manager=self.job_manager,
+            agent_manager=self.agent_manager,
+        )
         try:
             self.last_function_response = self._load_last_function_response(messages)
             valid_tools = await self._get_valid_tools()
@@ -451,13 +467,15 @@ class LettaAgentV2(BaseAgentV2):
                 )
 
                 self._update_global_usage_stats(llm_adapter.usage)
+                step_metrics.cache_read_tokens = llm_adapter.usage.cache_read_tokens
+                step_metrics.cache_creation_tokens = llm_adapter.usage.cache_creation_tokens
 
             # Handle the AI response with the extracted data
             if tool_call is None and llm_adapter.tool_call is None:
                 self.stop_reason = LettaStopReason(stop_reason=StopReasonType.no_tool_call.value)
                 raise ValueError("No tool calls found in response, model must make a tool call")
 
-            persisted_messages, self.should_continue, self.stop_reason = await self._handle_ai_response(
+            messages_to_persist, self.should_continue, self.stop_reason = await self._handle_ai_response(
                 tool_call or llm_adapter.tool_call,
                 [tool["name"] for tool in valid_tools],
                 self.agent_state,
@@ -480,6 +498,19 @@ class LettaAgentV2(BaseAgentV2):
                 denial_reason=approval_response.denial_reason if approval_response is not None else None,
             )
 
+            # Persist approval responses together with the step to prevent agent from getting into a bad state
+            if (
+                len(input_messages_to_persist) == 1
+                and input_messages_to_persist[0].role == "approval"
+                and messages_to_persist[0].role == "approval"
+                and messages_to_persist[1].role == "tool"
+            ):
+                self.agent_state.message_ids = self.agent_state.message_ids + [m.id for m in messages_to_persist[:2]]
+                self.step_writes.set_message_ids(self.agent_state.id, self.agent_state.message_ids)
+            step_progression, step_metrics, persisted_messages = await self._step_checkpoint_finish(
+                step_metrics, agent_step_span, logged_step, run_id
+            )
+
             new_message_idx = len(input_messages_to_persist) if input_messages_to_persist else 0
             self.response_messages.extend(persisted_messages[new_message_idx:])
 
@@ -499,19 +530,6 @@ class LettaAgentV2(BaseAgentV2):
                 for message in letta_messages:
                     if include_return_message_types is None or message.message_type in include_return_message_types:
                         yield message
-
-            # Persist approval responses immediately to prevent agent from getting into a bad state
-            if (
-                len(input_messages_to_persist) == 1
-                and input_messages_to_persist[0].role == "approval"
-                and persisted_messages[0].role == "approval"
-                and persisted_messages[1].role == "tool"
-            ):
-                self.agent_state.message_ids = self.agent_state.message_ids + [m.id for m in persisted_messages[:2]]
-                await self.agent_manager.update_message_ids_async(
-                    agent_id=self.agent_state.id, message_ids=self.agent_state.message_ids, actor=self.actor
-                )
-            step_progression, step_metrics = await self._step_checkpoint_finish(step_metrics, agent_step_span, logged_step)
         except Exception as e:
             self.logger.error(f"Error during step processing: {e}")
             self.job_update_metadata = {"error": str(e)}
@@ -534,20 +552,16 @@ class LettaAgentV2(BaseAgentV2):
             self.logger.info("Running final update. Step Progression: %s", step_progression)
             try:
                 if step_progression == StepProgression.FINISHED:
-                    if not self.should_continue:
-                        if self.stop_reason is None:
-                            self.stop_reason = LettaStopReason(stop_reason=StopReasonType.end_turn.value)
-                        if logged_step and step_id:
-                            await self.step_manager.update_step_stop_reason(self.actor, step_id, self.stop_reason.stop_reason)
                     return
+                # The step failed before its writes were flushed: the messages it produced are dropped so that the
+                # failed step is persisted on its own, in one transaction with its error details and partial metrics
+                self.step_writes.discard_messages()
                 if step_progression < StepProgression.STEP_LOGGED:
                     # Error occurred before step was fully logged
                     import traceback
 
                     if logged_step:
-                        await self.step_manager.update_step_error_async(
-                            actor=self.actor,
-                            step_id=step_id,  # Use original step_id for telemetry
+                        self.step_writes.mark_step_failed(
                             error_type=type(e).__name__ if "e" in locals() else "Unknown",
                             error_message=str(e) if "e" in locals() else "Unknown error",
                             error_traceback=traceback.format_exc(),
@@ -558,9 +572,8 @@ class LettaAgentV2(BaseAgentV2):
                         for message in input_messages_to_persist:
                             message.is_err = True
                             message.step_id = step_id
-                        await self.message_manager.create_many_messages_async(
+                        self.step_writes.add_messages(
                             input_messages_to_persist,
-                            actor=self.actor,
                             project_id=self.agent_state.project_id,
                             template_id=self.agent_state.template_id,
                         )
@@ -569,27 +582,29 @@ class LettaAgentV2(BaseAgentV2):
                         self.logger.error("Error in step after logging step")
                         self.stop_reason = LettaStopReason(stop_reason=StopReasonType.error.value)
                     if logged_step:
-                        await self.step_manager.update_step_stop_reason(self.actor, step_id, self.stop_reason.stop_reason)
+                        self.step_writes.set_stop_reason(self.stop_reason)
                 else:
                     self.logger.error("Invalid StepProgression value")
 
-                # Do tracking for failure cases. Can consolidate with success conditions later.
-                if settings.track_stop_reason:
-                    await self._log_request(request_start_timestamp_ns, None, self.job_update_metadata, is_error=True, run_id=run_id)
-
                 # Record partial step metrics on failure (capture whatever timing data we have)
-                if logged_step and step_metrics and step_progression < StepProgression.FINISHED:
+                if logged_step and step_metrics:
                     # Calculate total step time up to the failure point
                     step_metrics.step_ns = get_utc_timestamp_ns() - step_metrics.step_start_ns
+                    self._record_step_metrics(step_metrics=step_metrics, run_id=run_id)
 
-                    await self._record_step_metrics(
-                        step_id=step_id,
-                        step_metrics=step_metrics,
-                        run_id=run_id,
-                    )
+                await self.step_writes.flush_async()
+
+                # Do tracking for failure cases. Can consolidate with success conditions later.
+                if settings.track_stop_reason:
+                    await self._log_request(request_start_timestamp_ns, None, self.job_update_metadata, is_error=True, run_id=run_id)
             except Exception as e:
                 self.logger.error(f"Error during post-completion step tracking: {e}")
 
+    def _take_prefetched_in_context_messages(self) -> list[Message] | None:
+        # the system message is rebuilt in place while stepping, so prefetched messages are only valid once
+        messages, self.prefetched_in_context_messages = self.prefetched_in_context_messages, None
+        return messages
+
     def _initialize_state(self):
         self.should_continue = True
         self.stop_reason = None
@@ -617,18 +632,11 @@ class LettaAgentV2(BaseAgentV2):
 
     @trace_method
     async def _refresh_messages(self, in_context_messages: list[Message]):
-        num_messages = await self.message_manager.size_async(
-            agent_id=self.agent_state.id,
-            actor=self.actor,
-        )
-        num_archival_memories = await self.passage_manager.agent_passage_size_async(
-            agent_id=self.agent_state.id,
-            actor=self.actor,
-        )
+        # message and passage counts are only read if the system prompt has to be rebuilt
         in_context_messages = await self._rebuild_memory(
             in_context_messages,
-            num_messages=num_messages,
-            num_archival_memories=num_archival_memories,
+            num_messages=None,
+            num_archival_memories=None,
         )
         in_context_messages = scrub_inner_thoughts_from_messages(in_context_messages, self.agent_state.llm_config)
         return in_context_messages
@@ -637,27 +645,39 @@ class LettaAgentV2(BaseAgentV2):
     async def _rebuild_memory(
         self,
         in_context_messages: list[Message],
-        num_messages: int,
-        num_archival_memories: int,
+        num_messages: int | None,
+        num_archival_memories: int | None,
     ):
-        agent_state = await self.agent_manager.refresh_memory_async(agent_state=self.agent_state, actor=self.actor)
-
         tool_constraint_block = None
         if self.tool_rules_solver is not None:
             tool_constraint_block = self.tool_rules_solver.compile_tool_rule_prompts()
 
-        archive = await self.archive_manager.get_default_archive_for_agent_async(
-            agent_id=self.agent_state.id,
-            actor=self.actor,
+        # the memory version changes with every write to the agent's blocks, files, sources or tool rules, so if neither
+        # it nor the system message or tool rule prompts changed since the last check, the system prompt is up to date
+        memory_version = await self.agent_manager.get_memory_version_async(agent_id=self.agent_state.id, actor=self.actor)
+        snapshot = (memory_version, in_context_messages[0].id, tool_constraint_block)
+        if snapshot == self._memory_snapshot:
+            MetricRegistry().memory_rebuild_skip_counter.add(1, {**get_ctx_attributes(), "reason": "version_unchanged"})
+            return in_context_messages
+
+        in_context_messages = await self._compile_and_rebuild_memory(
+            in_context_messages,
+            tool_constraint_block=tool_constraint_block,
+            num_messages=num_messages,
+            num_archival_memories=num_archival_memories,
         )
+        self._memory_snapshot = (memory_version, in_context_messages[0].id, tool_constraint_block)
+        return in_context_messages
 
-        if archive:
-            archive_tags = await self.passage_manager.get_unique_tags_for_archive_async(
-                archive_id=archive.id,
-                actor=self.actor,
-            )
-        else:
-            archive_tags = None
+    @trace_method
+    async def _compile_and_rebuild_memory(
+        self,
+        in_context_messages: list[Message],
+        tool_constraint_block: str | None,
+        num_messages: int | None,
+        num_archival_memories: int | None,
+    ):
+        agent_state = await self.agent_manager.refresh_memory_async(agent_state=self.agent_state, actor=self.actor)
 
         # TODO: This is a pretty brittle pattern established all over our code, need to get rid of this
         curr_system_message = in_context_messages[0]
@@ -689,15 +709,30 @@ class LettaAgentV2(BaseAgentV2):
             self.logger.debug(
                 f"Memory and sources haven't changed for agent id={agent_state.id} and actor=({self.actor.id}, {self.actor.name}), skipping system prompt rebuild"
             )
+            MetricRegistry().memory_rebuild_skip_counter.add(1, {**get_ctx_attributes(), "reason": "memory_unchanged"})
             return in_context_messages
 
+        MetricRegistry().memory_rebuild_counter.add(1, get_ctx_attributes())
         memory_edit_timestamp = get_utc_time()
 
+        archive = await self.archive_manager.get_default_archive_for_agent_async(
+            agent_id=self.agent_state.id,
+            actor=self.actor,
+        )
+
+        if archive:
+            archive_tags = await self.passage_manager.get_archive_tags_async(
+                archive_id=archive.id,
+                actor=self.actor,
+            )
+        else:
+            archive_tags = None
+
         # size of messages and archival memories
         if num_messages is None:
-            num_messages = await self.message_manager.size_async(actor=self.actor, agent_id=agent_state.id)
+            num_messages = await self.message_manager.agent_message_count_async(actor=self.actor, agent_id=agent_state.id)
         if num_archival_memories is None:
-            num_archival_memories = await self.passage_manager.agent_passage_size_async(actor=self.actor, agent_id=agent_state.id)
+            num_archival_memories = await self.passage_manager.agent_passage_count_async(actor=self.actor, agent_id=agent_state.id)
 
         new_system_message_str = PromptGenerator.get_system_message_from_compiled_memory(
             system_prompt=agent_state.system,
@@ -785,9 +820,8 @@ class LettaAgentV2(BaseAgentV2):
         step_metrics = StepMetrics(id=step_id, step_start_ns=step_start_ns)
         agent_step_span = tracer.start_span("agent_step", start_time=step_start_ns)
         agent_step_span.set_attributes({"step_id": step_id})
-        # Create step early with PENDING status
-        logged_step = await self.step_manager.log_step_async(
-            actor=self.actor,
+        # Buffer the step with PENDING status, it is written together with the rest of the step's writes
+        logged_step = self.step_writes.log_step(
             agent_id=self.agent_state.id,
             provider_name=self.agent_state.llm_config.model_endpoint_type,
             provider_category=self.agent_state.llm_config.provider_category or "base",
@@ -824,21 +858,14 @@ class LettaAgentV2(BaseAgentV2):
 
     @trace_method
     async def _step_checkpoint_finish(
-        self, step_metrics: StepMetrics, agent_step_span: Span | None, logged_step: Step | None
-    ) -> Tuple[StepProgression, StepMetrics]:
-        if step_metrics.step_start_ns:
-            step_ns = get_utc_timestamp_ns() - step_metrics.step_start_ns
-            step_metrics.step_ns = step_ns
-            if agent_step_span is not None:
-                agent_step_span.add_event(name="step_ms", attributes={"duration_ms": ns_to_ms(step_ns)})
-                agent_step_span.end()
-            self._record_step_metrics(step_id=step_metrics.id, step_metrics=step_metrics)
+        self, step_metrics: StepMetrics, agent_step_span: Span | None, logged_step: Step | None, run_id: str | None = None
+    ) -> Tuple[StepProgression, StepMetrics, list[Message]]:
+        if not self.should_continue and self.stop_reason is None:
+            self.stop_reason = LettaStopReason(stop_reason=StopReasonType.end_turn.value)
 
         # Update step with actual usage now that we have it (if step was created)
         if logged_step:
-            await self.step_manager.update_step_success_async(
-                self.actor,
-                step_metrics.id,
+            self.step_writes.mark_step_success(
                 UsageStatistics(
                     completion_tokens=self.usage.completion_tokens,
                     prompt_tokens=self.usage.prompt_tokens,
@@ -846,13 +873,25 @@ class LettaAgentV2(BaseAgentV2):
                 ),
                 self.stop_reason,
             )
-        return StepProgression.FINISHED, step_metrics
+            if step_metrics.step_start_ns:
+                step_metrics.step_ns = get_utc_timestamp_ns() - step_metrics.step_start_ns
+                self._record_step_metrics(step_metrics=step_metrics, run_id=run_id)
+
+        # Step, messages, job messages, message_ids and metrics are written in one transaction
+        persisted_messages = await self.step_writes.flush_async()
+
+        if step_metrics.step_ns and agent_step_span is not None:
+            agent_step_span.add_event(name="step_ms", attributes={"duration_ms": ns_to_ms(step_metrics.step_ns)})
+            agent_step_span.end()
+        return StepProgression.FINISHED, step_metrics, persisted_messages
 
     def _update_global_usage_stats(self, step_usage_stats: LettaUsageStatistics):
         self.usage.step_count += step_usage_stats.step_count
         self.usage.completion_tokens += step_usage_stats.completion_tokens
         self.usage.prompt_tokens += step_usage_stats.prompt_tokens
         self.usage.total_tokens += step_usage_stats.total_tokens
+        self.usage.cache_read_tokens += step_usage_stats.cache_read_tokens
+        self.usage.cache_creation_tokens += step_usage_stats.cache_creation_tokens
 
     @trace_method
     async def _handle_ai_response(
@@ -876,7 +915,7 @@ class LettaAgentV2(BaseAgentV2):
     ) -> tuple[list[Message], bool, LettaStopReason | None]:
         """
         Handle the final AI response once streaming completes, execute / validate the
-        tool call, decide whether we should keep stepping, and persist state.
+        tool call, decide whether we should keep stepping, and buffer the messages to persist.
         """
         tool_call_id: str = tool_call.id or f"call_{uuid.uuid4().hex[:8]}"
 
@@ -902,13 +941,8 @@ class LettaAgentV2(BaseAgentV2):
                 is_approval_response=True,
             )
             messages_to_persist = (initial_messages or []) + tool_call_messages
-            persisted_messages = await self.message_manager.create_many_messages_async(
-                messages_to_persist,
-                actor=self.actor,
-                project_id=agent_state.project_id,
-                template_id=agent_state.template_id,
-            )
-            return persisted_messages, continue_stepping, stop_reason
+            self.step_writes.add_messages(messages_to_persist, project_id=agent_state.project_id, template_id=agent_state.template_id)
+            return messages_to_persist, continue_stepping, stop_reason
 
         # 1.  Parse and validate the tool-call envelope
         tool_call_name: str = tool_call.function.name
@@ -1017,18 +1051,11 @@ class LettaAgentV2(BaseAgentV2):
             )
             messages_to_persist = (initial_messages or []) + tool_call_messages
 
-        persisted_messages = await self.message_manager.create_many_messages_async(
-            messages_to_persist, actor=self.actor, project_id=agent_state.project_id, template_id=agent_state.template_id
+        # written with the rest of the step when it finishes, see StepWriteBuffer
+        self.step_writes.add_messages(
+            messages_to_persist, job_id=run_id, project_id=agent_state.project_id, template_id=agent_state.template_id
         )
-
-        if run_id:
-            await self.job_manager.add_messages_to_job_async(
-                job_id=run_id,
-                message_ids=[m.id for m in persisted_messages if m.role != "user"],
-                actor=self.actor,
-            )
-
-        return persisted_messages, continue_stepping, stop_reason
+        return messages_to_persist, continue_stepping, stop_reason
 
     @trace_method
     def _decide_continuation(
@@ -1183,26 +1210,17 @@ class LettaAgentV2(BaseAgentV2):
     def _record_step_metrics(
         self,
         *,
-        step_id: str,
         step_metrics: StepMetrics,
         run_id: str | None = None,
-    ):
-        task = safe_create_task(
-            self.step_manager.record_step_metrics_async(
-                actor=self.actor,
-                step_id=step_id,
-                llm_request_ns=step_metrics.llm_request_ns,
-                tool_execution_ns=step_metrics.tool_execution_ns,
-                step_ns=step_metrics.step_ns,
-                agent_id=self.agent_state.id,
-                job_id=run_id,
-                project_id=self.agent_state.project_id,
-                template_id=self.agent_state.template_id,
-                base_template_id=self.agent_state.base_template_id,
-            ),
-            label="record_step_metrics",
+    ) -> None:
+        self.step_writes.record_step_metrics(
+            step_metrics,
+            agent_id=self.agent_state.id,
+            job_id=run_id,
+            project_id=self.agent_state.project_id,
+            template_id=self.agent_state.template_id,
+            base_template_id=self.agent_state.base_template_id,
         )
-        return task
 
     @trace_method
     async def _log_request(
@@ -308,12 +308,12 @@ class VoiceAgent(BaseAgent):
         agent_state: AgentState,
     ) -> List[Message]:
         if not self.num_messages:
-            self.num_messages = await self.message_manager.size_async(
+            self.num_messages = await self.message_manager.agent_message_count_async(
                 agent_id=agent_state.id,
                 actor=self.actor,
             )
         if not self.num_archival_memories:
-            self.num_archival_memories = await self.passage_manager.agent_passage_size_async(
+            self.num_archival_memories = await self.passage_manager.agent_passage_count_async(
                 agent_id=agent_state.id,
                 actor=self.actor,
             )
@@ -373,6 +373,8 @@ REDIS_EXCLUDE = "exclude"
 REDIS_SET_DEFAULT_VAL = "None"
 REDIS_DEFAULT_CACHE_PREFIX = "letta_cache"
 REDIS_RUN_ID_PREFIX = "agent:send_message:run_id"
+REDIS_AGENT_LOCK_PREFIX = "agent:lock"
+REDIS_EMBEDDING_CACHE_PREFIX = "embedding"
 
 # TODO: This is temporary, eventually use token-based eviction
 # File based controls
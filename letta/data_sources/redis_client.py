@@ -1,6 +1,6 @@
 import asyncio
 from functools import wraps
-from typing import Any, Dict, List, Optional, Set, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Union
 
 from letta.constants import REDIS_EXCLUDE, REDIS_INCLUDE, REDIS_SET_DEFAULT_VAL
 from letta.log import get_logger
@@ -18,6 +18,20 @@ logger = get_logger(__name__)
 
 _client_instance = None
 
+_COMPARE_AND_DELETE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+_COMPARE_AND_EXPIRE_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+end
+return 0
+"""
+
 
 class AsyncRedisClient:
     """Async Redis client with connection pooling and error handling"""
@@ -165,6 +179,21 @@ class AsyncRedisClient:
         client = await self.get_client()
         return await client.set(key, value, ex=ex, px=px, nx=nx, xx=xx)
 
+    @with_retry()
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        """Get the values of several keys in one round trip."""
+        client = await self.get_client()
+        return await client.mget(keys)
+
+    @with_retry()
+    async def mset(self, mapping: Dict[str, Union[str, int, float]], ex: Optional[int] = None) -> None:
+        """Set several key-values in one round trip, each expiring after `ex` seconds if given."""
+        client = await self.get_client()
+        async with client.pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.set(key, value, ex=ex)
+            await pipe.execute()
+
     @with_retry()
     async def delete(self, *keys: str) -> int:
         """Delete one or more keys."""
@@ -177,6 +206,18 @@ class AsyncRedisClient:
         client = await self.get_client()
         return await client.exists(*keys)
 
+    @with_retry()
+    async def compare_and_delete(self, key: str, expected: str) -> int:
+        """Delete key only if it currently holds the expected value."""
+        client = await self.get_client()
+        return await client.eval(_COMPARE_AND_DELETE_SCRIPT, 1, key, expected)
+
+    @with_retry()
+    async def compare_and_expire(self, key: str, expected: str, px: int) -> int:
+        """Reset the expiry (ms) of key only if it currently holds the expected value."""
+        client = await self.get_client()
+        return await client.eval(_COMPARE_AND_EXPIRE_SCRIPT, 1, key, expected, px)
+
     # Set operations
     async def sadd(self, key: str, *members: Union[str, int, float]) -> int:
         """Add members to set."""
@@ -218,6 +259,27 @@ class AsyncRedisClient:
         client = await self.get_client()
         return await client.decr(key)
 
+    # Pub/sub operations
+    @with_retry()
+    async def publish(self, channel: str, message: str) -> int:
+        """Publish a message, returning the number of subscribers that received it."""
+        client = await self.get_client()
+        return await client.publish(channel, message)
+
+    async def subscribe(self, channel: str, poll_interval: float = 1.0) -> AsyncIterator[str]:
+        """Yield the messages published on a channel until the connection fails or the consumer stops."""
+        client = await self.get_client()
+        pubsub = client.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            while True:
+                # poll with a timeout rather than block, since blocking reads are cut off by the socket timeout
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=poll_interval)
+                if message is not None and message["type"] == "message":
+                    yield message["data"]
+        finally:
+            await pubsub.aclose()
+
     # Stream operations
     @with_retry()
     async def xadd(self, stream: str, fields: Dict[str, Any], id: str = "*", maxlen: Optional[int] = None, approximate: bool = True) -> str:
@@ -383,6 +445,12 @@ class NoopAsyncRedisClient(AsyncRedisClient):
     async def get(self, key: str, default: Any = None) -> Any:
         return default
 
+    async def mget(self, *keys: str) -> List[Optional[str]]:
+        return [None] * len(keys)
+
+    async def mset(self, mapping: Dict[str, Union[str, int, float]], ex: Optional[int] = None) -> None:
+        return None
+
     async def exists(self, *keys: str) -> int:
         return 0
 
@@ -395,6 +463,15 @@ class NoopAsyncRedisClient(AsyncRedisClient):
     async def delete(self, *keys: str) -> int:
         return 0
 
+    async def incr(self, key: str) -> int:
+        return 0
+
+    async def compare_and_delete(self, key: str, expected: str) -> int:
+        return 0
+
+    async def compare_and_expire(self, key: str, expected: str, px: int) -> int:
+        return 0
+
     async def check_inclusion_and_exclusion(self, member: str, group: str) -> bool:
         return False
 
@@ -410,6 +487,13 @@ class NoopAsyncRedisClient(AsyncRedisClient):
     async def srem(self, key: str, *members: Union[str, int, float]) -> int:
         return 0
 
+    async def publish(self, channel: str, message: str) -> int:
+        return 0
+
+    async def subscribe(self, channel: str, poll_interval: float = 1.0) -> AsyncIterator[str]:
+        return
+        yield
+
     # Stream operations
     async def xadd(self, stream: str, fields: Dict[str, Any], id: str = "*", maxlen: Optional[int] = None, approximate: bool = True) -> str:
         return ""
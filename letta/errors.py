@@ -201,6 +201,28 @@ class RateLimitExceededError(LettaError):
         )
 
 
+class AgentLockTimeoutError(LettaError):
+    """Error raised when the per-agent lock could not be acquired in time."""
+
+    def __init__(self, agent_id: str, timeout_s: float):
+        super().__init__(
+            message=f"Timed out after {timeout_s}s waiting for agent {agent_id} to finish processing another request",
+            code=ErrorCode.CONFLICT,
+            details={"agent_id": agent_id, "timeout_s": timeout_s},
+        )
+
+
+class AgentLockLostError(LettaError):
+    """Error raised when a write is attempted under a per-agent lock that has since passed to another holder."""
+
+    def __init__(self, agent_id: str, fencing_token: int):
+        super().__init__(
+            message=f"Lock for agent {agent_id} was lost (fencing token {fencing_token}), another request has taken over the agent",
+            code=ErrorCode.CONFLICT,
+            details={"agent_id": agent_id, "fencing_token": fencing_token},
+        )
+
+
 class LettaMessageError(LettaError):
     """Base error class for handling message-related errors."""
 
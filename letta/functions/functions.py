@@ -1,7 +1,9 @@
 import ast
+import copy
 import importlib
 import inspect
 from collections.abc import Callable
+from functools import lru_cache
 from textwrap import dedent  # remove indentation
 from types import ModuleType
 from typing import Any, Dict, List, Literal, Optional
@@ -354,6 +356,9 @@ def get_json_schema_from_module(module_name: str, function_name: str) -> dict:
     """
     Dynamically loads a specific function from a module and generates its JSON schema.
 
+    The schemas of built-in tools are derived every time such a tool is loaded, so they are generated once per
+    function and copied from then on.
+
     Args:
         module_name (str): The name of the module to import (e.g., 'base').
         function_name (str): The name of the function to retrieve.
@@ -366,6 +371,11 @@ def get_json_schema_from_module(module_name: str, function_name: str) -> dict:
         AttributeError: If the function is not found in the module.
         ValueError: If the attribute is not a user-defined function.
     """
+    return copy.deepcopy(_generate_json_schema_from_module(module_name, function_name))
+
+
+@lru_cache(maxsize=None)
+def _generate_json_schema_from_module(module_name: str, function_name: str) -> dict:
     try:
         # Dynamically import the module
         module = importlib.import_module(module_name)
@@ -26,8 +26,9 @@ class SleeptimeMultiAgentV3(LettaAgentV2):
         agent_state: AgentState,
         actor: User,
         group: Group,
+        in_context_messages: list[Message] | None = None,
     ):
-        super().__init__(agent_state, actor)
+        super().__init__(agent_state, actor, in_context_messages=in_context_messages)
         assert group.manager_type == ManagerType.sleeptime, f"Expected group type to be 'sleeptime', got {group.manager_type}"
         self.group = group
         self.run_ids = []
@@ -1,14 +1,16 @@
 import inspect
 import json
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from functools import wraps
-from typing import Callable
+from typing import Callable, Dict
 
 from pydantic import BaseModel
 
 from letta.constants import REDIS_DEFAULT_CACHE_PREFIX
 from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.memory_cache import CACHE_INVALIDATION_CHANNEL, ensure_invalidation_listener, get_memory_cache
 from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
 from letta.plugins.plugins import get_experimental_checker
 from letta.settings import settings
 
@@ -84,15 +86,28 @@ class CacheStats:
     hits: int = 0
     misses: int = 0
     invalidations: int = 0
+    # per cache tier, for caches with several tiers; `hits` counts the hits of all tiers and `misses` the calls that
+    # missed every tier
+    tier_hits: Dict[str, int] = field(default_factory=dict)
+    tier_misses: Dict[str, int] = field(default_factory=dict)
 
 
 def async_redis_cache(
-    key_func: Callable, prefix: str = REDIS_DEFAULT_CACHE_PREFIX, ttl_s: int = 600, model_class: type[BaseModel] | None = None
+    key_func: Callable,
+    prefix: str = REDIS_DEFAULT_CACHE_PREFIX,
+    ttl_s: int = 600,
+    model_class: type[BaseModel] | None = None,
+    memory_ttl_s: int | None = None,
 ):
     """
-    Decorator for caching async function results in Redis. May be a Noop if redis is not available.
+    Decorator for caching async function results in an in-process tier in front of Redis.
     Will handle pydantic objects and raw values.
 
+    Either tier may be missing: the in-process tier is disabled with `memory_cache_max_bytes=0`, and Redis when it is not
+    configured, in which case results are still cached per process. Invalidations clear both tiers, and are published
+    over Redis so other processes drop their in-process copies; without Redis, other processes serve their copies until
+    `memory_ttl_s` runs out.
+
     Attempts to write to and retrieve from cache, but does not fail on those cases
 
     Args:
@@ -100,59 +115,117 @@ def async_redis_cache(
         prefix: cache key prefix
         ttl_s: time to live (s)
         model_class: custom pydantic model class for serialization/deserialization
+        memory_ttl_s: time to live in the in-process tier (s), defaults to the smaller of ttl_s and memory_cache_ttl_seconds
 
     TODO (cliandy): move to class with generics for type hints
     """
 
     def decorator(func):
         stats = CacheStats()
+        metric_attributes = {"cache": func.__qualname__}
+
+        def record(tier: str, hit: bool) -> None:
+            if hit:
+                stats.hits += 1
+                stats.tier_hits[tier] = stats.tier_hits.get(tier, 0) + 1
+                MetricRegistry().cache_hit_counter.add(1, {**metric_attributes, "tier": tier})
+            else:
+                stats.tier_misses[tier] = stats.tier_misses.get(tier, 0) + 1
+                MetricRegistry().cache_miss_counter.add(1, {**metric_attributes, "tier": tier})
+
+        def deserialize(value: str):
+            if model_class:
+                return model_class.model_validate_json(value)
+            return json.loads(value)
+
+        def serialize(result) -> str | None:
+            if model_class:
+                return result.model_dump_json()
+            if isinstance(result, (dict, list, str, int, float, bool)):
+                return json.dumps(result)
+            logger.warning(f"Cannot cache result of type {type(result).__name__} for {func.__name__}")
+            return None
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
             redis_client = await get_redis_client()
+            use_redis = not isinstance(redis_client, NoopAsyncRedisClient)
+            memory_cache = get_memory_cache()
 
             # Don't bother going through other operations for no reason.
-            if isinstance(redis_client, NoopAsyncRedisClient):
+            if memory_cache is None and not use_redis:
                 return await func(*args, **kwargs)
             cache_key = get_cache_key(*args, **kwargs)
-            cached_value = await redis_client.get(cache_key)
 
-            try:
-                if cached_value is not None:
-                    stats.hits += 1
-                    if model_class:
-                        return model_class.model_validate_json(cached_value)
-                    return json.loads(cached_value)
-            except Exception as e:
-                logger.warning(f"Failed to retrieve value from cache: {e}")
+            generation = None
+            if memory_cache is not None:
+                if use_redis:
+                    ensure_invalidation_listener(redis_client, memory_cache)
+                generation = memory_cache.generation
+                cached_value = memory_cache.get(cache_key)
+                try:
+                    if cached_value is not None:
+                        result = deserialize(cached_value)
+                        record("memory", hit=True)
+                        return result
+                except Exception as e:
+                    logger.warning(f"Failed to retrieve value from in-process cache: {e}")
+                record("memory", hit=False)
+
+            if use_redis:
+                cached_value = await redis_client.get(cache_key)
+                try:
+                    if cached_value is not None:
+                        result = deserialize(cached_value)
+                        record("redis", hit=True)
+                        if memory_cache is not None:
+                            memory_cache.set(cache_key, cached_value, ttl_s=get_memory_ttl_s(), generation=generation)
+                        return result
+                except Exception as e:
+                    logger.warning(f"Failed to retrieve value from cache: {e}")
+                record("redis", hit=False)
 
             stats.misses += 1
             result = await func(*args, **kwargs)
             try:
-                if model_class:
-                    await redis_client.set(cache_key, result.model_dump_json(), ex=ttl_s)
-                elif isinstance(result, (dict, list, str, int, float, bool)):
-                    await redis_client.set(cache_key, json.dumps(result), ex=ttl_s)
-                else:
-                    logger.warning(f"Cannot cache result of type {type(result).__name__} for {func.__name__}")
+                value = serialize(result)
+                if value is not None:
+                    if memory_cache is not None:
+                        memory_cache.set(cache_key, value, ttl_s=get_memory_ttl_s(), generation=generation)
+                    if use_redis:
+                        await redis_client.set(cache_key, value, ex=ttl_s)
             except Exception as e:
-                logger.warning(f"Redis cache set failed: {e}")
+                logger.warning(f"Cache set failed: {e}")
             return result
 
+        def invalidate_local(*args, **kwargs) -> bool:
+            """Drop the value from this process's in-process tier only, for callers that cannot await."""
+            memory_cache = get_memory_cache()
+            return memory_cache is not None and memory_cache.delete(get_cache_key(*args, **kwargs))
+
         async def invalidate(*args, **kwargs) -> bool:
             stats.invalidations += 1
+            deleted = invalidate_local(*args, **kwargs)
             try:
                 redis_client = await get_redis_client()
+                if isinstance(redis_client, NoopAsyncRedisClient):
+                    return deleted
                 cache_key = get_cache_key(*args, **kwargs)
-                return (await redis_client.delete(cache_key)) > 0
+                deleted = (await redis_client.delete(cache_key)) > 0 or deleted
+                await redis_client.publish(CACHE_INVALIDATION_CHANNEL, cache_key)
+                return deleted
             except Exception as e:
                 logger.error(f"Failed to invalidate cache: {e}")
-                return False
+                return deleted
 
         def get_cache_key(*args, **kwargs):
             return f"{prefix}:{key_func(*args, **kwargs)}"
 
+        def get_memory_ttl_s() -> int:
+            return memory_ttl_s if memory_ttl_s is not None else min(ttl_s, settings.memory_cache_ttl_seconds)
+
         async_wrapper.cache_invalidate = invalidate
+        async_wrapper.cache_invalidate_local = invalidate_local
         async_wrapper.cache_key_func = get_cache_key
         async_wrapper.cache_stats = stats
         return async_wrapper
@@ -0,0 +1,160 @@
+"""Content-addressed cache of text embeddings.
+
+Embeddings are keyed by (organization, embedding endpoint type and endpoint, embedding model, embedding dimension,
+sha256 of the text), so identical chunks uploaded to several sources, re-imported agent files and repeated archival
+inserts of one organization share one embedding request. Scoping by organization keeps the cache from revealing to one
+organization which texts another has embedded, and scoping by endpoint keeps self-hosted or proxied deployments of a
+model name from sharing vectors. Lookups go through an in-process LRU first and then redis (when configured); misses
+are embedded and written back to both tiers.
+"""
+
+import base64
+import hashlib
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+from letta.constants import REDIS_EMBEDDING_CACHE_PREFIX
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.decorators import CacheStats
+from letta.log import get_logger
+from letta.otel.context import get_ctx_attributes
+from letta.otel.metric_registry import MetricRegistry
+from letta.otel.tracing import log_event
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU of float32 vectors in front of redis."""
+
+    def __init__(self, max_entries: int, ttl_s: int):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+
+    @staticmethod
+    def cache_key(organization_id: str, embedding_config: EmbeddingConfig, text: str) -> str:
+        endpoint_digest = hashlib.sha256((embedding_config.embedding_endpoint or "").encode("utf-8")).hexdigest()[:16]
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return (
+            f"{REDIS_EMBEDDING_CACHE_PREFIX}:{organization_id}:{embedding_config.embedding_endpoint_type}:{endpoint_digest}:"
+            f"{embedding_config.embedding_model}:{embedding_config.embedding_dim}:{digest}"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _get_local(self, key: str) -> Optional[np.ndarray]:
+        vector = self._entries.get(key)
+        if vector is not None:
+            self._entries.move_to_end(key)
+        return vector
+
+    def _put_local(self, key: str, vector: np.ndarray) -> None:
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up `keys`, returning None for each key that is in neither tier."""
+        found = [self._get_local(key) for key in keys]
+        memory_hits = sum(vector is not None for vector in found)
+        redis_hits = 0
+
+        missing = [i for i, vector in enumerate(found) if vector is None]
+        if missing:
+            redis_client = await get_redis_client()
+            if not isinstance(redis_client, NoopAsyncRedisClient):
+                try:
+                    values = await redis_client.mget(*[keys[i] for i in missing])
+                except Exception as e:
+                    logger.warning(f"Failed to read embeddings from redis cache: {e}")
+                    values = [None] * len(missing)
+                for i, value in zip(missing, values):
+                    if value is not None:
+                        found[i] = np.frombuffer(base64.b64decode(value), dtype=np.float32)
+                        self._put_local(keys[i], found[i])
+                        redis_hits += 1
+
+        misses = len(keys) - memory_hits - redis_hits
+        self.stats.hits += memory_hits + redis_hits
+        self.stats.misses += misses
+
+        attributes = get_ctx_attributes()
+        if memory_hits:
+            MetricRegistry().embedding_cache_hit_counter.add(memory_hits, {**attributes, "tier": "memory"})
+        if redis_hits:
+            MetricRegistry().embedding_cache_hit_counter.add(redis_hits, {**attributes, "tier": "redis"})
+        if misses:
+            MetricRegistry().embedding_cache_miss_counter.add(misses, attributes)
+        return found
+
+    async def set_many(self, keys: List[str], vectors: List[np.ndarray]) -> None:
+        for key, vector in zip(keys, vectors):
+            self._put_local(key, vector)
+
+        redis_client = await get_redis_client()
+        if isinstance(redis_client, NoopAsyncRedisClient):
+            return
+        try:
+            await redis_client.mset(
+                {key: base64.b64encode(vector.tobytes()).decode("ascii") for key, vector in zip(keys, vectors)},
+                ex=self.ttl_s,
+            )
+        except Exception as e:
+            logger.warning(f"Failed to write embeddings to redis cache: {e}")
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.stats = CacheStats()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Process-wide embedding cache, or None when disabled via `embedding_cache_size=0`."""
+    global _embedding_cache
+    if settings.embedding_cache_size <= 0:
+        return None
+    if _embedding_cache is None:
+        _embedding_cache = EmbeddingCache(max_entries=settings.embedding_cache_size, ttl_s=settings.embedding_cache_ttl_seconds)
+    return _embedding_cache
+
+
+async def embed_with_cache(
+    texts: List[str],
+    embedding_config: EmbeddingConfig,
+    embed: Callable[[List[str]], Awaitable[List[List[float]]]],
+    organization_id: str,
+) -> List[List[float]]:
+    """Embed `texts` in order, calling `embed` only for distinct texts that `organization_id` has not cached yet."""
+    cache = get_embedding_cache()
+    if cache is None or not texts:
+        return await embed(texts)
+
+    keys = [cache.cache_key(organization_id, embedding_config, text) for text in texts]
+    cached = await cache.get_many(keys)
+
+    texts_to_embed: Dict[str, str] = {}
+    for key, text, vector in zip(keys, texts, cached):
+        if vector is None:
+            texts_to_embed.setdefault(key, text)
+
+    embedded: Dict[str, List[float]] = {}
+    if texts_to_embed:
+        embeddings = await embed(list(texts_to_embed.values()))
+        embedded = dict(zip(texts_to_embed, embeddings))
+        await cache.set_many(list(embedded), [np.asarray(embedding, dtype=np.float32) for embedding in embeddings])
+
+    log_event(
+        "embedding_cache.lookup",
+        {"texts": len(texts), "cache_hits": sum(vector is not None for vector in cached), "embedded": len(texts_to_embed)},
+    )
+    return [embedded[key] if vector is None else vector.tolist() for key, vector in zip(keys, cached)]
@@ -0,0 +1,136 @@
+"""In-process tier of `async_redis_cache`.
+
+Values are kept serialized (the same strings that are written to redis), so callers never share mutable objects with
+the cache and the size of every entry is known. The cache is bounded by the total size of its keys and values and
+evicts least recently used entries first; every entry also expires after its own time to live.
+
+Invalidations bump a generation counter. A caller that computes a value on a miss reads the generation before doing
+so and passes it to `set`, which drops the value if anything was invalidated in the meantime, since the value may
+have been read before the invalidating write.
+
+When redis is configured, invalidations are also published on `CACHE_INVALIDATION_CHANNEL` and every process drops
+the published keys from its own in-process tier (see `ensure_invalidation_listener`, which other per-process caches
+use with channels of their own).
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Protocol, Tuple
+
+from letta.constants import REDIS_DEFAULT_CACHE_PREFIX
+from letta.data_sources.redis_client import AsyncRedisClient
+from letta.log import get_logger
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+CACHE_INVALIDATION_CHANNEL = f"{REDIS_DEFAULT_CACHE_PREFIX}:invalidate"
+# published instead of a key to drop every entry
+INVALIDATE_ALL = "*"
+
+
+class MemoryCache:
+    """Size-bounded LRU of serialized values with per-entry expiry."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.generation = 0
+        # key -> (value, expires at (monotonic), size)
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: str, ttl_s: float, generation: Optional[int] = None) -> bool:
+        """Cache `value`; skipped when an invalidation happened since `generation` or the entry alone exceeds the bound."""
+        if generation is not None and generation != self.generation:
+            return False
+        size = len(key) + len(value)
+        if size > self.max_bytes:
+            return False
+        self._remove(key)
+        self._entries[key] = (value, time.monotonic() + ttl_s, size)
+        self.size_bytes += size
+        while self.size_bytes > self.max_bytes:
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+        return True
+
+    def delete(self, key: str) -> bool:
+        self.generation += 1
+        return self._remove(key)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self.size_bytes = 0
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self.size_bytes -= entry[2]
+        return True
+
+
+_memory_cache: Optional[MemoryCache] = None
+
+
+def get_memory_cache() -> Optional[MemoryCache]:
+    """Process-wide in-process cache tier, or None when disabled via `memory_cache_max_bytes=0`."""
+    global _memory_cache
+    if settings.memory_cache_max_bytes <= 0:
+        return None
+    if _memory_cache is None:
+        _memory_cache = MemoryCache(max_bytes=settings.memory_cache_max_bytes)
+    return _memory_cache
+
+
+class InvalidatedCache(Protocol):
+    def delete(self, key: str) -> bool: ...
+
+    def clear(self) -> None: ...
+
+
+# invalidation channel -> task applying the invalidations published there
+_invalidation_listeners: Dict[str, asyncio.Task] = {}
+
+
+async def _listen_for_invalidations(redis_client: AsyncRedisClient, cache: InvalidatedCache, channel: str) -> None:
+    try:
+        async for key in redis_client.subscribe(channel):
+            if key == INVALIDATE_ALL:
+                cache.clear()
+            else:
+                cache.delete(key)
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        logger.warning(f"Cache invalidation listener on {channel} stopped: {e}")
+
+
+def ensure_invalidation_listener(
+    redis_client: AsyncRedisClient, cache: InvalidatedCache, channel: str = CACHE_INVALIDATION_CHANNEL
+) -> None:
+    """Start (or restart) the task that applies invalidations published on `channel` by other processes to `cache`.
+
+    Published messages are keys to delete, or `INVALIDATE_ALL`. Invalidations published while no listener was running
+    are lost, so the cache is cleared whenever a listener starts.
+    """
+    listener = _invalidation_listeners.get(channel)
+    if listener is not None and not listener.done() and listener.get_loop() is asyncio.get_running_loop():
+        return
+    cache.clear()
+    _invalidation_listeners[channel] = asyncio.create_task(_listen_for_invalidations(redis_client, cache, channel))
@@ -0,0 +1,442 @@
+"""In-process approximate nearest neighbour index for SQLite vector search.
+
+Postgres answers vector queries with pgvector, but SQLite falls back to a `cosine_distance` UDF that decodes and
+scores every row in Python. This module keeps a per-archive / per-source IVF-flat index on disk next to the
+database so those queries can be answered with a handful of NumPy matrix products instead.
+
+Layout of an index directory (`<letta_dir>/vector_index/<kind>/<container_id>/`):
+
+    meta.json       dimension, number of committed rows and the newest `updated_at` indexed (written last, so it
+                    is the commit point)
+    vectors.f32     row-major float32 matrix of L2-normalized vectors, memory-mapped for queries
+    ids.txt         passage id per row
+    lists.i32       IVF list per row (-1 until the index has been trained)
+    tombstones.i64  rows that were deleted or superseded
+    centroids.npy   IVF centroids, present once the index holds `sqlite_vector_index_ivf_threshold` vectors
+
+The index only ever appends; deletions are tombstoned and the files are compacted once most rows are dead.
+Several server processes may share a letta_dir, so every write holds an exclusive `flock` on `<container_id>.lock`
+next to the index directory and reads hold a shared one. Full rebuilds are written to a private staging directory
+and swapped in, so searches keep using the previous index meanwhile.
+The SQL tables remain the source of truth - callers must treat results as candidates and re-check them against
+the database, and rebuild the index whenever it has drifted (see `PassageManager.search_vector_index_async`).
+"""
+
+import asyncio
+import json
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from enum import Enum
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows, where several processes sharing one letta_dir is not supported
+    fcntl = None
+
+from letta.log import get_logger
+from letta.settings import DatabaseChoice, settings
+
+logger = get_logger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+SCAN_CHUNK_ROWS = 65_536
+KMEANS_ITERATIONS = 8
+KMEANS_SAMPLES_PER_LIST = 64
+# candidates ranked per requested result, so filters applied afterwards in SQL can still fill the page
+VECTOR_INDEX_CANDIDATE_OVERFETCH = 4
+
+
+class VectorIndexKind(str, Enum):
+    ARCHIVE = "archive"
+    SOURCE = "source"
+
+
+def should_use_sqlite_vector_index() -> bool:
+    return settings.database_engine is DatabaseChoice.SQLITE and settings.sqlite_vector_index
+
+
+def updated_at_timestamp(updated_at: Optional[datetime]) -> Optional[float]:
+    """`updated_at` as a POSIX timestamp; SQLite hands back naive UTC datetimes."""
+    if updated_at is None:
+        return None
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at.timestamp()
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32, copy=False)
+
+
+class PassageVectorIndex:
+    """IVF-flat cosine index over the passages of a single archive or source.
+
+    Below `ivf_threshold` live vectors every query is an exact, chunked scan of the memory-mapped matrix. Past it
+    the vectors are clustered with spherical k-means into ~sqrt(n) lists and a query only scores the `nprobe`
+    lists whose centroids are closest to it.
+
+    All methods are blocking and thread-safe; call them through `asyncio.to_thread` from async code.
+    """
+
+    def __init__(self, path: Path, nprobe: Optional[int] = None, ivf_threshold: Optional[int] = None):
+        self.path = Path(path)
+        self.nprobe = nprobe or settings.sqlite_vector_index_nprobe
+        self.ivf_threshold = ivf_threshold or settings.sqlite_vector_index_ivf_threshold
+        self._lock = threading.RLock()
+        self._flock_depth = 0
+        # serializes rebuilds from the database, see PassageManager.search_vector_index_async
+        self.rebuild_lock = asyncio.Lock()
+        self._reset_state()
+        self._load()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def _reset_state(self) -> None:
+        self.dim: Optional[int] = None
+        self._ids: List[str] = []
+        self._rows_by_id: Dict[str, int] = {}
+        self._live = np.zeros(0, dtype=bool)
+        self._lists = np.zeros(0, dtype=np.int32)
+        self._centroids: Optional[np.ndarray] = None
+        self._vectors: Optional[np.memmap] = None
+        self._max_updated_at: Optional[float] = None
+        self._meta_mtime_ns: Optional[int] = None
+
+    def _file(self, name: str) -> Path:
+        return self.path / name
+
+    @property
+    def lock_path(self) -> Path:
+        # outside the index directory, which is removed on drop and replaced on rebuild
+        return self.path.parent / f"{self.path.name}.lock"
+
+    @contextmanager
+    def _process_lock(self, exclusive: bool = True) -> Iterator[None]:
+        """Hold the thread lock and a `flock` shared with other processes using the same index directory.
+
+        Re-entrant within a thread; nested acquisitions reuse the outermost lock, so a read inside a write stays
+        exclusive.
+        """
+        with self._lock:
+            if fcntl is None or self._flock_depth:
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                return
+
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.lock_path, "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+                self._flock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._flock_depth -= 1
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @property
+    def exists(self) -> bool:
+        return self.dim is not None
+
+    @property
+    def num_rows(self) -> int:
+        return len(self._ids)
+
+    def __len__(self) -> int:
+        """Number of live (searchable) vectors."""
+        with self._process_lock(exclusive=False):
+            self._maybe_reload()
+            return int(self._live.sum())
+
+    def fingerprint(self) -> Tuple[int, Optional[float]]:
+        """(live vectors, newest `updated_at` timestamp indexed), to compare against the SQL tables."""
+        with self._process_lock(exclusive=False):
+            self._maybe_reload()
+            return int(self._live.sum()), self._max_updated_at
+
+    def _load(self) -> None:
+        meta_path = self._file("meta.json")
+        if not meta_path.exists():
+            return
+        try:
+            meta = json.loads(meta_path.read_text())
+            if meta.get("version") != INDEX_FORMAT_VERSION:
+                raise ValueError(f"unsupported index version {meta.get('version')}")
+            dim, rows = int(meta["dim"]), int(meta["rows"])
+
+            with open(self._file("ids.txt")) as f:
+                ids = f.read().split("\n")[:rows]
+            lists = np.fromfile(self._file("lists.i32"), dtype=np.int32, count=rows)
+            if len(ids) < rows or len(lists) < rows or self._file("vectors.f32").stat().st_size < rows * dim * 4:
+                raise ValueError("index files are shorter than recorded in meta.json")
+
+            live = np.ones(rows, dtype=bool)
+            tombstones_path = self._file("tombstones.i64")
+            if tombstones_path.exists():
+                tombstones = np.fromfile(tombstones_path, dtype=np.int64)
+                live[tombstones[tombstones < rows]] = False
+
+            centroids_path = self._file("centroids.npy")
+            self._centroids = np.load(centroids_path) if centroids_path.exists() else None
+            self.dim = dim
+            self._ids = ids
+            self._rows_by_id = {passage_id: row for row, passage_id in enumerate(ids) if live[row]}
+            self._live = live
+            self._lists = lists
+            self._max_updated_at = meta.get("max_updated_at")
+            self._meta_mtime_ns = meta_path.stat().st_mtime_ns
+        except Exception as e:
+            # the index is a cache of the SQL tables, so a damaged one is simply rebuilt
+            logger.warning(f"Discarding unreadable vector index at {self.path}: {e}")
+            self._reset_state()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def _maybe_reload(self) -> None:
+        """Pick up writes made by other processes sharing the same letta_dir."""
+        try:
+            mtime_ns = self._file("meta.json").stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime_ns = None
+        if mtime_ns != self._meta_mtime_ns:
+            self._reset_state()
+            self._load()
+
+    def _vector_matrix(self) -> np.ndarray:
+        if self._vectors is None or self._vectors.shape[0] != self.num_rows:
+            if self.num_rows == 0:
+                return np.zeros((0, self.dim or 0), dtype=np.float32)
+            self._vectors = np.memmap(self._file("vectors.f32"), dtype=np.float32, mode="r", shape=(self.num_rows, self.dim))
+        return self._vectors
+
+    def _write_meta(self) -> None:
+        tmp_path = self._file("meta.json.tmp")
+        tmp_path.write_text(
+            json.dumps({"version": INDEX_FORMAT_VERSION, "dim": self.dim, "rows": self.num_rows, "max_updated_at": self._max_updated_at})
+        )
+        os.replace(tmp_path, self._file("meta.json"))
+        self._meta_mtime_ns = self._file("meta.json").stat().st_mtime_ns
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def reset(self, dim: int) -> None:
+        """Discard the index contents and start an empty index of dimension `dim`."""
+        with self._process_lock():
+            self.drop()
+            self.path.mkdir(parents=True, exist_ok=True)
+            self.dim = dim
+            for name in ("vectors.f32", "lists.i32", "ids.txt"):
+                self._file(name).touch()
+            self._write_meta()
+
+    def add(self, ids: Sequence[str], vectors: np.ndarray, train: bool = True, updated_at: Optional[float] = None) -> None:
+        """Insert or replace vectors. Vectors may be zero-padded past the index dimension.
+
+        Pass `train=False` while bulk loading and call `maybe_train` once at the end, so the IVF lists are
+        clustered over the whole collection instead of its first batches. `updated_at` is the newest
+        `updated_at` timestamp of the passages being added.
+        """
+        if len(ids) == 0:
+            return
+        with self._process_lock():
+            self._maybe_reload()
+            if not self.exists:
+                raise ValueError(f"Vector index at {self.path} has not been built")
+            self.remove(ids)
+            self._append(ids, vectors)
+            if updated_at is not None:
+                self._max_updated_at = max(updated_at, self._max_updated_at or updated_at)
+            self._write_meta()
+            if train:
+                self.maybe_train()
+
+    def remove(self, ids: Iterable[str]) -> int:
+        """Tombstone vectors by passage id, returning how many were live."""
+        with self._process_lock():
+            self._maybe_reload()
+            rows = [self._rows_by_id.pop(passage_id) for passage_id in ids if passage_id in self._rows_by_id]
+            if not rows:
+                return 0
+            self._live[rows] = False
+            with open(self._file("tombstones.i64"), "ab") as f:
+                f.write(np.asarray(rows, dtype=np.int64).tobytes())
+            self._write_meta()
+
+            num_live = int(self._live.sum())
+            if self.num_rows > 1024 and num_live < self.num_rows // 2:
+                self._compact()
+            return len(rows)
+
+    def drop(self) -> None:
+        with self._process_lock():
+            self._reset_state()
+            shutil.rmtree(self.path, ignore_errors=True)
+
+    def staging(self) -> "PassageVectorIndex":
+        """A private, empty index to rebuild into and then `swap_in`."""
+        staging_path = self.path.parent / f".{self.path.name}.build-{uuid.uuid4().hex}"
+        return PassageVectorIndex(staging_path, nprobe=self.nprobe, ivf_threshold=self.ivf_threshold)
+
+    def swap_in(self, staging: "PassageVectorIndex") -> None:
+        """Replace this index with a fully built staging index."""
+        with self._process_lock():
+            self._reset_state()
+            shutil.rmtree(self.path, ignore_errors=True)
+            os.replace(staging.path, self.path)
+            staging.lock_path.unlink(missing_ok=True)
+            self._load()
+
+    def _append(self, ids: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.ndim != 2 or vectors.shape[0] != len(ids):
+            raise ValueError(f"Expected {len(ids)} vectors, got array of shape {vectors.shape}")
+        if vectors.shape[1] < self.dim:
+            raise ValueError(f"Vectors have dimension {vectors.shape[1]}, index expects {self.dim}")
+        if vectors.shape[1] > self.dim and np.any(vectors[:, self.dim :]):
+            raise ValueError(f"Vectors have non-zero components past the index dimension {self.dim}")
+        vectors = _normalize(vectors[:, : self.dim])
+
+        lists = np.full(len(ids), -1, dtype=np.int32)
+        if self._centroids is not None:
+            lists = np.argmax(vectors @ self._centroids.T, axis=1).astype(np.int32)
+
+        start = self.num_rows
+        with open(self._file("vectors.f32"), "ab") as f:
+            f.write(vectors.tobytes())
+        with open(self._file("lists.i32"), "ab") as f:
+            f.write(lists.tobytes())
+        with open(self._file("ids.txt"), "a") as f:
+            f.write("".join(f"{passage_id}\n" for passage_id in ids))
+
+        self._ids.extend(ids)
+        self._rows_by_id.update((passage_id, start + i) for i, passage_id in enumerate(ids))
+        self._live = np.concatenate([self._live, np.ones(len(ids), dtype=bool)])
+        self._lists = np.concatenate([self._lists, lists])
+
+    def _compact(self) -> None:
+        rows = np.flatnonzero(self._live)
+        ids = [self._ids[row] for row in rows]
+        vectors = np.array(self._vector_matrix()[rows])
+        max_updated_at = self._max_updated_at
+        self.reset(self.dim)
+        self._max_updated_at = max_updated_at
+        self._append(ids, vectors)
+        self._write_meta()
+        self.maybe_train()
+
+    def maybe_train(self) -> None:
+        """Cluster the index into IVF lists once it is large enough for exact scans to be slow."""
+        with self._process_lock():
+            self._train_if_needed()
+
+    def _train_if_needed(self) -> None:
+        if self._centroids is not None:
+            return
+        live_rows = np.flatnonzero(self._live)
+        if len(live_rows) < self.ivf_threshold:
+            return
+
+        num_lists = int(np.clip(np.sqrt(len(live_rows)), 16, 4096))
+        rng = np.random.default_rng(0)
+        sample_rows = np.sort(rng.choice(live_rows, size=min(len(live_rows), num_lists * KMEANS_SAMPLES_PER_LIST), replace=False))
+        sample = np.array(self._vector_matrix()[sample_rows])
+
+        # spherical k-means: vectors are normalized, so the nearest centroid is the one with the largest dot product
+        centroids = sample[rng.choice(len(sample), size=num_lists, replace=False)]
+        for _ in range(KMEANS_ITERATIONS):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            empty = ~np.any(sums, axis=1)
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+
+        lists = np.empty(self.num_rows, dtype=np.int32)
+        vectors = self._vector_matrix()
+        for start in range(0, self.num_rows, SCAN_CHUNK_ROWS):
+            chunk = np.asarray(vectors[start : start + SCAN_CHUNK_ROWS])
+            lists[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+
+        lists.tofile(self._file("lists.i32"))
+        np.save(self._file("centroids.npy"), centroids)
+        self._lists = lists
+        self._centroids = centroids
+        self._write_meta()
+        logger.info(f"Trained vector index {self.path.name} with {num_lists} lists over {len(live_rows)} vectors")
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def search(self, query: Sequence[float], top_k: int) -> List[Tuple[str, float]]:
+        """Return up to `top_k` (passage_id, cosine_distance) pairs, closest first."""
+        with self._process_lock(exclusive=False):
+            self._maybe_reload()
+            if not self.exists or top_k <= 0:
+                return []
+
+            q = np.asarray(query, dtype=np.float32)[: self.dim]
+            norm = np.linalg.norm(q)
+            if norm == 0:
+                return []
+            q = q / norm
+            vectors = self._vector_matrix()
+
+            if self._centroids is not None:
+                nprobe = min(self.nprobe, len(self._centroids))
+                probe = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+                rows = np.flatnonzero(np.isin(self._lists, probe) & self._live)
+                scores = vectors[rows] @ q if len(rows) else np.zeros(0, dtype=np.float32)
+            else:
+                rows = np.flatnonzero(self._live)
+                scores = np.empty(self.num_rows, dtype=np.float32)
+                for start in range(0, self.num_rows, SCAN_CHUNK_ROWS):
+                    chunk = np.asarray(vectors[start : start + SCAN_CHUNK_ROWS])
+                    scores[start : start + len(chunk)] = chunk @ q
+                scores = scores[rows]
+
+            if len(rows) > top_k:
+                best = np.argpartition(-scores, top_k - 1)[:top_k]
+            else:
+                best = np.arange(len(rows))
+            best = best[np.argsort(-scores[best], kind="stable")]
+            return [(self._ids[rows[i]], float(1.0 - scores[i])) for i in best]
+
+
+_indexes: Dict[Tuple[VectorIndexKind, str], PassageVectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_passage_vector_index(kind: VectorIndexKind, container_id: str) -> PassageVectorIndex:
+    """Process-wide index for an archive or source, created empty (unbuilt) if it does not exist yet."""
+    key = (VectorIndexKind(kind), container_id)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = PassageVectorIndex(Path(settings.letta_dir) / "vector_index" / key[0].value / container_id)
+        return index
+
+
+def drop_passage_vector_index(kind: VectorIndexKind, container_id: str) -> None:
+    """Remove the index of a deleted archive or source from disk and from the process-wide registry."""
+    key = (VectorIndexKind(kind), container_id)
+    index = get_passage_vector_index(*key)
+    index.drop()
+    index.lock_path.unlink(missing_ok=True)
+    with _indexes_lock:
+        _indexes.pop(key, None)
@@ -40,7 +40,7 @@ from letta.schemas.letta_message_content import ReasoningContent, RedactedReason
 from letta.schemas.letta_stop_reason import LettaStopReason, StopReasonType
 from letta.schemas.message import Message
 from letta.schemas.openai.chat_completion_response import FunctionCall, ToolCall
-from letta.server.rest_api.json_parser import JSONParser, PydanticJSONParser
+from letta.server.rest_api.json_parser import IncrementalJSONParser, JSONParser, PydanticJSONParser, string_delta
 
 logger = get_logger(__name__)
 
@@ -77,12 +77,16 @@ class AnthropicStreamingInterface:
         self.accumulated_inner_thoughts = []
         self.tool_call_id = None
         self.tool_call_name = None
-        self.accumulated_tool_call_args = ""
-        self.previous_parse = {}
+        self.tool_call_args_chunks: list[str] = []
+        # consumes each partial_json delta once instead of re-parsing the accumulated arguments
+        self.tool_call_args_parser = IncrementalJSONParser()
 
         # usage trackers
+        # input_tokens includes the prompt tokens read from and written to the prompt cache, which Anthropic reports separately
         self.input_tokens = 0
         self.output_tokens = 0
+        self.cache_read_tokens = 0
+        self.cache_creation_tokens = 0
         self.model = None
 
         # reasoning object trackers
@@ -98,6 +102,10 @@ class AnthropicStreamingInterface:
 
         self.requires_approval_tools = requires_approval_tools
 
+    @property
+    def accumulated_tool_call_args(self) -> str:
+        return "".join(self.tool_call_args_chunks)
+
     def get_tool_call_object(self) -> ToolCall:
         """Useful for agent loop"""
         if not self.tool_call_name:
@@ -121,22 +129,17 @@ class AnthropicStreamingInterface:
             arguments = str(json.dumps(tool_input, indent=2))
         return ToolCall(id=self.tool_call_id, function=FunctionCall(arguments=arguments, name=self.tool_call_name))
 
-    def _check_inner_thoughts_complete(self, combined_args: str) -> bool:
+    def _check_inner_thoughts_complete(self) -> bool:
         """
-        Check if inner thoughts are complete in the current tool call arguments
-        by looking for a closing quote after the inner_thoughts field
+        Check if inner thoughts are complete in the tool call arguments parsed so far
+        by checking whether another argument started after the inner_thoughts field
         """
-        try:
-            if not self.put_inner_thoughts_in_kwarg:
-                # None of the things should have inner thoughts in kwargs
-                return True
-            else:
-                parsed = self.json_parser.parse(combined_args)
-                # TODO: This will break on tools with 0 input
-                return len(parsed.keys()) > 1 and INNER_THOUGHTS_KWARG in parsed.keys()
-        except Exception as e:
-            logger.error("Error checking inner thoughts: %s", e)
-            raise
+        if not self.put_inner_thoughts_in_kwarg:
+            # None of the things should have inner thoughts in kwargs
+            return True
+        parsed = self.tool_call_args_parser.root
+        # TODO: This will break on tools with 0 input
+        return isinstance(parsed, dict) and len(parsed) > 1 and INNER_THOUGHTS_KWARG in parsed
 
     def get_reasoning_content(self) -> list[TextContent | ReasoningContent | RedactedReasoningContent]:
         def _process_group(
@@ -347,13 +350,11 @@ class AnthropicStreamingInterface:
                         f"Streaming integrity failed - received BetaInputJSONDelta object while not in TOOL_USE EventMode: {delta}"
                     )
 
-                self.accumulated_tool_call_args += delta.partial_json
-                current_parsed = self.json_parser.parse(self.accumulated_tool_call_args)
+                self.tool_call_args_chunks.append(delta.partial_json)
+                events = self.tool_call_args_parser.feed(delta.partial_json)
 
                 # Start detecting a difference in inner thoughts
-                previous_inner_thoughts = self.previous_parse.get(INNER_THOUGHTS_KWARG, "")
-                current_inner_thoughts = current_parsed.get(INNER_THOUGHTS_KWARG, "")
-                inner_thoughts_diff = current_inner_thoughts[len(previous_inner_thoughts) :]
+                inner_thoughts_diff = string_delta(events, INNER_THOUGHTS_KWARG)
 
                 if inner_thoughts_diff:
                     if prev_message_type and prev_message_type != "reasoning_message":
@@ -369,8 +370,9 @@ class AnthropicStreamingInterface:
                     yield reasoning_message
 
                 # Check if inner thoughts are complete - if so, flush the buffer or create approval message
-                if not self.inner_thoughts_complete and self._check_inner_thoughts_complete(self.accumulated_tool_call_args):
+                if not self.inner_thoughts_complete and self._check_inner_thoughts_complete():
                     self.inner_thoughts_complete = True
+                    current_inner_thoughts = self.tool_call_args_parser.value.get(INNER_THOUGHTS_KWARG, "")
 
                     # Check if this tool requires approval
                     if self.tool_call_name in self.requires_approval_tools:
@@ -423,9 +425,7 @@ class AnthropicStreamingInterface:
 
                 # Start detecting special case of "send_message"
                 if self.tool_call_name == DEFAULT_MESSAGE_TOOL and self.use_assistant_message:
-                    previous_send_message = self.previous_parse.get(DEFAULT_MESSAGE_TOOL_KWARG, "")
-                    current_send_message = current_parsed.get(DEFAULT_MESSAGE_TOOL_KWARG, "")
-                    send_message_diff = current_send_message[len(previous_send_message) :]
+                    send_message_diff = string_delta(events, DEFAULT_MESSAGE_TOOL_KWARG)
 
                     # Only stream out if it's not an empty string
                     if send_message_diff:
@@ -461,9 +461,6 @@ class AnthropicStreamingInterface:
                         yield tool_call_msg
                     else:
                         self.tool_call_buffer.append(tool_call_msg)
-
-                # Set previous parse
-                self.previous_parse = current_parsed
             elif isinstance(delta, BetaThinkingDelta):
                 # Safety check
                 if not self.anthropic_mode == EventMode.THINKING:
@@ -505,8 +502,11 @@ class AnthropicStreamingInterface:
                 yield reasoning_message
         elif isinstance(event, BetaRawMessageStartEvent):
             self.message_id = event.message.id
-            self.input_tokens += event.message.usage.input_tokens
-            self.output_tokens += event.message.usage.output_tokens
+            usage = event.message.usage
+            self.cache_read_tokens += usage.cache_read_input_tokens or 0
+            self.cache_creation_tokens += usage.cache_creation_input_tokens or 0
+            self.input_tokens += usage.input_tokens + (usage.cache_read_input_tokens or 0) + (usage.cache_creation_input_tokens or 0)
+            self.output_tokens += usage.output_tokens
             self.model = event.message.model
         elif isinstance(event, BetaRawMessageDeltaEvent):
             self.output_tokens += event.usage.output_tokens
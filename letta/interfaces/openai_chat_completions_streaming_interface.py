@@ -6,7 +6,7 @@ from openai.types.chat.chat_completion_chunk import ChatCompletionChunk, Choice,
 
 from letta.constants import PRE_EXECUTION_MESSAGE_ARG
 from letta.interfaces.utils import _format_sse_chunk
-from letta.server.rest_api.json_parser import OptimisticJSONParser
+from letta.server.rest_api.json_parser import IncrementalJSONParser, string_delta
 
 
 class OpenAIChatCompletionsStreamingInterface:
@@ -17,18 +17,21 @@ class OpenAIChatCompletionsStreamingInterface:
     """
 
     def __init__(self, stream_pre_execution_message: bool = True):
-        self.optimistic_json_parser: OptimisticJSONParser = OptimisticJSONParser()
+        self.tool_call_args_parser = IncrementalJSONParser()
         self.stream_pre_execution_message: bool = stream_pre_execution_message
 
-        self.current_parsed_json_result: dict[str, Any] = {}
         self.content_buffer: list[str] = []
         self.tool_call_happened: bool = False
         self.finish_reason_stop: bool = False
 
         self.tool_call_name: str | None = None
-        self.tool_call_args_str: str = ""
+        self.tool_call_args_chunks: list[str] = []
         self.tool_call_id: str | None = None
 
+    @property
+    def tool_call_args_str(self) -> str:
+        return "".join(self.tool_call_args_chunks)
+
     async def process(self, stream: AsyncStream[ChatCompletionChunk]) -> AsyncGenerator[str, None]:
         """
         Iterates over the OpenAI stream, yielding SSE events.
@@ -67,7 +70,7 @@ class OpenAIChatCompletionsStreamingInterface:
         self._update_tool_call_info(tool_call)
 
         if self.stream_pre_execution_message and tool_call.function.arguments:
-            self.tool_call_args_str += tool_call.function.arguments
+            self.tool_call_args_chunks.append(tool_call.function.arguments)
             async for sse_chunk in self._stream_pre_execution_message(chunk, tool_call):
                 yield sse_chunk
 
@@ -79,22 +82,11 @@ class OpenAIChatCompletionsStreamingInterface:
             self.tool_call_id = tool_call.id
 
     async def _stream_pre_execution_message(self, chunk: ChatCompletionChunk, tool_call: Any) -> AsyncGenerator[str, None]:
-        """Parses and streams pre-execution messages if they have changed."""
-        parsed_args = self.optimistic_json_parser.parse(self.tool_call_args_str)
-
-        if parsed_args.get(PRE_EXECUTION_MESSAGE_ARG) and parsed_args[PRE_EXECUTION_MESSAGE_ARG] != self.current_parsed_json_result.get(
-            PRE_EXECUTION_MESSAGE_ARG
-        ):
-            # Extract old and new message content
-            old = self.current_parsed_json_result.get(PRE_EXECUTION_MESSAGE_ARG, "")
-            new = parsed_args[PRE_EXECUTION_MESSAGE_ARG]
-
-            # Compute the new content by slicing off the old prefix
-            content = new[len(old) :] if old else new
-
-            # Update current state
-            self.current_parsed_json_result = parsed_args
+        """Parses the new argument text and streams whatever it added to the pre-execution message."""
+        events = self.tool_call_args_parser.feed(tool_call.function.arguments)
+        content = string_delta(events, PRE_EXECUTION_MESSAGE_ARG)
 
+        if content:
             # Yield the formatted SSE chunk
             yield _format_sse_chunk(
                 ChatCompletionChunk(
@@ -65,8 +65,8 @@ class OpenAIStreamingInterface:
         self.last_flushed_function_name = None
         self.last_flushed_function_id = None
 
-        # Buffer to hold function arguments until inner thoughts are complete
-        self.current_function_arguments = ""
+        # Buffer to hold function arguments until inner thoughts are complete (joined on read, see current_function_arguments)
+        self.current_function_arguments_chunks: list[str] = []
         self.current_json_parse_result = {}
 
         # Premake IDs for database writes
@@ -96,6 +96,10 @@ class OpenAIStreamingInterface:
 
         self.requires_approval_tools = requires_approval_tools
 
+    @property
+    def current_function_arguments(self) -> str:
+        return "".join(self.current_function_arguments_chunks)
+
     def get_reasoning_content(self) -> list[TextContent | OmittedReasoningContent]:
         content = "".join(self.reasoning_messages).strip()
 
@@ -239,7 +243,7 @@ class OpenAIStreamingInterface:
 
                 if tool_call.function.arguments:
                     # updates_main_json, updates_inner_thoughts = self.function_args_reader.process_fragment(tool_call.function.arguments)
-                    self.current_function_arguments += tool_call.function.arguments
+                    self.current_function_arguments_chunks.append(tool_call.function.arguments)
                     updates_main_json, updates_inner_thoughts = self.function_args_reader.process_fragment(tool_call.function.arguments)
 
                     if self.is_openai_proxy:
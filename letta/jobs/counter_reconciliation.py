@@ -0,0 +1,29 @@
+import datetime
+
+from letta.log import get_logger
+from letta.otel.tracing import trace_method
+from letta.server.server import SyncServer
+
+logger = get_logger(__name__)
+
+
+@trace_method
+async def reconcile_counters(server: SyncServer) -> None:
+    """Recount the maintained message and passage counters (see letta.services.helpers.counter_helper).
+
+    The managers keep the counters exact for writes they perform; this corrects drift from anything else that writes
+    messages or passages, e.g. manual SQL or cascading deletes.
+    """
+    start_time = datetime.datetime.now()
+    try:
+        drifted_agents = await server.message_manager.reconcile_agent_message_counts_async()
+        drifted_archives = await server.passage_manager.reconcile_archive_counts_async()
+    except Exception as e:
+        logger.exception(f"[Reconcile Counters] Failed to reconcile counters: {e}")
+        return
+
+    elapsed = (datetime.datetime.now() - start_time).total_seconds()
+    logger.info(
+        f"[Reconcile Counters] Finished in {elapsed:.2f}s, corrected {drifted_agents} agent message counters "
+        f"and {drifted_archives} archive counters."
+    )
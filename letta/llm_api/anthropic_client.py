@@ -28,6 +28,7 @@ from letta.helpers.datetime_helpers import get_utc_time_int
 from letta.helpers.decorators import deprecated
 from letta.llm_api.helpers import add_inner_thoughts_to_functions, unpack_all_inner_thoughts_from_kwargs
 from letta.llm_api.llm_client_base import LLMClientBase
+from letta.llm_api.request_prefix_cache import convert_request_messages, convert_request_tools
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION
 from letta.log import get_logger
 from letta.otel.tracing import trace_method
@@ -41,10 +42,12 @@ from letta.schemas.openai.chat_completion_response import (
     Message as ChoiceMessage,
     ToolCall,
     UsageStatistics,
+    UsageStatisticsPromptTokenDetails,
 )
 from letta.settings import model_settings
 
 DUMMY_FIRST_USER_MESSAGE = "User initializing bootup sequence."
+BASE_INSTRUCTIONS_END_TAG = "</base_instructions>"
 
 logger = get_logger(__name__)
 
@@ -220,15 +223,12 @@ class AnthropicClient(LLMClientBase):
         # https://docs.anthropic.com/en/docs/build-with-claude/tool-use/overview
         if not tools:
             # Special case for summarization path
-            tools_for_request = None
             tool_choice = None
         elif self.is_reasoning_model(llm_config) and llm_config.enable_reasoner:
             # NOTE: reasoning models currently do not allow for `any`
             tool_choice = {"type": "auto", "disable_parallel_tool_use": True}
-            tools_for_request = [OpenAITool(function=f) for f in tools]
         elif force_tool_call is not None:
             tool_choice = {"type": "tool", "name": force_tool_call, "disable_parallel_tool_use": True}
-            tools_for_request = [OpenAITool(function=f) for f in tools if f["name"] == force_tool_call]
 
             # need to have this setting to be able to put inner thoughts in kwargs
             if not llm_config.put_inner_thoughts_in_kwargs:
@@ -238,25 +238,25 @@ class AnthropicClient(LLMClientBase):
                 llm_config.put_inner_thoughts_in_kwargs = True
         else:
             tool_choice = {"type": "any", "disable_parallel_tool_use": True}
-            tools_for_request = [OpenAITool(function=f) for f in tools] if tools is not None else None
 
         # Add tool choice
         if tool_choice:
             data["tool_choice"] = tool_choice
 
-        # Add inner thoughts kwarg
-        # TODO: Can probably make this more efficient
-        if tools_for_request and len(tools_for_request) > 0 and llm_config.put_inner_thoughts_in_kwargs:
-            tools_with_inner_thoughts = add_inner_thoughts_to_functions(
-                functions=[t.function.model_dump() for t in tools_for_request],
-                inner_thoughts_key=INNER_THOUGHTS_KWARG,
-                inner_thoughts_description=INNER_THOUGHTS_KWARG_DESCRIPTION,
+        put_inner_thoughts_in_kwargs = bool(llm_config.put_inner_thoughts_in_kwargs)
+        if tools:
+            only_tool = force_tool_call if tool_choice["type"] == "tool" else None
+            anthropic_tools = convert_request_tools(
+                messages[0].agent_id,
+                tools,
+                ("anthropic", only_tool, put_inner_thoughts_in_kwargs),
+                lambda tools: self._convert_tools(tools, only_tool, put_inner_thoughts_in_kwargs),
             )
-            tools_for_request = [OpenAITool(function=f) for f in tools_with_inner_thoughts]
-
-        if tools_for_request and len(tools_for_request) > 0:
-            # TODO eventually enable parallel tool use
-            data["tools"] = convert_tools_to_anthropic_format(tools_for_request)
+            if anthropic_tools:
+                # TODO eventually enable parallel tool use
+                # tools come first in the prompt and rarely change, so they get their own cache breakpoint
+                anthropic_tools[-1]["cache_control"] = {"type": "ephemeral"}
+                data["tools"] = anthropic_tools
 
         # Messages
         inner_thoughts_xml_tag = "thinking"
@@ -264,13 +264,24 @@ class AnthropicClient(LLMClientBase):
         # Move 'system' to the top level
         if messages[0].role != "system":
             raise RuntimeError(f"First message is not a system message, instead has role {messages[0].role}")
-        system_content = messages[0].content if isinstance(messages[0].content, str) else messages[0].content[0].text
+        system_message = messages[0]
+        system_content = system_message.content if isinstance(system_message.content, str) else system_message.content[0].text
         data["system"] = self._add_cache_control_to_system_message(system_content)
-        data["messages"] = PydanticMessage.to_anthropic_dicts_from_list(
-            messages=messages[1:],
-            inner_thoughts_xml_tag=inner_thoughts_xml_tag,
-            put_inner_thoughts_in_kwargs=bool(llm_config.put_inner_thoughts_in_kwargs),
+        # the system message is passed through the cache (and dropped) so that a rewritten memory section ends the stable prefix
+        converted = convert_request_messages(
+            messages,
+            ("anthropic", inner_thoughts_xml_tag, put_inner_thoughts_in_kwargs),
+            lambda m: None
+            if m is system_message
+            else m.to_anthropic_dict(
+                inner_thoughts_xml_tag=inner_thoughts_xml_tag, put_inner_thoughts_in_kwargs=put_inner_thoughts_in_kwargs
+            ),
         )
+        data["messages"] = converted.messages
+
+        # Read the history cached by the previous request: it ended where the unchanged prefix ends now
+        if 0 < converted.stable_prefix_length < len(converted.messages):
+            add_cache_control_to_message(converted.messages[converted.stable_prefix_length - 1])
 
         # Ensure first message is user
         if data["messages"][0]["role"] != "user":
@@ -283,6 +294,9 @@ class AnthropicClient(LLMClientBase):
         if llm_config.enable_reasoner:
             data["messages"] = merge_heartbeats_into_tool_responses(data["messages"])
 
+        # Rolling history checkpoint: cache the whole conversation for the next step
+        add_cache_control_to_message(data["messages"][-1])
+
         # Prefix fill
         # https://docs.anthropic.com/en/api/messages#body-messages
         # NOTE: cannot prefill with tools for opus:
@@ -295,6 +309,20 @@ class AnthropicClient(LLMClientBase):
 
         return data
 
+    def _convert_tools(self, tools: List[dict], only_tool: Optional[str], put_inner_thoughts_in_kwargs: bool) -> List[dict]:
+        tools_for_request = [OpenAITool(function=f) for f in tools if only_tool is None or f["name"] == only_tool]
+
+        # Add inner thoughts kwarg
+        if tools_for_request and put_inner_thoughts_in_kwargs:
+            tools_with_inner_thoughts = add_inner_thoughts_to_functions(
+                functions=[t.function.model_dump() for t in tools_for_request],
+                inner_thoughts_key=INNER_THOUGHTS_KWARG,
+                inner_thoughts_description=INNER_THOUGHTS_KWARG_DESCRIPTION,
+            )
+            tools_for_request = [OpenAITool(function=f) for f in tools_with_inner_thoughts]
+
+        return convert_tools_to_anthropic_format(tools_for_request)
+
     async def count_tokens(self, messages: List[dict] = None, model: str = None, tools: List[OpenAITool] = None) -> int:
         logging.getLogger("httpx").setLevel(logging.WARNING)
 
@@ -475,7 +503,10 @@ class AnthropicClient(LLMClientBase):
         }
         """
         response = AnthropicMessage(**response_data)
-        prompt_tokens = response.usage.input_tokens
+        # input_tokens excludes the prompt tokens read from and written to the prompt cache
+        cache_read_tokens = response.usage.cache_read_input_tokens or 0
+        cache_creation_tokens = response.usage.cache_creation_input_tokens or 0
+        prompt_tokens = response.usage.input_tokens + cache_read_tokens + cache_creation_tokens
         completion_tokens = response.usage.output_tokens
         finish_reason = remap_finish_reason(str(response.stop_reason))
 
@@ -544,6 +575,10 @@ class AnthropicClient(LLMClientBase):
                 prompt_tokens=prompt_tokens,
                 completion_tokens=completion_tokens,
                 total_tokens=prompt_tokens + completion_tokens,
+                prompt_tokens_details=UsageStatisticsPromptTokenDetails(
+                    cached_tokens=cache_read_tokens,
+                    cache_creation_tokens=cache_creation_tokens,
+                ),
             ),
         )
         if llm_config.put_inner_thoughts_in_kwargs:
@@ -556,6 +591,16 @@ class AnthropicClient(LLMClientBase):
     def _add_cache_control_to_system_message(self, system_content):
         """Add cache control to system message content"""
         if isinstance(system_content, str):
+            # The memory section after the base instructions is rewritten whenever memory changes, so only the static
+            # base instructions get a breakpoint; the rolling history checkpoint covers the memory section
+            base_instructions_end = system_content.find(BASE_INSTRUCTIONS_END_TAG)
+            if base_instructions_end != -1:
+                split = base_instructions_end + len(BASE_INSTRUCTIONS_END_TAG)
+                if system_content[split:].strip():
+                    return [
+                        {"type": "text", "text": system_content[:split], "cache_control": {"type": "ephemeral"}},
+                        {"type": "text", "text": system_content[split:]},
+                    ]
             # For string content, convert to list format with cache control
             return [{"type": "text", "text": system_content, "cache_control": {"type": "ephemeral"}}]
         elif isinstance(system_content, list):
@@ -570,6 +615,23 @@ class AnthropicClient(LLMClientBase):
         return system_content
 
 
+def add_cache_control_to_message(message: dict) -> None:
+    """Place a prompt cache breakpoint at the end of an Anthropic message.
+
+    Thinking blocks and empty text blocks cannot carry a breakpoint, so it goes on the last block that can.
+    """
+    content = message["content"]
+    if isinstance(content, str):
+        if content:
+            message["content"] = [{"type": "text", "text": content, "cache_control": {"type": "ephemeral"}}]
+        return
+    for block in reversed(content):
+        if block.get("type") in ("thinking", "redacted_thinking") or (block.get("type") == "text" and not block.get("text")):
+            continue
+        block["cache_control"] = {"type": "ephemeral"}
+        return
+
+
 def convert_tools_to_anthropic_format(tools: List[OpenAITool]) -> List[dict]:
     """See: https://docs.anthropic.com/claude/docs/tool-use
 
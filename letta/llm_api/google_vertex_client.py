@@ -30,6 +30,7 @@ from letta.errors import (
 from letta.helpers.datetime_helpers import get_utc_time_int
 from letta.helpers.json_helpers import json_dumps, json_loads
 from letta.llm_api.llm_client_base import LLMClientBase
+from letta.llm_api.request_prefix_cache import convert_request_messages, convert_request_tools
 from letta.local_llm.json_parser import clean_json_string_extra_backslash
 from letta.local_llm.utils import count_tokens
 from letta.log import get_logger
@@ -284,16 +285,20 @@ class GoogleVertexClient(LLMClientBase):
         """
 
         if tools:
-            tool_objs = [Tool(type="function", function=t) for t in tools]
-            tool_names = [t.function.name for t in tool_objs]
+            tool_names = [t["name"] for t in tools]
             # Convert to the exact payload style Google expects
-            formatted_tools = self.convert_tools_to_google_ai_format(tool_objs, llm_config)
+            formatted_tools = convert_request_tools(
+                messages[0].agent_id if messages else None,
+                tools,
+                ("google", llm_config.put_inner_thoughts_in_kwargs),
+                lambda tools: self.convert_tools_to_google_ai_format([Tool(type="function", function=t) for t in tools], llm_config),
+            )
         else:
             formatted_tools = []
             tool_names = []
 
         contents = self.add_dummy_model_messages(
-            PydanticMessage.to_google_dicts_from_list(messages),
+            convert_request_messages(messages, ("google", True), lambda m: m.to_google_dict()).messages,
         )
 
         request_data = {
@@ -23,6 +23,7 @@ from letta.errors import (
 )
 from letta.llm_api.helpers import add_inner_thoughts_to_functions, convert_to_structured_output, unpack_all_inner_thoughts_from_kwargs
 from letta.llm_api.llm_client_base import LLMClientBase
+from letta.llm_api.request_prefix_cache import convert_request_messages, convert_request_tools
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG, INNER_THOUGHTS_KWARG_DESCRIPTION, INNER_THOUGHTS_KWARG_DESCRIPTION_GO_FIRST
 from letta.log import get_logger
 from letta.otel.tracing import trace_method
@@ -172,22 +173,30 @@ class OpenAIClient(LLMClientBase):
                 if llm_config.model_endpoint and ":1234" in llm_config.model_endpoint
                 else INNER_THOUGHTS_KWARG_DESCRIPTION
             )
-            tools = add_inner_thoughts_to_functions(
-                functions=tools,
-                inner_thoughts_key=INNER_THOUGHTS_KWARG,
-                inner_thoughts_description=inner_thoughts_desc,
-                put_inner_thoughts_first=True,
+            tools = convert_request_tools(
+                messages[0].agent_id if messages else None,
+                tools,
+                ("openai", inner_thoughts_desc),
+                lambda tools: add_inner_thoughts_to_functions(
+                    functions=tools,
+                    inner_thoughts_key=INNER_THOUGHTS_KWARG,
+                    inner_thoughts_description=inner_thoughts_desc,
+                    put_inner_thoughts_first=True,
+                ),
             )
 
         use_developer_message = accepts_developer_role(llm_config.model)
+        put_inner_thoughts_in_kwargs = llm_config.put_inner_thoughts_in_kwargs
 
         openai_message_list = [
             cast_message_to_subtype(m)
-            for m in PydanticMessage.to_openai_dicts_from_list(
+            for m in convert_request_messages(
                 messages,
-                put_inner_thoughts_in_kwargs=llm_config.put_inner_thoughts_in_kwargs,
-                use_developer_message=use_developer_message,
-            )
+                ("openai", put_inner_thoughts_in_kwargs, use_developer_message),
+                lambda m: m.to_openai_dict(
+                    put_inner_thoughts_in_kwargs=put_inner_thoughts_in_kwargs, use_developer_message=use_developer_message
+                ),
+            ).messages
         ]
 
         if llm_config.model:
@@ -0,0 +1,175 @@
+"""Per-agent cache of the provider-format pieces of LLM requests.
+
+Between two steps of an agent only the tail of its in-context messages changes, yet every request used to convert the
+whole history (`Message.to_openai_dict` and friends) and every tool schema again. The clients instead go through a
+`RequestPrefixCache` for the agent, which keeps the converted dict of each message keyed by message id and checked
+against a fingerprint of the fields the conversion reads, so edited messages (e.g. a rebuilt system prompt) are
+converted again. Converted tool definitions are kept keyed by a hash of the tool schemas.
+
+The cache also remembers the message sequence of the previous request per provider format, and reports how many
+leading messages are unchanged since then: the stable prefix that provider prompt caching can be pointed at.
+
+Callers always get copies, since the clients post-process the returned dicts in place.
+"""
+
+import hashlib
+import json
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from letta.helpers.decorators import CacheStats
+from letta.schemas.message import Message
+from letta.settings import settings
+
+
+@dataclass
+class ConvertedMessages:
+    messages: List[dict]
+    # number of leading entries of `messages` that are unchanged since the previous request in this format
+    stable_prefix_length: int
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, BaseModel):
+        return (type(value).__name__, tuple((k, _freeze(v)) for k, v in value.__dict__.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple((k, _freeze(v)) for k, v in value.items())
+    return value
+
+
+def _content_fingerprint(part: BaseModel) -> tuple:
+    # content parts are flat apart from the source of image parts
+    return (type(part), *(_freeze(v) if isinstance(v, (BaseModel, list, dict)) else v for v in part.__dict__.values()))
+
+
+def message_fingerprint(message: Message) -> tuple:
+    """The fields of a message that the provider conversions read.
+
+    Fingerprints are compared for equality, so the strings they hold are compared by identity first and only scanned
+    when a message was reloaded.
+    """
+    return (
+        message.role,
+        message.name,
+        message.tool_call_id,
+        tuple(_content_fingerprint(part) for part in message.content) if message.content else message.content,
+        tuple((tc.id, tc.type, tc.function.name, tc.function.arguments) for tc in message.tool_calls)
+        if message.tool_calls
+        else message.tool_calls,
+    )
+
+
+def copy_json(value: Any) -> Any:
+    """Copy the dicts and lists of a JSON-like value, sharing the (immutable) leaves."""
+    if isinstance(value, dict):
+        return {k: copy_json(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [copy_json(v) for v in value]
+    return value
+
+
+class RequestPrefixCache:
+    """Converted messages and tool definitions of one agent's LLM requests."""
+
+    def __init__(self):
+        self.stats = CacheStats()
+        # format key -> message id -> (fingerprint, converted dict or None)
+        self._messages: Dict[Hashable, Dict[str, Tuple[tuple, Optional[dict]]]] = {}
+        # format key -> (message id, fingerprint) of each message of the previous request
+        self._previous_sequence: Dict[Hashable, List[Tuple[str, tuple]]] = {}
+        # format key -> (tool schema hash, converted tools)
+        self._tools: Dict[Hashable, Tuple[str, Any]] = {}
+
+    def convert_messages(
+        self, messages: List[Message], format_key: Hashable, convert: Callable[[Message], Optional[dict]]
+    ) -> ConvertedMessages:
+        """Convert `messages` with `convert`, reusing the dicts of messages converted before under the same `format_key`.
+
+        `format_key` must capture every option `convert` depends on. Messages that convert to None are dropped, like the
+        `Message.to_*_dicts_from_list` helpers do. Entries of messages that left the context are evicted.
+        """
+        cached = self._messages.get(format_key, {})
+        previous_sequence = self._previous_sequence.get(format_key, [])
+        entries: Dict[str, Tuple[tuple, Optional[dict]]] = {}
+        sequence: List[Tuple[str, tuple]] = []
+        converted: List[dict] = []
+        stable_prefix_length = 0
+        still_stable = True
+
+        for i, message in enumerate(messages):
+            fingerprint = message_fingerprint(message)
+            entry = cached.get(message.id)
+            if entry is not None and entry[0] == fingerprint:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+                entry = (fingerprint, convert(message))
+            entries[message.id] = entry
+            sequence.append((message.id, fingerprint))
+
+            still_stable = still_stable and i < len(previous_sequence) and previous_sequence[i] == sequence[i]
+            if entry[1] is not None:
+                converted.append(copy_json(entry[1]))
+                if still_stable:
+                    stable_prefix_length += 1
+
+        self._messages[format_key] = entries
+        self._previous_sequence[format_key] = sequence
+        return ConvertedMessages(messages=converted, stable_prefix_length=stable_prefix_length)
+
+    def convert_tools(self, tools: List[dict], format_key: Hashable, convert: Callable[[List[dict]], Any]) -> Any:
+        """Convert `tools` with `convert`, reusing the previous result when the tool schemas are unchanged."""
+        schema_hash = hashlib.sha256(json.dumps(tools, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+        entry = self._tools.get(format_key)
+        if entry is not None and entry[0] == schema_hash:
+            self.stats.hits += 1
+        else:
+            self.stats.misses += 1
+            entry = (schema_hash, convert(tools))
+            self._tools[format_key] = entry
+        return copy_json(entry[1])
+
+
+_request_prefix_caches: "OrderedDict[str, RequestPrefixCache]" = OrderedDict()
+
+
+def get_request_prefix_cache(agent_id: Optional[str]) -> Optional[RequestPrefixCache]:
+    """The cache of `agent_id`, or None for messages without an agent or when disabled via `llm_request_prefix_cache_agents=0`."""
+    if agent_id is None or settings.llm_request_prefix_cache_agents <= 0:
+        return None
+    cache = _request_prefix_caches.get(agent_id)
+    if cache is None:
+        cache = _request_prefix_caches[agent_id] = RequestPrefixCache()
+        while len(_request_prefix_caches) > settings.llm_request_prefix_cache_agents:
+            _request_prefix_caches.popitem(last=False)
+    else:
+        _request_prefix_caches.move_to_end(agent_id)
+    return cache
+
+
+def clear_request_prefix_caches() -> None:
+    _request_prefix_caches.clear()
+
+
+def convert_request_messages(
+    messages: List[Message], format_key: Hashable, convert: Callable[[Message], Optional[dict]]
+) -> ConvertedMessages:
+    """Convert the messages of a request through their agent's cache (uncached for messages without an agent)."""
+    cache = get_request_prefix_cache(messages[0].agent_id if messages else None)
+    if cache is None:
+        converted = [convert(message) for message in messages]
+        return ConvertedMessages(messages=[m for m in converted if m is not None], stable_prefix_length=0)
+    return cache.convert_messages(messages, format_key, convert)
+
+
+def convert_request_tools(agent_id: Optional[str], tools: List[dict], format_key: Hashable, convert: Callable[[List[dict]], Any]) -> Any:
+    """Convert the tools of a request through the agent's cache (uncached without an agent)."""
+    cache = get_request_prefix_cache(agent_id)
+    if cache is None:
+        return convert(tools)
+    return cache.convert_tools(tools, format_key, convert)
@@ -3,7 +3,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING, List, Optional, Set
 
-from sqlalchemy import JSON, Boolean, DateTime, Index, Integer, String
+from sqlalchemy import JSON, BigInteger, Boolean, DateTime, Index, Integer, String
 from sqlalchemy.ext.asyncio import AsyncAttrs
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -105,6 +105,21 @@ class Agent(SqlalchemyBase, OrganizationMixin, ProjectMixin, TemplateEntityMixin
     hidden: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True, default=None, doc="If set to True, the agent will be hidden.")
     _vector_db_namespace: Mapped[Optional[str]] = mapped_column(String, nullable=True, doc="Private field for vector database namespace")
 
+    # per-agent lock fencing
+    lock_fencing_token: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, doc="Fencing token of the latest per-agent lock holder, checked on message_ids writes."
+    )
+
+    # denormalized counters, see letta.services.helpers.counter_helper
+    message_count: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, doc="Number of messages stored for this agent, NULL until first counted."
+    )
+
+    # bumped by every write that changes the compiled memory, see letta.services.helpers.memory_version_helper
+    memory_version: Mapped[int] = mapped_column(
+        BigInteger, nullable=False, default=0, server_default="0", doc="Version of the agent's memory blocks, file blocks and sources."
+    )
+
     # relationships
     organization: Mapped["Organization"] = relationship("Organization", back_populates="agents", lazy="raise")
     tool_exec_environment_variables: Mapped[List["AgentEnvironmentVariable"]] = relationship(
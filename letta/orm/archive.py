@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, List, Optional
 
-from sqlalchemy import JSON, Enum, Index, String
+from sqlalchemy import JSON, BigInteger, Enum, Index, String
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from letta.orm.mixins import OrganizationMixin
@@ -48,6 +48,14 @@ class Archive(SqlalchemyBase, OrganizationMixin):
     metadata_: Mapped[Optional[dict]] = mapped_column(JSON, nullable=True, doc="Additional metadata for the archive")
     _vector_db_namespace: Mapped[Optional[str]] = mapped_column(String, nullable=True, doc="Private field for vector database namespace")
 
+    # denormalized counters, see letta.services.helpers.counter_helper
+    passage_count: Mapped[Optional[int]] = mapped_column(
+        BigInteger, nullable=True, doc="Number of passages in this archive, NULL until first counted."
+    )
+    tag_counts: Mapped[Optional[dict]] = mapped_column(
+        JSON, nullable=True, doc="Number of passages per tag in this archive, NULL until first counted."
+    )
+
     # relationships
     archives_agents: Mapped[List["ArchivesAgents"]] = relationship(
         "ArchivesAgents",
@@ -56,6 +56,9 @@ class Message(SqlalchemyBase, OrganizationMixin, AgentMixin):
     )
     approve: Mapped[Optional[bool]] = mapped_column(nullable=True, doc="Whether tool call is approved.")
     denial_reason: Mapped[Optional[str]] = mapped_column(nullable=True, doc="The reason the tool call request was denied.")
+    num_tokens: Mapped[Optional[int]] = mapped_column(
+        nullable=True, doc="Cached local token count of the message, computed lazily and cleared when the message is edited."
+    )
 
     # Monotonically increasing sequence for efficient/correct listing
     sequence_id: Mapped[int] = mapped_column(
@@ -169,7 +172,8 @@ def set_sequence_id_for_sqlite_bulk(session, flush_context, instances):
 
 @event.listens_for(Message, "before_insert")
 def set_sequence_id_for_sqlite(mapper, connection, target):
-    if settings.database_engine is DatabaseChoice.SQLITE:
+    # messages flushed through a session were already numbered in one batch by set_sequence_id_for_sqlite_bulk
+    if settings.database_engine is DatabaseChoice.SQLITE and target.sequence_id is None:
         # For SQLite, we need to generate sequence_id manually
         # Use a database-level atomic operation to avoid race conditions
 
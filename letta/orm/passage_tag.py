@@ -28,6 +28,8 @@ class PassageTag(SqlalchemyBase, OrganizationMixin):
         Index("ix_passage_tags_archive_id", "archive_id"),
         Index("ix_passage_tags_tag", "tag"),
         Index("ix_passage_tags_archive_tag", "archive_id", "tag"),
+        # covers tag-driven semi-joins when filtering passages by tag
+        Index("ix_passage_tags_tag_passage", "tag", "passage_id"),
         Index("ix_passage_tags_org_archive", "organization_id", "archive_id"),
     )
 
@@ -1,5 +1,6 @@
 import sqlite3
-from typing import Optional, Union
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple, Union
 
 import numpy as np
 from sqlalchemy import event
@@ -106,13 +107,20 @@ def validate_and_transform_embedding(
     return vec
 
 
+@lru_cache(maxsize=32)
+def _normalized_query_vector(embedding: bytes, expected_dim: int) -> np.ndarray:
+    """The query side of `cosine_distance` is the same blob for every row of a scan, so normalize it once."""
+    vec = validate_and_transform_embedding(embedding, expected_dim)
+    return vec / np.linalg.norm(vec)
+
+
 def cosine_distance(embedding1, embedding2, expected_dim=MAX_EMBEDDING_DIM):
     """
     Calculate cosine distance between two embeddings
 
     Args:
-        embedding1: First embedding
-        embedding2: Second embedding
+        embedding1: First embedding (the stored row)
+        embedding2: Second embedding (the query)
         expected_dim: Expected embedding dimension (default 4096)
 
     Returns:
@@ -124,16 +132,81 @@ def cosine_distance(embedding1, embedding2, expected_dim=MAX_EMBEDDING_DIM):
 
     try:
         vec1 = validate_and_transform_embedding(embedding1, expected_dim)
-        vec2 = validate_and_transform_embedding(embedding2, expected_dim)
+        if isinstance(embedding2, (bytes, sqlite3.Binary)):
+            vec2 = _normalized_query_vector(bytes(embedding2), expected_dim)
+        else:
+            vec2 = validate_and_transform_embedding(embedding2, expected_dim)
+            vec2 = vec2 / np.linalg.norm(vec2)
     except ValueError:
         return 0.0
 
-    similarity = np.dot(vec1, vec2) / (np.linalg.norm(vec1) * np.linalg.norm(vec2))
+    similarity = np.dot(vec1, vec2) / np.linalg.norm(vec1)
     distance = float(1.0 - similarity)
 
     return distance
 
 
+class CosineTopK:
+    """Streaming top-k by cosine distance over serialized float32 embeddings.
+
+    Vector search on SQLite otherwise runs `cosine_distance` once per row through the UDF. This scores rows in
+    chunks instead: the query is normalized once, each chunk of blobs is joined into one contiguous buffer and viewed
+    as a float32 matrix with `np.frombuffer` (no per-row arrays), scored with a single matrix-vector product, and
+    only the best `k` rows of what has been seen so far are kept. Ties keep the row that was added first, so callers
+    that add rows in a deterministic order get a deterministic ranking.
+
+    Stored embeddings are zero-padded to MAX_EMBEDDING_DIM, so only the first `dim` components - up to the last
+    non-zero component of the query - take part in the score, and callers only need to read that prefix of each
+    blob (see `row_size`). Rows without a valid embedding rank after all others.
+    """
+
+    def __init__(self, query_embedding: Union[Sequence[float], np.ndarray], k: int, expected_dim: int = MAX_EMBEDDING_DIM):
+        query = np.asarray(query_embedding, dtype=np.float32)
+        if query.shape[0] != expected_dim:
+            raise ValueError(f"Invalid embedding dimension: got {query.shape[0]}, expected {expected_dim}")
+        nonzero = np.flatnonzero(query)
+        self.dim = int(nonzero[-1]) + 1 if len(nonzero) else 1
+        query = query[: self.dim]
+        norm = np.linalg.norm(query)
+        self.query = query / norm if norm else query
+        self.k = k
+        self._ids: List[str] = []
+        self._scores = np.empty(0, dtype=np.float32)
+
+    @property
+    def row_size(self) -> int:
+        """Bytes of each stored embedding that are needed for scoring."""
+        return self.dim * 4
+
+    def add(self, ids: Sequence[str], embeddings: Sequence[Optional[bytes]]) -> None:
+        row_size = self.row_size
+        valid = [i for i, blob in enumerate(embeddings) if blob is not None and len(blob) >= row_size]
+        scores = np.full(len(ids), -np.inf, dtype=np.float32)
+        if valid:
+            buffer = b"".join(memoryview(embeddings[i])[:row_size] for i in valid)
+            matrix = np.frombuffer(buffer, dtype=np.float32).reshape(len(valid), self.dim)
+            norms = np.sqrt(np.einsum("ij,ij->i", matrix, matrix))
+            norms[norms == 0] = 1.0
+            scores[valid] = (matrix @ self.query) / norms
+
+        self._ids.extend(ids)
+        self._scores = np.concatenate([self._scores, scores])
+        if len(self._ids) > 2 * self.k:
+            self._truncate()
+
+    def _truncate(self) -> None:
+        keep = np.sort(np.argsort(-self._scores, kind="stable")[: self.k])
+        self._ids = [self._ids[i] for i in keep]
+        self._scores = self._scores[keep]
+
+    def result(self) -> List[Tuple[str, float]]:
+        """(id, cosine_distance) pairs for the best `k` rows, closest first."""
+        if len(self._ids) > self.k:
+            self._truncate()
+        order = np.argsort(-self._scores, kind="stable")
+        return [(self._ids[i], float(1.0 - self._scores[i]) if np.isfinite(self._scores[i]) else 2.0) for i in order]
+
+
 # Note: sqlite-vec provides native SQL functions for vector operations
 # We don't need custom Python distance functions since sqlite-vec handles this at the SQL level
 @event.listens_for(Engine, "connect")
@@ -1,7 +1,7 @@
 from datetime import datetime, timezone
 from typing import TYPE_CHECKING, Optional
 
-from sqlalchemy import BigInteger, ForeignKey, String
+from sqlalchemy import BigInteger, ForeignKey, Integer, String
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
@@ -68,6 +68,16 @@ class StepMetrics(SqlalchemyBase, ProjectMixin, AgentMixin):
         nullable=True,
         doc="Total time for the step in nanoseconds",
     )
+    cache_read_tokens: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        doc="Prompt tokens of the step read from the provider's prompt cache",
+    )
+    cache_creation_tokens: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        nullable=True,
+        doc="Prompt tokens of the step written to the provider's prompt cache",
+    )
     base_template_id: Mapped[Optional[str]] = mapped_column(
         String,
         nullable=True,
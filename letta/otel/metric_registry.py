@@ -182,6 +182,135 @@ class MetricRegistry:
             ),
         )
 
+    # (includes base attributes)
+    @property
+    def agent_lock_wait_ms_histogram(self) -> Histogram:
+        return self._get_or_create_metric(
+            "hist_agent_lock_wait_ms",
+            partial(
+                self._meter.create_histogram,
+                name="hist_agent_lock_wait_ms",
+                description="Histogram for time spent waiting to acquire a per-agent lock (ms)",
+                unit="ms",
+            ),
+        )
+
+    # (includes base attributes)
+    @property
+    def agent_lock_contention_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_agent_lock_contention",
+            partial(
+                self._meter.create_counter,
+                name="count_agent_lock_contention",
+                description="Counts per-agent lock acquisitions that had to wait for another holder",
+                unit="1",
+            ),
+        )
+
+    # (includes tier: memory | redis)
+    @property
+    def embedding_cache_hit_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_embedding_cache_hit",
+            partial(
+                self._meter.create_counter,
+                name="count_embedding_cache_hit",
+                description="Counts chunk embeddings served from the embedding cache",
+                unit="1",
+            ),
+        )
+
+    @property
+    def embedding_cache_miss_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_embedding_cache_miss",
+            partial(
+                self._meter.create_counter,
+                name="count_embedding_cache_miss",
+                description="Counts chunk embeddings that had to be requested from the embedding endpoint",
+                unit="1",
+            ),
+        )
+
+    # (includes cache, tier: memory | redis)
+    @property
+    def cache_hit_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_cache_hit",
+            partial(
+                self._meter.create_counter,
+                name="count_cache_hit",
+                description="Counts calls of cached functions served from a cache tier",
+                unit="1",
+            ),
+        )
+
+    # (includes cache, tier: memory | redis)
+    @property
+    def cache_miss_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_cache_miss",
+            partial(
+                self._meter.create_counter,
+                name="count_cache_miss",
+                description="Counts calls of cached functions that missed a cache tier",
+                unit="1",
+            ),
+        )
+
+    # (includes model, embedding_endpoint_type)
+    @property
+    def embedding_throughput_histogram(self) -> Histogram:
+        return self._get_or_create_metric(
+            "hist_embedding_chunks_per_second",
+            partial(
+                self._meter.create_histogram,
+                name="hist_embedding_chunks_per_second",
+                description="Histogram for chunks embedded per second by each call into the embedding scheduler",
+                unit="1/s",
+            ),
+        )
+
+    # (includes model, embedding_endpoint_type)
+    @property
+    def embedding_concurrency_limit_gauge(self) -> Gauge:
+        return self._get_or_create_metric(
+            "gauge_embedding_concurrency_limit",
+            partial(
+                self._meter.create_gauge,
+                name="gauge_embedding_concurrency_limit",
+                description="Current adaptive limit on embedding requests in flight per endpoint",
+                unit="1",
+            ),
+        )
+
+    # (includes base attributes)
+    @property
+    def memory_rebuild_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_memory_rebuild",
+            partial(
+                self._meter.create_counter,
+                name="count_memory_rebuild",
+                description="Counts agent steps that rebuilt the system prompt from changed memory",
+                unit="1",
+            ),
+        )
+
+    # (includes reason: version_unchanged | memory_unchanged)
+    @property
+    def memory_rebuild_skip_counter(self) -> Counter:
+        return self._get_or_create_metric(
+            "count_memory_rebuild_skip",
+            partial(
+                self._meter.create_counter,
+                name="count_memory_rebuild_skip",
+                description="Counts agent steps that kept the existing system prompt",
+                unit="1",
+            ),
+        )
+
     # Database connection pool metrics
     # (includes engine_name)
     @property
@@ -77,6 +77,16 @@ class LettaBatchRequest(LettaRequest):
     agent_id: str = Field(..., description="The ID of the agent to send this batch request for")
 
 
+class LettaBulkRequest(LettaRequest):
+    agent_ids: List[str] = Field(..., min_length=1, description="The IDs of the agents to send the messages to.")
+    max_concurrency: int = Field(
+        default=8,
+        ge=1,
+        le=64,
+        description="Maximum number of agents processing the messages at the same time.",
+    )
+
+
 class CreateBatch(BaseModel):
     requests: List[LettaBatchRequest] = Field(..., description="List of requests to be processed in batch.")
     callback_url: Optional[HttpUrl] = Field(
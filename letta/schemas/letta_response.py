@@ -2,7 +2,7 @@ import html
 import json
 import re
 from datetime import datetime
-from typing import List, Union
+from typing import List, Optional, Union
 
 from pydantic import BaseModel, Field
 
@@ -183,5 +183,11 @@ class LettaBatchResponse(BaseModel):
     created_at: datetime = Field(..., description="The timestamp when the batch request was created.")
 
 
+class LettaBulkResponseItem(BaseModel):
+    agent_id: str = Field(..., description="The ID of the agent this result belongs to.")
+    response: Optional[LettaResponse] = Field(None, description="The agent's response, if the agent processed the messages.")
+    error: Optional[str] = Field(None, description="Why the agent could not process the messages, if it failed.")
+
+
 class LettaBatchMessages(BaseModel):
     messages: List[Message]
@@ -1,6 +1,7 @@
 import asyncio
 import logging
 from datetime import datetime
+from functools import lru_cache
 from typing import TYPE_CHECKING, List, Optional
 
 from jinja2 import Template, TemplateSyntaxError
@@ -18,6 +19,12 @@ from letta.schemas.block import Block, FileBlock
 from letta.schemas.message import Message
 
 
+@lru_cache(maxsize=64)
+def _compile_template(prompt_template: str, enable_async: bool = False) -> Template:
+    """Compiled jinja template for `prompt_template`; compiling dominates rendering and agents share few templates."""
+    return Template(prompt_template, enable_async=enable_async)
+
+
 class ContextWindowOverview(BaseModel):
     """
     Overview of the context window, including the number of messages and tokens.
@@ -161,7 +168,7 @@ class Memory(BaseModel, validate_assignment=True):
     def compile(self, tool_usage_rules=None, sources=None, max_files_open=None) -> str:
         """Generate a string representation of the memory in-context using the Jinja2 template"""
         try:
-            template = Template(self.prompt_template)
+            template = _compile_template(self.prompt_template)
             return template.render(
                 blocks=self.blocks,
                 file_blocks=self.file_blocks,
@@ -178,7 +185,7 @@ class Memory(BaseModel, validate_assignment=True):
     async def compile_async(self, tool_usage_rules=None, sources=None, max_files_open=None) -> str:
         """Async version of compile that doesn't block the event loop"""
         try:
-            template = Template(self.prompt_template, enable_async=True)
+            template = _compile_template(self.prompt_template, enable_async=True)
             return await template.render_async(
                 blocks=self.blocks,
                 file_blocks=self.file_blocks,
@@ -205,6 +205,9 @@ class Message(BaseMessage):
     )
     approve: Optional[bool] = Field(default=None, description="Whether tool call is approved.")
     denial_reason: Optional[str] = Field(default=None, description="The reason the tool call request was denied.")
+    num_tokens: Optional[int] = Field(
+        default=None, description="Cached (uncalibrated) local token count of the message, used for context window accounting."
+    )
     # This overrides the optional base orm schema, created_at MUST exist on all messages objects
     created_at: datetime = Field(default_factory=get_utc_time, description="The timestamp when the object was created.")
 
@@ -75,12 +75,15 @@ class Choice(BaseModel):
 
 class UsageStatisticsPromptTokenDetails(BaseModel):
     cached_tokens: int = 0
+    # NOTE: Anthropic specific, prompt tokens written to the prompt cache
+    cache_creation_tokens: int = 0
     # NOTE: OAI specific
     # audio_tokens: int = 0
 
     def __add__(self, other: "UsageStatisticsPromptTokenDetails") -> "UsageStatisticsPromptTokenDetails":
         return UsageStatisticsPromptTokenDetails(
             cached_tokens=self.cached_tokens + other.cached_tokens,
+            cache_creation_tokens=self.cache_creation_tokens + other.cache_creation_tokens,
         )
 
 
@@ -20,6 +20,8 @@ class StepMetrics(StepMetricsBase):
     llm_request_ns: Optional[int] = Field(None, description="Time spent on LLM requests in nanoseconds.")
     tool_execution_ns: Optional[int] = Field(None, description="Time spent on tool execution in nanoseconds.")
     step_ns: Optional[int] = Field(None, description="Total time for the step in nanoseconds.")
+    cache_read_tokens: Optional[int] = Field(None, description="Prompt tokens of the step read from the provider's prompt cache.")
+    cache_creation_tokens: Optional[int] = Field(None, description="Prompt tokens of the step written to the provider's prompt cache.")
     base_template_id: Optional[str] = Field(None, description="The base template ID that the step belongs to (cloud only).")
     template_id: Optional[str] = Field(None, description="The template ID that the step belongs to (cloud only).")
     project_id: Optional[str] = Field(None, description="The project that the step belongs to (cloud only).")
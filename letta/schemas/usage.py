@@ -14,6 +14,8 @@ class LettaUsageStatistics(BaseModel):
         prompt_tokens (int): The number of tokens in the prompt.
         total_tokens (int): The total number of tokens processed by the agent.
         step_count (int): The number of steps taken by the agent.
+        cache_read_tokens (int): The number of prompt tokens read from the provider's prompt cache.
+        cache_creation_tokens (int): The number of prompt tokens written to the provider's prompt cache.
     """
 
     message_type: Literal["usage_statistics"] = "usage_statistics"
@@ -21,6 +23,8 @@ class LettaUsageStatistics(BaseModel):
     prompt_tokens: int = Field(0, description="The number of tokens in the prompt.")
     total_tokens: int = Field(0, description="The total number of tokens processed by the agent.")
     step_count: int = Field(0, description="The number of steps taken by the agent.")
+    cache_read_tokens: int = Field(0, description="The number of prompt tokens read from the provider's prompt cache.")
+    cache_creation_tokens: int = Field(0, description="The number of prompt tokens written to the provider's prompt cache.")
     # TODO: Optional for now. This field makes everyone's lives easier
     steps_messages: Optional[List[List[Message]]] = Field(None, description="The messages generated per step")
     run_ids: Optional[List[str]] = Field(None, description="The background task run IDs associated with the agent interaction")
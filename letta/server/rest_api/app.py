@@ -18,6 +18,8 @@ from letta.__init__ import __version__ as letta_version
 from letta.agents.exceptions import IncompatibleAgentType
 from letta.constants import ADMIN_PREFIX, API_PREFIX, OPENAI_API_PREFIX
 from letta.errors import (
+    AgentLockLostError,
+    AgentLockTimeoutError,
     BedrockPermissionError,
     LettaAgentNotFoundError,
     LettaUserNotFoundError,
@@ -51,6 +53,7 @@ from letta.server.rest_api.routers.v1.users import router as users_router  # TOD
 from letta.server.rest_api.static_files import mount_static_files
 from letta.server.rest_api.utils import SENTRY_ENABLED
 from letta.server.server import SyncServer
+from letta.services.helpers.provider_model_catalog import get_provider_model_catalog_async
 from letta.settings import settings, telemetry_settings
 
 if SENTRY_ENABLED:
@@ -145,6 +148,10 @@ async def lifespan(app_: FastAPI):
         logger.info(f"[Worker {worker_id}] Scheduler initialization completed")
     except Exception as e:
         logger.error(f"[Worker {worker_id}] Scheduler initialization failed: {e}", exc_info=True)
+
+    # list the models of the providers configured through the environment before the first request needs them
+    (await get_provider_model_catalog_async()).warm(server._enabled_providers)
+
     logger.info(f"[Worker {worker_id}] Lifespan startup completed")
     yield
 
@@ -240,6 +247,8 @@ def create_application() -> "FastAPI":
     app.add_exception_handler(LettaUserNotFoundError, _error_handler_404_user)
     app.add_exception_handler(ForeignKeyConstraintViolationError, _error_handler_409)
     app.add_exception_handler(UniqueConstraintViolationError, _error_handler_409)
+    app.add_exception_handler(AgentLockTimeoutError, _error_handler_409)
+    app.add_exception_handler(AgentLockLostError, _error_handler_409)
 
     @app.exception_handler(IncompatibleAgentType)
     async def handle_incompatible_agent_type(request: Request, exc: IncompatibleAgentType):
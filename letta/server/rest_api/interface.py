@@ -28,7 +28,7 @@ from letta.schemas.letta_message import (
 from letta.schemas.letta_message_content import ReasoningContent, RedactedReasoningContent, TextContent
 from letta.schemas.message import Message
 from letta.schemas.openai.chat_completion_response import ChatCompletionChunkResponse
-from letta.server.rest_api.json_parser import OptimisticJSONParser
+from letta.server.rest_api.json_parser import IncrementalJSONParser, string_delta
 from letta.streaming_interface import AgentChunkStreamingInterface
 from letta.streaming_utils import FunctionArgumentsStreamHandler, JSONInnerThoughtsExtractor
 from letta.utils import parse_json
@@ -292,8 +292,8 @@ class StreamingServerInterface(AgentChunkStreamingInterface):
 
         # @matt's changes here, adopting new optimistic json parser
         self.current_function_arguments = ""
-        self.optimistic_json_parser = OptimisticJSONParser()
-        self.current_json_parse_result = {}
+        # parses the send_message arguments as they stream in, see IncrementalJSONParser
+        self.assistant_message_args_parser = IncrementalJSONParser()
 
         # NOTE (fix): OpenAI deltas may split a key and its value across chunks
         # (e.g. '"request_heartbeat"' in one chunk, ': true' in the next). The
@@ -407,7 +407,7 @@ class StreamingServerInterface(AgentChunkStreamingInterface):
         """Initialize streaming by activating the generator and clearing any old chunks."""
         self.streaming_chat_completion_mode_function_name = None
         self.current_function_arguments = ""
-        self.current_json_parse_result = {}
+        self.assistant_message_args_parser.reset()
 
         if not self._active:
             self._active = True
@@ -418,7 +418,7 @@ class StreamingServerInterface(AgentChunkStreamingInterface):
         """Clean up the stream by deactivating and clearing chunks."""
         self.streaming_chat_completion_mode_function_name = None
         self.current_function_arguments = ""
-        self.current_json_parse_result = {}
+        self.assistant_message_args_parser.reset()
 
         # if not self.streaming_chat_completion_mode and not self.nonstreaming_legacy_mode:
         #     self._push_to_buffer(self.multi_step_gen_indicator)
@@ -637,6 +637,7 @@ class StreamingServerInterface(AgentChunkStreamingInterface):
                 # if self.streaming_chat_completion_mode_function_name == self.assistant_message_tool_name:
                 if tool_call.function.name == self.assistant_message_tool_name:
                     self.streaming_chat_completion_json_reader.reset()
+                    self.assistant_message_args_parser.reset()
                     # early exit to turn into content mode
                     return None
                 if tool_call.function.arguments:
@@ -644,18 +645,16 @@ class StreamingServerInterface(AgentChunkStreamingInterface):
 
                 # if we're in the middle of parsing a send_message, we'll keep processing the JSON chunks
                 if tool_call.function.arguments and self.streaming_chat_completion_mode_function_name == self.assistant_message_tool_name:
-                    # Strip out any extras tokens
+                    # Only the new characters of the message value are streamed
                     # In the case that we just have the prefix of something, no message yet, then we should early exit to move to the next chunk
-                    parsed_args = self.optimistic_json_parser.parse(self.current_function_arguments)
-
-                    if parsed_args.get(self.assistant_message_tool_kwarg) and parsed_args.get(
-                        self.assistant_message_tool_kwarg
-                    ) != self.current_json_parse_result.get(self.assistant_message_tool_kwarg):
-                        new_content = parsed_args.get(self.assistant_message_tool_kwarg)
-                        prev_content = self.current_json_parse_result.get(self.assistant_message_tool_kwarg, "")
-                        # TODO: Assumes consistent state and that prev_content is subset of new_content
-                        diff = new_content.replace(prev_content, "", 1)
-                        self.current_json_parse_result = parsed_args
+                    try:
+                        events = self.assistant_message_args_parser.feed(tool_call.function.arguments)
+                    except ValueError as e:
+                        warnings.warn(f"Failed to parse streamed {self.assistant_message_tool_name} arguments: {e}")
+                        return None
+                    diff = string_delta(events, self.assistant_message_tool_kwarg)
+
+                    if diff:
                         if prev_message_type and prev_message_type != "assistant_message":
                             message_index += 1
                         processed_chunk = AssistantMessage(
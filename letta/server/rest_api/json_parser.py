@@ -1,6 +1,9 @@
 import json
+import re
 from abc import ABC, abstractmethod
-from typing import Any
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any, List, Optional, Tuple, Union
 
 from pydantic_core import from_json
 
@@ -228,6 +231,301 @@ class OptimisticJSONParser(JSONParser):
         raise decode_error
 
 
+JSONPath = Tuple[Union[str, int], ...]
+
+
+class JSONEventType(str, Enum):
+    KEY = "key"
+    STRING_DELTA = "string_delta"
+    VALUE = "value"
+
+
+@dataclass
+class JSONEvent:
+    """An event emitted by `IncrementalJSONParser`.
+
+    - KEY: an object key was read, `path` points at the value that follows it and `value` is the key.
+    - STRING_DELTA: more characters of the string value at `path` were read, `value` holds the decoded new characters.
+    - VALUE: the value at `path` is complete, `value` holds it.
+    """
+
+    type: JSONEventType
+    path: JSONPath
+    value: Any
+
+
+@dataclass
+class _Frame:
+    container: Union[dict, list]
+    path: JSONPath
+    key: Optional[str] = None
+
+
+_VALUE = "value"
+_ARRAY_VALUE = "array_value"
+_OBJECT_KEY = "object_key"
+_OBJECT_COLON = "object_colon"
+_AFTER_VALUE = "after_value"
+_STRING = "string"
+_SCALAR = "scalar"
+_DONE = "done"
+
+_WHITESPACE = " \t\r\n"
+_SCALAR_CHARS = frozenset("0123456789+-.eEtrufalsn")
+_STRING_SPECIAL = re.compile(r'["\\]')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+class IncrementalJSONParser(JSONParser):
+    """
+    A resumable JSON parser for streamed tool call arguments.
+
+    `feed` consumes only the newly arrived text, carrying its position inside strings, escapes, numbers and nested
+    containers over to the next call, and returns the events that text produced. Consumers that only need what changed
+    (e.g. the new characters of `inner_thoughts` or of the `send_message` message) read the STRING_DELTA events, so a
+    stream of arguments costs time linear in its length instead of re-parsing the whole buffer on every delta.
+
+    `value` is the partially parsed document, with the string being read cut off at the last complete character and
+    scalars that are still being read left out. Text after the end of the document is ignored. Malformed input raises a
+    `ValueError`, after which the parser has to be `reset` before it can be used again.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self) -> None:
+        # the parsed document; containers and strings are attached as soon as they start
+        self.root: Any = None
+        self._stack: List[_Frame] = []
+        self._state = _VALUE
+        self._path: JSONPath = ()
+        self._string_chunks: List[str] = []
+        self._string_is_key = False
+        # characters read after a backslash, "" right after it and "uXXXX" while reading a unicode escape
+        self._escape: Optional[str] = None
+        self._high_surrogate: Optional[int] = None
+        self._scalar_chunks: List[str] = []
+        self._text: Optional[str] = None
+
+    @property
+    def value(self) -> Any:
+        if self._state == _STRING and not self._string_is_key:
+            self._set_current("".join(self._string_chunks))
+        elif self._state == _SCALAR and not self._stack:
+            try:
+                return json.loads("".join(self._scalar_chunks))
+            except ValueError:
+                return None
+        return self.root
+
+    def parse(self, input_str: str) -> Any:
+        """Parse `input_str`, which only has to be fed from where the last call stopped if it extends that call's input."""
+        if self._text is None or not input_str.startswith(self._text):
+            self.reset()
+            self._text = ""
+        try:
+            self.feed(input_str[len(self._text) :])
+        except ValueError:
+            self.reset()
+            raise
+        self._text = input_str
+        value = self.value
+        return {} if value is None else value
+
+    def feed(self, text: str) -> List[JSONEvent]:
+        """Consume the next piece of the document and return the events it produced."""
+        events: List[JSONEvent] = []
+        i, n = 0, len(text)
+        while i < n:
+            state = self._state
+            if state == _STRING:
+                i = self._consume_string(text, i, events)
+                continue
+            if state == _DONE:
+                # like OptimisticJSONParser, keep the first document and ignore anything after it
+                break
+
+            c = text[i]
+            if state == _SCALAR:
+                if c in _SCALAR_CHARS:
+                    j = i + 1
+                    while j < n and text[j] in _SCALAR_CHARS:
+                        j += 1
+                    self._scalar_chunks.append(text[i:j])
+                    i = j
+                else:
+                    # the delimiter is handled by the next state
+                    self._finish_scalar(events)
+                continue
+
+            i += 1
+            if c in _WHITESPACE:
+                continue
+            if state == _VALUE or state == _ARRAY_VALUE:
+                if c == "]" and state == _ARRAY_VALUE:
+                    self._close(events)
+                else:
+                    self._start_value(c)
+            elif state == _OBJECT_KEY:
+                if c == '"':
+                    self._start_string(is_key=True)
+                elif c == "}":
+                    self._close(events)
+                else:
+                    raise ValueError(f"Expected an object key, got {c!r}")
+            elif state == _OBJECT_COLON:
+                if c != ":":
+                    raise ValueError(f"Expected ':' after object key, got {c!r}")
+                self._state = _VALUE
+            elif state == _AFTER_VALUE:
+                is_object = isinstance(self._stack[-1].container, dict)
+                if c == ",":
+                    self._state = _OBJECT_KEY if is_object else _ARRAY_VALUE
+                elif c == ("}" if is_object else "]"):
+                    self._close(events)
+                else:
+                    raise ValueError(f"Expected ',' or the end of the {'object' if is_object else 'array'}, got {c!r}")
+        return events
+
+    def _next_path(self) -> JSONPath:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        if isinstance(frame.container, dict):
+            return frame.path + (frame.key,)
+        return frame.path + (len(frame.container),)
+
+    def _attach(self, value: Any) -> None:
+        if not self._stack:
+            self.root = value
+        elif isinstance(self._stack[-1].container, dict):
+            self._stack[-1].container[self._stack[-1].key] = value
+        else:
+            self._stack[-1].container.append(value)
+
+    def _set_current(self, value: Any) -> None:
+        """Replace the value attached last, i.e. the string that is being read."""
+        if not self._stack:
+            self.root = value
+        elif isinstance(self._stack[-1].container, dict):
+            self._stack[-1].container[self._stack[-1].key] = value
+        else:
+            self._stack[-1].container[-1] = value
+
+    def _complete(self, value: Any, events: List[JSONEvent]) -> None:
+        events.append(JSONEvent(JSONEventType.VALUE, self._path, value))
+        self._state = _AFTER_VALUE if self._stack else _DONE
+
+    def _start_value(self, c: str) -> None:
+        self._path = self._next_path()
+        if c == "{" or c == "[":
+            container = {} if c == "{" else []
+            self._attach(container)
+            self._stack.append(_Frame(container=container, path=self._path))
+            self._state = _OBJECT_KEY if c == "{" else _ARRAY_VALUE
+        elif c == '"':
+            self._attach("")
+            self._start_string(is_key=False)
+        elif c in _SCALAR_CHARS:
+            self._scalar_chunks = [c]
+            self._state = _SCALAR
+        else:
+            raise ValueError(f"Expected a JSON value, got {c!r}")
+
+    def _close(self, events: List[JSONEvent]) -> None:
+        frame = self._stack.pop()
+        self._path = frame.path
+        self._complete(frame.container, events)
+
+    def _finish_scalar(self, events: List[JSONEvent]) -> None:
+        value = json.loads("".join(self._scalar_chunks))
+        self._scalar_chunks = []
+        self._attach(value)
+        self._complete(value, events)
+
+    def _start_string(self, is_key: bool) -> None:
+        self._string_chunks = []
+        self._string_is_key = is_key
+        self._state = _STRING
+
+    def _flush_surrogate(self, delta: List[str]) -> None:
+        if self._high_surrogate is not None:
+            delta.append(chr(self._high_surrogate))
+            self._high_surrogate = None
+
+    def _consume_string(self, text: str, i: int, events: List[JSONEvent]) -> int:
+        delta: List[str] = []
+        n = len(text)
+        done = False
+        while i < n:
+            if self._escape is not None:
+                i = self._consume_escape(text, i, delta)
+                continue
+            match = _STRING_SPECIAL.search(text, i)
+            end = match.start() if match else n
+            if end > i:
+                self._flush_surrogate(delta)
+                delta.append(text[i:end])
+            i = end + 1
+            if match is None:
+                break
+            if match.group() == '"':
+                self._flush_surrogate(delta)
+                done = True
+                break
+            self._escape = ""
+
+        self._string_chunks.extend(delta)
+        if self._string_is_key:
+            if done:
+                key = "".join(self._string_chunks)
+                self._stack[-1].key = key
+                events.append(JSONEvent(JSONEventType.KEY, self._stack[-1].path + (key,), key))
+                self._state = _OBJECT_COLON
+        else:
+            if delta:
+                events.append(JSONEvent(JSONEventType.STRING_DELTA, self._path, "".join(delta)))
+            if done:
+                value = "".join(self._string_chunks)
+                self._set_current(value)
+                self._complete(value, events)
+        return min(i, n)
+
+    def _consume_escape(self, text: str, i: int, delta: List[str]) -> int:
+        if self._escape == "":
+            c = text[i]
+            if c == "u":
+                self._escape = "u"
+            elif c in _ESCAPES:
+                self._escape = None
+                self._flush_surrogate(delta)
+                delta.append(_ESCAPES[c])
+            else:
+                raise ValueError(f"Invalid escape sequence: \\{c}")
+            return i + 1
+
+        chunk = text[i : i + 5 - len(self._escape)]
+        self._escape += chunk
+        if len(self._escape) == 5:
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                delta.append(chr(0x10000 + ((self._high_surrogate - 0xD800) << 10) + (code - 0xDC00)))
+                self._high_surrogate = None
+            else:
+                self._flush_surrogate(delta)
+                if 0xD800 <= code <= 0xDBFF:
+                    self._high_surrogate = code
+                else:
+                    delta.append(chr(code))
+        return i + len(chunk)
+
+
+def string_delta(events: List[JSONEvent], *path: Union[str, int]) -> str:
+    """The characters that `events` added to the string value at `path`."""
+    return "".join(event.value for event in events if event.type == JSONEventType.STRING_DELTA and event.path == path)
+
+
 # TODO: Keeping this around for posterity
 # def main():
 #     test_string = '{"inner_thoughts":}'
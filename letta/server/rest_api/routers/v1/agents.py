@@ -1,7 +1,9 @@
 import asyncio
 import json
 import traceback
+from contextlib import AsyncExitStack, asynccontextmanager
 from datetime import datetime, timezone
+from functools import partial
 from typing import Annotated, Any, Dict, List, Literal, Optional, Union
 
 from fastapi import APIRouter, Body, Depends, File, Form, Header, HTTPException, Query, Request, UploadFile, status
@@ -21,6 +23,7 @@ from letta.errors import (
     AgentExportIdMappingError,
     AgentExportProcessingError,
     AgentFileImportError,
+    AgentLockTimeoutError,
     AgentNotFoundForExportError,
     PendingApprovalError,
 )
@@ -33,13 +36,13 @@ from letta.otel.metric_registry import MetricRegistry
 from letta.schemas.agent import AgentState, AgentType, CreateAgent, UpdateAgent
 from letta.schemas.agent_file import AgentFileSchema
 from letta.schemas.block import Block, BlockUpdate
-from letta.schemas.enums import JobType
+from letta.schemas.enums import JobType, MessageRole
 from letta.schemas.file import AgentFileAttachment, PaginatedAgentFiles
 from letta.schemas.group import Group
 from letta.schemas.job import JobStatus, JobUpdate, LettaRequestConfig
 from letta.schemas.letta_message import LettaMessageUnion, LettaMessageUpdateUnion, MessageType
-from letta.schemas.letta_request import LettaAsyncRequest, LettaRequest, LettaStreamingRequest
-from letta.schemas.letta_response import LettaResponse
+from letta.schemas.letta_request import LettaAsyncRequest, LettaBulkRequest, LettaRequest, LettaStreamingRequest
+from letta.schemas.letta_response import LettaBulkResponseItem, LettaResponse
 from letta.schemas.memory import (
     ArchivalMemorySearchResponse,
     ArchivalMemorySearchResult,
@@ -47,7 +50,7 @@ from letta.schemas.memory import (
     CreateArchivalMemory,
     Memory,
 )
-from letta.schemas.message import MessageCreate, MessageSearchRequest, MessageSearchResult
+from letta.schemas.message import Message, MessageCreate, MessageSearchRequest, MessageSearchResult
 from letta.schemas.passage import Passage
 from letta.schemas.run import Run
 from letta.schemas.source import Source
@@ -57,6 +60,7 @@ from letta.serialize_schemas.pydantic_agent_schema import AgentSchema
 from letta.server.rest_api.redis_stream_manager import create_background_stream_processor, redis_sse_stream_generator
 from letta.server.rest_api.utils import get_letta_server
 from letta.server.server import SyncServer
+from letta.services.per_agent_lock_manager import get_per_agent_lock_manager
 from letta.services.summarizer.enums import SummarizationMode
 from letta.services.telemetry_manager import NoopTelemetryManager
 from letta.settings import settings
@@ -69,6 +73,46 @@ router = APIRouter(prefix="/agents", tags=["agents"])
 
 logger = get_logger(__name__)
 
+# relationships loaded for agents that are about to step on a non-streaming send
+SEND_MESSAGE_AGENT_RELATIONSHIPS = ["memory", "multi_agent_group", "sources", "tool_exec_environment_variables", "tools"]
+
+
+@asynccontextmanager
+async def _agent_lock(server: SyncServer, agent_id: str, actor: User):
+    """Serializes writes to the same agent's messages across requests (and workers, with redis) when enabled.
+
+    Distributed leases are fenced by a token issued on the agent row, so a holder whose lease expired
+    mid-step has its message_ids writes rejected instead of overwriting the new holder's.
+    """
+    if not settings.enable_per_agent_lock:
+        yield
+        return
+
+    issue_fencing_token = partial(server.agent_manager.claim_lock_fencing_token_async, agent_id=agent_id, actor=actor)
+    async with get_per_agent_lock_manager().lock(agent_id, issue_fencing_token=issue_fencing_token):
+        yield
+
+
+@asynccontextmanager
+async def _agent_step_lock(server: SyncServer, agent: AgentState, actor: User):
+    """Holds the agent lock for a step.
+
+    The in-context message ids are re-read once the lock is held, since another request
+    may have advanced them after `agent` was loaded.
+    """
+    async with _agent_lock(server, agent.id, actor):
+        if settings.enable_per_agent_lock:
+            agent.message_ids = await server.agent_manager.get_agent_message_ids_async(agent_id=agent.id, actor=actor)
+        yield
+
+
+async def _release_after_stream(body_iterator, exit_stack: AsyncExitStack):
+    try:
+        async for chunk in body_iterator:
+            yield chunk
+    finally:
+        await exit_stack.aclose()
+
 
 @router.get("/", response_model=list[AgentState], operation_id="list_agents")
 async def list_agents(
@@ -407,6 +451,9 @@ async def import_agent(
 @router.get("/{agent_id}/context", response_model=ContextWindowOverview, operation_id="retrieve_agent_context_window")
 async def retrieve_agent_context_window(
     agent_id: str,
+    include_messages: bool = Query(
+        True, description="Whether to return the in-context messages. When false, `messages` is empty and only counts are computed."
+    ),
     server: "SyncServer" = Depends(get_letta_server),
     actor_id: str | None = Header(None, alias="user_id"),  # Extract user_id from header, default to None if not present
 ):
@@ -415,7 +462,7 @@ async def retrieve_agent_context_window(
     """
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
     try:
-        return await server.agent_manager.get_context_window(agent_id=agent_id, actor=actor)
+        return await server.agent_manager.get_context_window(agent_id=agent_id, actor=actor, include_messages=include_messages)
     except Exception as e:
         traceback.print_exc()
         raise e
@@ -450,6 +497,28 @@ async def create_agent(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/bulk", response_model=List[AgentState], operation_id="create_agents")
+async def create_agents(
+    agents: List[CreateAgentRequest] = Body(...),
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: str | None = Header(None, alias="user_id"),  # Extract user_id from header, default to None if not present
+    x_project: str | None = Header(
+        None, alias="X-Project", description="The project slug to associate with the agents (cloud only)."
+    ),  # Only handled by next js middleware
+):
+    """
+    Create many agents at once, returned in the order of the request.
+
+    The agents are written together with a few multi-row inserts, which is much faster than creating them one by one.
+    """
+    try:
+        actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+        return await server.create_agents_async(agents, actor=actor)
+    except Exception as e:
+        traceback.print_exc()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.patch("/{agent_id}", response_model=AgentState, operation_id="modify_agent")
 async def modify_agent(
     agent_id: str,
@@ -1112,8 +1181,78 @@ async def list_messages(
     )
 
 
+@router.get(
+    "/{agent_id}/messages/export",
+    response_model=None,
+    operation_id="export_messages",
+    responses={
+        200: {
+            "description": "Newline-delimited JSON stream with one LettaMessage per line, oldest first",
+            "content": {"application/x-ndjson": {}},
+        }
+    },
+)
+async def export_messages(
+    agent_id: str,
+    server: "SyncServer" = Depends(get_letta_server),
+    after: str | None = Query(None, description="Message after which to start the export."),
+    group_id: str | None = Query(None, description="Group ID to filter messages by."),
+    batch_size: int = Query(1000, ge=1, le=10000, description="Number of messages read from the database at a time."),
+    use_assistant_message: bool = Query(True, description="Whether to use assistant messages"),
+    assistant_message_tool_name: str = Query(DEFAULT_MESSAGE_TOOL, description="The name of the designated message tool."),
+    assistant_message_tool_kwarg: str = Query(DEFAULT_MESSAGE_TOOL_KWARG, description="The name of the message argument."),
+    include_err: bool | None = Query(
+        None, description="Whether to include error messages and error statuses. For debugging purposes only."
+    ),
+    actor_id: str | None = Header(None, alias="user_id"),  # Extract user_id from header, default to None if not present
+):
+    """
+    Export the full message history of an agent as newline-delimited JSON.
+
+    The messages are read in batches and written to the response as they are read, so histories of any length can be
+    exported without loading them into memory at once.
+    """
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    batches = server.message_manager.iter_messages_for_agent_async(
+        agent_id=agent_id, actor=actor, after=after, group_id=group_id, include_err=include_err, batch_size=batch_size
+    )
+    # read the first batch before responding, so a missing agent or cursor is reported as an error instead of an empty stream
+    first_batch = await anext(batches, None)
+
+    async def stream_messages():
+        batch = first_batch
+        # tool calls of the designated message tool in the previous batch, whose returns are folded into assistant messages
+        assistant_tool_call_ids = set()
+        try:
+            while batch is not None:
+                if use_assistant_message:
+                    batch = [m for m in batch if m.role != MessageRole.tool or m.tool_call_id not in assistant_tool_call_ids]
+                    assistant_tool_call_ids = {
+                        tool_call.id
+                        for m in batch
+                        if m.role == MessageRole.assistant and m.tool_calls
+                        for tool_call in m.tool_calls
+                        if tool_call.function.name == assistant_message_tool_name
+                    }
+                letta_messages = Message.to_letta_messages_from_list(
+                    messages=batch,
+                    use_assistant_message=use_assistant_message,
+                    assistant_message_tool_name=assistant_message_tool_name,
+                    assistant_message_tool_kwarg=assistant_message_tool_kwarg,
+                    reverse=False,
+                    include_err=include_err,
+                )
+                if letta_messages:
+                    yield "".join(f"{letta_message.model_dump_json()}\n" for letta_message in letta_messages)
+                batch = await anext(batches, None)
+        finally:
+            await batches.aclose()
+
+    return StreamingResponse(stream_messages(), media_type="application/x-ndjson")
+
+
 @router.patch("/{agent_id}/messages/{message_id}", response_model=LettaMessageUnion, operation_id="modify_message")
-def modify_message(
+async def modify_message(
     agent_id: str,
     message_id: str,
     request: LettaMessageUpdateUnion = Body(...),
@@ -1124,8 +1263,83 @@ def modify_message(
     Update the details of a message associated with an agent.
     """
     # TODO: support modifying tool calls/returns
-    actor = server.user_manager.get_user_or_default(user_id=actor_id)
-    return server.message_manager.update_message_by_letta_message(message_id=message_id, letta_message_update=request, actor=actor)
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    async with _agent_lock(server, agent_id, actor):
+        return await asyncio.to_thread(
+            server.message_manager.update_message_by_letta_message, message_id=message_id, letta_message_update=request, actor=actor
+        )
+
+
+@router.post(
+    "/messages/bulk",
+    response_model=None,
+    operation_id="send_message_to_agents",
+    responses={
+        200: {
+            "description": "Server-Sent Events stream with one LettaBulkResponseItem per agent, in completion order",
+            "content": {"text/event-stream": {}},
+        }
+    },
+)
+async def send_message_to_agents(
+    server: SyncServer = Depends(get_letta_server),
+    request: LettaBulkRequest = Body(...),
+    actor_id: str | None = Header(None, alias="user_id"),  # Extract user_id from header, default to None if not present
+):
+    """
+    Send the same messages to many agents and stream back each agent's response as soon as it is done.
+
+    The agents and their in-context messages are loaded up front in a few batched queries rather than once per agent,
+    and at most `max_concurrency` agents process the messages at the same time. An agent that fails does not stop the
+    others; its event carries the error instead of a response.
+    """
+    if len(request.messages) == 0:
+        raise ValueError("Messages must not be empty")
+    request_start_timestamp_ns = get_utc_timestamp_ns()
+
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+    agent_ids = list(dict.fromkeys(request.agent_ids))
+    agents, in_context_messages = await server.agent_manager.get_agents_with_in_context_messages_async(
+        agent_ids, actor, include_relationships=SEND_MESSAGE_AGENT_RELATIONSHIPS
+    )
+    MetricRegistry().user_message_counter.add(len(agents), get_ctx_attributes())
+    semaphore = asyncio.Semaphore(request.max_concurrency)
+
+    async def send_to_agent(agent_id: str) -> LettaBulkResponseItem:
+        agent = agents.get(agent_id)
+        if agent is None:
+            return LettaBulkResponseItem(agent_id=agent_id, error=f"Agent {agent_id} not found")
+        async with semaphore:
+            try:
+                response = await _send_message_to_agent(
+                    server=server,
+                    agent=agent,
+                    actor=actor,
+                    request=request,
+                    # agents may annotate their input messages (e.g. with a group id), so each one gets its own copy
+                    input_messages=[message.model_copy(deep=True) for message in request.messages],
+                    request_start_timestamp_ns=request_start_timestamp_ns,
+                    in_context_messages=in_context_messages.get(agent_id),
+                )
+                return LettaBulkResponseItem(agent_id=agent_id, response=response)
+            except HTTPException as e:
+                return LettaBulkResponseItem(agent_id=agent_id, error=json.dumps(e.detail) if isinstance(e.detail, dict) else str(e.detail))
+            except Exception as e:
+                logger.exception(f"Bulk send to agent {agent_id} failed")
+                return LettaBulkResponseItem(agent_id=agent_id, error=str(e))
+
+    async def stream_results():
+        tasks = [asyncio.create_task(send_to_agent(agent_id)) for agent_id in agent_ids]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                item = await next_result
+                yield f"data: {item.model_dump_json()}\n\n"
+        finally:
+            # the client went away, stop the agents that have not finished
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="text/event-stream")
 
 
 # noinspection PyInconsistentReturns
@@ -1152,9 +1366,28 @@ async def send_message(
 
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
     # TODO: This is redundant, remove soon
-    agent = await server.agent_manager.get_agent_by_id_async(
-        agent_id, actor, include_relationships=["memory", "multi_agent_group", "sources", "tool_exec_environment_variables", "tools"]
+    agent = await server.agent_manager.get_agent_by_id_async(agent_id, actor, include_relationships=SEND_MESSAGE_AGENT_RELATIONSHIPS)
+    return await _send_message_to_agent(
+        server=server,
+        agent=agent,
+        actor=actor,
+        request=request,
+        input_messages=request.messages,
+        request_start_timestamp_ns=request_start_timestamp_ns,
     )
+
+
+async def _send_message_to_agent(
+    server: SyncServer,
+    agent: AgentState,
+    actor: User,
+    request: LettaRequest,
+    input_messages: List[MessageCreate],
+    request_start_timestamp_ns: int,
+    in_context_messages: Optional[List[Message]] = None,
+) -> LettaResponse:
+    """Run one non-streaming agent step for `request`, tracking it as a run. Shared by the single and bulk send routes."""
+    agent_id = agent.id
     agent_eligible = agent.multi_agent_group is None or agent.multi_agent_group.manager_type in ["sleeptime", "voice_sleeptime"]
     model_compatible = agent.llm_config.model_endpoint_type in [
         "anthropic",
@@ -1200,28 +1433,30 @@ async def send_message(
 
     try:
         if agent_eligible and model_compatible:
-            agent_loop = AgentLoop.load(agent_state=agent, actor=actor)
-            result = await agent_loop.step(
-                request.messages,
-                max_steps=request.max_steps,
-                run_id=run.id if run else None,
-                use_assistant_message=request.use_assistant_message,
-                request_start_timestamp_ns=request_start_timestamp_ns,
-                include_return_message_types=request.include_return_message_types,
-            )
+            async with _agent_step_lock(server, agent, actor):
+                agent_loop = AgentLoop.load(agent_state=agent, actor=actor, in_context_messages=in_context_messages)
+                result = await agent_loop.step(
+                    input_messages,
+                    max_steps=request.max_steps,
+                    run_id=run.id if run else None,
+                    use_assistant_message=request.use_assistant_message,
+                    request_start_timestamp_ns=request_start_timestamp_ns,
+                    include_return_message_types=request.include_return_message_types,
+                )
         else:
-            result = await server.send_message_to_agent(
-                agent_id=agent_id,
-                actor=actor,
-                input_messages=request.messages,
-                stream_steps=False,
-                stream_tokens=False,
-                # Support for AssistantMessage
-                use_assistant_message=request.use_assistant_message,
-                assistant_message_tool_name=request.assistant_message_tool_name,
-                assistant_message_tool_kwarg=request.assistant_message_tool_kwarg,
-                include_return_message_types=request.include_return_message_types,
-            )
+            async with _agent_lock(server, agent_id, actor):
+                result = await server.send_message_to_agent(
+                    agent_id=agent_id,
+                    actor=actor,
+                    input_messages=input_messages,
+                    stream_steps=False,
+                    stream_tokens=False,
+                    # Support for AssistantMessage
+                    use_assistant_message=request.use_assistant_message,
+                    assistant_message_tool_name=request.assistant_message_tool_name,
+                    assistant_message_tool_kwarg=request.assistant_message_tool_kwarg,
+                    include_return_message_types=request.include_return_message_types,
+                )
         job_status = result.stop_reason.stop_reason.run_status
         return result
     except PendingApprovalError as e:
@@ -1332,17 +1567,18 @@ async def send_message_streaming(
                 from letta.errors import LLMAuthenticationError, LLMError, LLMRateLimitError, LLMTimeoutError
 
                 try:
-                    stream = agent_loop.stream(
-                        input_messages=request.messages,
-                        max_steps=request.max_steps,
-                        stream_tokens=request.stream_tokens and model_compatible_token_streaming,
-                        run_id=run.id if run else None,
-                        use_assistant_message=request.use_assistant_message,
-                        request_start_timestamp_ns=request_start_timestamp_ns,
-                        include_return_message_types=request.include_return_message_types,
-                    )
-                    async for chunk in stream:
-                        yield chunk
+                    async with _agent_step_lock(server, agent, actor):
+                        stream = agent_loop.stream(
+                            input_messages=request.messages,
+                            max_steps=request.max_steps,
+                            stream_tokens=request.stream_tokens and model_compatible_token_streaming,
+                            run_id=run.id if run else None,
+                            use_assistant_message=request.use_assistant_message,
+                            request_start_timestamp_ns=request_start_timestamp_ns,
+                            include_return_message_types=request.include_return_message_types,
+                        )
+                        async for chunk in stream:
+                            yield chunk
 
                 except LLMTimeoutError as e:
                     error_data = {
@@ -1370,6 +1606,11 @@ async def send_message_streaming(
                 except LLMError as e:
                     error_data = {"error": {"type": "llm_error", "message": "An error occurred with the LLM request.", "detail": str(e)}}
                     yield (f"data: {json.dumps(error_data)}\n\n", 502)
+                except AgentLockTimeoutError as e:
+                    error_data = {
+                        "error": {"type": "agent_busy", "message": "The agent is busy processing another request.", "detail": str(e)}
+                    }
+                    yield (f"data: {json.dumps(error_data)}\n\n", 409)
                 except Exception as e:
                     error_data = {"error": {"type": "internal_error", "message": "An internal server error occurred.", "detail": str(e)}}
                     yield (f"data: {json.dumps(error_data)}\n\n", 500)
@@ -1416,19 +1657,27 @@ async def send_message_streaming(
                 media_type="text/event-stream",
             )
         else:
-            result = await server.send_message_to_agent(
-                agent_id=agent_id,
-                actor=actor,
-                input_messages=request.messages,
-                stream_steps=True,
-                stream_tokens=request.stream_tokens,
-                # Support for AssistantMessage
-                use_assistant_message=request.use_assistant_message,
-                assistant_message_tool_name=request.assistant_message_tool_name,
-                assistant_message_tool_kwarg=request.assistant_message_tool_kwarg,
-                request_start_timestamp_ns=request_start_timestamp_ns,
-                include_return_message_types=request.include_return_message_types,
-            )
+            # the step runs in a background task that outlives this call, so the lock is held until the stream ends
+            lock_stack = AsyncExitStack()
+            await lock_stack.enter_async_context(_agent_lock(server, agent_id, actor))
+            try:
+                result = await server.send_message_to_agent(
+                    agent_id=agent_id,
+                    actor=actor,
+                    input_messages=request.messages,
+                    stream_steps=True,
+                    stream_tokens=request.stream_tokens,
+                    # Support for AssistantMessage
+                    use_assistant_message=request.use_assistant_message,
+                    assistant_message_tool_name=request.assistant_message_tool_name,
+                    assistant_message_tool_kwarg=request.assistant_message_tool_kwarg,
+                    request_start_timestamp_ns=request_start_timestamp_ns,
+                    include_return_message_types=request.include_return_message_types,
+                )
+            except BaseException:
+                await lock_stack.aclose()
+                raise
+            result.body_iterator = _release_after_stream(result.body_iterator, lock_stack)
         if settings.track_agent_run:
             job_status = JobStatus.running
         return result
@@ -1569,29 +1818,31 @@ async def _process_message_background(
             "deepseek",
         ]
         if agent_eligible and model_compatible:
-            agent_loop = AgentLoop.load(agent_state=agent, actor=actor)
-            result = await agent_loop.step(
-                messages,
-                max_steps=max_steps,
-                run_id=run_id,
-                use_assistant_message=use_assistant_message,
-                request_start_timestamp_ns=request_start_timestamp_ns,
-                include_return_message_types=include_return_message_types,
-            )
+            async with _agent_step_lock(server, agent, actor):
+                agent_loop = AgentLoop.load(agent_state=agent, actor=actor)
+                result = await agent_loop.step(
+                    messages,
+                    max_steps=max_steps,
+                    run_id=run_id,
+                    use_assistant_message=use_assistant_message,
+                    request_start_timestamp_ns=request_start_timestamp_ns,
+                    include_return_message_types=include_return_message_types,
+                )
         else:
-            result = await server.send_message_to_agent(
-                agent_id=agent_id,
-                actor=actor,
-                input_messages=messages,
-                stream_steps=False,
-                stream_tokens=False,
-                metadata={"job_id": run_id},
-                # Support for AssistantMessage
-                use_assistant_message=use_assistant_message,
-                assistant_message_tool_name=assistant_message_tool_name,
-                assistant_message_tool_kwarg=assistant_message_tool_kwarg,
-                include_return_message_types=include_return_message_types,
-            )
+            async with _agent_lock(server, agent_id, actor):
+                result = await server.send_message_to_agent(
+                    agent_id=agent_id,
+                    actor=actor,
+                    input_messages=messages,
+                    stream_steps=False,
+                    stream_tokens=False,
+                    metadata={"job_id": run_id},
+                    # Support for AssistantMessage
+                    use_assistant_message=use_assistant_message,
+                    assistant_message_tool_name=assistant_message_tool_name,
+                    assistant_message_tool_kwarg=assistant_message_tool_kwarg,
+                    include_return_message_types=include_return_message_types,
+                )
 
         job_update = JobUpdate(
             status=JobStatus.completed,
@@ -1710,9 +1961,10 @@ async def reset_messages(
 ):
     """Resets the messages for an agent"""
     actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
-    return await server.agent_manager.reset_messages_async(
-        agent_id=agent_id, actor=actor, add_default_initial_messages=add_default_initial_messages
-    )
+    async with _agent_lock(server, agent_id, actor):
+        return await server.agent_manager.reset_messages_async(
+            agent_id=agent_id, actor=actor, add_default_initial_messages=add_default_initial_messages
+        )
 
 
 @router.get("/{agent_id}/groups", response_model=list[Group], operation_id="list_agent_groups")
@@ -1808,14 +2060,15 @@ async def summarize_agent_conversation(
     ]
 
     if agent_eligible and model_compatible:
-        agent_loop = LettaAgentV2(agent_state=agent, actor=actor)
-        in_context_messages = await server.message_manager.get_messages_by_ids_async(message_ids=agent.message_ids, actor=actor)
-        await agent_loop.summarize_conversation_history(
-            in_context_messages=in_context_messages,
-            new_letta_messages=[],
-            total_tokens=None,
-            force=True,
-        )
+        async with _agent_step_lock(server, agent, actor):
+            agent_loop = LettaAgentV2(agent_state=agent, actor=actor)
+            in_context_messages = await server.message_manager.get_messages_by_ids_async(message_ids=agent.message_ids, actor=actor)
+            await agent_loop.summarize_conversation_history(
+                in_context_messages=in_context_messages,
+                new_letta_messages=[],
+                total_tokens=None,
+                force=True,
+            )
         # Summarization completed, return 204 No Content
     else:
         raise HTTPException(
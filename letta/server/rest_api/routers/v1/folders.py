@@ -450,6 +450,63 @@ async def list_folder_files(
 #    return file_metadata
 
 
+@router.post("/{folder_id}/files/{file_id}/resume", response_model=FileMetadata, operation_id="resume_file_processing")
+async def resume_file_processing(
+    folder_id: str,
+    file_id: str,
+    server: "SyncServer" = Depends(get_letta_server),
+    actor_id: Optional[str] = Header(None, alias="user_id"),
+):
+    """
+    Resume embedding a file whose processing failed or timed out.
+
+    Chunks that already have a stored passage are not embedded again.
+    """
+    if should_use_tpuf() or should_use_pinecone():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Resuming file processing is only supported for the native vector store."
+        )
+
+    actor = await server.user_manager.get_actor_or_default_async(actor_id=actor_id)
+
+    folder = await server.source_manager.get_source_by_id(source_id=folder_id, actor=actor)
+    if folder is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Folder with id={folder_id} not found.")
+
+    file_metadata = await server.file_manager.get_file_by_id(file_id=file_id, actor=actor, include_content=True)
+    if not file_metadata or file_metadata.source_id != folder_id:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"File with id={file_id} not found in folder {folder_id}.")
+
+    # files stuck in a non-terminal state are moved to ERROR once they time out
+    file_metadata = await server.file_manager.check_and_update_file_status(file_metadata, actor)
+    if file_metadata.processing_status != FileProcessingStatus.ERROR:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Only files in the error state can be resumed, file {file_id} is {file_metadata.processing_status.value}.",
+        )
+    if not file_metadata.content:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail=f"File {file_id} failed before it was parsed, upload it again instead."
+        )
+
+    file_processor = FileProcessor(
+        file_parser=MarkitdownFileParser(), embedder=OpenAIEmbedder(embedding_config=folder.embedding_config), actor=actor
+    )
+    # claim the file synchronously, so a second resume request sees EMBEDDING and is rejected
+    file_metadata = await server.file_manager.update_file_status(
+        file_id=file_id, actor=actor, processing_status=FileProcessingStatus.EMBEDDING, error_message="", enforce_state_transitions=False
+    )
+    safe_create_file_processing_task(
+        file_processor.resume_processing(file_metadata=file_metadata, source_id=folder_id),
+        file_metadata=file_metadata,
+        server=server,
+        actor=actor,
+        logger=logger,
+        label="file_processor.resume_processing",
+    )
+    return file_metadata
+
+
 # it's redundant to include /delete in the URL path. The HTTP verb DELETE already implies that action.
 # it's still good practice to return a status indicating the success or failure of the deletion
 @router.delete("/{folder_id}/{file_id}", status_code=204, operation_id="delete_file_from_folder")
@@ -88,6 +88,7 @@ from letta.services.block_manager import BlockManager
 from letta.services.file_manager import FileManager
 from letta.services.files_agents_manager import FileAgentManager
 from letta.services.group_manager import GroupManager
+from letta.services.helpers.provider_model_catalog import get_provider_model_catalog, get_provider_model_catalog_async
 from letta.services.helpers.tool_execution_helper import prepare_local_sandbox
 from letta.services.identity_manager import IdentityManager
 from letta.services.job_manager import JobManager
@@ -405,8 +406,6 @@ class SyncServer(Server):
         self.mcp_clients: Dict[str, AsyncBaseMCPClient] = {}
 
         # TODO: Remove these in memory caches
-        self._llm_config_cache = {}
-        self._embedding_config_cache = {}
 
         # TODO: Replace this with the Anthropic client we have in house
         self.anthropic_async_client = AsyncAnthropic()
@@ -761,32 +760,43 @@ class SyncServer(Server):
 
     @trace_method
     def get_cached_llm_config(self, actor: User, **kwargs):
+        catalog = get_provider_model_catalog()
         key = make_key(**kwargs)
-        if key not in self._llm_config_cache:
-            self._llm_config_cache[key] = self.get_llm_config_from_handle(actor=actor, **kwargs)
-        return self._llm_config_cache[key]
+        llm_config = catalog.get_resolved_config("llm", actor.organization_id, key)
+        if llm_config is None:
+            llm_config = self.get_llm_config_from_handle(actor=actor, **kwargs)
+            catalog.put_resolved_config("llm", actor.organization_id, key, llm_config)
+        return llm_config
 
     @trace_method
     async def get_cached_llm_config_async(self, actor: User, **kwargs):
+        catalog = await get_provider_model_catalog_async()
         key = make_key(**kwargs)
-        if key not in self._llm_config_cache:
-            self._llm_config_cache[key] = await self.get_llm_config_from_handle_async(actor=actor, **kwargs)
-        return self._llm_config_cache[key]
+        llm_config = catalog.get_resolved_config("llm", actor.organization_id, key)
+        if llm_config is None:
+            llm_config = await self.get_llm_config_from_handle_async(actor=actor, **kwargs)
+            catalog.put_resolved_config("llm", actor.organization_id, key, llm_config)
+        return llm_config
 
     @trace_method
     def get_cached_embedding_config(self, actor: User, **kwargs):
+        catalog = get_provider_model_catalog()
         key = make_key(**kwargs)
-        if key not in self._embedding_config_cache:
-            self._embedding_config_cache[key] = self.get_embedding_config_from_handle(actor=actor, **kwargs)
-        return self._embedding_config_cache[key]
+        embedding_config = catalog.get_resolved_config("embedding", actor.organization_id, key)
+        if embedding_config is None:
+            embedding_config = self.get_embedding_config_from_handle(actor=actor, **kwargs)
+            catalog.put_resolved_config("embedding", actor.organization_id, key, embedding_config)
+        return embedding_config
 
-    # @async_redis_cache(key_func=lambda (actor, **kwargs): actor.id + hash(kwargs))
     @trace_method
     async def get_cached_embedding_config_async(self, actor: User, **kwargs):
+        catalog = await get_provider_model_catalog_async()
         key = make_key(**kwargs)
-        if key not in self._embedding_config_cache:
-            self._embedding_config_cache[key] = await self.get_embedding_config_from_handle_async(actor=actor, **kwargs)
-        return self._embedding_config_cache[key]
+        embedding_config = catalog.get_resolved_config("embedding", actor.organization_id, key)
+        if embedding_config is None:
+            embedding_config = await self.get_embedding_config_from_handle_async(actor=actor, **kwargs)
+            catalog.put_resolved_config("embedding", actor.organization_id, key, embedding_config)
+        return embedding_config
 
     @trace_method
     def create_agent(
@@ -842,6 +852,37 @@ class SyncServer(Server):
         request: CreateAgent,
         actor: User,
     ) -> AgentState:
+        await self._resolve_agent_configs_async(request, actor)
+
+        log_event(name="start create_agent db")
+        main_agent = await self.agent_manager.create_agent_async(
+            agent_create=request,
+            actor=actor,
+        )
+        log_event(name="end create_agent db")
+
+        return await self._finish_agent_creation_async(request, main_agent, actor)
+
+    async def create_agents_async(
+        self,
+        requests: List[CreateAgent],
+        actor: User,
+    ) -> List[AgentState]:
+        """Create many agents with one bulk write (see `AgentManager.create_agents_async`), returned in request order."""
+        for request in requests:
+            await self._resolve_agent_configs_async(request, actor)
+
+        log_event(name="start create_agents db", attributes={"num_agents": len(requests)})
+        agents = await self.agent_manager.create_agents_async(agent_creates=requests, actor=actor)
+        log_event(name="end create_agents db", attributes={"num_agents": len(requests)})
+
+        return [
+            await self._finish_agent_creation_async(request, agent, actor) if request.source_ids or request.enable_sleeptime else agent
+            for request, agent in zip(requests, agents)
+        ]
+
+    async def _resolve_agent_configs_async(self, request: CreateAgent, actor: User) -> None:
+        """Fill in the llm and embedding configs of `request` from its model and embedding handles (or the defaults)."""
         if request.llm_config is None:
             if request.model is None:
                 if settings.default_llm_handle is None:
@@ -876,13 +917,8 @@ class SyncServer(Server):
             request.embedding_config = await self.get_cached_embedding_config_async(actor=actor, **embedding_config_params)
             log_event(name="end get_cached_embedding_config", attributes=embedding_config_params)
 
-        log_event(name="start create_agent db")
-        main_agent = await self.agent_manager.create_agent_async(
-            agent_create=request,
-            actor=actor,
-        )
-        log_event(name="end create_agent db")
-
+    async def _finish_agent_creation_async(self, request: CreateAgent, main_agent: AgentState, actor: User) -> AgentState:
+        """Open the files of the agent's sources and create its sleeptime agent, if requested."""
         log_event(name="start insert_files_into_context_window db")
         if request.source_ids:
             for source_id in request.source_ids:
@@ -1513,20 +1549,9 @@ class SyncServer(Server):
             actor=actor,
         )
 
-        async def get_provider_models(provider: Provider) -> list[LLMConfig]:
-            try:
-                async with asyncio.timeout(constants.GET_PROVIDERS_TIMEOUT_SECONDS):
-                    return await provider.list_llm_models_async()
-            except asyncio.TimeoutError:
-                warnings.warn(f"Timeout while listing LLM models for provider {provider}")
-                return []
-            except Exception as e:
-                traceback.print_exc()
-                warnings.warn(f"Error while listing LLM models for provider {provider}: {e}")
-                return []
-
-        # Execute all provider model listing tasks concurrently
-        provider_results = await asyncio.gather(*[get_provider_models(provider) for provider in providers])
+        # Served from the catalog's snapshots; listing errors and timeouts are handled there
+        catalog = await get_provider_model_catalog_async()
+        provider_results = await asyncio.gather(*[catalog.list_llm_models(provider) for provider in providers])
 
         # Flatten the results
         llm_models = []
@@ -1565,20 +1590,9 @@ class SyncServer(Server):
         # Get all eligible providers first
         providers = await self.get_enabled_providers_async(actor=actor)
 
-        # Fetch embedding models from each provider concurrently
-        async def get_provider_embedding_models(provider):
-            try:
-                # All providers now have list_embedding_models_async
-                return await provider.list_embedding_models_async()
-            except Exception as e:
-                import traceback
-
-                traceback.print_exc()
-                warnings.warn(f"An error occurred while listing embedding models for provider {provider}: {e}")
-                return []
-
-        # Execute all provider model listing tasks concurrently
-        provider_results = await asyncio.gather(*[get_provider_embedding_models(provider) for provider in providers])
+        # Served from the catalog's snapshots; listing errors and timeouts are handled there
+        catalog = await get_provider_model_catalog_async()
+        provider_results = await asyncio.gather(*[catalog.list_embedding_models(provider) for provider in providers])
 
         # Flatten the results
         embedding_models = []
@@ -1713,7 +1727,7 @@ class SyncServer(Server):
             provider_name, model_name = handle.split("/", 1)
             provider = await self.get_provider_from_name_async(provider_name, actor)
 
-            all_llm_configs = await provider.list_llm_models_async()
+            all_llm_configs = await (await get_provider_model_catalog_async()).list_llm_models(provider)
             llm_configs = [config for config in all_llm_configs if config.handle == handle]
             if not llm_configs:
                 llm_configs = [config for config in all_llm_configs if config.model == model_name]
@@ -1791,7 +1805,7 @@ class SyncServer(Server):
             provider_name, model_name = handle.split("/", 1)
             provider = await self.get_provider_from_name_async(provider_name, actor)
 
-            all_embedding_configs = await provider.list_embedding_models_async()
+            all_embedding_configs = await (await get_provider_model_catalog_async()).list_embedding_models(provider)
             embedding_configs = [config for config in all_embedding_configs if config.handle == handle]
             if not embedding_configs:
                 raise ValueError(f"Embedding model {model_name} is not supported by {provider_name}")
@@ -1,10 +1,10 @@
 import asyncio
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Literal, Optional, Set, Tuple
+from typing import Any, Awaitable, Callable, Dict, List, Literal, Optional, Set, Tuple
 from zoneinfo import ZoneInfo
 
 import sqlalchemy as sa
-from sqlalchemy import delete, func, insert, literal, or_, select, tuple_
+from sqlalchemy import LargeBinary, Select, delete, func, insert, literal, or_, select, tuple_, type_coerce, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from letta.constants import (
@@ -24,8 +24,10 @@ from letta.constants import (
     INCLUDE_MODEL_KEYWORDS_BASE_TOOL_RULES,
     RETRIEVAL_QUERY_DEFAULT_PAGE_SIZE,
 )
+from letta.errors import AgentLockLostError
 from letta.helpers import ToolRulesSolver
 from letta.helpers.datetime_helpers import get_utc_time
+from letta.helpers.sqlite_vector_index import VECTOR_INDEX_CANDIDATE_OVERFETCH, VectorIndexKind, should_use_sqlite_vector_index
 from letta.llm_api.llm_client import LLMClient
 from letta.log import get_logger
 from letta.orm import (
@@ -46,6 +48,7 @@ from letta.orm import (
 from letta.orm.errors import NoResultFound
 from letta.orm.sandbox_config import AgentEnvironmentVariable, AgentEnvironmentVariable as AgentEnvironmentVariableModel
 from letta.orm.sqlalchemy_base import AccessType
+from letta.orm.sqlite_functions import CosineTopK
 from letta.otel.tracing import trace_method
 from letta.prompts.prompt_generator import PromptGenerator
 from letta.schemas.agent import (
@@ -77,7 +80,7 @@ from letta.server.db import db_registry
 from letta.services.archive_manager import ArchiveManager
 from letta.services.block_manager import BlockManager
 from letta.services.context_window_calculator.context_window_calculator import ContextWindowCalculator
-from letta.services.context_window_calculator.token_counter import AnthropicTokenCounter, TiktokenCounter
+from letta.services.context_window_calculator.token_counter import AnthropicTokenCounter, ApproximateTokenCounter, TiktokenCounter
 from letta.services.file_processor.chunker.line_chunker import LineChunker
 from letta.services.files_agents_manager import FileAgentManager
 from letta.services.helpers.agent_manager_helper import (
@@ -97,14 +100,23 @@ from letta.services.helpers.agent_manager_helper import (
     check_supports_structured_output,
     compile_system_message,
     derive_system_message,
+    embed_passage_query,
     initialize_message_sequence,
     initialize_message_sequence_async,
     package_initial_message_sequence,
     validate_agent_exists_async,
 )
+from letta.services.helpers.agent_state_cache import get_agent_state_cache_async, invalidate_agent_states_async
+from letta.services.helpers.memory_version_helper import (
+    agent_update_changes_memory,
+    bump_memory_version,
+    bump_memory_version_async,
+    get_memory_version_async,
+)
 from letta.services.identity_manager import IdentityManager
 from letta.services.message_manager import MessageManager
 from letta.services.passage_manager import PassageManager
+from letta.services.per_agent_lock_manager import get_held_lease
 from letta.services.source_manager import SourceManager
 from letta.services.tool_manager import ToolManager
 from letta.settings import DatabaseChoice, settings
@@ -112,6 +124,15 @@ from letta.utils import calculate_file_defaults_based_on_context_window, enforce
 
 logger = get_logger(__name__)
 
+# rows of raw embeddings scored per batch by SQLite vector search (~16MB at MAX_EMBEDDING_DIM)
+SQLITE_VECTOR_SCAN_CHUNK_ROWS = 1024
+# ids bound per IN (...) list when fetching ranked passages, well below SQLite's bound parameter limit
+SQLITE_PASSAGE_ID_BATCH_SIZE = 500
+# agents and in-context messages loaded per query when prefetching for a bulk send
+BULK_PREFETCH_BATCH_SIZE = 500
+# rows written per multi-row INSERT, keeping the bound parameters well below the database limits
+BULK_INSERT_BATCH_SIZE = 1000
+
 
 class AgentManager:
     """Manager class to handle business logic related to Agents."""
@@ -230,11 +251,7 @@ class AgentManager:
             return
 
         dialect = session.bind.dialect.name
-        if dialect == "postgresql":
-            stmt = pg_insert(table).values(rows).on_conflict_do_nothing()
-        elif dialect == "sqlite":
-            stmt = sa.insert(table).values(rows).prefix_with("OR IGNORE")
-        else:
+        if dialect not in ("postgresql", "sqlite"):
             # fallback: filter out exact-duplicate dicts in Python
             seen = set()
             filtered = []
@@ -243,9 +260,17 @@ class AgentManager:
                 if key not in seen:
                     seen.add(key)
                     filtered.append(row)
-            stmt = sa.insert(table).values(filtered)
-
-        await session.execute(stmt)
+            rows = filtered
+
+        for start in range(0, len(rows), BULK_INSERT_BATCH_SIZE):
+            batch = rows[start : start + BULK_INSERT_BATCH_SIZE]
+            if dialect == "postgresql":
+                stmt = pg_insert(table).values(batch).on_conflict_do_nothing()
+            elif dialect == "sqlite":
+                stmt = sa.insert(table).values(batch).prefix_with("OR IGNORE")
+            else:
+                stmt = sa.insert(table).values(batch)
+            await session.execute(stmt)
 
     @staticmethod
     def _replace_pivot_rows(session, table, agent_id: str, rows: list[dict]):
@@ -490,78 +515,32 @@ class AgentManager:
         _test_only_force_id: Optional[str] = None,
         _init_with_no_messages: bool = False,
     ) -> PydanticAgentState:
-        # validate required configs
-        if not agent_create.llm_config or not agent_create.embedding_config:
-            raise ValueError("llm_config and embedding_config are required")
-
-        if agent_create.reasoning is not None:
-            agent_create.llm_config = LLMConfig.apply_reasoning_setting_to_config(agent_create.llm_config, agent_create.reasoning)
+        self._prepare_agent_create(agent_create)
 
         # blocks
         block_ids = list(agent_create.block_ids or [])
         if agent_create.memory_blocks:
-            pydantic_blocks = [PydanticBlock(**b.model_dump(to_orm=True)) for b in agent_create.memory_blocks]
-
-            # Inject a description for the default blocks if the user didn't specify them
-            # Used for `persona`, `human`, etc
-            default_blocks = {block.label: block for block in DEFAULT_BLOCKS}
-            for block in pydantic_blocks:
-                if block.label in default_blocks:
-                    if block.description is None:
-                        block.description = default_blocks[block.label].description
-
             # Actually create the blocks
             created_blocks = await self.block_manager.batch_create_blocks_async(
-                pydantic_blocks,
+                self._memory_blocks_to_create(agent_create),
                 actor=actor,
             )
             block_ids.extend([blk.id for blk in created_blocks])
 
         # tools
-        tool_names = set(agent_create.tools or [])
-        if agent_create.include_base_tools:
-            if agent_create.agent_type == AgentType.voice_sleeptime_agent:
-                tool_names |= set(BASE_VOICE_SLEEPTIME_TOOLS)
-            elif agent_create.agent_type == AgentType.voice_convo_agent:
-                tool_names |= set(BASE_VOICE_SLEEPTIME_CHAT_TOOLS)
-            elif agent_create.agent_type == AgentType.sleeptime_agent:
-                tool_names |= set(BASE_SLEEPTIME_TOOLS)
-            elif agent_create.enable_sleeptime:
-                tool_names |= set(BASE_SLEEPTIME_CHAT_TOOLS)
-            elif agent_create.agent_type == AgentType.memgpt_v2_agent:
-                tool_names |= calculate_base_tools(is_v2=True)
-            elif agent_create.agent_type == AgentType.react_agent:
-                pass  # no default tools
-            elif agent_create.agent_type == AgentType.workflow_agent:
-                pass  # no default tools
-            else:
-                tool_names |= calculate_base_tools(is_v2=False)
-        if agent_create.include_multi_agent_tools:
-            tool_names |= calculate_multi_agent_tools()
-
-        # take out the deprecated tool names
-        tool_names.difference_update(set(DEPRECATED_LETTA_TOOLS))
-
+        tool_names = self._requested_tool_names(agent_create)
         supplied_ids = set(agent_create.tool_ids or [])
 
         source_ids = agent_create.source_ids or []
 
         # Create default source if requested
         if agent_create.include_default_source:
-            default_source = PydanticSource(
-                name=f"{agent_create.name} External Data Source",
-                embedding_config=agent_create.embedding_config,
-            )
-            created_source = await self.source_manager.create_source(default_source, actor)
+            created_source = await self._create_default_source_async(agent_create, actor)
             source_ids.append(created_source.id)
 
         identity_ids = agent_create.identity_ids or []
         tag_values = agent_create.tags or []
 
-        # if the agent type is workflow, we set the autoclear to forced true
-        if agent_create.agent_type == AgentType.workflow_agent:
-            agent_create.message_buffer_autoclear = True
-
         async with db_registry.async_session() as session:
             async with session.begin():
                 # Note: This will need to be modified if _resolve_tools needs an async version
@@ -574,69 +553,9 @@ class AgentManager:
 
                 tool_ids = set(name_to_id.values()) | set(id_to_name.keys())
                 tool_names = set(name_to_id.keys())  # now canonical
-                tool_rules = list(agent_create.tool_rules or [])
-
-                # Override include_base_tool_rules to False if model matches exclusion keywords and include_base_tool_rules is not explicitly set to True
-                if (
-                    (
-                        self._should_exclude_model_from_base_tool_rules(agent_create.llm_config.model)
-                        and agent_create.include_base_tool_rules is None
-                    )
-                    and agent_create.agent_type != AgentType.sleeptime_agent
-                ) or agent_create.include_base_tool_rules is False:
-                    agent_create.include_base_tool_rules = False
-                    logger.info(f"Overriding include_base_tool_rules to False for model: {agent_create.llm_config.model}")
-                else:
-                    agent_create.include_base_tool_rules = True
-
-                should_add_base_tool_rules = agent_create.include_base_tool_rules
-                if should_add_base_tool_rules:
-                    for tn in tool_names:
-                        if tn in {"send_message", "send_message_to_agent_async", "memory_finish_edits"}:
-                            tool_rules.append(TerminalToolRule(tool_name=tn))
-                        elif tn in (BASE_TOOLS + BASE_MEMORY_TOOLS + BASE_MEMORY_TOOLS_V2 + BASE_SLEEPTIME_TOOLS):
-                            tool_rules.append(ContinueToolRule(tool_name=tn))
-
-                for tool_with_requires_approval in requires_approval:
-                    tool_rules.append(RequiresApprovalToolRule(tool_name=tool_with_requires_approval))
-
-                if tool_rules:
-                    check_supports_structured_output(model=agent_create.llm_config.model, tool_rules=tool_rules)
-
-                new_agent = AgentModel(
-                    name=agent_create.name,
-                    system=derive_system_message(
-                        agent_type=agent_create.agent_type,
-                        enable_sleeptime=agent_create.enable_sleeptime,
-                        system=agent_create.system,
-                    ),
-                    agent_type=agent_create.agent_type,
-                    llm_config=agent_create.llm_config,
-                    embedding_config=agent_create.embedding_config,
-                    organization_id=actor.organization_id,
-                    description=agent_create.description,
-                    metadata_=agent_create.metadata,
-                    tool_rules=tool_rules,
-                    hidden=agent_create.hidden,
-                    project_id=agent_create.project_id,
-                    template_id=agent_create.template_id,
-                    base_template_id=agent_create.base_template_id,
-                    message_buffer_autoclear=agent_create.message_buffer_autoclear,
-                    enable_sleeptime=agent_create.enable_sleeptime,
-                    response_format=agent_create.response_format,
-                    created_by_id=actor.id,
-                    last_updated_by_id=actor.id,
-                    timezone=agent_create.timezone if agent_create.timezone else DEFAULT_TIMEZONE,
-                    max_files_open=agent_create.max_files_open,
-                    per_file_view_window_char_limit=agent_create.per_file_view_window_char_limit,
-                )
+                tool_rules = self._build_tool_rules(agent_create, tool_names, requires_approval)
 
-                # Set template fields for InternalTemplateAgentCreate (similar to group creation)
-                if isinstance(agent_create, InternalTemplateAgentCreate):
-                    new_agent.base_template_id = agent_create.base_template_id
-                    new_agent.template_id = agent_create.template_id
-                    new_agent.deployment_id = agent_create.deployment_id
-                    new_agent.entity_id = agent_create.entity_id
+                new_agent = self._build_agent_model(agent_create, actor, tool_rules)
 
                 if _test_only_force_id:
                     new_agent.id = _test_only_force_id
@@ -675,15 +594,7 @@ class AgentManager:
 
                 env_rows = []
                 if agent_create.tool_exec_environment_variables:
-                    env_rows = [
-                        {
-                            "agent_id": aid,
-                            "key": key,
-                            "value": val,
-                            "organization_id": actor.organization_id,
-                        }
-                        for key, val in agent_create.tool_exec_environment_variables.items()
-                    ]
+                    env_rows = self._environment_variable_rows(aid, agent_create, actor)
                     result = await session.execute(insert(AgentEnvironmentVariable).values(env_rows).returning(AgentEnvironmentVariable.id))
                     env_rows = [{**row, "id": env_var_id} for row, env_var_id in zip(env_rows, result.scalars().all())]
 
@@ -724,6 +635,272 @@ class AgentManager:
             )
         return result
 
+    @trace_method
+    async def create_agents_async(self, agent_creates: List[CreateAgent], actor: PydanticUser) -> List[PydanticAgentState]:
+        """
+        Create many agents at once, returning their states in the order of `agent_creates`.
+
+        Produces the same agents as calling `create_agent_async` for every payload, but with a number of statements that
+        does not grow with the number of agents: the memory blocks of all agents are created together, the tools
+        requested by any of them are resolved with a single query, the agents, their pivot rows and their initial
+        messages are written with multi-row inserts, and the states are loaded back in batches.
+        """
+        if not agent_creates:
+            return []
+        for agent_create in agent_creates:
+            self._prepare_agent_create(agent_create)
+
+        # blocks of all agents, created in one batch
+        memory_blocks = [self._memory_blocks_to_create(agent_create) for agent_create in agent_creates]
+        created_blocks = iter(
+            await self.block_manager.batch_create_blocks_async([block for blocks in memory_blocks for block in blocks], actor=actor)
+        )
+        block_labels: Dict[str, str] = {}
+        block_ids_per_agent: List[List[str]] = []
+        for agent_create, blocks in zip(agent_creates, memory_blocks):
+            created = [next(created_blocks) for _ in blocks]
+            block_labels.update((block.id, block.label) for block in created)
+            block_ids_per_agent.append(list(agent_create.block_ids or []) + [block.id for block in created])
+
+        source_ids_per_agent: List[List[str]] = []
+        for agent_create in agent_creates:
+            source_ids = list(agent_create.source_ids or [])
+            if agent_create.include_default_source:
+                source_ids.append((await self._create_default_source_async(agent_create, actor)).id)
+            source_ids_per_agent.append(source_ids)
+
+        tool_names_per_agent = [self._requested_tool_names(agent_create) for agent_create in agent_creates]
+        tool_ids_per_agent = [set(agent_create.tool_ids or []) for agent_create in agent_creates]
+
+        async with db_registry.async_session() as session:
+            async with session.begin():
+                name_to_id, id_to_name, requires_approval = await self._resolve_tools_async(
+                    session, set().union(*tool_names_per_agent), set().union(*tool_ids_per_agent), actor.organization_id
+                )
+
+                # labels of the existing blocks to attach; like `create_agent_async`, ids that do not exist are skipped
+                existing_block_ids = list({bid for block_ids in block_ids_per_agent for bid in block_ids if bid not in block_labels})
+                for start in range(0, len(existing_block_ids), BULK_PREFETCH_BATCH_SIZE):
+                    result = await session.execute(
+                        select(BlockModel.id, BlockModel.label).where(
+                            BlockModel.id.in_(existing_block_ids[start : start + BULK_PREFETCH_BATCH_SIZE])
+                        )
+                    )
+                    block_labels.update(result.all())
+
+                new_agents = []
+                for i, agent_create in enumerate(agent_creates):
+                    tool_ids_per_agent[i] |= {name_to_id[name] for name in tool_names_per_agent[i]}
+                    tool_names = {id_to_name[tid] for tid in tool_ids_per_agent[i]}
+                    tool_rules = self._build_tool_rules(
+                        agent_create, tool_names, [name for name in requires_approval if name in tool_names]
+                    )
+                    new_agents.append(self._build_agent_model(agent_create, actor, tool_rules))
+
+                session.add_all(new_agents)
+                await session.flush()
+                agent_ids = [agent.id for agent in new_agents]
+
+                tool_rows, block_rows, source_rows, tag_rows, identity_rows, env_rows = [], [], [], [], [], []
+                for aid, agent_create, tool_ids, block_ids, source_ids in zip(
+                    agent_ids, agent_creates, tool_ids_per_agent, block_ids_per_agent, source_ids_per_agent
+                ):
+                    tool_rows.extend({"agent_id": aid, "tool_id": tid} for tid in tool_ids)
+                    block_rows.extend(
+                        {"agent_id": aid, "block_id": bid, "block_label": block_labels[bid]} for bid in block_ids if bid in block_labels
+                    )
+                    source_rows.extend({"agent_id": aid, "source_id": sid} for sid in source_ids)
+                    tag_rows.extend({"agent_id": aid, "tag": tag} for tag in agent_create.tags or [])
+                    identity_rows.extend({"agent_id": aid, "identity_id": iid} for iid in agent_create.identity_ids or [])
+                    if agent_create.tool_exec_environment_variables:
+                        env_rows.extend(self._environment_variable_rows(aid, agent_create, actor))
+
+                await self._bulk_insert_pivot_async(session, ToolsAgents.__table__, tool_rows)
+                await self._bulk_insert_pivot_async(session, BlocksAgents.__table__, block_rows)
+                await self._bulk_insert_pivot_async(session, SourcesAgents.__table__, source_rows)
+                await self._bulk_insert_pivot_async(session, AgentsTags.__table__, tag_rows)
+                await self._bulk_insert_pivot_async(session, IdentitiesAgents.__table__, identity_rows)
+                for start in range(0, len(env_rows), BULK_INSERT_BATCH_SIZE):
+                    await session.execute(insert(AgentEnvironmentVariable).values(env_rows[start : start + BULK_INSERT_BATCH_SIZE]))
+
+        agents: Dict[str, PydanticAgentState] = {}
+        for start in range(0, len(agent_ids), BULK_PREFETCH_BATCH_SIZE):
+            batch = await self.get_agents_by_ids_async(agent_ids[start : start + BULK_PREFETCH_BATCH_SIZE], actor=actor)
+            agents.update((agent.id, agent) for agent in batch)
+        results = [agents[aid] for aid in agent_ids]
+
+        # initial message sequences of all agents, written together with the agents' message_ids
+        init_messages: List[List[PydanticMessage]] = []
+        for agent_create, agent_state in zip(agent_creates, results):
+            messages = await self._generate_initial_message_sequence_async(
+                actor,
+                agent_state=agent_state,
+                supplied_initial_message_sequence=agent_create.initial_message_sequence,
+            )
+            agent_state.message_ids = [msg.id for msg in messages]
+            init_messages.append(messages)
+
+        async with db_registry.async_session() as session:
+            for start in range(0, len(results), BULK_PREFETCH_BATCH_SIZE):
+                batch = [msg for messages in init_messages[start : start + BULK_PREFETCH_BATCH_SIZE] for msg in messages]
+                await self.message_manager._insert_many_messages_async(
+                    session, self.message_manager._prepare_many_messages(batch, actor), actor
+                )
+            await session.execute(
+                update(AgentModel), [{"id": agent_state.id, "message_ids": agent_state.message_ids} for agent_state in results]
+            )
+            await session.commit()
+
+        for agent_state, messages in zip(results, init_messages):
+            await self.message_manager._embed_created_messages_async(
+                messages, actor, project_id=agent_state.project_id, template_id=agent_state.template_id
+            )
+        return results
+
+    @staticmethod
+    def _prepare_agent_create(agent_create: CreateAgent) -> None:
+        """Validate `agent_create` and apply the settings derived from it before anything is written."""
+        # validate required configs
+        if not agent_create.llm_config or not agent_create.embedding_config:
+            raise ValueError("llm_config and embedding_config are required")
+
+        if agent_create.reasoning is not None:
+            agent_create.llm_config = LLMConfig.apply_reasoning_setting_to_config(agent_create.llm_config, agent_create.reasoning)
+
+        # if the agent type is workflow, we set the autoclear to forced true
+        if agent_create.agent_type == AgentType.workflow_agent:
+            agent_create.message_buffer_autoclear = True
+
+    @staticmethod
+    def _memory_blocks_to_create(agent_create: CreateAgent) -> List[PydanticBlock]:
+        pydantic_blocks = [PydanticBlock(**b.model_dump(to_orm=True)) for b in agent_create.memory_blocks or []]
+
+        # Inject a description for the default blocks if the user didn't specify them
+        # Used for `persona`, `human`, etc
+        default_blocks = {block.label: block for block in DEFAULT_BLOCKS}
+        for block in pydantic_blocks:
+            if block.label in default_blocks:
+                if block.description is None:
+                    block.description = default_blocks[block.label].description
+        return pydantic_blocks
+
+    @staticmethod
+    def _requested_tool_names(agent_create: CreateAgent) -> Set[str]:
+        """Names of the tools `agent_create` asks for by name, including the base tools of its agent type."""
+        tool_names = set(agent_create.tools or [])
+        if agent_create.include_base_tools:
+            if agent_create.agent_type == AgentType.voice_sleeptime_agent:
+                tool_names |= set(BASE_VOICE_SLEEPTIME_TOOLS)
+            elif agent_create.agent_type == AgentType.voice_convo_agent:
+                tool_names |= set(BASE_VOICE_SLEEPTIME_CHAT_TOOLS)
+            elif agent_create.agent_type == AgentType.sleeptime_agent:
+                tool_names |= set(BASE_SLEEPTIME_TOOLS)
+            elif agent_create.enable_sleeptime:
+                tool_names |= set(BASE_SLEEPTIME_CHAT_TOOLS)
+            elif agent_create.agent_type == AgentType.memgpt_v2_agent:
+                tool_names |= calculate_base_tools(is_v2=True)
+            elif agent_create.agent_type == AgentType.react_agent:
+                pass  # no default tools
+            elif agent_create.agent_type == AgentType.workflow_agent:
+                pass  # no default tools
+            else:
+                tool_names |= calculate_base_tools(is_v2=False)
+        if agent_create.include_multi_agent_tools:
+            tool_names |= calculate_multi_agent_tools()
+
+        # take out the deprecated tool names
+        tool_names.difference_update(set(DEPRECATED_LETTA_TOOLS))
+        return tool_names
+
+    async def _create_default_source_async(self, agent_create: CreateAgent, actor: PydanticUser) -> PydanticSource:
+        default_source = PydanticSource(
+            name=f"{agent_create.name} External Data Source",
+            embedding_config=agent_create.embedding_config,
+        )
+        return await self.source_manager.create_source(default_source, actor)
+
+    def _build_tool_rules(self, agent_create: CreateAgent, tool_names: Set[str], requires_approval: List[str]) -> list:
+        """The tool rules of a new agent with the (canonical) `tool_names` attached."""
+        tool_rules = list(agent_create.tool_rules or [])
+
+        # Override include_base_tool_rules to False if model matches exclusion keywords and include_base_tool_rules is not explicitly set to True
+        if (
+            (
+                self._should_exclude_model_from_base_tool_rules(agent_create.llm_config.model)
+                and agent_create.include_base_tool_rules is None
+            )
+            and agent_create.agent_type != AgentType.sleeptime_agent
+        ) or agent_create.include_base_tool_rules is False:
+            agent_create.include_base_tool_rules = False
+            logger.info(f"Overriding include_base_tool_rules to False for model: {agent_create.llm_config.model}")
+        else:
+            agent_create.include_base_tool_rules = True
+
+        should_add_base_tool_rules = agent_create.include_base_tool_rules
+        if should_add_base_tool_rules:
+            for tn in tool_names:
+                if tn in {"send_message", "send_message_to_agent_async", "memory_finish_edits"}:
+                    tool_rules.append(TerminalToolRule(tool_name=tn))
+                elif tn in (BASE_TOOLS + BASE_MEMORY_TOOLS + BASE_MEMORY_TOOLS_V2 + BASE_SLEEPTIME_TOOLS):
+                    tool_rules.append(ContinueToolRule(tool_name=tn))
+
+        for tool_with_requires_approval in requires_approval:
+            tool_rules.append(RequiresApprovalToolRule(tool_name=tool_with_requires_approval))
+
+        if tool_rules:
+            check_supports_structured_output(model=agent_create.llm_config.model, tool_rules=tool_rules)
+        return tool_rules
+
+    @staticmethod
+    def _build_agent_model(agent_create: CreateAgent, actor: PydanticUser, tool_rules: list) -> AgentModel:
+        new_agent = AgentModel(
+            name=agent_create.name,
+            system=derive_system_message(
+                agent_type=agent_create.agent_type,
+                enable_sleeptime=agent_create.enable_sleeptime,
+                system=agent_create.system,
+            ),
+            agent_type=agent_create.agent_type,
+            llm_config=agent_create.llm_config,
+            embedding_config=agent_create.embedding_config,
+            organization_id=actor.organization_id,
+            description=agent_create.description,
+            metadata_=agent_create.metadata,
+            tool_rules=tool_rules,
+            hidden=agent_create.hidden,
+            project_id=agent_create.project_id,
+            template_id=agent_create.template_id,
+            base_template_id=agent_create.base_template_id,
+            message_buffer_autoclear=agent_create.message_buffer_autoclear,
+            enable_sleeptime=agent_create.enable_sleeptime,
+            response_format=agent_create.response_format,
+            created_by_id=actor.id,
+            last_updated_by_id=actor.id,
+            timezone=agent_create.timezone if agent_create.timezone else DEFAULT_TIMEZONE,
+            max_files_open=agent_create.max_files_open,
+            per_file_view_window_char_limit=agent_create.per_file_view_window_char_limit,
+        )
+
+        # Set template fields for InternalTemplateAgentCreate (similar to group creation)
+        if isinstance(agent_create, InternalTemplateAgentCreate):
+            new_agent.base_template_id = agent_create.base_template_id
+            new_agent.template_id = agent_create.template_id
+            new_agent.deployment_id = agent_create.deployment_id
+            new_agent.entity_id = agent_create.entity_id
+        return new_agent
+
+    @staticmethod
+    def _environment_variable_rows(agent_id: str, agent_create: CreateAgent, actor: PydanticUser) -> List[dict]:
+        return [
+            {
+                "agent_id": agent_id,
+                "key": key,
+                "value": val,
+                "organization_id": actor.organization_id,
+            }
+            for key, val in agent_create.tool_exec_environment_variables.items()
+        ]
+
     @enforce_types
     def _generate_initial_message_sequence(
         self, actor: PydanticUser, agent_state: PydanticAgentState, supplied_initial_message_sequence: Optional[List[MessageCreate]] = None
@@ -814,6 +991,8 @@ class AgentManager:
 
         with db_registry.session() as session, session.begin():
             agent: AgentModel = AgentModel.read(db_session=session, identifier=agent_id, actor=actor)
+            if agent_update.message_ids is not None:
+                self._check_lock_fence(session, agent_id)
             agent.updated_at = datetime.now(timezone.utc)
             agent.last_updated_by_id = actor.id
 
@@ -916,6 +1095,9 @@ class AgentManager:
                     system=agent.system,
                 )
 
+            if agent_update_changes_memory(agent_update):
+                bump_memory_version(session, agent_ids=[aid])
+
             session.flush()
             session.refresh(agent)
 
@@ -937,6 +1119,8 @@ class AgentManager:
 
         async with db_registry.async_session() as session, session.begin():
             agent: AgentModel = await AgentModel.read_async(db_session=session, identifier=agent_id, actor=actor)
+            if agent_update.message_ids is not None:
+                await self._check_lock_fence_async(session, agent_id)
             agent.updated_at = datetime.now(timezone.utc)
             agent.last_updated_by_id = actor.id
 
@@ -1041,6 +1225,9 @@ class AgentManager:
                     system=agent.system,
                 )
 
+            if agent_update_changes_memory(agent_update):
+                await bump_memory_version_async(session, agent_ids=[aid])
+
             await session.flush()
             await session.refresh(agent)
 
@@ -1055,20 +1242,25 @@ class AgentManager:
         actor: PydanticUser,
     ) -> None:
         async with db_registry.async_session() as session:
-            query = select(AgentModel)
-            query = AgentModel.apply_access_predicate(query, actor, ["read"], AccessType.ORGANIZATION)
-            query = query.where(AgentModel.id == agent_id)
-            query = _apply_relationship_filters(query, include_relationships=[])
+            await self._update_message_ids_in_session_async(session, agent_id, message_ids, actor)
+            await session.commit()
 
-            result = await session.execute(query)
-            agent = result.scalar_one_or_none()
+    async def _update_message_ids_in_session_async(self, session, agent_id: str, message_ids: List[str], actor: PydanticUser) -> None:
+        """Point the agent's in-context window at `message_ids` in `session` without committing."""
+        query = select(AgentModel)
+        query = AgentModel.apply_access_predicate(query, actor, ["read"], AccessType.ORGANIZATION)
+        query = query.where(AgentModel.id == agent_id)
+        query = _apply_relationship_filters(query, include_relationships=[])
 
-            agent.updated_at = datetime.now(timezone.utc)
-            agent.last_updated_by_id = actor.id
-            agent.message_ids = message_ids
+        result = await session.execute(query)
+        agent = result.scalar_one_or_none()
 
-            await agent.update_async(db_session=session, actor=actor, no_commit=True, no_refresh=True)
-            await session.commit()
+        await self._check_lock_fence_async(session, agent_id)
+        agent.updated_at = datetime.now(timezone.utc)
+        agent.last_updated_by_id = actor.id
+        agent.message_ids = message_ids
+
+        await agent.update_async(db_session=session, actor=actor, no_commit=True, no_refresh=True)
 
     # TODO: Make this general and think about how to roll this into sqlalchemybase
     @trace_method
@@ -1324,9 +1516,27 @@ class AgentManager:
         actor: PydanticUser,
         include_relationships: Optional[List[str]] = None,
     ) -> PydanticAgentState:
-        """Fetch an agent by its ID."""
+        """Fetch an agent by its ID.
+
+        States are cached per process: while the agent's version is unchanged only the agent row is read, see
+        letta.services.helpers.agent_state_cache.
+        """
+        cache = await get_agent_state_cache_async()
         async with db_registry.async_session() as session:
             try:
+                generation = None
+                if cache is not None:
+                    version_query = select(AgentModel.updated_at, func.coalesce(AgentModel.memory_version, 0))
+                    version_query = AgentModel.apply_access_predicate(version_query, actor, ["read"], AccessType.ORGANIZATION)
+                    version_query = version_query.where(AgentModel.id == agent_id)
+                    version = (await session.execute(version_query)).one_or_none()
+                    if version is None:
+                        raise NoResultFound(f"Agent with ID {agent_id} not found")
+                    agent_state = cache.get(agent_id, include_relationships, tuple(version))
+                    if agent_state is not None:
+                        return agent_state
+                    generation = cache.generation
+
                 query = select(AgentModel)
                 query = AgentModel.apply_access_predicate(query, actor, ["read"], AccessType.ORGANIZATION)
                 query = query.where(AgentModel.id == agent_id)
@@ -1338,7 +1548,11 @@ class AgentManager:
                 if agent is None:
                     raise NoResultFound(f"Agent with ID {agent_id} not found")
 
-                return await agent.to_pydantic_async(include_relationships=include_relationships)
+                agent_state = await agent.to_pydantic_async(include_relationships=include_relationships)
+                if cache is not None:
+                    version = (agent.updated_at, agent.memory_version or 0)
+                    cache.put(agent_id, include_relationships, version, agent_state, generation=generation)
+                return agent_state
             except Exception as e:
                 logger.error(f"Error fetching agent {agent_id}: {str(e)}")
                 raise
@@ -1371,6 +1585,46 @@ class AgentManager:
                 logger.error(f"Error fetching agents with IDs {agent_ids}: {str(e)}")
                 raise
 
+    @enforce_types
+    @trace_method
+    async def get_agents_with_in_context_messages_async(
+        self,
+        agent_ids: List[str],
+        actor: PydanticUser,
+        include_relationships: Optional[List[str]] = None,
+    ) -> Tuple[Dict[str, PydanticAgentState], Dict[str, List[PydanticMessage]]]:
+        """Load many agents and their in-context messages with a handful of batched queries.
+
+        Returns the agents found by ID, and for each of them the in-context messages its next step starts from (only
+        the system message when `message_buffer_autoclear` is set). Agents whose in-context messages could not all be
+        found are left out of the second mapping, so that their step loads them itself.
+        """
+        agents: Dict[str, PydanticAgentState] = {}
+        for start in range(0, len(agent_ids), BULK_PREFETCH_BATCH_SIZE):
+            batch = await self.get_agents_by_ids_async(
+                agent_ids[start : start + BULK_PREFETCH_BATCH_SIZE], actor=actor, include_relationships=include_relationships
+            )
+            agents.update((agent.id, agent) for agent in batch)
+
+        in_context_ids = {
+            agent.id: agent.message_ids[:1] if agent.message_buffer_autoclear else list(agent.message_ids or [])
+            for agent in agents.values()
+        }
+        message_ids = [message_id for ids in in_context_ids.values() for message_id in ids]
+        messages_by_id: Dict[str, PydanticMessage] = {}
+        for start in range(0, len(message_ids), BULK_PREFETCH_BATCH_SIZE):
+            batch = await self.message_manager.get_messages_by_ids_async(
+                message_ids=message_ids[start : start + BULK_PREFETCH_BATCH_SIZE], actor=actor
+            )
+            messages_by_id.update((message.id, message) for message in batch)
+
+        in_context_messages = {
+            agent_id: [messages_by_id[message_id] for message_id in ids]
+            for agent_id, ids in in_context_ids.items()
+            if all(message_id in messages_by_id for message_id in ids)
+        }
+        return agents, in_context_messages
+
     @enforce_types
     @trace_method
     def get_agent_by_name(self, agent_name: str, actor: PydanticUser) -> PydanticAgentState:
@@ -1476,6 +1730,7 @@ class AgentManager:
                     )
                     sleeptime_group_to_delete = sleeptime_agent_group
 
+            deleted_agent_ids = [agent.id for agent in agents_to_delete]
             try:
                 if sleeptime_group_to_delete is not None:
                     await session.delete(sleeptime_group_to_delete)
@@ -1489,6 +1744,7 @@ class AgentManager:
                 raise ValueError(f"Failed to hard delete Agent with ID {agent_id}: {e}")
             else:
                 logger.debug(f"Agent with ID {agent_id} successfully hard deleted")
+            await invalidate_agent_states_async(deleted_agent_ids)
 
     @enforce_types
     @trace_method
@@ -1770,8 +2026,8 @@ class AgentManager:
 
         Updates to the memory header should *not* trigger a rebuild, since that will simply flood recall storage with excess messages
         """
-        num_messages = await self.message_manager.size_async(actor=actor, agent_id=agent_id)
-        num_archival_memories = await self.passage_manager.agent_passage_size_async(actor=actor, agent_id=agent_id)
+        num_messages = await self.message_manager.agent_message_count_async(actor=actor, agent_id=agent_id)
+        num_archival_memories = await self.passage_manager.agent_passage_count_async(actor=actor, agent_id=agent_id)
         agent_state = await self.get_agent_by_id_async(agent_id=agent_id, include_relationships=["memory", "sources", "tools"], actor=actor)
 
         tool_rules_solver = ToolRulesSolver(agent_state.tool_rules)
@@ -1930,6 +2186,8 @@ class AgentManager:
                 )
                 raise ValueError(f"Agent {agent_id} has no message_ids - cannot preserve system message")
 
+            await self._check_lock_fence_async(session, agent_id)
+
             # Get the system message ID (first message)
             system_message_id = agent.message_ids[0]
 
@@ -2010,6 +2268,16 @@ class AgentManager:
 
         return agent_state
 
+    @enforce_types
+    @trace_method
+    async def get_memory_version_async(self, agent_id: str, actor: PydanticUser) -> int:
+        """Get the agent's memory version, which changes whenever its blocks, open files, sources or tool rules change."""
+        async with db_registry.async_session() as session:
+            version = await get_memory_version_async(session, agent_id, actor.organization_id)
+        if version is None:
+            raise NoResultFound(f"Agent with ID {agent_id} not found")
+        return version
+
     @enforce_types
     @trace_method
     async def refresh_memory_async(self, agent_state: PydanticAgentState, actor: PydanticUser) -> PydanticAgentState:
@@ -2096,6 +2364,7 @@ class AgentManager:
                 item_ids=[source_id],
                 replace=False,
             )
+            await bump_memory_version_async(session, agent_ids=[agent_id])
 
             # Commit the changes
             agent = await agent.update_async(session, actor=actor)
@@ -2225,6 +2494,7 @@ class AgentManager:
                 # Delete the association directly from the junction table
                 delete_query = delete(SourcesAgents).where(SourcesAgents.agent_id == agent_id, SourcesAgents.source_id == source_id)
                 await session.execute(delete_query)
+                await bump_memory_version_async(session, agent_ids=[agent_id])
                 await session.commit()
 
             # Get agent without loading relationships for return value
@@ -2291,6 +2561,7 @@ class AgentManager:
             for key, value in update_data.items():
                 setattr(block, key, value)
 
+            await bump_memory_version_async(session, block_ids=[block.id])
             await block.update_async(session, actor=actor)
             return block.to_pydantic()
 
@@ -2316,6 +2587,7 @@ class AgentManager:
 
             # Add new block
             agent.core_memory.append(new_block)
+            bump_memory_version(session, agent_ids=[agent_id])
             agent.update(session, actor=actor)
             return agent.to_pydantic()
 
@@ -2345,6 +2617,7 @@ class AgentManager:
                         except NoResultFound:
                             # Agent might not exist anymore, skip
                             continue
+            bump_memory_version(session, block_ids=[block_id])
             session.commit()
 
             return agent.to_pydantic()
@@ -2382,6 +2655,8 @@ class AgentManager:
             # TODO: Ideally we do two no commits on the update_async calls, and then commit here - but that errors for some reason?
             # TODO: I have too many things rn so lets look at this later
             # await session.commit()
+            await bump_memory_version_async(session, block_ids=[block_id])
+            await session.commit()
 
             return await agent.to_pydantic_async()
 
@@ -2403,6 +2678,7 @@ class AgentManager:
             if len(agent.core_memory) == original_length:
                 raise NoResultFound(f"No block with id '{block_id}' found for agent '{agent_id}' with actor id: '{actor.id}'")
 
+            bump_memory_version(session, agent_ids=[agent_id])
             agent.update(session, actor=actor)
             return agent.to_pydantic()
 
@@ -2424,6 +2700,7 @@ class AgentManager:
             if len(agent.core_memory) == original_length:
                 raise NoResultFound(f"No block with id '{block_id}' found for agent '{agent_id}' with actor id: '{actor.id}'")
 
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await agent.update_async(session, actor=actor)
             return await agent.to_pydantic_async()
 
@@ -2445,6 +2722,7 @@ class AgentManager:
             if len(agent.core_memory) == original_length:
                 raise NoResultFound(f"No block with label '{block_label}' found for agent '{agent_id}' with actor id: '{actor.id}'")
 
+            bump_memory_version(session, agent_ids=[agent_id])
             agent.update(session, actor=actor)
             return agent.to_pydantic()
 
@@ -2612,6 +2890,45 @@ class AgentManager:
         embedding_config: Optional[EmbeddingConfig] = None,
     ) -> List[PydanticPassage]:
         """Lists all passages attached to an agent."""
+        query_embedding = None
+        if embed_query and limit and (source_id or agent_id) and should_use_sqlite_vector_index():
+            query_embedding = await embed_passage_query(actor, query_text, embedding_config)
+            if source_id:
+                source_ids = [source_id]
+            else:
+                async with db_registry.async_session() as session:
+                    result = await session.execute(select(SourcesAgents.source_id).where(SourcesAgents.agent_id == agent_id))
+                    source_ids = list(result.scalars().all())
+
+            passages = await self._query_passages_with_vector_index_async(
+                kind=VectorIndexKind.SOURCE,
+                container_ids=source_ids,
+                query_embedding=query_embedding,
+                limit=limit,
+                build_query=lambda candidate_ids: build_source_passage_query(
+                    actor=actor,
+                    agent_id=agent_id,
+                    file_id=file_id,
+                    query_text=query_text,
+                    start_date=start_date,
+                    end_date=end_date,
+                    before=before,
+                    after=after,
+                    source_id=source_id,
+                    embed_query=embed_query,
+                    ascending=ascending,
+                    embedding_config=embedding_config,
+                    query_embedding=query_embedding,
+                    candidate_ids=candidate_ids,
+                ),
+            )
+            if passages is not None:
+                return passages
+
+        rank_in_caller = bool(embed_query and limit and settings.database_engine is not DatabaseChoice.POSTGRES)
+        if rank_in_caller and query_embedding is None:
+            query_embedding = await embed_passage_query(actor, query_text, embedding_config)
+
         async with db_registry.async_session() as session:
             main_query = await build_source_passage_query(
                 actor=actor,
@@ -2626,8 +2943,16 @@ class AgentManager:
                 embed_query=embed_query,
                 ascending=ascending,
                 embedding_config=embedding_config,
+                query_embedding=query_embedding,
+                rank_in_caller=rank_in_caller,
             )
 
+            if rank_in_caller:
+                passages = await self._rank_passages_by_cosine_distance_sqlite_async(
+                    session, main_query, SourcePassage, query_embedding, limit, ascending
+                )
+                return [p.to_pydantic() for p in passages]
+
             # Add limit
             if limit:
                 main_query = main_query.limit(limit)
@@ -2641,6 +2966,72 @@ class AgentManager:
             # Convert to Pydantic models
             return [p.to_pydantic() for p in passages]
 
+    async def _query_passages_with_vector_index_async(
+        self,
+        kind: VectorIndexKind,
+        container_ids: List[str],
+        query_embedding: List[float],
+        limit: int,
+        build_query: Callable[[List[str]], Awaitable[Select]],
+    ) -> Optional[List[PydanticPassage]]:
+        """Vector search through the SQLite vector index.
+
+        The index ranks an over-fetched set of candidates, `build_query` re-applies the caller's filters to them in SQL,
+        and the survivors are returned in ranked order. Returns None if the filters rejected so many candidates that
+        the page could not be filled, in which case the caller falls back to the brute-force scan.
+        """
+        top_k = limit * VECTOR_INDEX_CANDIDATE_OVERFETCH
+        candidate_ids = await self.passage_manager.search_vector_index_async(
+            kind=kind, container_ids=container_ids, query_embedding=query_embedding, top_k=top_k
+        )
+        if not candidate_ids:
+            return []
+
+        passages_by_id = {}
+        async with db_registry.async_session() as session:
+            for start in range(0, len(candidate_ids), SQLITE_PASSAGE_ID_BATCH_SIZE):
+                result = await session.execute(await build_query(candidate_ids[start : start + SQLITE_PASSAGE_ID_BATCH_SIZE]))
+                passages_by_id.update((p.id, p) for p in result.scalars().all())
+
+        ranked = [passages_by_id[passage_id] for passage_id in candidate_ids if passage_id in passages_by_id]
+        if len(ranked) < limit and len(candidate_ids) == top_k:
+            return None
+        return [p.to_pydantic() for p in ranked[:limit]]
+
+    async def _rank_passages_by_cosine_distance_sqlite_async(
+        self,
+        session,
+        query: Select,
+        passage_model,
+        query_embedding: List[float],
+        limit: int,
+        ascending: bool,
+    ) -> list:
+        """Vector search on SQLite: the `limit` rows of the filtered `query` closest to `query_embedding`, closest first.
+
+        Streams (id, raw embedding blob) for the matched rows in chunks and scores them with `CosineTopK` instead of
+        letting SQLite sort the whole table by calling the `cosine_distance` UDF once per row. Only the non-padded
+        prefix of each blob is read. Rows are scanned in (created_at, id) order and ties keep the earlier row, the same
+        tiebreak as the UDF ordering. The winners are then loaded by id in bounded batches.
+        """
+        scorer = CosineTopK(query_embedding, limit)
+        embedding_prefix = type_coerce(func.substr(passage_model.embedding, 1, scorer.row_size), LargeBinary)
+        scan = query.with_only_columns(passage_model.id, embedding_prefix).order_by(
+            passage_model.created_at.asc() if ascending else passage_model.created_at.desc(),
+            passage_model.id.asc(),
+        )
+        result = await session.stream(scan)
+        async for rows in result.partitions(SQLITE_VECTOR_SCAN_CHUNK_ROWS):
+            scorer.add([row[0] for row in rows], [row[1] for row in rows])
+
+        ranked_ids = [passage_id for passage_id, _ in scorer.result()]
+        passages_by_id = {}
+        for start in range(0, len(ranked_ids), SQLITE_PASSAGE_ID_BATCH_SIZE):
+            batch = ranked_ids[start : start + SQLITE_PASSAGE_ID_BATCH_SIZE]
+            result = await session.execute(select(passage_model).where(passage_model.id.in_(batch)))
+            passages_by_id.update((p.id, p) for p in result.scalars().all())
+        return [passages_by_id[passage_id] for passage_id in ranked_ids if passage_id in passages_by_id]
+
     @enforce_types
     @trace_method
     async def query_agent_passages_async(
@@ -2706,7 +3097,40 @@ class AgentManager:
             else:
                 return []
 
+        # On SQLite, rank with the in-process vector index and only apply the remaining filters in SQL
+        query_embedding = None
+        if embed_query and agent_id and limit and should_use_sqlite_vector_index():
+            query_embedding = await embed_passage_query(actor, query_text, embedding_config)
+            passages = await self._query_passages_with_vector_index_async(
+                kind=VectorIndexKind.ARCHIVE,
+                container_ids=await self.get_agent_archive_ids_async(agent_id=agent_id, actor=actor),
+                query_embedding=query_embedding,
+                limit=limit,
+                build_query=lambda candidate_ids: build_agent_passage_query(
+                    actor=actor,
+                    agent_id=agent_id,
+                    query_text=query_text,
+                    start_date=start_date,
+                    end_date=end_date,
+                    before=before,
+                    after=after,
+                    embed_query=embed_query,
+                    ascending=ascending,
+                    embedding_config=embedding_config,
+                    tags=tags,
+                    tag_match_mode=tag_match_mode,
+                    query_embedding=query_embedding,
+                    candidate_ids=candidate_ids,
+                ),
+            )
+            if passages is not None:
+                return [(p, 0.0, {}) for p in passages]
+
         # Fall back to SQL-based search for non-vector queries or NATIVE archives
+        rank_in_caller = bool(embed_query and limit and settings.database_engine is not DatabaseChoice.POSTGRES)
+        if rank_in_caller and query_embedding is None:
+            query_embedding = await embed_passage_query(actor, query_text, embedding_config)
+
         async with db_registry.async_session() as session:
             main_query = await build_agent_passage_query(
                 actor=actor,
@@ -2719,8 +3143,18 @@ class AgentManager:
                 embed_query=embed_query,
                 ascending=ascending,
                 embedding_config=embedding_config,
+                tags=tags,
+                tag_match_mode=tag_match_mode,
+                query_embedding=query_embedding,
+                rank_in_caller=rank_in_caller,
             )
 
+            if rank_in_caller:
+                passages = await self._rank_passages_by_cosine_distance_sqlite_async(
+                    session, main_query, ArchivalPassage, query_embedding, limit, ascending
+                )
+                return [(p.to_pydantic(), 0.0, {}) for p in passages]
+
             # Add limit
             if limit:
                 main_query = main_query.limit(limit)
@@ -2734,28 +3168,6 @@ class AgentManager:
             # Convert to Pydantic models
             pydantic_passages = [p.to_pydantic() for p in passages]
 
-            # TODO: Integrate tag filtering directly into the SQL query for better performance.
-            # Currently using post-filtering which is less efficient but simpler to implement.
-            # Future optimization: Add JOIN with passage_tags table and WHERE clause for tag filtering.
-            if tags:
-                filtered_passages = []
-                for passage in pydantic_passages:
-                    if passage.tags:
-                        passage_tags = set(passage.tags)
-                        query_tags = set(tags)
-
-                        if tag_match_mode == TagMatchMode.ALL:
-                            # ALL mode: passage must have all query tags
-                            if query_tags.issubset(passage_tags):
-                                filtered_passages.append(passage)
-                        else:
-                            # ANY mode (default): passage must have at least one query tag
-                            if query_tags.intersection(passage_tags):
-                                filtered_passages.append(passage)
-
-                # Return as tuples with empty metadata for SQL path
-                return [(p, 0.0, {}) for p in filtered_passages]
-
             # Return as tuples with empty metadata for SQL path
             return [(p, 0.0, {}) for p in pydantic_passages]
 
@@ -3079,8 +3491,10 @@ class AgentManager:
                     tool_rules.append(RequiresApprovalToolRule(tool_name=tool_name))
                     agent.tool_rules = tool_rules
                     session.add(agent)
+                    await bump_memory_version_async(session, agent_ids=[agent_id])
 
             await session.commit()
+        await invalidate_agent_states_async([agent_id])
 
     @enforce_types
     @trace_method
@@ -3153,6 +3567,7 @@ class AgentManager:
                     logger.info(f"All {len(tool_ids)} tools already attached to agent {agent_id}")
 
             await session.commit()
+        await invalidate_agent_states_async([agent_id])
 
     @enforce_types
     @trace_method
@@ -3309,6 +3724,7 @@ class AgentManager:
                 logger.debug(f"Detached tool id={tool_id} from agent id={agent_id}")
 
             await session.commit()
+        await invalidate_agent_states_async([agent_id])
 
     @enforce_types
     @trace_method
@@ -3345,6 +3761,7 @@ class AgentManager:
                 logger.info(f"Detached all {detached_count} tools from agent {agent_id}")
 
             await session.commit()
+        await invalidate_agent_states_async([agent_id])
 
     @enforce_types
     @trace_method
@@ -3371,6 +3788,7 @@ class AgentManager:
 
             agent.tool_rules = tool_rules
             session.add(agent)
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await session.commit()
 
     @enforce_types
@@ -3692,6 +4110,103 @@ class AgentManager:
 
             return row
 
+    @enforce_types
+    @trace_method
+    async def get_agent_message_ids_async(self, agent_id: str, actor: PydanticUser) -> List[str]:
+        """Get the in-context message ids for an agent.
+
+        This is a performant query that only fetches the specific field needed.
+
+        Args:
+            agent_id: The ID of the agent
+            actor: The user making the request
+
+        Returns:
+            The agent's in-context message ids
+        """
+        async with db_registry.async_session() as session:
+            result = await session.execute(
+                select(AgentModel.message_ids)
+                .where(AgentModel.id == agent_id)
+                .where(AgentModel.organization_id == actor.organization_id)
+                .where(AgentModel.is_deleted == False)
+            )
+            row = result.one_or_none()
+
+            if row is None:
+                raise ValueError(f"Agent {agent_id} not found")
+
+            return row[0] or []
+
+    @enforce_types
+    @trace_method
+    async def claim_lock_fencing_token_async(self, agent_id: str, actor: PydanticUser) -> int:
+        """Issue the next per-agent lock fencing token for an agent.
+
+        Bumping the token invalidates the previous holder: its `message_ids` writes are rejected from then on.
+
+        Args:
+            agent_id: The ID of the agent
+            actor: The user making the request
+
+        Returns:
+            The new fencing token
+        """
+        async with db_registry.async_session() as session:
+            result = await session.execute(
+                update(AgentModel)
+                .where(AgentModel.id == agent_id)
+                .where(AgentModel.organization_id == actor.organization_id)
+                .values(lock_fencing_token=func.coalesce(AgentModel.lock_fencing_token, 0) + 1)
+                .returning(AgentModel.lock_fencing_token)
+                .execution_options(synchronize_session=False)
+            )
+            token = result.scalar_one_or_none()
+            if token is None:
+                raise NoResultFound(f"Agent {agent_id} not found")
+            await session.commit()
+            return token
+
+    @staticmethod
+    def _lock_fence_statement(agent_id: str):
+        """Touches the agent row only if the lease held by this task is still the latest, or None when not fenced."""
+        lease = get_held_lease(agent_id)
+        if lease is None or not lease.fenced:
+            return None, lease
+        statement = (
+            update(AgentModel)
+            .where(AgentModel.id == agent_id)
+            .where(AgentModel.lock_fencing_token == lease.fencing_token)
+            .values(lock_fencing_token=lease.fencing_token)
+            .execution_options(synchronize_session=False)
+        )
+        return statement, lease
+
+    async def _check_lock_fence_async(self, session, agent_id: str) -> None:
+        """Reject a message_ids write from a lock holder that has been superseded.
+
+        Runs inside the write's transaction; the conditional update also holds the agent row until commit,
+        so a new holder cannot claim the agent in between.
+        """
+        statement, lease = self._lock_fence_statement(agent_id)
+        if statement is None:
+            return
+        if lease.lost:
+            raise AgentLockLostError(agent_id=agent_id, fencing_token=lease.fencing_token)
+        result = await session.execute(statement)
+        if result.rowcount == 0:
+            raise AgentLockLostError(agent_id=agent_id, fencing_token=lease.fencing_token)
+
+    def _check_lock_fence(self, session, agent_id: str) -> None:
+        statement, lease = self._lock_fence_statement(agent_id)
+        if statement is None:
+            return
+        if lease.lost:
+            raise AgentLockLostError(agent_id=agent_id, fencing_token=lease.fencing_token)
+        result = session.execute(statement)
+        if result.rowcount == 0:
+            raise AgentLockLostError(agent_id=agent_id, fencing_token=lease.fencing_token)
+
     @enforce_types
     @trace_method
     async def get_agent_per_file_view_window_char_limit_async(self, agent_id: str, actor: PydanticUser) -> int:
@@ -3721,13 +4236,18 @@ class AgentManager:
             return row
 
     @trace_method
-    async def get_context_window(self, agent_id: str, actor: PydanticUser) -> ContextWindowOverview:
+    async def get_context_window(self, agent_id: str, actor: PydanticUser, include_messages: bool = True) -> ContextWindowOverview:
         agent_state, system_message, num_messages, num_archival_memories = await self.rebuild_system_prompt_async(
             agent_id=agent_id, actor=actor, force=True, dry_run=True
         )
         calculator = ContextWindowCalculator()
 
-        if settings.environment == "PRODUCTION" or agent_state.llm_config.model_endpoint_type == "anthropic":
+        if settings.token_counter_mode == "local":
+            token_counter = ApproximateTokenCounter(
+                provider=agent_state.llm_config.model_endpoint_type,
+                model=agent_state.llm_config.model,
+            )
+        elif settings.environment == "PRODUCTION" or agent_state.llm_config.model_endpoint_type == "anthropic":
             anthropic_client = LLMClient.create(provider_type=ProviderType.anthropic, actor=actor)
             model = agent_state.llm_config.model if agent_state.llm_config.model_endpoint_type == "anthropic" else None
 
@@ -3743,4 +4263,5 @@ class AgentManager:
             system_message_compiled=system_message,
             num_archival_memories=num_archival_memories,
             num_messages=num_messages,
+            include_messages=include_messages,
         )
@@ -1,7 +1,9 @@
+import asyncio
 from typing import List, Optional
 
 from sqlalchemy import select
 
+from letta.helpers.sqlite_vector_index import VectorIndexKind, drop_passage_vector_index, should_use_sqlite_vector_index
 from letta.helpers.tpuf_client import should_use_tpuf
 from letta.log import get_logger
 from letta.orm import ArchivalPassage, Archive as ArchiveModel, ArchivesAgents
@@ -202,6 +204,9 @@ class ArchiveManager:
             await archive_model.hard_delete_async(session, actor=actor)
             logger.info(f"Deleted archive {archive_id}")
 
+        if should_use_sqlite_vector_index():
+            await asyncio.to_thread(drop_passage_vector_index, VectorIndexKind.ARCHIVE, archive_id)
+
     @enforce_types
     @trace_method
     async def get_or_create_default_archive_for_agent_async(
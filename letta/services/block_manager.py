@@ -17,6 +17,7 @@ from letta.schemas.block import Block as PydanticBlock, BlockUpdate
 from letta.schemas.enums import ActorType
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.memory_version_helper import bump_memory_version, bump_memory_version_async
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
@@ -120,6 +121,7 @@ class BlockManager:
             for key, value in update_data.items():
                 setattr(block, key, value)
 
+            bump_memory_version(session, block_ids=[block_id])
             block.update(db_session=session, actor=actor)
             return block.to_pydantic()
 
@@ -136,6 +138,7 @@ class BlockManager:
             for key, value in update_data.items():
                 setattr(block, key, value)
 
+            await bump_memory_version_async(session, block_ids=[block_id])
             await block.update_async(db_session=session, actor=actor, no_commit=True, no_refresh=True)
             pydantic_block = block.to_pydantic()
             await session.commit()
@@ -147,6 +150,7 @@ class BlockManager:
         """Delete a block by its ID."""
         with db_registry.session() as session:
             # First, delete all references in blocks_agents table
+            bump_memory_version(session, block_ids=[block_id])
             session.execute(delete(BlocksAgents).where(BlocksAgents.block_id == block_id))
             session.flush()
 
@@ -160,6 +164,7 @@ class BlockManager:
         """Delete a block by its ID."""
         async with db_registry.async_session() as session:
             # First, delete all references in blocks_agents table
+            await bump_memory_version_async(session, block_ids=[block_id])
             await session.execute(delete(BlocksAgents).where(BlocksAgents.block_id == block_id))
             await session.flush()
 
@@ -625,6 +630,7 @@ class BlockManager:
 
         # Update in DB (optimistic locking).
         # We'll do a flush now; the caller does final commit.
+        bump_memory_version(session, block_ids=[block.id])
         updated_block = block.update(db_session=session, actor=actor, no_commit=True)
         return updated_block
 
@@ -747,6 +753,7 @@ class BlockManager:
                     new_val = new_val[: block.limit]
                 block.value = new_val
 
+            await bump_memory_version_async(session, block_ids=found_ids)
             await session.commit()
 
             if return_hydrated:
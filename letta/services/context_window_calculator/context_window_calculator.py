@@ -10,7 +10,7 @@ from letta.schemas.letta_message_content import TextContent
 from letta.schemas.memory import ContextWindowOverview
 from letta.schemas.message import Message
 from letta.schemas.user import User as PydanticUser
-from letta.services.context_window_calculator.token_counter import TokenCounter
+from letta.services.context_window_calculator.token_counter import ApproximateTokenCounter, TokenCounter
 from letta.services.message_manager import MessageManager
 
 logger = get_logger(__name__)
@@ -96,6 +96,47 @@ class ContextWindowCalculator:
 
         return None, 1
 
+    @staticmethod
+    async def count_messages_incrementally(
+        messages: List[Message],
+        token_counter: ApproximateTokenCounter,
+        message_manager: MessageManager,
+        actor: PydanticUser,
+        cached_raw_tokens: int = 0,
+    ) -> int:
+        """
+        Count message tokens using the per-message counts cached on each message row.
+
+        Only messages without a cached count are tokenized, and their counts are persisted
+        so subsequent calls are answered in O(new messages) tokenization work.
+
+        Args:
+            messages: In-context messages to count (excluding the system and summary messages)
+            token_counter: Local counter used for uncached messages and calibration
+            message_manager: Used to persist newly computed counts
+            actor: User performing the action
+            cached_raw_tokens: Sum of the cached raw counts of in-context messages that were not loaded
+
+        Returns:
+            The calibrated token count for the messages
+        """
+        new_counts = {}
+        raw_total = cached_raw_tokens
+        for message in messages:
+            if message.num_tokens is None:
+                message.num_tokens = token_counter.count_raw_message_tokens(message)
+                new_counts[message.id] = message.num_tokens
+            raw_total += message.num_tokens
+
+        if new_counts:
+            try:
+                await message_manager.update_message_token_counts_async(token_counts=new_counts, actor=actor)
+            except Exception as e:
+                # caching is best-effort, the counts will be recomputed next time
+                logger.warning(f"Failed to persist message token counts: {e}")
+
+        return token_counter.scale(raw_total)
+
     async def calculate_context_window(
         self,
         agent_state: AgentState,
@@ -105,13 +146,23 @@ class ContextWindowCalculator:
         system_message_compiled: Message,
         num_archival_memories: int,
         num_messages: int,
+        include_messages: bool = True,
     ) -> ContextWindowOverview:
-        """Calculate context window information using the provided token counter"""
-        messages = await message_manager.get_messages_by_ids_async(message_ids=agent_state.message_ids[1:], actor=actor)
-        in_context_messages = [system_message_compiled] + messages
+        """Calculate context window information using the provided token counter
 
-        # Convert messages to appropriate format
-        converted_messages = token_counter.convert_messages(in_context_messages)
+        With a local counter and `include_messages=False`, only the cached per-message counts are read, and full rows
+        are loaded just for messages without a cached count (plus the first message, which may hold the summary).
+        The returned overview then has an empty `messages` list.
+        """
+        message_ids = agent_state.message_ids[1:]
+        cached_counts = None
+        if isinstance(token_counter, ApproximateTokenCounter) and not include_messages:
+            cached_counts = await message_manager.get_message_token_counts_async(message_ids=message_ids, actor=actor)
+            ids_to_load = [message_id for i, message_id in enumerate(message_ids) if i == 0 or cached_counts.get(message_id) is None]
+        else:
+            ids_to_load = message_ids
+        messages = await message_manager.get_messages_by_ids_async(message_ids=ids_to_load, actor=actor)
+        in_context_messages = [system_message_compiled] + messages
 
         # Extract system components
         system_prompt = ""
@@ -139,17 +190,35 @@ class ContextWindowCalculator:
         if agent_state.tools:
             available_functions_definitions = [OpenAITool(type="function", function=f.json_schema) for f in agent_state.tools]
 
+        # Local counters reuse the per-message counts cached on each message row
+        if cached_counts is not None:
+            counted_ids = set(message_ids[message_start_index - 1 :])
+            count_messages = self.count_messages_incrementally(
+                [message for message in messages if message.id in counted_ids and message.num_tokens is None],
+                token_counter,
+                message_manager,
+                actor,
+                cached_raw_tokens=sum(cached_counts.get(message_id) or 0 for message_id in counted_ids),
+            )
+        elif isinstance(token_counter, ApproximateTokenCounter) and len(in_context_messages) > message_start_index:
+            count_messages = self.count_messages_incrementally(
+                in_context_messages[message_start_index:], token_counter, message_manager, actor
+            )
+        else:
+            # Convert messages to appropriate format
+            converted_messages = token_counter.convert_messages(in_context_messages)
+            if len(converted_messages) > message_start_index:
+                count_messages = token_counter.count_message_tokens(converted_messages[message_start_index:])
+            else:
+                count_messages = asyncio.sleep(0, result=0)
+
         # Count tokens concurrently
         token_counts = await asyncio.gather(
             token_counter.count_text_tokens(system_prompt),
             token_counter.count_text_tokens(core_memory),
             token_counter.count_text_tokens(external_memory_summary),
             token_counter.count_text_tokens(summary_memory) if summary_memory else asyncio.sleep(0, result=0),
-            (
-                token_counter.count_message_tokens(converted_messages[message_start_index:])
-                if len(converted_messages) > message_start_index
-                else asyncio.sleep(0, result=0)
-            ),
+            count_messages,
             (
                 token_counter.count_tool_tokens(available_functions_definitions)
                 if available_functions_definitions
@@ -170,7 +239,7 @@ class ContextWindowCalculator:
 
         return ContextWindowOverview(
             # context window breakdown (in messages)
-            num_messages=len(in_context_messages),
+            num_messages=1 + len(message_ids),
             num_archival_memory=num_archival_memories,
             num_recall_memory=num_messages,
             num_tokens_external_memory_summary=num_tokens_external_memory_summary,
@@ -186,7 +255,7 @@ class ContextWindowCalculator:
             num_tokens_summary_memory=num_tokens_summary_memory,
             summary_memory=summary_memory,
             num_tokens_messages=num_tokens_messages,
-            messages=in_context_messages,
+            messages=in_context_messages if include_messages else [],
             # related to functions
             num_tokens_functions_definitions=num_tokens_available_functions_definitions,
             functions_definitions=available_functions_definitions,
@@ -1,7 +1,11 @@
 import hashlib
 import json
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import tiktoken
 
 from letta.helpers.decorators import async_redis_cache
 from letta.llm_api.anthropic_client import AnthropicClient
@@ -43,6 +47,7 @@ class AnthropicTokenCounter(TokenCounter):
         key_func=lambda self, text: f"anthropic_text_tokens:{self.model}:{hashlib.sha256(text.encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_text_tokens(self, text: str) -> int:
         if not text:
@@ -55,6 +60,7 @@ class AnthropicTokenCounter(TokenCounter):
         messages: f"anthropic_message_tokens:{self.model}:{hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
         if not messages:
@@ -67,6 +73,7 @@ class AnthropicTokenCounter(TokenCounter):
         tools: f"anthropic_tool_tokens:{self.model}:{hashlib.sha256(json.dumps([t.model_dump() for t in tools], sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_tool_tokens(self, tools: List[OpenAITool]) -> int:
         if not tools:
@@ -88,6 +95,7 @@ class TiktokenCounter(TokenCounter):
         key_func=lambda self, text: f"tiktoken_text_tokens:{self.model}:{hashlib.sha256(text.encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_text_tokens(self, text: str) -> int:
         if not text:
@@ -100,6 +108,7 @@ class TiktokenCounter(TokenCounter):
         messages: f"tiktoken_message_tokens:{self.model}:{hashlib.sha256(json.dumps(messages, sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
         if not messages:
@@ -114,6 +123,7 @@ class TiktokenCounter(TokenCounter):
         tools: f"tiktoken_tool_tokens:{self.model}:{hashlib.sha256(json.dumps([t.model_dump() for t in tools], sort_keys=True).encode()).hexdigest()[:16]}",
         prefix="token_counter",
         ttl_s=3600,  # cache for 1 hour
+        memory_ttl_s=3600,  # token counts never change for a key
     )
     async def count_tool_tokens(self, tools: List[OpenAITool]) -> int:
         if not tools:
@@ -126,3 +136,184 @@ class TiktokenCounter(TokenCounter):
 
     def convert_messages(self, messages: List[Any]) -> List[Dict[str, Any]]:
         return Message.to_openai_dicts_from_list(messages)
+
+
+# Starting multipliers that map cl100k_base counts onto each provider's native tokenizer.
+# They are refined in-process by ``ApproximateTokenCounter.record_usage`` from the prompt token counts
+# providers report for each agent step, and start over from these values on restart.
+DEFAULT_TOKEN_CALIBRATION: Dict[str, float] = {
+    "anthropic": 1.15,
+    "google_ai": 1.0,
+    "google_vertex": 1.0,
+    "openai": 1.0,
+}
+
+APPROXIMATE_TOKENIZER_ENCODING = "cl100k_base"
+
+# Fixed per-item overheads (role markers, separators) added on top of the content tokens
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_TOOL = 8
+
+
+class TokenMemo:
+    """Bounded, thread-safe LRU mapping of content hash -> local token count.
+
+    Shared across counters so an unchanged in-context message is only tokenized once,
+    no matter how many times the context window is recomputed.
+    """
+
+    def __init__(self, max_size: int = 50_000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[int]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: int) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_token_memo = TokenMemo()
+
+
+def get_token_memo() -> TokenMemo:
+    return _token_memo
+
+
+class ApproximateTokenCounter(TokenCounter):
+    """Offline token counter backed by a local tiktoken encoding.
+
+    Counts are scaled by a per-provider calibration factor so they approximate the
+    provider's own tokenizer without a network round trip. Messages are counted one by one
+    and memoized by content hash, so recomputing a context window only tokenizes new messages.
+    """
+
+    _calibration: Dict[str, float] = dict(DEFAULT_TOKEN_CALIBRATION)
+    _calibration_lock = threading.Lock()
+
+    def __init__(self, provider: str, model: Optional[str] = None, memo: Optional[TokenMemo] = None):
+        self.provider = provider
+        self.model = model
+        self.memo = memo if memo is not None else get_token_memo()
+        # A single canonical encoding keeps raw counts comparable across models, so they can be
+        # persisted on messages; provider differences are absorbed by the calibration multiplier.
+        self.encoding = tiktoken.get_encoding(APPROXIMATE_TOKENIZER_ENCODING)
+
+    @property
+    def multiplier(self) -> float:
+        return self._calibration.get(self.provider, 1.0)
+
+    @classmethod
+    def calibrate(cls, provider: str, local_count: int, api_count: int, weight: float = 0.1) -> float:
+        """Fold an observed (local, API) count pair into the provider multiplier using an exponential moving average.
+
+        Args:
+            provider: Provider endpoint type the API count was recorded for
+            local_count: Raw (uncalibrated) local token count for the payload
+            api_count: Token count reported by the provider for the same payload
+            weight: Weight given to the new observation
+
+        Returns:
+            The updated multiplier
+        """
+        if local_count <= 0 or api_count <= 0:
+            return cls._calibration.get(provider, 1.0)
+        observed = api_count / local_count
+        with cls._calibration_lock:
+            current = cls._calibration.get(provider, observed)
+            updated = (1 - weight) * current + weight * observed
+            cls._calibration[provider] = updated
+        return updated
+
+    @classmethod
+    def record_usage(cls, provider: str, request_data: Dict[str, Any], prompt_tokens: int) -> float:
+        """Calibrate the provider multiplier against the prompt token count the provider reported for `request_data`."""
+        counter = cls(provider=provider)
+        return cls.calibrate(provider, counter.count_raw_request_tokens(request_data), prompt_tokens)
+
+    def count_raw_request_tokens(self, request_data: Dict[str, Any]) -> int:
+        """Uncalibrated token count of a provider request payload (system prompt, messages and tools)."""
+        raw = self._memoized_raw_count(request_data["system"]) if request_data.get("system") else 0
+        # openai/anthropic send "messages", google sends "contents"
+        messages = request_data.get("messages") or request_data.get("contents") or []
+        raw += sum(self._memoized_raw_count(message) + TOKENS_PER_MESSAGE for message in messages)
+        raw += sum(self._memoized_raw_count(tool) + TOKENS_PER_TOOL for tool in request_data.get("tools") or [])
+        return raw
+
+    def _raw_count(self, value: Any) -> int:
+        """Count tokens in every string leaf of a JSON-like value."""
+        if value is None:
+            return 0
+        if isinstance(value, str):
+            return len(self.encoding.encode(value, disallowed_special=()))
+        if isinstance(value, dict):
+            return sum(self._raw_count(v) for v in value.values())
+        if isinstance(value, (list, tuple)):
+            return sum(self._raw_count(v) for v in value)
+        return len(self.encoding.encode(str(value), disallowed_special=()))
+
+    def _memoized_raw_count(self, value: Any) -> int:
+        payload = value if isinstance(value, str) else json.dumps(value, sort_keys=True, default=str)
+        key = f"{self.encoding.name}:{hashlib.sha256(payload.encode()).hexdigest()}"
+        cached = self.memo.get(key)
+        if cached is not None:
+            return cached
+        count = self._raw_count(value)
+        self.memo.set(key, count)
+        return count
+
+    def scale(self, raw: int) -> int:
+        """Apply the provider calibration multiplier to a raw local count."""
+        return int(round(raw * self.multiplier))
+
+    def count_raw_message_tokens(self, message: Message) -> int:
+        """Uncalibrated token count of a single message, suitable for caching on ``Message.num_tokens``."""
+        return sum(self._memoized_raw_count(d) + TOKENS_PER_MESSAGE for d in Message.to_openai_dicts_from_list([message]))
+
+    @trace_method
+    async def count_text_tokens(self, text: str) -> int:
+        if not text:
+            return 0
+        return self.scale(self._memoized_raw_count(text))
+
+    @trace_method
+    async def count_message_tokens(self, messages: List[Dict[str, Any]]) -> int:
+        if not messages:
+            return 0
+        raw = sum(self._memoized_raw_count(message) + TOKENS_PER_MESSAGE for message in messages)
+        return self.scale(raw)
+
+    @trace_method
+    async def count_tool_tokens(self, tools: List[OpenAITool]) -> int:
+        if not tools:
+            return 0
+        raw = sum(self._memoized_raw_count(t.model_dump(exclude_none=True)) + TOKENS_PER_TOOL for t in tools)
+        return self.scale(raw)
+
+    def convert_messages(self, messages: List[Any]) -> List[Dict[str, Any]]:
+        if self.provider == "anthropic":
+            return Message.to_anthropic_dicts_from_list(messages)
+        return Message.to_openai_dicts_from_list(messages)
@@ -1,7 +1,7 @@
 import asyncio
 import os
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
 
 from sqlalchemy import func, select, update
 from sqlalchemy.dialects.postgresql import insert as pg_insert
@@ -21,6 +21,8 @@ from letta.schemas.source import Source as PydanticSource
 from letta.schemas.source_metadata import FileStats, OrganizationSourcesStats, SourceStats
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.file_processor.chunker.line_index import build_line_index
+from letta.services.helpers.memory_version_helper import bump_memory_version_async
 from letta.settings import settings
 from letta.utils import enforce_types
 
@@ -71,7 +73,8 @@ class FileManager:
                 await file_orm.create_async(session, actor=actor, no_commit=True)
 
                 if text is not None:
-                    content_orm = FileContentModel(file_id=file_orm.id, text=text)
+                    line_index = await asyncio.to_thread(build_line_index, file_metadata, text)
+                    content_orm = FileContentModel(file_id=file_orm.id, text=text, line_index=line_index)
                     await content_orm.create_async(session, actor=actor, no_commit=True)
 
                 await session.commit()
@@ -308,13 +311,14 @@ class FileManager:
                 if settings.letta_pg_uri_no_default:
                     # postgresql: both datetimes are timezone-aware
                     timeout_threshold = datetime.now(timezone.utc) - timedelta(minutes=settings.file_processing_timeout_minutes)
-                    file_created_at = file_metadata.created_at
                 else:
                     # sqlite: both datetimes should be timezone-naive
                     timeout_threshold = datetime.utcnow() - timedelta(minutes=settings.file_processing_timeout_minutes)
-                    file_created_at = file_metadata.created_at
+                # time out files that stopped making progress: embedding bumps updated_at after every batch, and a
+                # resumed file may have been created long ago
+                last_progress_at = max(file_metadata.created_at, file_metadata.updated_at or file_metadata.created_at)
 
-                if file_created_at < timeout_threshold:
+                if last_progress_at < timeout_threshold:
                     # move file to error status with timeout message
                     timeout_message = settings.file_processing_timeout_error_message.format(settings.file_processing_timeout_minutes)
                     try:
@@ -363,17 +367,18 @@ class FileManager:
         actor: PydanticUser,
     ) -> PydanticFileMetadata:
         async with db_registry.async_session() as session:
-            await FileMetadataModel.read_async(session, file_id, actor)
+            file_orm = await FileMetadataModel.read_async(session, file_id, actor)
+            line_index = await asyncio.to_thread(build_line_index, await file_orm.to_pydantic_async(), text)
 
             dialect_name = session.bind.dialect.name
 
             if dialect_name == "postgresql":
                 stmt = (
                     pg_insert(FileContentModel)
-                    .values(file_id=file_id, text=text)
+                    .values(file_id=file_id, text=text, line_index=line_index)
                     .on_conflict_do_update(
                         index_elements=[FileContentModel.file_id],
-                        set_={"text": text},
+                        set_={"text": text, "line_index": line_index},
                     )
                 )
                 await session.execute(stmt)
@@ -384,9 +389,11 @@ class FileManager:
                 existing = result.scalar_one_or_none()
 
                 if existing:
-                    await session.execute(update(FileContentModel).where(FileContentModel.file_id == file_id).values(text=text))
+                    await session.execute(
+                        update(FileContentModel).where(FileContentModel.file_id == file_id).values(text=text, line_index=line_index)
+                    )
                 else:
-                    session.add(FileContentModel(file_id=file_id, text=text))
+                    session.add(FileContentModel(file_id=file_id, text=text, line_index=line_index))
 
             await session.commit()
 
@@ -459,6 +466,7 @@ class FileManager:
             # invalidate cache for this file before deletion
             await self._invalidate_file_caches(file_id, actor, file.original_file_name, file.source_id)
 
+            await bump_memory_version_async(session, file_ids=[file_id])
             await file.hard_delete_async(db_session=session, actor=actor)
             return await file.to_pydantic_async()
 
@@ -652,6 +660,63 @@ class FileManager:
 
             return await asyncio.gather(*[file.to_pydantic_async(include_content=include_content) for file in files_orm])
 
+    @enforce_types
+    @trace_method
+    async def get_line_indexes_async(self, file_ids: List[str], actor: PydanticUser) -> Dict[str, Optional[bytes]]:
+        """
+        Get the serialized line indexes (see `FileLineIndex`) of files with content, without loading the content.
+
+        Files stored before line indexes were built map to None.
+        """
+        if not file_ids:
+            return {}
+
+        async with db_registry.async_session() as session:
+            query = (
+                select(FileContentModel.file_id, FileContentModel.line_index)
+                .join(FileMetadataModel, FileMetadataModel.id == FileContentModel.file_id)
+                .where(
+                    FileContentModel.file_id.in_(file_ids),
+                    FileMetadataModel.organization_id == actor.organization_id,
+                    FileMetadataModel.is_deleted == False,
+                )
+            )
+            result = await session.execute(query)
+            return {file_id: line_index for file_id, line_index in result.all()}
+
+    @enforce_types
+    @trace_method
+    async def set_line_index_async(self, file_id: str, line_index: Optional[bytes], actor: PydanticUser) -> None:
+        """Store the line index of a file's content, for files stored before line indexes were built."""
+        async with db_registry.async_session() as session:
+            await FileMetadataModel.read_async(session, file_id, actor)
+            await session.execute(update(FileContentModel).where(FileContentModel.file_id == file_id).values(line_index=line_index))
+            await session.commit()
+
+    @enforce_types
+    @trace_method
+    async def get_file_content_ranges_async(self, file_id: str, ranges: List[Tuple[int, int]], actor: PydanticUser) -> List[str]:
+        """
+        Get `content[start:end]` of a file for each (start, end) range in one query, without loading the rest of the content.
+        """
+        if not ranges:
+            return []
+
+        async with db_registry.async_session() as session:
+            query = (
+                select(*[func.substr(FileContentModel.text, start + 1, end - start) for start, end in ranges])
+                .join(FileMetadataModel, FileMetadataModel.id == FileContentModel.file_id)
+                .where(
+                    FileContentModel.file_id == file_id,
+                    FileMetadataModel.organization_id == actor.organization_id,
+                )
+            )
+            result = await session.execute(query)
+            row = result.one_or_none()
+            if row is None:
+                raise NoResultFound(f"File content for file {file_id} not found")
+            return [text or "" for text in row]
+
     @enforce_types
     @trace_method
     async def get_files_for_agents_async(
@@ -0,0 +1,248 @@
+"""Per-file trigram index over the lines `LineChunker` splits a file into.
+
+`grep_files` matches a regex against every line of every attached file. The index lets it skip the lines that cannot
+match: it records where each line starts and ends in the file content, and for every trigram of the case-folded lines
+the lines it occurs in. The literal strings a pattern requires are extracted from the parsed regex, and only lines
+containing all of their trigrams are candidates. Lines are verified with the regex, so a trigram that collides with
+another (trigrams of non-latin text are hashed) or a literal the extraction misses only costs precision.
+
+The index is built once when the file content is stored (`FileManager.create_file` / `upsert_file_content`) and
+serialized compactly next to it. Postings are kept in segments of at most `SEGMENT_MAX_LINES` lines, so that line
+numbers within a segment fit in 16 bits and building the index of a large file does not hold the trigrams of all
+of its lines at once.
+"""
+
+import re
+import struct
+import zlib
+from typing import List, Optional, Set, Tuple
+
+import numpy as np
+
+from letta.schemas.file import FileMetadata
+from letta.services.file_processor.chunker.line_chunker import LineChunker
+from letta.services.file_processor.file_types import ChunkingStrategy
+
+LINE_INDEX_FORMAT_VERSION = 1
+SEGMENT_MAX_LINES = 1 << 16
+SEGMENT_MAX_CHARS = 1 << 20
+
+# non-ASCII characters that `re.IGNORECASE` matches with an ASCII letter, folded to that letter
+_ASCII_CASE_FOLDS = str.maketrans({"İ": "i", "ı": "i", "ſ": "s", "K": "k"})
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+_WHITESPACE = re.compile(r"\s+")
+
+_STRATEGIES = list(ChunkingStrategy)
+_HEADER = struct.Struct("<BBIQI")
+_SEGMENT_HEADER = struct.Struct("<III")
+
+
+def _fold(line: str) -> str:
+    return line.translate(_ASCII_CASE_FOLDS).lower()
+
+
+def _trigram_keys(codes: np.ndarray) -> np.ndarray:
+    """Keys of the trigrams starting at each position of an array of code points (uint64)."""
+    a, b, c = codes[:-2], codes[1:-1], codes[2:]
+    packed = (a << 20) | (b << 10) | c
+    hashed = ((a * 0x9E3779B1) ^ (b * 0x85EBCA77) ^ (c * 0xC2B2AE3D)) & 0x3FFFFFFF | 0x40000000
+    return np.where((a < 1024) & (b < 1024) & (c < 1024), packed, hashed).astype(np.uint32)
+
+
+def _code_points(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode("utf-32-le", errors="surrogatepass"), dtype="<u4").astype(np.uint64)
+
+
+def chunk_spans(text: str, strategy: ChunkingStrategy) -> List[Tuple[int, int]]:
+    """Where each line `LineChunker.chunk_text` produces for `text` starts and ends in it."""
+    spans = []
+    if not text:
+        return spans
+    if strategy == ChunkingStrategy.DOCUMENTATION:
+        stripped = text.strip()
+        offset = len(text) - len(text.lstrip())
+        start = 0
+        for boundary in [*_SENTENCE_BOUNDARY.finditer(stripped), None]:
+            end = boundary.start() if boundary else len(stripped)
+            sentence = stripped[start:end]
+            lstripped = sentence.lstrip()
+            if lstripped:
+                sentence_start = offset + start + len(sentence) - len(lstripped)
+                spans.append((sentence_start, sentence_start + len(lstripped.rstrip())))
+            start = boundary.end() if boundary else end
+        return spans
+
+    position = 0
+    for line in text.splitlines(keepends=True):
+        content = line.rstrip()
+        if strategy != ChunkingStrategy.CODE:
+            content = content.lstrip()
+        if content:
+            start = position + len(line.rstrip()) - len(content)
+            spans.append((start, start + len(content)))
+        position += len(line)
+    return spans
+
+
+def chunk_from_span(text: str, strategy: ChunkingStrategy) -> str:
+    """The line `LineChunker` produces for the text of one of its spans."""
+    if strategy == ChunkingStrategy.DOCUMENTATION:
+        return _WHITESPACE.sub(" ", text)
+    return text
+
+
+def required_literals(pattern: str, flags: int = 0) -> List[str]:
+    """Case-folded ASCII strings of at least three characters that every match of the pattern contains."""
+    # the parser is private to `re`, but it is the only way to see the pattern as `re` does
+    from re import _constants, _parser
+
+    def _walk(items) -> List[str]:
+        runs, current = [], []
+        for op, av in items:
+            if op is _constants.LITERAL and av < 128:
+                current.append(chr(av))
+                continue
+            runs.append("".join(current))
+            current = []
+            if op is _constants.SUBPATTERN:
+                runs.extend(_walk(av[3]))
+            elif op is _constants.ATOMIC_GROUP:
+                runs.extend(_walk(av))
+            elif op in (_constants.MAX_REPEAT, _constants.MIN_REPEAT, _constants.POSSESSIVE_REPEAT) and av[0] >= 1:
+                runs.extend(_walk(av[2]))
+        runs.append("".join(current))
+        return runs
+
+    try:
+        runs = _walk(_parser.parse(pattern, flags))
+    except Exception:
+        return []
+    return [run.lower() for run in runs if len(run) >= 3]
+
+
+class _Segment:
+    def __init__(self, first_line: int, keys: np.ndarray, ends: np.ndarray, deltas: np.ndarray):
+        self.first_line = first_line
+        self.keys = keys
+        self.ends = ends
+        self.deltas = deltas
+
+    def lines_with(self, keys: np.ndarray) -> np.ndarray:
+        positions = np.searchsorted(self.keys, keys)
+        if np.any(positions >= len(self.keys)) or np.any(self.keys[np.minimum(positions, len(self.keys) - 1)] != keys):
+            return np.empty(0, dtype=np.int64)
+        lines = None
+        # rarest trigram first, so that the intersections stay small
+        sizes = self.ends[positions] - np.where(positions > 0, self.ends[positions - 1], 0)
+        for position in positions[np.argsort(sizes)]:
+            start = int(self.ends[position - 1]) if position > 0 else 0
+            posting = np.cumsum(self.deltas[start : int(self.ends[position])], dtype=np.int64)
+            lines = posting if lines is None else np.intersect1d(lines, posting, assume_unique=True)
+            if len(lines) == 0:
+                break
+        return lines + self.first_line
+
+
+def _build_segment(first_line: int, lines: List[str]) -> _Segment:
+    codes = _code_points(_fold("\n".join(lines)))
+    if len(codes) < 3:
+        return _Segment(first_line, np.empty(0, np.uint32), np.empty(0, np.uint32), np.empty(0, np.uint16))
+    newline = codes == 10
+    line_of = np.cumsum(newline[:-2], dtype=np.uint64)
+    valid = ~(newline[:-2] | newline[1:-1] | newline[2:])
+    pairs = (_trigram_keys(codes)[valid].astype(np.uint64) << 16) | line_of[valid]
+    pairs.sort()
+    pairs = pairs[np.append(True, pairs[1:] != pairs[:-1])]
+    keys = (pairs >> 16).astype(np.uint32)
+    lines_with_key = (pairs & 0xFFFF).astype(np.uint16)
+    first = np.flatnonzero(np.append(True, keys[1:] != keys[:-1]))
+    deltas = np.diff(lines_with_key, prepend=np.uint16(0))
+    deltas[first] = lines_with_key[first]
+    ends = np.append(first[1:], len(keys)).astype(np.uint32)
+    return _Segment(first_line, keys[first], ends, deltas)
+
+
+class FileLineIndex:
+    """Line spans and trigram postings of one file, see the module docstring."""
+
+    def __init__(self, strategy: ChunkingStrategy, content_bytes: int, spans: np.ndarray, segments: List[_Segment]):
+        self.strategy = strategy
+        self.content_bytes = content_bytes
+        # (num_lines, 2) start and end of each line in the file content
+        self.spans = spans
+        self.segments = segments
+
+    @property
+    def num_lines(self) -> int:
+        return len(self.spans)
+
+    @classmethod
+    def build(cls, text: str, strategy: ChunkingStrategy) -> "FileLineIndex":
+        spans = chunk_spans(text, strategy)
+        segments = []
+        first_line, lines, chars = 0, [], 0
+        for start, end in spans:
+            # grep matches the stripped line
+            lines.append(chunk_from_span(text[start:end], strategy).strip())
+            chars += len(lines[-1])
+            if len(lines) == SEGMENT_MAX_LINES or chars >= SEGMENT_MAX_CHARS:
+                segments.append(_build_segment(first_line, lines))
+                first_line, lines, chars = first_line + len(lines), [], 0
+        if lines:
+            segments.append(_build_segment(first_line, lines))
+        return cls(strategy, len(text.encode("utf-8", errors="surrogatepass")), np.array(spans, dtype=np.uint32).reshape(-1, 2), segments)
+
+    def to_bytes(self) -> bytes:
+        parts = [
+            _HEADER.pack(
+                LINE_INDEX_FORMAT_VERSION, _STRATEGIES.index(self.strategy), self.num_lines, self.content_bytes, len(self.segments)
+            ),
+            self.spans.astype("<u4").tobytes(),
+        ]
+        for segment in self.segments:
+            parts.append(_SEGMENT_HEADER.pack(segment.first_line, len(segment.keys), len(segment.deltas)))
+            parts.append(segment.keys.astype("<u4").tobytes())
+            parts.append(segment.ends.astype("<u4").tobytes())
+            parts.append(segment.deltas.astype("<u2").tobytes())
+        return zlib.compress(b"".join(parts), 6)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> Optional["FileLineIndex"]:
+        """The serialized index, or None if it was written in another format version."""
+        buffer = zlib.decompress(data)
+        version, strategy, num_lines, content_bytes, num_segments = _HEADER.unpack_from(buffer)
+        if version != LINE_INDEX_FORMAT_VERSION:
+            return None
+        offset = _HEADER.size
+        spans = np.frombuffer(buffer, dtype="<u4", count=num_lines * 2, offset=offset).reshape(-1, 2)
+        offset += spans.nbytes
+        segments = []
+        for _ in range(num_segments):
+            first_line, num_keys, num_postings = _SEGMENT_HEADER.unpack_from(buffer, offset)
+            offset += _SEGMENT_HEADER.size
+            keys = np.frombuffer(buffer, dtype="<u4", count=num_keys, offset=offset)
+            ends = np.frombuffer(buffer, dtype="<u4", count=num_keys, offset=offset + keys.nbytes)
+            offset += keys.nbytes + ends.nbytes
+            deltas = np.frombuffer(buffer, dtype="<u2", count=num_postings, offset=offset)
+            offset += deltas.nbytes
+            segments.append(_Segment(first_line, keys, ends, deltas))
+        return cls(_STRATEGIES[strategy], content_bytes, spans, segments)
+
+    def candidate_lines(self, pattern: str, flags: int = 0) -> Optional[np.ndarray]:
+        """Sorted numbers (0-based) of the lines that may match the pattern, or None if the index cannot narrow them."""
+        keys: Set[int] = set()
+        for literal in required_literals(pattern, flags):
+            keys.update(int(key) for key in _trigram_keys(_code_points(literal)))
+        if not keys:
+            return None
+        query = np.array(sorted(keys), dtype=np.uint32)
+        candidates = [segment.lines_with(query) for segment in self.segments]
+        return np.concatenate(candidates) if candidates else np.empty(0, dtype=np.int64)
+
+
+def build_line_index(file_metadata: FileMetadata, text: str) -> Optional[bytes]:
+    """Serialized line index of a file's content, or None for content too large to address with 32 bit offsets."""
+    if len(text) >= 1 << 32:
+        return None
+    strategy = LineChunker()._determine_chunking_strategy(file_metadata)
+    return FileLineIndex.build(text, strategy).to_bytes()
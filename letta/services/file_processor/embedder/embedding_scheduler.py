@@ -0,0 +1,251 @@
+"""Process-wide scheduling of embedding requests.
+
+All embedding requests in the process that target the same endpoint and model go through one `EmbeddingScheduler`.
+Chunks from every concurrent caller (e.g. several file uploads) wait in a shared queue and are packed into requests by
+estimated token count, up to the provider's per-request limits, so small batches from different files share a request.
+The number of requests in flight is controlled AIMD-style: it halves whenever the provider rate limits us and grows by
+one per window of fast, successful requests.
+"""
+
+import asyncio
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+import openai
+
+from letta.errors import LLMRateLimitError
+from letta.log import get_logger
+from letta.otel.context import get_ctx_attributes
+from letta.otel.metric_registry import MetricRegistry
+from letta.otel.tracing import log_event
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+# OpenAI rejects embedding requests with more inputs than this
+EMBEDDING_MAX_INPUTS_PER_REQUEST = 2048
+# rate limited requests are retried this many times before the error reaches the callers
+EMBEDDING_MAX_RATE_LIMIT_RETRIES = 5
+
+EmbedRequest = Callable[[List[str]], Awaitable[List[List[float]]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap upper-leaning token estimate: BPE tokenizers average ~4 bytes per token on English text."""
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def is_token_limit_error(error: Exception) -> bool:
+    """Check if the error is due to token limit exceeded"""
+    # convert to string and check for token limit patterns
+    error_str = str(error).lower()
+
+    # TODO: This is quite brittle, works for now
+    # check for the specific patterns we see in token limit errors
+    return (
+        "max_tokens_per_request" in error_str
+        or ("requested" in error_str and "tokens" in error_str and "max" in error_str and "per request" in error_str)
+        or "token limit" in error_str
+        or ("bad request to openai" in error_str and "tokens" in error_str and "max" in error_str)
+    )
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    return isinstance(error, (openai.RateLimitError, LLMRateLimitError)) or getattr(error, "status_code", None) == 429
+
+
+class AIMDLimiter:
+    """Concurrency limit with additive increase and multiplicative decrease.
+
+    A throttled request halves the limit. A request that finishes within `target_latency_s` raises it by `1 / limit`,
+    i.e. by one per window of `limit` fast requests. Slow requests leave it unchanged.
+    """
+
+    def __init__(self, initial_limit: int, max_limit: int, target_latency_s: float, min_limit: int = 1):
+        self.min_limit = min_limit
+        self.max_limit = max(max_limit, min_limit)
+        self.limit = float(min(max(initial_limit, min_limit), self.max_limit))
+        self.target_latency_s = target_latency_s
+        self.in_flight = 0
+        self._changed = asyncio.Condition()
+
+    async def acquire(self) -> None:
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, latency_s: float, throttled: bool = False) -> None:
+        async with self._changed:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(float(self.min_limit), self.limit / 2)
+            elif latency_s <= self.target_latency_s:
+                self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+            self._changed.notify_all()
+
+
+@dataclass
+class _PendingChunk:
+    text: str
+    tokens: int
+    request: EmbedRequest
+    future: asyncio.Future
+    rate_limit_retries: int = 0
+    # set when a request containing this chunk hit the token limit despite the estimate
+    max_batch_inputs: Optional[int] = None
+
+
+class EmbeddingScheduler:
+    """Packs queued chunks into shared embedding requests and runs them under an `AIMDLimiter`.
+
+    Requests are sent through the `request` callable of the first chunk in each batch; callers that share a scheduler
+    embed with the same endpoint, model and credentials, so their callables are interchangeable.
+    """
+
+    def __init__(self, max_inputs: int, max_tokens: int, limiter: AIMDLimiter, attributes: Optional[Dict[str, str]] = None):
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.limiter = limiter
+        self.attributes = attributes or {}
+        self._pending: Deque[_PendingChunk] = deque()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._batches: Set[asyncio.Task] = set()
+
+    async def embed(self, texts: List[str], request: EmbedRequest) -> List[List[float]]:
+        """Embed `texts` in order, sharing requests with other concurrent callers of this scheduler."""
+        if not texts:
+            return []
+
+        loop = asyncio.get_running_loop()
+        chunks = [_PendingChunk(text=text, tokens=estimate_tokens(text), request=request, future=loop.create_future()) for text in texts]
+        self._enqueue(chunks)
+
+        start = time.perf_counter()
+        try:
+            embeddings = await asyncio.gather(*(chunk.future for chunk in chunks))
+        except BaseException:
+            # drop the caller's chunks that have not been sent yet
+            for chunk in chunks:
+                chunk.future.cancel()
+            raise
+
+        elapsed = time.perf_counter() - start
+        if elapsed > 0:
+            MetricRegistry().embedding_throughput_histogram.record(len(texts) / elapsed, {**get_ctx_attributes(), **self.attributes})
+        return list(embeddings)
+
+    def _enqueue(self, chunks: List[_PendingChunk], front: bool = False) -> None:
+        if front:
+            self._pending.extendleft(reversed(chunks))
+        else:
+            self._pending.extend(chunks)
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+    def _take_batch(self) -> List[_PendingChunk]:
+        batch, tokens, max_inputs = [], 0, self.max_inputs
+        while self._pending:
+            chunk = self._pending[0]
+            if chunk.future.done():
+                self._pending.popleft()
+                continue
+            max_inputs = min(max_inputs, chunk.max_batch_inputs or max_inputs)
+            if batch and (len(batch) >= max_inputs or tokens + chunk.tokens > self.max_tokens):
+                break
+            batch.append(self._pending.popleft())
+            tokens += chunk.tokens
+        return batch
+
+    async def _dispatch(self) -> None:
+        try:
+            while self._pending:
+                await self.limiter.acquire()
+                # let callers that were scheduled in the same tick join this batch
+                await asyncio.sleep(0)
+                batch = self._take_batch()
+                if not batch:
+                    await self.limiter.release(latency_s=float("inf"))
+                    continue
+                task = asyncio.create_task(self._run_batch(batch))
+                self._batches.add(task)
+                task.add_done_callback(self._batches.discard)
+        finally:
+            self._dispatcher = None
+
+    async def _run_batch(self, batch: List[_PendingChunk]) -> None:
+        log_event("embedder.batch_started", {"batch_size": len(batch), "batch_tokens": sum(chunk.tokens for chunk in batch)})
+        start = time.perf_counter()
+        error = None
+        try:
+            embeddings = await batch[0].request([chunk.text for chunk in batch])
+        except Exception as e:
+            error = e
+        latency_s = time.perf_counter() - start
+        throttled = error is not None and is_rate_limit_error(error)
+        await self.limiter.release(latency_s=latency_s if error is None else float("inf"), throttled=throttled)
+        MetricRegistry().embedding_concurrency_limit_gauge.set(int(self.limiter.limit), attributes=self.attributes)
+
+        if error is None:
+            log_event("embedder.batch_completed", {"batch_size": len(batch), "embeddings_generated": len(embeddings)})
+            for chunk, embedding in zip(batch, embeddings):
+                if not chunk.future.done():
+                    chunk.future.set_result(embedding)
+        elif throttled and all(chunk.rate_limit_retries < EMBEDDING_MAX_RATE_LIMIT_RETRIES for chunk in batch):
+            retries = max(chunk.rate_limit_retries for chunk in batch)
+            logger.warning(f"Embedding request rate limited, retrying {len(batch)} chunks with concurrency limit {int(self.limiter.limit)}")
+            log_event("embedder.batch_rate_limited", {"batch_size": len(batch), "concurrency_limit": int(self.limiter.limit)})
+            await asyncio.sleep(min(30.0, 0.5 * 2**retries))
+            for chunk in batch:
+                chunk.rate_limit_retries += 1
+            self._enqueue(batch, front=True)
+        elif is_token_limit_error(error) and len(batch) > 1:
+            # the token estimate was too low for this batch, split it in half and retry
+            logger.warning(f"Token limit exceeded for batch of size {len(batch)}, splitting in half and retrying")
+            log_event("embedder.batch_split_retry", {"original_batch_size": len(batch), "error": str(error), "split_size": len(batch) // 2})
+            mid = len(batch) // 2
+            for chunk in batch[:mid]:
+                chunk.max_batch_inputs = mid
+            for chunk in batch[mid:]:
+                chunk.max_batch_inputs = len(batch) - mid
+            self._enqueue(batch, front=True)
+        else:
+            logger.error("Failed to embed batch of size %s: %s", len(batch), error)
+            log_event("embedder.batch_failed", {"batch_size": len(batch), "error": str(error), "error_type": type(error).__name__})
+            for chunk in batch:
+                if not chunk.future.done():
+                    chunk.future.set_exception(error)
+
+
+_schedulers: Dict[Tuple, Tuple[asyncio.AbstractEventLoop, EmbeddingScheduler]] = {}
+
+
+def get_embedding_scheduler(embedding_config: EmbeddingConfig) -> EmbeddingScheduler:
+    """The process-wide scheduler for `embedding_config`'s endpoint and model (per event loop)."""
+    key = (
+        embedding_config.embedding_endpoint_type,
+        embedding_config.embedding_endpoint,
+        embedding_config.embedding_model,
+        embedding_config.embedding_dim,
+        embedding_config.batch_size,
+    )
+    loop = asyncio.get_running_loop()
+    entry = _schedulers.get(key)
+    if entry is None or entry[0] is not loop:
+        scheduler = EmbeddingScheduler(
+            max_inputs=max(1, min(embedding_config.batch_size, EMBEDDING_MAX_INPUTS_PER_REQUEST)),
+            max_tokens=settings.embedding_max_tokens_per_request,
+            limiter=AIMDLimiter(
+                initial_limit=settings.embedding_initial_concurrency,
+                max_limit=settings.embedding_max_concurrency,
+                target_latency_s=settings.embedding_target_latency_seconds,
+            ),
+            attributes={
+                "model": embedding_config.embedding_model,
+                "embedding_endpoint_type": str(embedding_config.embedding_endpoint_type),
+            },
+        )
+        entry = _schedulers[key] = (loop, scheduler)
+    return entry[1]
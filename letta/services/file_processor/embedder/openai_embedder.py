@@ -1,6 +1,7 @@
-import asyncio
-from typing import List, Optional, Tuple, cast
+from typing import List, Optional, cast
 
+from letta.errors import LLMError
+from letta.helpers.embedding_cache import embed_with_cache
 from letta.llm_api.llm_client import LLMClient
 from letta.llm_api.openai_client import OpenAIClient
 from letta.log import get_logger
@@ -10,6 +11,7 @@ from letta.schemas.enums import ProviderType
 from letta.schemas.passage import Passage
 from letta.schemas.user import User
 from letta.services.file_processor.embedder.base_embedder import BaseEmbedder
+from letta.services.file_processor.embedder.embedding_scheduler import get_embedding_scheduler, is_token_limit_error
 from letta.settings import model_settings
 
 logger = get_logger(__name__)
@@ -40,66 +42,9 @@ class OpenAIEmbedder(BaseEmbedder):
             ),
         )
 
-    @trace_method
-    async def _embed_batch(self, batch: List[str], batch_indices: List[int]) -> List[Tuple[int, List[float]]]:
-        """Embed a single batch and return embeddings with their original indices"""
-        log_event(
-            "embedder.batch_started",
-            {
-                "batch_size": len(batch),
-                "model": self.embedding_config.embedding_model,
-                "embedding_endpoint_type": self.embedding_config.embedding_endpoint_type,
-            },
-        )
-
-        try:
-            embeddings = await self.client.request_embeddings(inputs=batch, embedding_config=self.embedding_config)
-            log_event("embedder.batch_completed", {"batch_size": len(batch), "embeddings_generated": len(embeddings)})
-            return [(idx, e) for idx, e in zip(batch_indices, embeddings)]
-        except Exception as e:
-            # if it's a token limit error and we can split, do it
-            if self._is_token_limit_error(e) and len(batch) > 1:
-                logger.warning(f"Token limit exceeded for batch of size {len(batch)}, splitting in half and retrying")
-                log_event(
-                    "embedder.batch_split_retry",
-                    {
-                        "original_batch_size": len(batch),
-                        "error": str(e),
-                        "split_size": len(batch) // 2,
-                    },
-                )
-
-                # split batch in half
-                mid = len(batch) // 2
-                batch1 = batch[:mid]
-                batch1_indices = batch_indices[:mid]
-                batch2 = batch[mid:]
-                batch2_indices = batch_indices[mid:]
-
-                # retry with smaller batches
-                result1 = await self._embed_batch(batch1, batch1_indices)
-                result2 = await self._embed_batch(batch2, batch2_indices)
-
-                return result1 + result2
-            else:
-                # re-raise for other errors or if batch size is already 1
-                raise
-
     def _is_token_limit_error(self, error: Exception) -> bool:
         """Check if the error is due to token limit exceeded"""
-        # convert to string and check for token limit patterns
-        error_str = str(error).lower()
-
-        # TODO: This is quite brittle, works for now
-        # check for the specific patterns we see in token limit errors
-        is_token_limit = (
-            "max_tokens_per_request" in error_str
-            or ("requested" in error_str and "tokens" in error_str and "max" in error_str and "per request" in error_str)
-            or "token limit" in error_str
-            or ("bad request to openai" in error_str and "tokens" in error_str and "max" in error_str)
-        )
-
-        return is_token_limit
+        return is_token_limit_error(error)
 
     @trace_method
     async def generate_embedded_passages(self, file_id: str, source_id: str, chunks: List[str], actor: User) -> List[Passage]:
@@ -120,51 +65,11 @@ class OpenAIEmbedder(BaseEmbedder):
             },
         )
 
-        # Create batches with their original indices
-        batches = []
-        batch_indices = []
-
-        for i in range(0, len(chunks), self.embedding_config.batch_size):
-            batch = chunks[i : i + self.embedding_config.batch_size]
-            indices = list(range(i, min(i + self.embedding_config.batch_size, len(chunks))))
-            batches.append(batch)
-            batch_indices.append(indices)
-
-        logger.info(f"Processing {len(batches)} batches")
-        log_event(
-            "embedder.batching_completed",
-            {"total_batches": len(batches), "batch_size": self.embedding_config.batch_size, "total_chunks": len(chunks)},
-        )
-
-        async def process(batch: List[str], indices: List[int]):
-            try:
-                return await self._embed_batch(batch, indices)
-            except Exception as e:
-                logger.error("Failed to embed batch of size %s: %s", len(batch), e)
-                log_event("embedder.batch_failed", {"batch_size": len(batch), "error": str(e), "error_type": type(e).__name__})
-                raise
-
-        # Execute all batches concurrently with semaphore control
-        tasks = [process(batch, indices) for batch, indices in zip(batches, batch_indices)]
-
-        log_event(
-            "embedder.concurrent_processing_started",
-            {"concurrent_tasks": len(tasks)},
-        )
-        results = await asyncio.gather(*tasks)
-        log_event("embedder.concurrent_processing_completed", {"batches_processed": len(results)})
-
-        # Flatten results and sort by original index
-        indexed_embeddings = []
-        for batch_result in results:
-            indexed_embeddings.extend(batch_result)
-
-        # Sort by index to maintain original order
-        indexed_embeddings.sort(key=lambda x: x[0])
+        embeddings = await embed_with_cache(chunks, self.embedding_config, self._embed_chunks, organization_id=actor.organization_id)
 
         # Create Passage objects in original order
         passages = []
-        for (idx, embedding), text in zip(indexed_embeddings, chunks):
+        for text, embedding in zip(chunks, embeddings):
             passage = Passage(
                 text=text,
                 file_id=file_id,
@@ -181,3 +86,19 @@ class OpenAIEmbedder(BaseEmbedder):
             {"passages_created": len(passages), "total_chunks_processed": len(chunks), "file_id": file_id, "source_id": source_id},
         )
         return passages
+
+    async def _embed_chunks(self, chunks: List[str]) -> List[List[float]]:
+        """Embed chunks through the process-wide embedding scheduler, returning embeddings in the order of `chunks`.
+
+        The scheduler packs chunks from all concurrent callers into requests by estimated token count and adapts the
+        number of requests in flight; see `embedding_scheduler`.
+        """
+        try:
+            return await get_embedding_scheduler(self.embedding_config).embed(chunks, self._request_embeddings)
+        except LLMError:
+            raise
+        except Exception as e:
+            raise self.client.handle_llm_error(e) from e
+
+    async def _request_embeddings(self, inputs: List[str]) -> List[List[float]]:
+        return await self.client.request_embeddings(inputs=inputs, embedding_config=self.embedding_config)
@@ -1,3 +1,5 @@
+import asyncio
+from collections import Counter, defaultdict
 from typing import List
 
 from mistralai import OCRPageObject, OCRResponse, OCRUsageInfo
@@ -18,6 +20,7 @@ from letta.services.file_processor.parser.base_parser import FileParser
 from letta.services.job_manager import JobManager
 from letta.services.passage_manager import PassageManager
 from letta.services.source_manager import SourceManager
+from letta.settings import settings
 
 logger = get_logger(__name__)
 
@@ -134,6 +137,178 @@ class FileProcessor:
                 )
                 raise fallback_error
 
+    def _chunk_page(self, text_chunker: LlamaIndexChunker, page, filename: str, page_index: int) -> List[str]:
+        """Chunk a single page, falling back to the default chunker if the file-specific one fails"""
+        try:
+            chunks = text_chunker.chunk_text(page)
+        except Exception as e:
+            logger.warning(f"Failed to chunk page {page_index} of {filename} with file-specific chunker: {str(e)}")
+            chunks = []
+
+        if chunks:
+            return chunks
+
+        log_event("file_processor.chunking_failed", {"filename": filename, "page_index": page_index})
+        chunks = text_chunker.default_chunk_text(page)
+        if not chunks:
+            log_event("file_processor.default_chunking_failed", {"filename": filename, "page_index": page_index})
+            raise ValueError("No chunks created from text with default chunker")
+        return chunks
+
+    async def _embed_batch_with_fallback(
+        self, text_chunker: LlamaIndexChunker, file_metadata: FileMetadata, chunks: List[str], source_id: str
+    ) -> List[Passage]:
+        """Embed one batch of chunks, re-splitting it with the default chunker if embedding fails"""
+        try:
+            return await self.embedder.generate_embedded_passages(
+                file_id=file_metadata.id, source_id=source_id, chunks=chunks, actor=self.actor
+            )
+        except Exception as e:
+            logger.warning(
+                f"Failed to embed batch of {len(chunks)} chunks for {file_metadata.file_name}: {str(e)}. Retrying with default chunker."
+            )
+            log_event(
+                "file_processor.embedding_failed_retrying",
+                {"filename": file_metadata.file_name, "error": str(e), "error_type": type(e).__name__},
+            )
+            smaller_chunks = [piece for chunk in chunks for piece in text_chunker.default_chunk_text(chunk)]
+            return await self.embedder.generate_embedded_passages(
+                file_id=file_metadata.id, source_id=source_id, chunks=smaller_chunks, actor=self.actor
+            )
+
+    async def _chunk_embed_and_insert(self, file_metadata: FileMetadata, pages: list, source_id: str) -> List[Passage]:
+        """Stream pages through chunking, embedding and passage insertion.
+
+        The chunker, a pool of embedding workers and the inserter run concurrently, connected by queues. At most
+        ``2 * file_processing_embedding_concurrency`` batches are chunked but not yet inserted at any time, so memory
+        stays bounded by that window rather than by the file size, and passages become searchable as soon as their
+        batch is inserted. Batches are inserted in file order and ``chunks_embedded`` advances after each one.
+
+        Chunks whose passages were already stored by an interrupted earlier run are not embedded again, and stored
+        passages that no longer match any chunk are deleted once the file has been fully processed. A chunk that the
+        earlier run had to re-split in `_embed_batch_with_fallback` counts as stored when all of its pieces are.
+
+        Returns the newly created passages, without their embeddings.
+        """
+        filename = file_metadata.file_name
+        text_chunker = LlamaIndexChunker(file_type=file_metadata.file_type, chunk_size=self.embedder.embedding_config.embedding_chunk_size)
+        batch_size = max(1, self.embedder.embedding_config.batch_size)
+        concurrency = max(1, settings.file_processing_embedding_concurrency)
+
+        stored_ids_by_text = defaultdict(list)
+        for passage_id, text in await self.passage_manager.list_passage_texts_by_file_id_async(file_id=file_metadata.id, actor=self.actor):
+            stored_ids_by_text[text].append(passage_id)
+        resuming = bool(stored_ids_by_text)
+
+        def take_stored(texts: List[str]) -> int:
+            # claim one stored passage per text, but only if every text has one left
+            if not all(len(stored_ids_by_text.get(text, ())) >= count for text, count in Counter(texts).items()):
+                return 0
+            for text in texts:
+                stored_ids_by_text[text].pop()
+            return len(texts)
+
+        inflight = asyncio.Semaphore(2 * concurrency)
+        chunk_batches: asyncio.Queue = asyncio.Queue()
+        embedded_batches: asyncio.Queue = asyncio.Queue()
+        created_passages: List[Passage] = []
+        num_reused = 0
+
+        async def put_batch(seq: int, batch: List[str]) -> None:
+            await inflight.acquire()
+            await chunk_batches.put((seq, batch))
+
+        async def chunk_pages() -> None:
+            nonlocal num_reused
+            seq, total_chunks, batch = 0, 0, []
+            for page_index, page in enumerate(pages):
+                for chunk in self._chunk_page(text_chunker, page, filename, page_index):
+                    total_chunks += 1
+                    reused = take_stored([chunk])
+                    if not reused and resuming:
+                        reused = take_stored(text_chunker.default_chunk_text(chunk))
+                    if reused:
+                        num_reused += reused
+                        continue
+                    batch.append(chunk)
+                    if len(batch) == batch_size:
+                        await put_batch(seq, batch)
+                        seq, batch = seq + 1, []
+                # chunking is synchronous, let the embedders and the inserter run between pages
+                await asyncio.sleep(0)
+
+            if batch:
+                await put_batch(seq, batch)
+            for _ in range(concurrency):
+                await chunk_batches.put(None)
+
+            await self.file_manager.update_file_status(file_id=file_metadata.id, actor=self.actor, total_chunks=total_chunks)
+            log_event(
+                "file_processor.chunking_completed",
+                {"filename": filename, "total_chunks": total_chunks, "reused_chunks": num_reused},
+            )
+
+        async def embed_batches() -> None:
+            while (item := await chunk_batches.get()) is not None:
+                seq, chunks = item
+                passages = await self._embed_batch_with_fallback(text_chunker, file_metadata, chunks, source_id)
+                await embedded_batches.put((seq, passages))
+            await embedded_batches.put(None)
+
+        async def insert_batches() -> None:
+            pending, next_seq, running_embedders = {}, 0, concurrency
+            while running_embedders:
+                item = await embedded_batches.get()
+                if item is None:
+                    running_embedders -= 1
+                    continue
+
+                seq, passages = item
+                pending[seq] = passages
+                while next_seq in pending:
+                    created = await self.passage_manager.create_many_source_passages_async(
+                        passages=pending.pop(next_seq), file_metadata=file_metadata, actor=self.actor
+                    )
+                    next_seq += 1
+                    inflight.release()
+
+                    created_passages.extend(p.model_copy(update={"embedding": None}) for p in created)
+                    await self.file_manager.update_file_status(
+                        file_id=file_metadata.id, actor=self.actor, chunks_embedded=num_reused + len(created_passages)
+                    )
+
+        tasks = [
+            asyncio.create_task(chunk_pages()),
+            *(asyncio.create_task(embed_batches()) for _ in range(concurrency)),
+            asyncio.create_task(insert_batches()),
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        stale_ids = [passage_id for ids in stored_ids_by_text.values() for passage_id in ids]
+        for passage_id in stale_ids:
+            await self.passage_manager.delete_source_passage_by_id_async(passage_id=passage_id, actor=self.actor)
+
+        # chunks reused from an earlier run are only known once chunking finished
+        await self.file_manager.update_file_status(
+            file_id=file_metadata.id, actor=self.actor, chunks_embedded=num_reused + len(created_passages)
+        )
+        log_event(
+            "file_processor.passages_created",
+            {
+                "filename": filename,
+                "total_passages": num_reused + len(created_passages),
+                "reused_passages": num_reused,
+                "stale_passages_deleted": len(stale_ids),
+            },
+        )
+        return created_passages
+
     # TODO: Factor this function out of SyncServer
     @trace_method
     async def process(
@@ -211,22 +386,19 @@ class FileProcessor:
                 {"filename": filename, "pages_to_process": len(ocr_response.pages)},
             )
 
-            # Chunk and embed with fallback logic
-            all_passages = await self._chunk_and_embed_with_fallback(
-                file_metadata=file_metadata,
-                ocr_response=ocr_response,
-                source_id=source_id,
-            )
-
             if self.vector_db_type == VectorDBProvider.NATIVE:
-                all_passages = await self.passage_manager.create_many_source_passages_async(
-                    passages=all_passages,
-                    file_metadata=file_metadata,
-                    actor=self.actor,
+                file_metadata = await self.file_manager.update_file_status(
+                    file_id=file_metadata.id, actor=self.actor, processing_status=FileProcessingStatus.EMBEDDING, chunks_embedded=0
                 )
-                log_event(
-                    "file_processor.passages_created",
-                    {"filename": filename, "total_passages": len(all_passages)},
+                all_passages = await self._chunk_embed_and_insert(
+                    file_metadata=file_metadata, pages=ocr_response.pages, source_id=source_id
+                )
+            else:
+                # external vector dbs store the embeddings themselves
+                all_passages = await self._chunk_and_embed_with_fallback(
+                    file_metadata=file_metadata,
+                    ocr_response=ocr_response,
+                    source_id=source_id,
                 )
 
             logger.info(f"Successfully processed {filename}: {len(all_passages)} passages")
@@ -247,7 +419,8 @@ class FileProcessor:
                     file_id=file_metadata.id,
                     actor=self.actor,
                     processing_status=FileProcessingStatus.COMPLETED,
-                    chunks_embedded=len(all_passages),
+                    # the native pipeline keeps chunks_embedded up to date as it inserts
+                    chunks_embedded=None if self.vector_db_type == VectorDBProvider.NATIVE else len(all_passages),
                 )
 
             return all_passages
@@ -312,17 +485,15 @@ class FileProcessor:
             logger.info(f"Chunking imported file content for {filename}")
             log_event("file_processor.import_chunking_started", {"filename": filename, "content_length": len(content)})
 
-            # Chunk and embed using existing logic
-            all_passages = await self._chunk_and_embed_with_fallback(
-                file_metadata=file_metadata, ocr_response=ocr_response, source_id=source_id
-            )
-
-            # Create passages in database (unless using Pinecone)
+            # Chunk, embed and create passages in database (unless using an external vector db)
             if self.vector_db_type == VectorDBProvider.NATIVE:
-                all_passages = await self.passage_manager.create_many_source_passages_async(
-                    passages=all_passages, file_metadata=file_metadata, actor=self.actor
+                all_passages = await self._chunk_embed_and_insert(
+                    file_metadata=file_metadata, pages=ocr_response.pages, source_id=source_id
+                )
+            else:
+                all_passages = await self._chunk_and_embed_with_fallback(
+                    file_metadata=file_metadata, ocr_response=ocr_response, source_id=source_id
                 )
-                log_event("file_processor.import_passages_created", {"filename": filename, "total_passages": len(all_passages)})
 
             # Update file status to completed (valid transition from EMBEDDING)
             # pinecone completes slowly, so gets updated later
@@ -370,3 +541,34 @@ class FileProcessor:
             )
 
             return []
+
+    @trace_method
+    async def resume_processing(self, file_metadata: FileMetadata, source_id: str) -> List[Passage]:
+        """Finish embedding a file whose processing was interrupted, e.g. by a crash or an embedding error.
+
+        Only chunks without a stored passage are embedded; see `_chunk_embed_and_insert`. Used by the
+        `POST /v1/folders/{folder_id}/files/{file_id}/resume` route.
+        """
+        if self.vector_db_type != VectorDBProvider.NATIVE:
+            raise ValueError("Resuming file processing is only supported for the native vector store")
+
+        if file_metadata.content is None:
+            file_metadata = await self.file_manager.get_file_by_id(file_metadata.id, actor=self.actor, include_content=True)
+
+        if file_metadata.processing_status == FileProcessingStatus.COMPLETED:
+            logger.info(f"File {file_metadata.file_name} is already processed, nothing to resume")
+            return []
+
+        log_event(
+            "file_processor.resume_started",
+            {"filename": file_metadata.file_name, "file_id": str(file_metadata.id), "status": file_metadata.processing_status.value},
+        )
+        # moving back out of ERROR is deliberate here, so bypass the state machine
+        await self.file_manager.update_file_status(
+            file_id=file_metadata.id,
+            actor=self.actor,
+            processing_status=FileProcessingStatus.EMBEDDING,
+            error_message="",
+            enforce_state_transitions=False,
+        )
+        return await self.process_imported_file(file_metadata=file_metadata, source_id=source_id)
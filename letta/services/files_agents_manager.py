@@ -11,6 +11,7 @@ from letta.schemas.block import Block as PydanticBlock, FileBlock as PydanticFil
 from letta.schemas.file import FileAgent as PydanticFileAgent, FileMetadata
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.memory_version_helper import bump_memory_version_async
 from letta.utils import enforce_types
 
 logger = get_logger(__name__)
@@ -90,6 +91,7 @@ class FileAgentManager:
                     existing.start_line = start_line
                     existing.end_line = end_line
 
+                    await bump_memory_version_async(session, agent_ids=[agent_id])
                     await existing.update_async(session, actor=actor)
                     return existing.to_pydantic(), []
 
@@ -105,6 +107,7 @@ class FileAgentManager:
                     start_line=start_line,
                     end_line=end_line,
                 )
+                await bump_memory_version_async(session, agent_ids=[agent_id])
                 await assoc.create_async(session, actor=actor)
                 return assoc.to_pydantic(), []
 
@@ -137,6 +140,7 @@ class FileAgentManager:
             # touch timestamp
             assoc.last_accessed_at = datetime.now(timezone.utc)
 
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await assoc.update_async(session, actor=actor)
             return assoc.to_pydantic()
 
@@ -163,6 +167,7 @@ class FileAgentManager:
             # touch timestamp
             assoc.last_accessed_at = datetime.now(timezone.utc)
 
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await assoc.update_async(session, actor=actor)
             return assoc.to_pydantic()
 
@@ -172,6 +177,7 @@ class FileAgentManager:
         """Hard-delete the association."""
         async with db_registry.async_session() as session:
             assoc = await self._get_association_by_file_id(session, agent_id, file_id, actor)
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await assoc.hard_delete_async(session, actor=actor)
 
     @enforce_types
@@ -200,6 +206,7 @@ class FileAgentManager:
             stmt = delete(FileAgentModel).where(and_(or_(*conditions), FileAgentModel.organization_id == actor.organization_id))
 
             result = await session.execute(stmt)
+            await bump_memory_version_async(session, agent_ids={agent_id for agent_id, _ in agent_file_pairs})
             await session.commit()
 
             return result.rowcount
@@ -439,6 +446,8 @@ class FileAgentManager:
             )
 
             closed_file_names = [row.file_name for row in (await session.execute(stmt))]
+            if closed_file_names:
+                await bump_memory_version_async(session, agent_ids=[agent_id])
             await session.commit()
             return closed_file_names
 
@@ -546,6 +555,7 @@ class FileAgentManager:
 
             # Open the target file (update or create)
             now_ts = datetime.now(timezone.utc)
+            await bump_memory_version_async(session, agent_ids=[agent_id])
 
             if file_to_open:
                 # Update existing file
@@ -683,6 +693,7 @@ class FileAgentManager:
                     .values(is_open=False, visible_content=None)
                 )
 
+            await bump_memory_version_async(session, agent_ids=[agent_id])
             await session.commit()
             return closed_file_names
 
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import List, Optional, Union
 
-from sqlalchemy import and_, asc, delete, desc, or_, select
+from sqlalchemy import and_, asc, delete, desc, func, or_, select
 from sqlalchemy.orm import Session
 
 from letta.orm.agent import Agent as AgentModel
@@ -14,6 +14,8 @@ from letta.schemas.letta_message import LettaMessage
 from letta.schemas.message import Message as PydanticMessage
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.agent_state_cache import invalidate_agent_states, invalidate_agent_states_async
+from letta.services.helpers.counter_helper import adjust_agent_message_counts, adjust_agent_message_counts_async
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
@@ -123,7 +125,10 @@ class GroupManager:
                 self._process_shared_block_relationship(session=session, group=new_group, block_ids=group.shared_block_ids)
 
             new_group.create(session, actor=actor)
-            return new_group.to_pydantic()
+            group_state = new_group.to_pydantic()
+        # cached agent states embed the group their agent manages
+        invalidate_agent_states(_manager_agent_ids(group_state.manager_agent_id))
+        return group_state
 
     @enforce_types
     async def create_group_async(self, group: Union[GroupCreate, InternalTemplateGroupCreate], actor: PydanticUser) -> PydanticGroup:
@@ -173,13 +178,17 @@ class GroupManager:
                 await self._process_shared_block_relationship_async(session=session, group=new_group, block_ids=group.shared_block_ids)
 
             await new_group.create_async(session, actor=actor)
-            return new_group.to_pydantic()
+            group_state = new_group.to_pydantic()
+        # cached agent states embed the group their agent manages
+        await invalidate_agent_states_async(_manager_agent_ids(group_state.manager_agent_id))
+        return group_state
 
     @enforce_types
     @trace_method
     async def modify_group_async(self, group_id: str, group_update: GroupUpdate, actor: PydanticUser) -> PydanticGroup:
         async with db_registry.async_session() as session:
             group = await GroupModel.read_async(db_session=session, identifier=group_id, actor=actor)
+            previous_manager_agent_id = group.manager_agent_id
 
             sleeptime_agent_frequency = None
             max_message_buffer_length = None
@@ -236,7 +245,9 @@ class GroupManager:
                 )
 
             await group.update_async(session, actor=actor)
-            return group.to_pydantic()
+            group_state = group.to_pydantic()
+        await invalidate_agent_states_async(_manager_agent_ids(previous_manager_agent_id, group_state.manager_agent_id))
+        return group_state
 
     @enforce_types
     @trace_method
@@ -244,14 +255,18 @@ class GroupManager:
         with db_registry.session() as session:
             # Retrieve the agent
             group = GroupModel.read(db_session=session, identifier=group_id, actor=actor)
+            manager_agent_id = group.manager_agent_id
             group.hard_delete(session)
+        invalidate_agent_states(_manager_agent_ids(manager_agent_id))
 
     @enforce_types
     @trace_method
     async def delete_group_async(self, group_id: str, actor: PydanticUser) -> None:
         async with db_registry.async_session() as session:
             group = await GroupModel.read_async(db_session=session, identifier=group_id, actor=actor)
+            manager_agent_id = group.manager_agent_id
             await group.hard_delete_async(session)
+        await invalidate_agent_states_async(_manager_agent_ids(manager_agent_id))
 
     @enforce_types
     @trace_method
@@ -335,9 +350,11 @@ class GroupManager:
             group = GroupModel.read(db_session=session, identifier=group_id, actor=actor)
 
             # Delete all messages in the group
+            deleted_counts = session.execute(self._group_message_counts_query(group_id, actor)).all()
             session.query(MessageModel).filter(
                 MessageModel.organization_id == actor.organization_id, MessageModel.group_id == group_id
             ).delete(synchronize_session=False)
+            adjust_agent_message_counts(session, {agent_id: -count for agent_id, count in deleted_counts})
 
             session.commit()
 
@@ -349,13 +366,23 @@ class GroupManager:
             group = await GroupModel.read_async(db_session=session, identifier=group_id, actor=actor)
 
             # Delete all messages in the group
+            deleted_counts = (await session.execute(self._group_message_counts_query(group_id, actor))).all()
             delete_stmt = delete(MessageModel).where(
                 MessageModel.organization_id == actor.organization_id, MessageModel.group_id == group_id
             )
             await session.execute(delete_stmt)
+            await adjust_agent_message_counts_async(session, {agent_id: -count for agent_id, count in deleted_counts})
 
             await session.commit()
 
+    @staticmethod
+    def _group_message_counts_query(group_id: str, actor: PydanticUser):
+        return (
+            select(MessageModel.agent_id, func.count(MessageModel.id))
+            .where(MessageModel.organization_id == actor.organization_id, MessageModel.group_id == group_id)
+            .group_by(MessageModel.agent_id)
+        )
+
     @enforce_types
     @trace_method
     def bump_turns_counter(self, group_id: str, actor: PydanticUser) -> int:
@@ -366,7 +393,9 @@ class GroupManager:
             # Update turns counter
             group.turns_counter = (group.turns_counter + 1) % group.sleeptime_agent_frequency
             group.update(session, actor=actor)
-            return group.turns_counter
+            manager_agent_id, turns_counter = group.manager_agent_id, group.turns_counter
+        invalidate_agent_states(_manager_agent_ids(manager_agent_id))
+        return turns_counter
 
     @enforce_types
     @trace_method
@@ -378,7 +407,9 @@ class GroupManager:
             # Update turns counter
             group.turns_counter = (group.turns_counter + 1) % group.sleeptime_agent_frequency
             await group.update_async(session, actor=actor)
-            return group.turns_counter
+            manager_agent_id, turns_counter = group.manager_agent_id, group.turns_counter
+        await invalidate_agent_states_async(_manager_agent_ids(manager_agent_id))
+        return turns_counter
 
     @enforce_types
     def get_last_processed_message_id_and_update(self, group_id: str, last_processed_message_id: str, actor: PydanticUser) -> str:
@@ -390,8 +421,10 @@ class GroupManager:
             prev_last_processed_message_id = group.last_processed_message_id
             group.last_processed_message_id = last_processed_message_id
             group.update(session, actor=actor)
+            manager_agent_id = group.manager_agent_id
 
-            return prev_last_processed_message_id
+        invalidate_agent_states(_manager_agent_ids(manager_agent_id))
+        return prev_last_processed_message_id
 
     @enforce_types
     @trace_method
@@ -406,8 +439,10 @@ class GroupManager:
             prev_last_processed_message_id = group.last_processed_message_id
             group.last_processed_message_id = last_processed_message_id
             await group.update_async(session, actor=actor)
+            manager_agent_id = group.manager_agent_id
 
-            return prev_last_processed_message_id
+        await invalidate_agent_states_async(_manager_agent_ids(manager_agent_id))
+        return prev_last_processed_message_id
 
     @enforce_types
     async def size(
@@ -599,6 +634,10 @@ def _cursor_filter(sort_col, id_col, ref_sort_col, ref_id, forward: bool):
         )
 
 
+def _manager_agent_ids(*agent_ids: Optional[str]) -> List[str]:
+    return [agent_id for agent_id in agent_ids if agent_id]
+
+
 async def _apply_group_pagination_async(query, before: Optional[str], after: Optional[str], session, ascending: bool = True) -> any:
     """Apply cursor-based pagination to group queries."""
     sort_column = GroupModel.created_at
@@ -28,6 +28,7 @@ from letta.orm.archives_agents import ArchivesAgents
 from letta.orm.errors import NoResultFound
 from letta.orm.identity import Identity
 from letta.orm.passage import ArchivalPassage, SourcePassage
+from letta.orm.passage_tag import PassageTag
 from letta.orm.sources_agents import SourcesAgents
 from letta.orm.sqlite_functions import adapt_array
 from letta.otel.tracing import trace_method
@@ -35,7 +36,7 @@ from letta.prompts import gpt_system
 from letta.prompts.prompt_generator import PromptGenerator
 from letta.schemas.agent import AgentState, AgentType
 from letta.schemas.embedding_config import EmbeddingConfig
-from letta.schemas.enums import MessageRole
+from letta.schemas.enums import MessageRole, TagMatchMode
 from letta.schemas.letta_message_content import TextContent
 from letta.schemas.memory import Memory
 from letta.schemas.message import Message, MessageCreate
@@ -998,6 +999,21 @@ async def build_passage_query(
     return main_query
 
 
+async def embed_passage_query(actor: User, query_text: Optional[str], embedding_config: Optional[EmbeddingConfig]) -> List[float]:
+    """Embed a passage search query, zero-padded to MAX_EMBEDDING_DIM like stored passage embeddings."""
+    assert embedding_config is not None, "embedding_config must be specified for vector search"
+    assert query_text is not None, "query_text must be specified for vector search"
+
+    # Use the new LLMClient for embeddings
+    embedding_client = LLMClient.create(
+        provider_type=embedding_config.embedding_endpoint_type,
+        actor=actor,
+    )
+    embeddings = await embedding_client.request_embeddings([query_text], embedding_config)
+    embedded_text = np.array(embeddings[0])
+    return np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+
+
 async def build_source_passage_query(
     actor: User,
     agent_id: Optional[str] = None,
@@ -1011,23 +1027,22 @@ async def build_source_passage_query(
     embed_query: bool = False,
     ascending: bool = True,
     embedding_config: Optional[EmbeddingConfig] = None,
+    query_embedding: Optional[List[float]] = None,
+    candidate_ids: Optional[List[str]] = None,
+    rank_in_caller: bool = False,
 ) -> Select:
-    """Build query for source passages with all filters applied."""
+    """Build query for source passages with all filters applied.
+
+    `query_embedding` skips re-embedding `query_text`. `candidate_ids` restricts the query to passages already
+    ranked by the SQLite vector index, in which case no similarity ordering is applied and the caller orders rows.
+    `rank_in_caller` leaves similarity ordering on SQLite to the caller, which scores the rows in batches instead of
+    sorting by the per-row UDF.
+    """
 
     # Handle embedding for vector search
     embedded_text = None
     if embed_query:
-        assert embedding_config is not None, "embedding_config must be specified for vector search"
-        assert query_text is not None, "query_text must be specified for vector search"
-
-        # Use the new LLMClient for embeddings
-        embedding_client = LLMClient.create(
-            provider_type=embedding_config.embedding_endpoint_type,
-            actor=actor,
-        )
-        embeddings = await embedding_client.request_embeddings([query_text], embedding_config)
-        embedded_text = np.array(embeddings[0])
-        embedded_text = np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+        embedded_text = query_embedding or await embed_passage_query(actor, query_text, embedding_config)
 
     # Base query for source passages
     query = select(SourcePassage).where(SourcePassage.organization_id == actor.organization_id)
@@ -1048,11 +1063,13 @@ async def build_source_passage_query(
         query = query.where(SourcePassage.created_at <= end_date)
 
     # Handle text search or vector search
-    if embedded_text:
+    if candidate_ids is not None:
+        query = query.where(SourcePassage.id.in_(candidate_ids))
+    elif embedded_text:
         if settings.database_engine is DatabaseChoice.POSTGRES:
             # PostgreSQL with pgvector
             query = query.order_by(SourcePassage.embedding.cosine_distance(embedded_text).asc())
-        else:
+        elif not rank_in_caller:
             # SQLite with custom vector type
             query_embedding_binary = adapt_array(embedded_text)
             query = query.order_by(
@@ -1113,23 +1130,24 @@ async def build_agent_passage_query(
     embed_query: bool = False,
     ascending: bool = True,
     embedding_config: Optional[EmbeddingConfig] = None,
+    tags: Optional[List[str]] = None,
+    tag_match_mode: Optional[TagMatchMode] = None,
+    query_embedding: Optional[List[float]] = None,
+    candidate_ids: Optional[List[str]] = None,
+    rank_in_caller: bool = False,
 ) -> Select:
-    """Build query for agent passages with all filters applied."""
+    """Build query for agent passages with all filters applied.
+
+    `query_embedding` skips re-embedding `query_text`. `candidate_ids` restricts the query to passages already
+    ranked by the SQLite vector index, in which case no similarity ordering is applied and the caller orders rows.
+    `rank_in_caller` leaves similarity ordering on SQLite to the caller, which scores the rows in batches instead of
+    sorting by the per-row UDF.
+    """
 
     # Handle embedding for vector search
     embedded_text = None
     if embed_query:
-        assert embedding_config is not None, "embedding_config must be specified for vector search"
-        assert query_text is not None, "query_text must be specified for vector search"
-
-        # Use the new LLMClient for embeddings
-        embedding_client = LLMClient.create(
-            provider_type=embedding_config.embedding_endpoint_type,
-            actor=actor,
-        )
-        embeddings = await embedding_client.request_embeddings([query_text], embedding_config)
-        embedded_text = np.array(embeddings[0])
-        embedded_text = np.pad(embedded_text, (0, MAX_EMBEDDING_DIM - embedded_text.shape[0]), mode="constant").tolist()
+        embedded_text = query_embedding or await embed_passage_query(actor, query_text, embedding_config)
 
     # Base query for agent passages - join through archives_agents
     query = (
@@ -1143,13 +1161,17 @@ async def build_agent_passage_query(
         query = query.where(ArchivalPassage.created_at >= start_date)
     if end_date:
         query = query.where(ArchivalPassage.created_at <= end_date)
+    if tags:
+        query = query.where(build_passage_tag_filter(tags, tag_match_mode))
 
     # Handle text search or vector search
-    if embedded_text:
+    if candidate_ids is not None:
+        query = query.where(ArchivalPassage.id.in_(candidate_ids))
+    elif embedded_text:
         if settings.database_engine is DatabaseChoice.POSTGRES:
             # PostgreSQL with pgvector
             query = query.order_by(ArchivalPassage.embedding.cosine_distance(embedded_text).asc())
-        else:
+        elif not rank_in_caller:
             # SQLite with custom vector type
             query_embedding_binary = adapt_array(embedded_text)
             query = query.order_by(
@@ -1199,6 +1221,27 @@ async def build_agent_passage_query(
     return query
 
 
+def build_passage_tag_filter(tags: List[str], tag_match_mode: Optional[TagMatchMode] = None):
+    """Build a WHERE clause restricting archival passages by tag using the passage_tags junction table.
+
+    ANY matches passages with at least one of the tags; ALL requires every tag. Both are correlated
+    lookups on (passage_id, tag), so the filter is applied before LIMIT and works the same on SQLite and Postgres.
+    """
+    unique_tags = list(dict.fromkeys(tags))
+    tag_conditions = (
+        PassageTag.passage_id == ArchivalPassage.id,
+        PassageTag.tag.in_(unique_tags),
+        PassageTag.is_deleted == False,
+    )
+
+    if tag_match_mode == TagMatchMode.ALL:
+        # (passage_id, tag) is unique, so counting matching rows counts distinct tags
+        matched = select(func.count(PassageTag.id)).where(*tag_conditions).scalar_subquery()
+        return matched == len(unique_tags)
+
+    return exists().where(*tag_conditions)
+
+
 def calculate_base_tools(is_v2: bool) -> Set[str]:
     if is_v2:
         return (set(BASE_TOOLS) - set(DEPRECATED_LETTA_TOOLS)) | set(BASE_MEMORY_TOOLS_V2)
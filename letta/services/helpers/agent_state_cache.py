@@ -0,0 +1,162 @@
+"""Per-process cache of agent states.
+
+`AgentManager.get_agent_by_id_async` joins the agent row with its tools, blocks, sources, tags, identities, group and
+environment variables and converts the result into a large `AgentState`. Instead it first reads the agent's version,
+`(updated_at, memory_version)`, from the agent row alone and serves the cached state while that version is unchanged.
+Writes to the agent row move `updated_at` and writes to memory, sources, files or tool rules move `memory_version`
+(see `memory_version_helper`), so those never need explicit invalidation.
+
+Writes that change an agent state without touching its row (attaching or detaching tools, editing tools, identities or
+groups) call `invalidate_agent_states_async` / `invalidate_agent_states`. When redis is configured the async variant
+also publishes the invalidation so other processes drop their copies; otherwise, and for the sync variant, other
+processes serve their copies for at most `agent_state_cache_ttl_seconds`.
+
+States are cached per set of included relationships, and callers always get copies since agent loops mutate them.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.decorators import CacheStats
+from letta.helpers.memory_cache import INVALIDATE_ALL, ensure_invalidation_listener
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.schemas.agent import AgentState
+from letta.settings import settings
+
+logger = get_logger(__name__)
+
+AGENT_STATE_INVALIDATION_CHANNEL = "agent_state:invalidate"
+
+_METRIC_ATTRIBUTES = {"cache": "agent_state", "tier": "memory"}
+
+
+def _relationships_key(include_relationships: Optional[List[str]]) -> Optional[Tuple[str, ...]]:
+    return None if include_relationships is None else tuple(sorted(set(include_relationships)))
+
+
+class AgentStateCache:
+    """LRU of agent states, each stored with the agent version it was loaded at."""
+
+    def __init__(self, max_entries: int, ttl_s: int):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.stats = CacheStats()
+        self.generation = 0
+        # (agent id, included relationships) -> (version, expires at (monotonic), state)
+        self._entries: "OrderedDict[Tuple[str, Optional[Tuple[str, ...]]], Tuple[Hashable, float, AgentState]]" = OrderedDict()
+        self._keys_by_agent: Dict[str, Set[Tuple[str, Optional[Tuple[str, ...]]]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, agent_id: str, include_relationships: Optional[List[str]], version: Hashable) -> Optional[AgentState]:
+        """A copy of the cached state of the agent, if it was cached at `version` and has not expired."""
+        key = (agent_id, _relationships_key(include_relationships))
+        entry = self._entries.get(key)
+        if entry is None or entry[0] != version or entry[1] <= time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.stats.misses += 1
+            MetricRegistry().cache_miss_counter.add(1, _METRIC_ATTRIBUTES)
+            return None
+        self._entries.move_to_end(key)
+        self.stats.hits += 1
+        MetricRegistry().cache_hit_counter.add(1, _METRIC_ATTRIBUTES)
+        return entry[2].model_copy(deep=True)
+
+    def put(
+        self,
+        agent_id: str,
+        include_relationships: Optional[List[str]],
+        version: Hashable,
+        agent_state: AgentState,
+        generation: Optional[int] = None,
+    ) -> bool:
+        """Cache a copy of `agent_state`; skipped when anything was invalidated since `generation`."""
+        if generation is not None and generation != self.generation:
+            return False
+        key = (agent_id, _relationships_key(include_relationships))
+        self._entries[key] = (version, time.monotonic() + self.ttl_s, agent_state.model_copy(deep=True))
+        self._entries.move_to_end(key)
+        self._keys_by_agent.setdefault(agent_id, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            evicted_key, _ = self._entries.popitem(last=False)
+            self._forget_key(evicted_key)
+        return True
+
+    def delete(self, agent_id: str) -> bool:
+        """Drop every cached state of the agent."""
+        self.generation += 1
+        self.stats.invalidations += 1
+        keys = self._keys_by_agent.pop(agent_id, set())
+        for key in keys:
+            self._entries.pop(key, None)
+        return bool(keys)
+
+    def clear(self) -> None:
+        self.generation += 1
+        self._entries.clear()
+        self._keys_by_agent.clear()
+
+    def _remove(self, key: Tuple[str, Optional[Tuple[str, ...]]]) -> None:
+        self._entries.pop(key, None)
+        self._forget_key(key)
+
+    def _forget_key(self, key: Tuple[str, Optional[Tuple[str, ...]]]) -> None:
+        keys = self._keys_by_agent.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_agent[key[0]]
+
+
+_agent_state_cache: Optional[AgentStateCache] = None
+
+
+def get_agent_state_cache() -> Optional[AgentStateCache]:
+    """Process-wide agent state cache, or None when disabled via `agent_state_cache_size=0`."""
+    global _agent_state_cache
+    if settings.agent_state_cache_size <= 0:
+        return None
+    if _agent_state_cache is None:
+        _agent_state_cache = AgentStateCache(max_entries=settings.agent_state_cache_size, ttl_s=settings.agent_state_cache_ttl_seconds)
+    return _agent_state_cache
+
+
+async def get_agent_state_cache_async() -> Optional[AgentStateCache]:
+    """Like `get_agent_state_cache`, also making sure invalidations published by other processes are applied."""
+    cache = get_agent_state_cache()
+    if cache is not None:
+        redis_client = await get_redis_client()
+        if not isinstance(redis_client, NoopAsyncRedisClient):
+            ensure_invalidation_listener(redis_client, cache, AGENT_STATE_INVALIDATION_CHANNEL)
+    return cache
+
+
+def invalidate_agent_states(agent_ids: Optional[Iterable[str]] = None) -> None:
+    """Drop the cached states of `agent_ids` (of every agent when None) in this process."""
+    cache = get_agent_state_cache()
+    if cache is None:
+        return
+    if agent_ids is None:
+        cache.clear()
+    else:
+        for agent_id in agent_ids:
+            cache.delete(agent_id)
+
+
+async def invalidate_agent_states_async(agent_ids: Optional[Iterable[str]] = None) -> None:
+    """Drop the cached states of `agent_ids` (of every agent when None) in this and, through redis, every other process."""
+    agent_ids = None if agent_ids is None else list(agent_ids)
+    invalidate_agent_states(agent_ids)
+    try:
+        redis_client = await get_redis_client()
+        if isinstance(redis_client, NoopAsyncRedisClient):
+            return
+        for message in [INVALIDATE_ALL] if agent_ids is None else agent_ids:
+            await redis_client.publish(AGENT_STATE_INVALIDATION_CHANNEL, message)
+    except Exception as e:
+        logger.warning(f"Failed to publish agent state invalidation: {e}")
@@ -0,0 +1,313 @@
+"""Denormalized counters read on every agent step.
+
+`agents.message_count`, `archives.passage_count` and `archives.tag_counts` mirror COUNT(*) over an agent's messages,
+COUNT(*) over an archive's passages and the passages per tag of an archive, so that compiling the system prompt does not
+scan those tables. The message and passage managers adjust them in the same transaction as the rows they write.
+
+NULL means "not counted yet": adjustments leave it alone and the first read counts once and stores the result. The
+counter reconciliation job recounts stored counters in batches to correct drift from writes that bypass the managers.
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from letta.orm.agent import Agent as AgentModel
+from letta.orm.archive import Archive as ArchiveModel
+from letta.orm.archives_agents import ArchivesAgents
+from letta.orm.message import Message as MessageModel
+from letta.orm.passage import ArchivalPassage
+from letta.orm.passage_tag import PassageTag
+
+# agents / archives recounted per transaction by the reconciliation job
+COUNTER_RECONCILIATION_BATCH_SIZE = 500
+
+
+def _message_count_subquery():
+    return select(func.count(MessageModel.id)).where(MessageModel.agent_id == AgentModel.id).scalar_subquery()
+
+
+def _passage_count_subquery():
+    return (
+        select(func.count(ArchivalPassage.id))
+        .where(ArchivalPassage.archive_id == ArchiveModel.id, ArchivalPassage.is_deleted == False)
+        .scalar_subquery()
+    )
+
+
+def _tag_counts_query(archive_ids: List[str]):
+    return (
+        select(PassageTag.archive_id, PassageTag.tag, func.count(PassageTag.id))
+        .where(PassageTag.archive_id.in_(archive_ids), PassageTag.is_deleted == False)
+        .group_by(PassageTag.archive_id, PassageTag.tag)
+    )
+
+
+def _group_by_delta(deltas: Dict[str, int]) -> Dict[int, List[str]]:
+    ids_by_delta = defaultdict(list)
+    for key, delta in deltas.items():
+        if delta:
+            ids_by_delta[delta].append(key)
+    return ids_by_delta
+
+
+def _message_count_updates(deltas: Dict[str, int]):
+    for delta, agent_ids in _group_by_delta(deltas).items():
+        yield (
+            update(AgentModel)
+            .where(AgentModel.id.in_(agent_ids), AgentModel.message_count.isnot(None))
+            .values(message_count=AgentModel.message_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _passage_count_updates(deltas: Dict[str, int]):
+    for delta, archive_ids in _group_by_delta(deltas).items():
+        yield (
+            update(ArchiveModel)
+            .where(ArchiveModel.id.in_(archive_ids), ArchiveModel.passage_count.isnot(None))
+            .values(passage_count=ArchiveModel.passage_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def _apply_tag_deltas(tag_counts: Dict[str, int], deltas: Dict[str, int]) -> Dict[str, int]:
+    tag_counts = dict(tag_counts)
+    for tag, delta in deltas.items():
+        count = tag_counts.get(tag, 0) + delta
+        if count > 0:
+            tag_counts[tag] = count
+        else:
+            tag_counts.pop(tag, None)
+    return tag_counts
+
+
+def _lock_tag_counts_query(archive_id: str):
+    # tag counts are read-modify-write, so concurrent writers to an archive serialize on its row
+    return select(ArchiveModel.tag_counts).where(ArchiveModel.id == archive_id).with_for_update()
+
+
+def _set_tag_counts(archive_id: str, tag_counts: Dict[str, int]):
+    return (
+        update(ArchiveModel).where(ArchiveModel.id == archive_id).values(tag_counts=tag_counts).execution_options(synchronize_session=False)
+    )
+
+
+def message_count_deltas(agent_ids: Iterable[Optional[str]], sign: int = 1) -> Dict[str, int]:
+    """Per-agent message count change for messages of `agent_ids` being created (`sign=1`) or deleted (`sign=-1`)."""
+    return {agent_id: count * sign for agent_id, count in Counter(agent_ids).items() if agent_id is not None}
+
+
+def passage_count_deltas(
+    passages: Iterable[Tuple[Optional[str], Optional[List[str]]]], sign: int = 1
+) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+    """Per-archive passage count and tag count changes for `(archive_id, tags)` of passages being created or deleted."""
+    passage_deltas, tag_deltas = Counter(), defaultdict(Counter)
+    for archive_id, tags in passages:
+        if archive_id is None:
+            continue
+        passage_deltas[archive_id] += sign
+        for tag in set(tags or []):
+            tag_deltas[archive_id][tag] += sign
+    return dict(passage_deltas), {archive_id: dict(deltas) for archive_id, deltas in tag_deltas.items()}
+
+
+def adjust_agent_message_counts(session: Session, deltas: Dict[str, int]) -> None:
+    for stmt in _message_count_updates(deltas):
+        session.execute(stmt)
+
+
+async def adjust_agent_message_counts_async(session: AsyncSession, deltas: Dict[str, int]) -> None:
+    """Add `deltas` to the stored message counts of agents within the caller's transaction."""
+    for stmt in _message_count_updates(deltas):
+        await session.execute(stmt)
+
+
+def adjust_archive_passage_counts(session: Session, deltas: Dict[str, int]) -> None:
+    for stmt in _passage_count_updates(deltas):
+        session.execute(stmt)
+
+
+async def adjust_archive_passage_counts_async(session: AsyncSession, deltas: Dict[str, int]) -> None:
+    """Add `deltas` to the stored passage counts of archives within the caller's transaction."""
+    for stmt in _passage_count_updates(deltas):
+        await session.execute(stmt)
+
+
+def adjust_archive_tag_counts(session: Session, deltas: Dict[str, Dict[str, int]]) -> None:
+    for archive_id, tag_deltas in deltas.items():
+        tag_counts = session.execute(_lock_tag_counts_query(archive_id)).scalar_one_or_none()
+        if tag_counts is not None and tag_deltas:
+            session.execute(_set_tag_counts(archive_id, _apply_tag_deltas(tag_counts, tag_deltas)))
+
+
+async def adjust_archive_tag_counts_async(session: AsyncSession, deltas: Dict[str, Dict[str, int]]) -> None:
+    """Add `deltas` to the stored per-tag passage counts of archives within the caller's transaction."""
+    for archive_id, tag_deltas in deltas.items():
+        tag_counts = (await session.execute(_lock_tag_counts_query(archive_id))).scalar_one_or_none()
+        if tag_counts is not None and tag_deltas:
+            await session.execute(_set_tag_counts(archive_id, _apply_tag_deltas(tag_counts, tag_deltas)))
+
+
+def _deleted_passage_count_queries(passage_ids: List[str]):
+    return (
+        select(ArchivalPassage.archive_id, func.count(ArchivalPassage.id))
+        .where(ArchivalPassage.id.in_(passage_ids), ArchivalPassage.is_deleted == False)
+        .group_by(ArchivalPassage.archive_id),
+        select(PassageTag.archive_id, PassageTag.tag, func.count(PassageTag.id))
+        .where(PassageTag.passage_id.in_(passage_ids), PassageTag.is_deleted == False)
+        .group_by(PassageTag.archive_id, PassageTag.tag),
+    )
+
+
+def _negated_deltas(passage_rows, tag_rows) -> Tuple[Dict[str, int], Dict[str, Dict[str, int]]]:
+    tag_deltas = defaultdict(dict)
+    for archive_id, tag, count in tag_rows:
+        tag_deltas[archive_id][tag] = -count
+    return {archive_id: -count for archive_id, count in passage_rows}, dict(tag_deltas)
+
+
+def adjust_archive_counts_for_deleted_passages(session: Session, passage_ids: List[str]) -> None:
+    passage_query, tag_query = _deleted_passage_count_queries(passage_ids)
+    passage_deltas, tag_deltas = _negated_deltas(session.execute(passage_query).all(), session.execute(tag_query).all())
+    adjust_archive_passage_counts(session, passage_deltas)
+    adjust_archive_tag_counts(session, tag_deltas)
+
+
+async def adjust_archive_counts_for_deleted_passages_async(session: AsyncSession, passage_ids: List[str]) -> None:
+    """Subtract the archival passages `passage_ids` (and their tags) from their archives' counters before deleting them."""
+    passage_query, tag_query = _deleted_passage_count_queries(passage_ids)
+    passage_deltas, tag_deltas = _negated_deltas((await session.execute(passage_query)).all(), (await session.execute(tag_query)).all())
+    await adjust_archive_passage_counts_async(session, passage_deltas)
+    await adjust_archive_tag_counts_async(session, tag_deltas)
+
+
+async def get_agent_message_count_async(session: AsyncSession, agent_id: str, organization_id: str) -> int:
+    """Stored message count of an agent, counting (and committing) it first if it was never counted."""
+    query = select(AgentModel.message_count).where(AgentModel.id == agent_id, AgentModel.organization_id == organization_id)
+    count = (await session.execute(query)).scalar_one_or_none()
+    if count is None:
+        await session.execute(
+            update(AgentModel)
+            .where(AgentModel.id == agent_id, AgentModel.organization_id == organization_id, AgentModel.message_count.is_(None))
+            .values(message_count=_message_count_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        count = (await session.execute(query)).scalar_one_or_none()
+    return count or 0
+
+
+async def get_agent_passage_count_async(session: AsyncSession, agent_id: str, organization_id: str) -> int:
+    """Total stored passage count of the archives attached to an agent, counting archives that were never counted."""
+    archive_ids = select(ArchivesAgents.archive_id).where(ArchivesAgents.agent_id == agent_id)
+    query = select(ArchiveModel.id, ArchiveModel.passage_count).where(
+        ArchiveModel.id.in_(archive_ids), ArchiveModel.organization_id == organization_id
+    )
+    rows = (await session.execute(query)).all()
+    uncounted = [archive_id for archive_id, count in rows if count is None]
+    if uncounted:
+        await session.execute(
+            update(ArchiveModel)
+            .where(ArchiveModel.id.in_(uncounted), ArchiveModel.passage_count.is_(None))
+            .values(passage_count=_passage_count_subquery())
+            .execution_options(synchronize_session=False)
+        )
+        await session.commit()
+        rows = (await session.execute(query)).all()
+    return sum(count or 0 for _, count in rows)
+
+
+async def get_archive_tag_counts_async(session: AsyncSession, archive_id: str, organization_id: str) -> Dict[str, int]:
+    """Stored passages per tag of an archive, counting (and committing) them first if they were never counted."""
+    query = select(ArchiveModel.tag_counts).where(ArchiveModel.id == archive_id, ArchiveModel.organization_id == organization_id)
+    row = (await session.execute(query)).first()
+    if row is None:
+        return {}
+    tag_counts = row.tag_counts
+    if tag_counts is None:
+        # another request may count it while we wait for the lock
+        tag_counts = (await session.execute(_lock_tag_counts_query(archive_id))).scalar_one_or_none()
+        if tag_counts is None:
+            rows = (await session.execute(_tag_counts_query([archive_id]))).all()
+            tag_counts = {tag: count for _, tag, count in rows}
+            await session.execute(_set_tag_counts(archive_id, tag_counts))
+        await session.commit()
+    return tag_counts
+
+
+async def reconcile_agent_message_counts_async(session: AsyncSession, after_id: Optional[str]) -> Tuple[Optional[str], int]:
+    """Recount the next batch of stored agent message counts after `after_id`.
+
+    Returns the last agent id of the batch (None when done) and the number of counters that had drifted.
+    """
+    query = select(AgentModel.id).where(AgentModel.message_count.isnot(None))
+    if after_id:
+        query = query.where(AgentModel.id > after_id)
+    agent_ids = (await session.execute(query.order_by(AgentModel.id).limit(COUNTER_RECONCILIATION_BATCH_SIZE))).scalars().all()
+    if not agent_ids:
+        return None, 0
+
+    # lock first so that writers still in flight commit before we count
+    await session.execute(select(AgentModel.id).where(AgentModel.id.in_(agent_ids)).with_for_update())
+    subquery = _message_count_subquery()
+    result = await session.execute(
+        update(AgentModel)
+        .where(AgentModel.id.in_(agent_ids), AgentModel.message_count != subquery)
+        .values(message_count=subquery)
+        .execution_options(synchronize_session=False)
+    )
+    await session.commit()
+    return agent_ids[-1], result.rowcount
+
+
+async def reconcile_archive_counts_async(session: AsyncSession, after_id: Optional[str]) -> Tuple[Optional[str], int]:
+    """Recount the next batch of stored archive passage and tag counts after `after_id`.
+
+    Returns the last archive id of the batch (None when done) and the number of archives whose counters had drifted.
+    """
+    query = select(ArchiveModel.id).where(ArchiveModel.passage_count.isnot(None) | ArchiveModel.tag_counts.isnot(None))
+    if after_id:
+        query = query.where(ArchiveModel.id > after_id)
+    archive_ids = (await session.execute(query.order_by(ArchiveModel.id).limit(COUNTER_RECONCILIATION_BATCH_SIZE))).scalars().all()
+    if not archive_ids:
+        return None, 0
+
+    stored = {
+        archive_id: (passage_count, tag_counts)
+        for archive_id, passage_count, tag_counts in await session.execute(
+            select(ArchiveModel.id, ArchiveModel.passage_count, ArchiveModel.tag_counts)
+            .where(ArchiveModel.id.in_(archive_ids))
+            .with_for_update()
+        )
+    }
+    passage_counts = dict(
+        (
+            await session.execute(
+                select(ArchivalPassage.archive_id, func.count(ArchivalPassage.id))
+                .where(ArchivalPassage.archive_id.in_(archive_ids), ArchivalPassage.is_deleted == False)
+                .group_by(ArchivalPassage.archive_id)
+            )
+        ).all()
+    )
+    tag_counts = defaultdict(dict)
+    for archive_id, tag, count in await session.execute(_tag_counts_query(archive_ids)):
+        tag_counts[archive_id][tag] = count
+
+    drifted = 0
+    for archive_id, (stored_passage_count, stored_tag_counts) in stored.items():
+        values = {}
+        if stored_passage_count is not None and stored_passage_count != passage_counts.get(archive_id, 0):
+            values["passage_count"] = passage_counts.get(archive_id, 0)
+        if stored_tag_counts is not None and stored_tag_counts != tag_counts.get(archive_id, {}):
+            values["tag_counts"] = tag_counts.get(archive_id, {})
+        if values:
+            drifted += 1
+            await session.execute(
+                update(ArchiveModel).where(ArchiveModel.id == archive_id).values(**values).execution_options(synchronize_session=False)
+            )
+    await session.commit()
+    return archive_ids[-1], drifted
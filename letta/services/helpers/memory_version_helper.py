@@ -0,0 +1,94 @@
+"""Per-agent memory version.
+
+`agents.memory_version` increases whenever something the compiled memory string depends on changes: the agent's
+memory blocks, its open files, its attached sources, its tool rules or its file settings. Writers bump it in the same
+transaction as the change, so the agent loop can compare the version with the one it last compiled and skip refreshing
+and recompiling memory while nothing has changed.
+"""
+
+from typing import Iterable, Optional
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from letta.orm.agent import Agent as AgentModel
+from letta.orm.blocks_agents import BlocksAgents
+from letta.orm.files_agents import FileAgent as FileAgentModel
+from letta.orm.sources_agents import SourcesAgents
+
+# `UpdateAgent` fields that feed into the compiled memory or the system prompt
+MEMORY_UPDATE_FIELDS = (
+    "system",
+    "tool_rules",
+    "block_ids",
+    "source_ids",
+    "enable_sleeptime",
+    "max_files_open",
+    "per_file_view_window_char_limit",
+)
+
+
+def agent_update_changes_memory(agent_update) -> bool:
+    return any(getattr(agent_update, field, None) is not None for field in MEMORY_UPDATE_FIELDS)
+
+
+def _memory_version_update(
+    agent_ids: Optional[Iterable[str]] = None,
+    block_ids: Optional[Iterable[str]] = None,
+    source_ids: Optional[Iterable[str]] = None,
+    file_ids: Optional[Iterable[str]] = None,
+):
+    conditions = []
+    if agent_ids:
+        conditions.append(AgentModel.id.in_(list(agent_ids)))
+    if block_ids:
+        conditions.append(AgentModel.id.in_(select(BlocksAgents.agent_id).where(BlocksAgents.block_id.in_(list(block_ids)))))
+    if source_ids:
+        conditions.append(AgentModel.id.in_(select(SourcesAgents.agent_id).where(SourcesAgents.source_id.in_(list(source_ids)))))
+    if file_ids:
+        conditions.append(AgentModel.id.in_(select(FileAgentModel.agent_id).where(FileAgentModel.file_id.in_(list(file_ids)))))
+    if not conditions:
+        return None
+    return (
+        update(AgentModel)
+        .where(or_(*conditions))
+        .values(memory_version=func.coalesce(AgentModel.memory_version, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def bump_memory_version(
+    session: Session,
+    agent_ids: Optional[Iterable[str]] = None,
+    block_ids: Optional[Iterable[str]] = None,
+    source_ids: Optional[Iterable[str]] = None,
+    file_ids: Optional[Iterable[str]] = None,
+) -> None:
+    """Bump the memory version of the given agents and of every agent attached to the given blocks, sources or files."""
+    stmt = _memory_version_update(agent_ids=agent_ids, block_ids=block_ids, source_ids=source_ids, file_ids=file_ids)
+    if stmt is not None:
+        session.execute(stmt)
+
+
+async def bump_memory_version_async(
+    session: AsyncSession,
+    agent_ids: Optional[Iterable[str]] = None,
+    block_ids: Optional[Iterable[str]] = None,
+    source_ids: Optional[Iterable[str]] = None,
+    file_ids: Optional[Iterable[str]] = None,
+) -> None:
+    """Bump the memory version of the given agents and of every agent attached to the given blocks, sources or files."""
+    stmt = _memory_version_update(agent_ids=agent_ids, block_ids=block_ids, source_ids=source_ids, file_ids=file_ids)
+    if stmt is not None:
+        await session.execute(stmt)
+
+
+async def get_memory_version_async(session: AsyncSession, agent_id: str, organization_id: str) -> Optional[int]:
+    """The agent's memory version, or None if the agent does not exist in the organization."""
+    result = await session.execute(
+        select(func.coalesce(AgentModel.memory_version, 0)).where(
+            AgentModel.id == agent_id, AgentModel.organization_id == organization_id, AgentModel.is_deleted == False
+        )
+    )
+    return result.scalar_one_or_none()
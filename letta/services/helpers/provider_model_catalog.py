@@ -0,0 +1,201 @@
+"""Per-process catalog of the models each provider offers.
+
+Listing a provider's models is a remote call, and the models endpoint, handle resolution and agent creation all need
+the lists. The catalog keeps a snapshot of each provider's LLM and embedding models, per organization for BYOK
+providers and shared for providers configured through the environment. Only the first listing of a provider waits on
+the provider; afterwards callers are served the snapshot and a snapshot older than its refresh time is refreshed in
+the background. Refresh times are spread with random jitter so that providers are not all listed at once. When a
+listing fails, callers keep being served the previous snapshot (or nothing, if the provider was never listed) until
+a later refresh succeeds.
+
+`ProviderManager` writes invalidate the snapshots of the organization (`invalidate_provider_catalog_async`), and
+snapshots also become invalid when the provider they were taken of was updated in another process. The catalog also
+holds the configs resolved from handles by `SyncServer.get_cached_llm_config_async` and friends, which are bounded and
+expire at the refresh interval.
+"""
+
+import asyncio
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, List, Literal, Optional, Tuple
+
+from letta.constants import GET_PROVIDERS_TIMEOUT_SECONDS
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers.decorators import CacheStats
+from letta.helpers.memory_cache import INVALIDATE_ALL, ensure_invalidation_listener
+from letta.log import get_logger
+from letta.otel.metric_registry import MetricRegistry
+from letta.schemas.providers import Provider
+from letta.settings import settings
+from letta.utils import safe_create_task
+
+logger = get_logger(__name__)
+
+PROVIDER_CATALOG_INVALIDATION_CHANNEL = "provider_catalog:invalidate"
+# how soon a listing that failed is retried
+ERROR_RETRY_SECONDS = 60
+
+_METRIC_ATTRIBUTES = {"cache": "provider_catalog", "tier": "memory"}
+
+ModelKind = Literal["llm", "embedding"]
+
+
+class _Snapshot:
+    def __init__(self, version: Hashable):
+        self.version = version
+        self.models: Optional[List[Any]] = None
+        self.refresh_at = 0.0
+        self.refresh_task: Optional[asyncio.Task] = None
+
+    def is_refreshing(self) -> bool:
+        task = self.refresh_task
+        return task is not None and not task.done() and not task.get_loop().is_closed()
+
+
+def _provider_version(provider: Provider) -> Hashable:
+    return provider.id, provider.updated_at, provider.provider_type, provider.base_url
+
+
+class ProviderModelCatalog:
+    """Snapshots of provider model lists and configs resolved from handles, see the module docstring."""
+
+    def __init__(self, refresh_interval_s: float, jitter: float, max_entries: int, max_resolved_configs: int):
+        self.refresh_interval_s = refresh_interval_s
+        self.jitter = jitter
+        self.max_entries = max(max_entries, 1)
+        self.max_resolved_configs = max_resolved_configs
+        self.stats = CacheStats()
+        # (kind, organization id, provider name) -> snapshot
+        self._snapshots: "OrderedDict[Tuple[str, Optional[str], str], _Snapshot]" = OrderedDict()
+        # (kind, organization id, resolution arguments) -> (expires at (monotonic), config)
+        self._resolved: "OrderedDict[Tuple[str, Optional[str], Hashable], Tuple[float, Any]]" = OrderedDict()
+
+    async def list_llm_models(self, provider: Provider) -> list:
+        return await self._list_models("llm", provider, provider.list_llm_models_async)
+
+    async def list_embedding_models(self, provider: Provider) -> list:
+        return await self._list_models("embedding", provider, provider.list_embedding_models_async)
+
+    def warm(self, providers: List[Provider]) -> None:
+        """List the models of the providers in the background, so that callers do not wait on their first listing."""
+        for provider in providers:
+            safe_create_task(self.list_llm_models(provider), label=f"warm_llm_models_{provider.name}")
+            safe_create_task(self.list_embedding_models(provider), label=f"warm_embedding_models_{provider.name}")
+
+    async def _list_models(self, kind: ModelKind, provider: Provider, list_models: Callable) -> list:
+        key = (kind, provider.organization_id, provider.name)
+        version = _provider_version(provider)
+        snapshot = self._snapshots.get(key)
+        if snapshot is None or snapshot.version != version:
+            snapshot = _Snapshot(version)
+            self._snapshots[key] = snapshot
+            while len(self._snapshots) > self.max_entries:
+                self._snapshots.popitem(last=False)
+        self._snapshots.move_to_end(key)
+
+        if snapshot.models is None:
+            self.stats.misses += 1
+            MetricRegistry().cache_miss_counter.add(1, _METRIC_ATTRIBUTES)
+            if not snapshot.is_refreshing():
+                snapshot.refresh_task = asyncio.create_task(self._refresh(snapshot, provider, kind, list_models))
+            # shielded, since other callers may be waiting on the same listing
+            await asyncio.shield(snapshot.refresh_task)
+        else:
+            self.stats.hits += 1
+            MetricRegistry().cache_hit_counter.add(1, _METRIC_ATTRIBUTES)
+            if snapshot.refresh_at <= time.monotonic() and not snapshot.is_refreshing():
+                snapshot.refresh_task = safe_create_task(
+                    self._refresh(snapshot, provider, kind, list_models), label=f"refresh_{kind}_models_{provider.name}"
+                )
+        return [model.model_copy() for model in snapshot.models or []]
+
+    async def _refresh(self, snapshot: _Snapshot, provider: Provider, kind: ModelKind, list_models: Callable) -> None:
+        try:
+            async with asyncio.timeout(GET_PROVIDERS_TIMEOUT_SECONDS):
+                models = await list_models()
+        except Exception as e:
+            served = "no models" if snapshot.models is None else f"{len(snapshot.models)} models listed before"
+            logger.warning(f"Failed to list {kind} models of provider {provider.name}, serving {served}: {type(e).__name__}: {e}")
+            if snapshot.models is None:
+                snapshot.models = []
+            snapshot.refresh_at = self._next_refresh(min(ERROR_RETRY_SECONDS, self.refresh_interval_s))
+            return
+        snapshot.models = models
+        snapshot.refresh_at = self._next_refresh(self.refresh_interval_s)
+
+    def _next_refresh(self, interval_s: float) -> float:
+        return time.monotonic() + interval_s * (1 + random.uniform(-self.jitter, self.jitter))
+
+    def get_resolved_config(self, kind: ModelKind, organization_id: Optional[str], key: Hashable) -> Optional[Any]:
+        entry = self._resolved.get((kind, organization_id, key))
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        self._resolved.move_to_end((kind, organization_id, key))
+        return entry[1].model_copy(deep=True)
+
+    def put_resolved_config(self, kind: ModelKind, organization_id: Optional[str], key: Hashable, config: Any) -> None:
+        self._resolved[(kind, organization_id, key)] = (time.monotonic() + self.refresh_interval_s, config.model_copy(deep=True))
+        self._resolved.move_to_end((kind, organization_id, key))
+        while len(self._resolved) > self.max_resolved_configs:
+            self._resolved.popitem(last=False)
+
+    def delete(self, organization_id: str) -> bool:
+        """Drop the snapshots of the organization's providers and the configs resolved for it."""
+        self.stats.invalidations += 1
+        snapshot_keys = [key for key in self._snapshots if key[1] == organization_id]
+        resolved_keys = [key for key in self._resolved if key[1] == organization_id]
+        for key in snapshot_keys:
+            del self._snapshots[key]
+        for key in resolved_keys:
+            del self._resolved[key]
+        return bool(snapshot_keys or resolved_keys)
+
+    def clear(self) -> None:
+        self._snapshots.clear()
+        self._resolved.clear()
+
+
+_provider_model_catalog: Optional[ProviderModelCatalog] = None
+
+
+def get_provider_model_catalog() -> ProviderModelCatalog:
+    """Process-wide provider model catalog."""
+    global _provider_model_catalog
+    if _provider_model_catalog is None:
+        _provider_model_catalog = ProviderModelCatalog(
+            refresh_interval_s=settings.provider_catalog_refresh_seconds,
+            jitter=settings.provider_catalog_refresh_jitter,
+            max_entries=settings.provider_catalog_max_entries,
+            max_resolved_configs=settings.resolved_model_config_cache_size,
+        )
+    return _provider_model_catalog
+
+
+async def get_provider_model_catalog_async() -> ProviderModelCatalog:
+    """Like `get_provider_model_catalog`, also making sure invalidations published by other processes are applied."""
+    catalog = get_provider_model_catalog()
+    redis_client = await get_redis_client()
+    if not isinstance(redis_client, NoopAsyncRedisClient):
+        ensure_invalidation_listener(redis_client, catalog, PROVIDER_CATALOG_INVALIDATION_CHANNEL)
+    return catalog
+
+
+def invalidate_provider_catalog(organization_id: Optional[str] = None) -> None:
+    """Drop what the catalog holds for the organization (for every organization when None) in this process."""
+    if organization_id is None:
+        get_provider_model_catalog().clear()
+    else:
+        get_provider_model_catalog().delete(organization_id)
+
+
+async def invalidate_provider_catalog_async(organization_id: Optional[str] = None) -> None:
+    """Like `invalidate_provider_catalog`, and through redis in every other process."""
+    invalidate_provider_catalog(organization_id)
+    try:
+        redis_client = await get_redis_client()
+        if isinstance(redis_client, NoopAsyncRedisClient):
+            return
+        await redis_client.publish(PROVIDER_CATALOG_INVALIDATION_CHANNEL, organization_id or INVALIDATE_ALL)
+    except Exception as e:
+        logger.warning(f"Failed to publish provider catalog invalidation: {e}")
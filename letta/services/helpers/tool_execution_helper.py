@@ -2,7 +2,7 @@ import os
 import platform
 import subprocess
 import venv
-from typing import TYPE_CHECKING, Dict, Optional
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 from datamodel_code_generator import DataModelType, PythonVersion
 from datamodel_code_generator.model import get_data_model_types
@@ -31,6 +31,16 @@ def find_python_executable(local_configs: LocalSandboxConfig) -> str:
         return "python.exe" if platform.system().lower().startswith("win") else "python3"
 
     venv_path = os.path.join(sandbox_dir, local_configs.venv_name)
+    return venv_python_executable(venv_path)
+
+
+def venv_python_executable(venv_path: str) -> str:
+    """
+    Returns the path of the Python binary of the virtual environment at `venv_path`.
+
+    Raises:
+        FileNotFoundError: If the virtual environment has no Python binary.
+    """
     python_exec = (
         os.path.join(venv_path, "Scripts", "python.exe")
         if platform.system().startswith("Win")
@@ -192,6 +202,35 @@ def create_venv_for_local_sandbox(sandbox_dir_path: str, venv_path: str, env: Di
         raise RuntimeError(f"Failed to set up the virtual environment: {e}")
 
 
+def create_venv_with_requirements(
+    venv_path: str, requirements: List[str], requirements_txt_path: Optional[str] = None, env: Optional[Dict[str, str]] = None
+):
+    """
+    Creates a new virtual environment at `venv_path` and installs the requirements into it.
+
+    Args:
+        venv_path (str): Path of the virtual environment, which must not exist yet.
+        requirements (list): pip-installable requirement strings.
+        requirements_txt_path (str, optional): A requirements file to install as well.
+        env (dict, optional): Environment variables to pass to pip.
+
+    Raises:
+        RuntimeError: If installing the requirements fails.
+    """
+    logger.info(f"Creating virtual environment at {venv_path} for requirements: {requirements}")
+    venv.create(venv_path, with_pip=True)
+    python_exec = venv_python_executable(venv_path)
+    ensure_pip_is_up_to_date(python_exec, env=env)
+
+    pip_cmd = [python_exec, "-m", "pip", "install"]
+    if requirements_txt_path:
+        pip_cmd += ["-r", requirements_txt_path]
+    pip_cmd += requirements
+
+    fail_msg = f"Failed to install pip packages ({', '.join(requirements)}). This may be due to package version incompatibility. Consider updating package versions or removing version constraints."
+    run_subprocess(pip_cmd, env=env, fail_msg=fail_msg)
+
+
 def add_imports_and_pydantic_schemas_for_args(args_json_schema: dict) -> str:
     data_model_types = get_data_model_types(DataModelType.PydanticV2BaseModel, target_python_version=PythonVersion.PY_311)
     parser = JsonSchemaParser(
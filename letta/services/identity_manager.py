@@ -19,6 +19,7 @@ from letta.schemas.identity import (
 )
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.agent_state_cache import invalidate_agent_states_async
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types
 
@@ -110,6 +111,9 @@ class IdentityManager:
             allow_partial=False,
         )
         await new_identity.create_async(db_session=db_session, actor=actor)
+        if identity.agent_ids:
+            # cached agent states list their identity ids
+            await invalidate_agent_states_async()
         return new_identity.to_pydantic()
 
     @enforce_types
@@ -199,6 +203,9 @@ class IdentityManager:
                 replace=replace,
             )
         await existing_identity.update_async(db_session=db_session, actor=actor)
+        if identity.agent_ids is not None:
+            # cached agent states list their identity ids
+            await invalidate_agent_states_async()
         return existing_identity.to_pydantic()
 
     @enforce_types
@@ -229,6 +236,7 @@ class IdentityManager:
                 raise HTTPException(status_code=403, detail="Forbidden")
             await session.delete(identity)
             await session.commit()
+        await invalidate_agent_states_async()
 
     @enforce_types
     @trace_method
@@ -4,6 +4,7 @@ from typing import List, Literal, Optional, Union
 
 from httpx import AsyncClient, post
 from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from letta.helpers.datetime_helpers import get_utc_time
@@ -538,14 +539,20 @@ class JobManager:
             return
 
         async with db_registry.async_session() as session:
-            # First verify job exists and user has access
-            await self._verify_job_access_async(session, job_id, actor, access=["write"])
-
-            # Create new JobMessage associations
-            job_messages = [JobMessage(job_id=job_id, message_id=message_id) for message_id in message_ids]
-            session.add_all(job_messages)
+            await self._add_messages_to_job_in_session_async(session, job_id, message_ids, actor)
             await session.commit()
 
+    async def _add_messages_to_job_in_session_async(
+        self, session: AsyncSession, job_id: str, message_ids: List[str], actor: PydanticUser
+    ) -> None:
+        """Create the JobMessage associations in `session` without committing."""
+        # First verify job exists and user has access
+        await self._verify_job_access_async(session, job_id, actor, access=["write"])
+
+        # Create new JobMessage associations
+        job_messages = [JobMessage(job_id=job_id, message_id=message_id) for message_id in message_ids]
+        session.add_all(job_messages)
+
     @enforce_types
     @trace_method
     def get_job_usage(self, job_id: str, actor: PydanticUser) -> LettaUsageStatistics:
@@ -1,9 +1,10 @@
 import json
 import uuid
 from datetime import datetime
-from typing import List, Optional, Sequence, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
 
-from sqlalchemy import delete, exists, func, select, text
+from sqlalchemy import bindparam, delete, exists, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from letta.constants import CONVERSATION_SEARCH_TOOL_NAME, DEFAULT_MESSAGE_TOOL, DEFAULT_MESSAGE_TOOL_KWARG
 from letta.log import get_logger
@@ -19,11 +20,24 @@ from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
 from letta.services.file_manager import FileManager
 from letta.services.helpers.agent_manager_helper import validate_agent_exists_async
+from letta.services.helpers.counter_helper import (
+    adjust_agent_message_counts,
+    adjust_agent_message_counts_async,
+    get_agent_message_count_async,
+    message_count_deltas,
+    reconcile_agent_message_counts_async,
+)
 from letta.settings import DatabaseChoice, settings
 from letta.utils import enforce_types, fire_and_forget
 
 logger = get_logger(__name__)
 
+# the columns a pydantic message is built from, labeled with its field names
+_PYDANTIC_MESSAGE_COLUMNS = [
+    getattr(MessageModel, f"_{name}" if name in ("created_by_id", "last_updated_by_id") else name).label(name)
+    for name in PydanticMessage.model_fields
+]
+
 
 class MessageManager:
     """Manager class to handle business logic related to Messages."""
@@ -274,6 +288,7 @@ class MessageManager:
             msg_data = pydantic_msg.model_dump(to_orm=True)
             msg_data["organization_id"] = actor.organization_id
             msg = MessageModel(**msg_data)
+            adjust_agent_message_counts(session, message_count_deltas([msg.agent_id]))
             msg.create(session, actor=actor)  # Persist to database
             return msg.to_pydantic()
 
@@ -304,6 +319,7 @@ class MessageManager:
 
         orm_messages = self._create_many_preprocess(pydantic_msgs, actor)
         with db_registry.session() as session:
+            adjust_agent_message_counts(session, message_count_deltas(msg.agent_id for msg in orm_messages))
             created_messages = MessageModel.batch_create(orm_messages, session, actor=actor)
             return [msg.to_pydantic() for msg in created_messages]
 
@@ -333,6 +349,16 @@ class MessageManager:
         if not pydantic_msgs:
             return []
 
+        orm_messages = self._prepare_many_messages(pydantic_msgs, actor)
+        async with db_registry.async_session() as session:
+            result = await self._insert_many_messages_async(session, orm_messages, actor)
+            await session.commit()
+
+        await self._embed_created_messages_async(result, actor, strict_mode=strict_mode, project_id=project_id, template_id=template_id)
+        return result
+
+    def _prepare_many_messages(self, pydantic_msgs: List[PydanticMessage], actor: PydanticUser) -> List[MessageModel]:
+        """Build the ORM rows for `pydantic_msgs`, swapping inline base64 images for file placeholders."""
         for message in pydantic_msgs:
             if isinstance(message.content, list):
                 for content in message.content:
@@ -358,30 +384,41 @@ class MessageManager:
                             media_type=content.source.media_type,
                             detail=content.source.detail,
                         )
-        orm_messages = self._create_many_preprocess(pydantic_msgs, actor)
-        async with db_registry.async_session() as session:
-            created_messages = await MessageModel.batch_create_async(orm_messages, session, actor=actor, no_commit=True, no_refresh=True)
-            result = [msg.to_pydantic() for msg in created_messages]
-            await session.commit()
+        return self._create_many_preprocess(pydantic_msgs, actor)
 
-            # embed messages in turbopuffer if enabled
-            from letta.helpers.tpuf_client import should_use_tpuf_for_messages
-
-            if should_use_tpuf_for_messages() and result:
-                # extract agent_id from the first message (all should have same agent_id)
-                agent_id = result[0].agent_id
-                if agent_id:
-                    if strict_mode:
-                        # wait for embedding to complete
-                        await self._embed_messages_background(result, actor, agent_id, project_id, template_id)
-                    else:
-                        # fire and forget - run embedding in background
-                        fire_and_forget(
-                            self._embed_messages_background(result, actor, agent_id, project_id, template_id),
-                            task_name=f"embed_messages_for_agent_{agent_id}",
-                        )
+    async def _insert_many_messages_async(
+        self, session: AsyncSession, orm_messages: List[MessageModel], actor: PydanticUser
+    ) -> List[PydanticMessage]:
+        """Insert prepared message rows and adjust the agents' message counts, without committing."""
+        created_messages = await MessageModel.batch_create_async(orm_messages, session, actor=actor, no_commit=True, no_refresh=True)
+        result = [msg.to_pydantic() for msg in created_messages]
+        await adjust_agent_message_counts_async(session, message_count_deltas(msg.agent_id for msg in result))
+        return result
 
-            return result
+    async def _embed_created_messages_async(
+        self,
+        messages: List[PydanticMessage],
+        actor: PydanticUser,
+        strict_mode: bool = False,
+        project_id: Optional[str] = None,
+        template_id: Optional[str] = None,
+    ) -> None:
+        """Embed committed messages in turbopuffer if enabled."""
+        from letta.helpers.tpuf_client import should_use_tpuf_for_messages
+
+        if should_use_tpuf_for_messages() and messages:
+            # extract agent_id from the first message (all should have same agent_id)
+            agent_id = messages[0].agent_id
+            if agent_id:
+                if strict_mode:
+                    # wait for embedding to complete
+                    await self._embed_messages_background(messages, actor, agent_id, project_id, template_id)
+                else:
+                    # fire and forget - run embedding in background
+                    fire_and_forget(
+                        self._embed_messages_background(messages, actor, agent_id, project_id, template_id),
+                        task_name=f"embed_messages_for_agent_{agent_id}",
+                    )
 
     async def _embed_messages_background(
         self,
@@ -652,6 +689,10 @@ class MessageManager:
 
         for key, value in update_data.items():
             setattr(message, key, value)
+
+        # content changed, so the cached token count is stale
+        if update_data:
+            message.num_tokens = None
         return message
 
     @enforce_types
@@ -665,6 +706,7 @@ class MessageManager:
                     identifier=message_id,
                     actor=actor,
                 )
+                adjust_agent_message_counts(session, message_count_deltas([msg.agent_id], sign=-1))
                 msg.hard_delete(session, actor=actor)
                 # Note: Turbopuffer deletion requires async, use delete_message_by_id_async for full deletion
             except NoResultFound:
@@ -682,6 +724,7 @@ class MessageManager:
                     actor=actor,
                 )
                 agent_id = msg.agent_id
+                await adjust_agent_message_counts_async(session, message_count_deltas([agent_id], sign=-1))
                 await msg.hard_delete_async(session, actor=actor)
 
                 # delete from turbopuffer if enabled
@@ -704,6 +747,53 @@ class MessageManager:
             except NoResultFound:
                 raise ValueError(f"Message with id {message_id} not found.")
 
+    @enforce_types
+    @trace_method
+    async def update_message_token_counts_async(self, token_counts: Dict[str, int], actor: PydanticUser) -> None:
+        """Persist cached token counts for messages, keyed by message id.
+
+        Args:
+            token_counts: Mapping of message id to its local token count
+            actor: User performing the action
+        """
+        if not token_counts:
+            return
+
+        stmt = (
+            update(MessageModel.__table__)
+            .where(MessageModel.__table__.c.id == bindparam("message_id"))
+            .where(MessageModel.__table__.c.organization_id == actor.organization_id)
+            .values(num_tokens=bindparam("token_count"))
+        )
+        async with db_registry.async_session() as session:
+            await session.execute(
+                stmt, [{"message_id": message_id, "token_count": num_tokens} for message_id, num_tokens in token_counts.items()]
+            )
+            await session.commit()
+
+    @enforce_types
+    @trace_method
+    async def get_message_token_counts_async(self, message_ids: List[str], actor: PydanticUser) -> Dict[str, Optional[int]]:
+        """Fetch the cached token count of each message without loading the message rows.
+
+        Args:
+            message_ids: Messages to look up
+            actor: User performing the action
+
+        Returns:
+            Mapping of message id to its cached count, None where no count is cached yet
+        """
+        if not message_ids:
+            return {}
+
+        async with db_registry.async_session() as session:
+            result = await session.execute(
+                select(MessageModel.id, MessageModel.num_tokens).where(
+                    MessageModel.id.in_(message_ids), MessageModel.organization_id == actor.organization_id
+                )
+            )
+            return {message_id: num_tokens for message_id, num_tokens in result.all()}
+
     @enforce_types
     @trace_method
     def size(
@@ -737,6 +827,27 @@ class MessageManager:
         async with db_registry.async_session() as session:
             return await MessageModel.size_async(db_session=session, actor=actor, role=role, agent_id=agent_id)
 
+    @enforce_types
+    @trace_method
+    async def agent_message_count_async(self, agent_id: str, actor: PydanticUser) -> int:
+        """Get the number of messages stored for an agent from its maintained counter.
+
+        Same result as `size_async(agent_id=...)`, without counting the agent's messages on every call.
+        """
+        async with db_registry.async_session() as session:
+            return await get_agent_message_count_async(session, agent_id=agent_id, organization_id=actor.organization_id)
+
+    @trace_method
+    async def reconcile_agent_message_counts_async(self) -> int:
+        """Recount the maintained message counters of all agents. Returns the number of counters that had drifted."""
+        after_id, drifted = None, 0
+        while True:
+            async with db_registry.async_session() as session:
+                after_id, batch_drifted = await reconcile_agent_message_counts_async(session, after_id=after_id)
+            drifted += batch_drifted
+            if after_id is None:
+                return drifted
+
     @enforce_types
     @trace_method
     def list_user_messages_for_agent(
@@ -862,7 +973,7 @@ class MessageManager:
                 after_ref = session.query(MessageModel.sequence_id).filter(MessageModel.id == after).one_or_none()
                 if not after_ref:
                     raise NoResultFound(f"No message found with id '{after}' for agent '{agent_id}'.")
-                # Filter out any messages with a sequence_id <= after_ref.sequence_id
+                # Filter out any messages with a sequence_id <= that of the after message
                 query = query.filter(MessageModel.sequence_id > after_ref.sequence_id)
 
             # Apply 'before' pagination if specified.
@@ -870,7 +981,7 @@ class MessageManager:
                 before_ref = session.query(MessageModel.sequence_id).filter(MessageModel.id == before).one_or_none()
                 if not before_ref:
                     raise NoResultFound(f"No message found with id '{before}' for agent '{agent_id}'.")
-                # Filter out any messages with a sequence_id >= before_ref.sequence_id
+                # Filter out any messages with a sequence_id >= that of the before message
                 query = query.filter(MessageModel.sequence_id < before_ref.sequence_id)
 
             # Apply ordering based on the ascending flag.
@@ -933,57 +1044,21 @@ class MessageManager:
             await validate_agent_exists_async(session, agent_id, actor)
 
             # Build a query that directly filters the Message table by agent_id.
-            query = select(MessageModel).where(MessageModel.agent_id == agent_id)
-
-            # If group_id is provided, filter messages by group_id.
-            if group_id:
-                query = query.where(MessageModel.group_id == group_id)
-
-            if not include_err:
-                query = query.where((MessageModel.is_err == False) | (MessageModel.is_err.is_(None)))
-
-            # If query_text is provided, filter messages using database-specific JSON search.
-            if query_text:
-                if settings.database_engine is DatabaseChoice.POSTGRES:
-                    # PostgreSQL: Use json_array_elements and ILIKE
-                    content_element = func.json_array_elements(MessageModel.content).alias("content_element")
-                    query = query.where(
-                        exists(
-                            select(1)
-                            .select_from(content_element)
-                            .where(text("content_element->>'type' = 'text' AND content_element->>'text' ILIKE :query_text"))
-                            .params(query_text=f"%{query_text}%")
-                        )
-                    )
-                else:
-                    # SQLite: Use JSON_EXTRACT with individual array indices for case-insensitive search
-                    # Since SQLite doesn't support $[*] syntax, we'll use a different approach
-                    query = query.where(text("JSON_EXTRACT(content, '$') LIKE :query_text")).params(query_text=f"%{query_text}%")
-
-            # If role(s) are provided, filter messages by those roles.
-            if roles:
-                role_values = [r.value for r in roles]
-                query = query.where(MessageModel.role.in_(role_values))
+            query = self._filter_agent_messages(
+                select(MessageModel), agent_id, group_id=group_id, include_err=include_err, query_text=query_text, roles=roles
+            )
 
             # Apply 'after' pagination if specified.
             if after:
-                after_query = select(MessageModel.sequence_id).where(MessageModel.id == after)
-                after_result = await session.execute(after_query)
-                after_ref = after_result.one_or_none()
-                if not after_ref:
-                    raise NoResultFound(f"No message found with id '{after}' for agent '{agent_id}'.")
-                # Filter out any messages with a sequence_id <= after_ref.sequence_id
-                query = query.where(MessageModel.sequence_id > after_ref.sequence_id)
+                after_sequence_id = await self._get_cursor_sequence_id_async(session, after, agent_id)
+                # Filter out any messages with a sequence_id <= that of the after message
+                query = query.where(MessageModel.sequence_id > after_sequence_id)
 
             # Apply 'before' pagination if specified.
             if before:
-                before_query = select(MessageModel.sequence_id).where(MessageModel.id == before)
-                before_result = await session.execute(before_query)
-                before_ref = before_result.one_or_none()
-                if not before_ref:
-                    raise NoResultFound(f"No message found with id '{before}' for agent '{agent_id}'.")
-                # Filter out any messages with a sequence_id >= before_ref.sequence_id
-                query = query.where(MessageModel.sequence_id < before_ref.sequence_id)
+                before_sequence_id = await self._get_cursor_sequence_id_async(session, before, agent_id)
+                # Filter out any messages with a sequence_id >= that of the before message
+                query = query.where(MessageModel.sequence_id < before_sequence_id)
 
             # Apply ordering based on the ascending flag.
             if ascending:
@@ -999,6 +1074,127 @@ class MessageManager:
             results = result.scalars().all()
             return [msg.to_pydantic() for msg in results]
 
+    @enforce_types
+    async def iter_messages_for_agent_async(
+        self,
+        agent_id: str,
+        actor: PydanticUser,
+        after: Optional[str] = None,
+        roles: Optional[Sequence[MessageRole]] = None,
+        group_id: Optional[str] = None,
+        include_err: Optional[bool] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[PydanticMessage]]:
+        """
+        Iterate over all messages of an agent in ascending sequence_id order, in batches of at most `batch_size`.
+
+        Meant for exporting message histories of any length. Unlike paging through `list_messages_for_agent_async`,
+        every batch continues from the sequence_id of the previous one (keyset pagination on the index on
+        (agent_id, sequence_id)), so later batches are as cheap as the first. Each batch is read in its own short
+        session, so no connection is held while the caller consumes a batch and memory stays bounded by `batch_size`.
+        Only the columns of the pydantic message are selected, so no ORM objects or relationships (e.g. the step) are
+        loaded.
+
+        Args:
+            agent_id: The ID of the agent whose messages are exported.
+            actor: The user performing the action (used for permission checks).
+            after: A message ID; if provided, only messages *after* this message (by sequence_id) are returned.
+            roles: Optional MessageRoles to filter messages by.
+            group_id: Optional group ID to filter messages by group_id.
+            include_err: Optional boolean to include errors and error statuses. Used for debugging only.
+            batch_size: Maximum number of messages per batch.
+
+        Raises:
+            NoResultFound: If the agent or the provided after message ID does not exist.
+        """
+        query = self._filter_agent_messages(
+            select(*_PYDANTIC_MESSAGE_COLUMNS, MessageModel.text, MessageModel.sequence_id),
+            agent_id,
+            group_id=group_id,
+            include_err=include_err,
+            roles=roles,
+        )
+        async with db_registry.async_session() as session:
+            await validate_agent_exists_async(session, agent_id, actor)
+            last_sequence_id = await self._get_cursor_sequence_id_async(session, after, agent_id) if after else None
+
+        while True:
+            batch_query = query if last_sequence_id is None else query.where(MessageModel.sequence_id > last_sequence_id)
+            batch_query = batch_query.order_by(MessageModel.sequence_id.asc()).limit(batch_size)
+            async with db_registry.async_session() as session:
+                rows = (await session.execute(batch_query)).all()
+            if not rows:
+                return
+            yield [self._message_from_row(row) for row in rows]
+            if len(rows) < batch_size:
+                return
+            last_sequence_id = rows[-1].sequence_id
+
+    @staticmethod
+    def _filter_agent_messages(
+        query,
+        agent_id: str,
+        group_id: Optional[str] = None,
+        include_err: Optional[bool] = None,
+        query_text: Optional[str] = None,
+        roles: Optional[Sequence[MessageRole]] = None,
+    ):
+        """Restrict a query on the Message table to the messages of an agent matching the given filters."""
+        query = query.where(MessageModel.agent_id == agent_id)
+
+        # If group_id is provided, filter messages by group_id.
+        if group_id:
+            query = query.where(MessageModel.group_id == group_id)
+
+        if not include_err:
+            query = query.where((MessageModel.is_err == False) | (MessageModel.is_err.is_(None)))
+
+        # If query_text is provided, filter messages using database-specific JSON search.
+        if query_text:
+            if settings.database_engine is DatabaseChoice.POSTGRES:
+                # PostgreSQL: Use json_array_elements and ILIKE
+                content_element = func.json_array_elements(MessageModel.content).alias("content_element")
+                query = query.where(
+                    exists(
+                        select(1)
+                        .select_from(content_element)
+                        .where(text("content_element->>'type' = 'text' AND content_element->>'text' ILIKE :query_text"))
+                        .params(query_text=f"%{query_text}%")
+                    )
+                )
+            else:
+                # SQLite: Use JSON_EXTRACT with individual array indices for case-insensitive search
+                # Since SQLite doesn't support $[*] syntax, we'll use a different approach
+                query = query.where(text("JSON_EXTRACT(content, '$') LIKE :query_text")).params(query_text=f"%{query_text}%")
+
+        # If role(s) are provided, filter messages by those roles.
+        if roles:
+            role_values = [r.value for r in roles]
+            query = query.where(MessageModel.role.in_(role_values))
+
+        return query
+
+    @staticmethod
+    async def _get_cursor_sequence_id_async(session: AsyncSession, message_id: str, agent_id: str) -> int:
+        result = await session.execute(select(MessageModel.sequence_id).where(MessageModel.id == message_id))
+        sequence_id = result.scalar_one_or_none()
+        if sequence_id is None:
+            raise NoResultFound(f"No message found with id '{message_id}' for agent '{agent_id}'.")
+        return sequence_id
+
+    @staticmethod
+    def _message_from_row(row) -> PydanticMessage:
+        """Build a pydantic message from a row of `_PYDANTIC_MESSAGE_COLUMNS` the way `MessageModel.to_pydantic` does."""
+        values = row._asdict()
+        legacy_text = values.pop("text")
+        values.pop("sequence_id")
+        message = PydanticMessage.model_validate(values)
+        if legacy_text and not message.content:
+            message.content = [TextContent(text=legacy_text)]
+        if not message.tool_calls:
+            message.tool_calls = None
+        return message
+
     @enforce_types
     @trace_method
     async def delete_all_messages_for_agent_async(
@@ -1023,6 +1219,7 @@ class MessageManager:
                 stmt = stmt.where(~MessageModel.id.in_(exclude_ids))
 
             result = await session.execute(stmt)
+            await adjust_agent_message_counts_async(session, {agent_id: -result.rowcount})
 
             # 4) commit once
             await session.commit()
@@ -1060,23 +1257,22 @@ class MessageManager:
             return 0
 
         async with db_registry.async_session() as session:
-            # get agent_ids BEFORE deleting (for turbopuffer)
-            agent_ids = []
+            # get agent_ids BEFORE deleting (for the message counters and turbopuffer)
             from letta.helpers.tpuf_client import TurbopufferClient, should_use_tpuf_for_messages
 
-            if should_use_tpuf_for_messages():
-                agent_query = (
-                    select(MessageModel.agent_id)
-                    .where(MessageModel.id.in_(message_ids))
-                    .where(MessageModel.organization_id == actor.organization_id)
-                    .distinct()
-                )
-                agent_result = await session.execute(agent_query)
-                agent_ids = [row[0] for row in agent_result.fetchall() if row[0]]
+            agent_query = (
+                select(MessageModel.agent_id, func.count(MessageModel.id))
+                .where(MessageModel.id.in_(message_ids))
+                .where(MessageModel.organization_id == actor.organization_id)
+                .group_by(MessageModel.agent_id)
+            )
+            deleted_counts = {agent_id: count for agent_id, count in (await session.execute(agent_query)).all() if agent_id}
+            agent_ids = list(deleted_counts)
 
             # issue a CORE DELETE against the mapped class for specific message IDs
             stmt = delete(MessageModel).where(MessageModel.id.in_(message_ids)).where(MessageModel.organization_id == actor.organization_id)
             result = await session.execute(stmt)
+            await adjust_agent_message_counts_async(session, {agent_id: -count for agent_id, count in deleted_counts.items()})
 
             # commit once
             await session.commit()
@@ -1,8 +1,11 @@
+import asyncio
 import uuid
+from collections import Counter, defaultdict
 from datetime import datetime, timezone
 from functools import lru_cache
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 from openai import AsyncOpenAI, OpenAI
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,6 +13,14 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from letta.constants import MAX_EMBEDDING_DIM
 from letta.embeddings import parse_and_chunk_text
 from letta.helpers.decorators import async_redis_cache
+from letta.helpers.embedding_cache import embed_with_cache
+from letta.helpers.sqlite_vector_index import (
+    PassageVectorIndex,
+    VectorIndexKind,
+    get_passage_vector_index,
+    should_use_sqlite_vector_index,
+    updated_at_timestamp,
+)
 from letta.llm_api.llm_client import LLMClient
 from letta.log import get_logger
 from letta.orm import ArchivesAgents
@@ -24,10 +35,24 @@ from letta.schemas.passage import Passage as PydanticPassage
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
 from letta.services.archive_manager import ArchiveManager
+from letta.services.helpers.counter_helper import (
+    adjust_archive_counts_for_deleted_passages,
+    adjust_archive_counts_for_deleted_passages_async,
+    adjust_archive_passage_counts,
+    adjust_archive_passage_counts_async,
+    adjust_archive_tag_counts,
+    adjust_archive_tag_counts_async,
+    get_agent_passage_count_async,
+    get_archive_tag_counts_async,
+    passage_count_deltas,
+    reconcile_archive_counts_async,
+)
 from letta.utils import enforce_types
 
 logger = get_logger(__name__)
 
+VECTOR_INDEX_BUILD_BATCH_SIZE = 1000
+
 
 # TODO: Add redis-backed caching for backend
 @lru_cache(maxsize=8192)
@@ -72,26 +97,28 @@ class PassageManager:
         if not tags:
             return []
 
-        tag_objects = []
-        for tag in tags:
-            tag_obj = PassageTag(
-                id=f"passage-tag-{uuid.uuid4()}",
-                tag=tag,
-                passage_id=passage_id,
-                archive_id=archive_id,
-                organization_id=organization_id,
-            )
-            tag_objects.append(tag_obj)
-
         # batch create all tags
         created_tags = await PassageTag.batch_create_async(
-            items=tag_objects,
+            items=self._build_passage_tags(passage_id, archive_id, organization_id, tags),
             db_session=session,
             actor=actor,
         )
 
         return created_tags
 
+    @staticmethod
+    def _build_passage_tags(passage_id: str, archive_id: str, organization_id: str, tags: List[str]) -> List[PassageTag]:
+        return [
+            PassageTag(
+                id=f"passage-tag-{uuid.uuid4()}",
+                tag=tag,
+                passage_id=passage_id,
+                archive_id=archive_id,
+                organization_id=organization_id,
+            )
+            for tag in tags
+        ]
+
     # AGENT PASSAGE METHODS
     @enforce_types
     @trace_method
@@ -219,9 +246,23 @@ class PassageManager:
         agent_fields = {"archive_id": data["archive_id"]}
         passage = ArchivalPassage(**common_fields, **agent_fields)
 
+        passage_deltas, tag_deltas = passage_count_deltas([(passage.archive_id, tags)])
         with db_registry.session() as session:
+            adjust_archive_passage_counts(session, passage_deltas)
             passage.create(session, actor=actor)
-            return passage.to_pydantic()
+            created = passage.to_pydantic()
+
+            # dual storage: save tags to junction table for efficient queries
+            if tags:
+                adjust_archive_tag_counts(session, tag_deltas)
+                PassageTag.batch_create(
+                    items=self._build_passage_tags(created.id, created.archive_id, created.organization_id, tags),
+                    db_session=session,
+                    actor=actor,
+                )
+
+        self._update_vector_index(VectorIndexKind.ARCHIVE, passages=[created])
+        return created
 
     @enforce_types
     @trace_method
@@ -253,11 +294,14 @@ class PassageManager:
         agent_fields = {"archive_id": data["archive_id"]}
         passage = ArchivalPassage(**common_fields, **agent_fields)
 
+        passage_deltas, tag_deltas = passage_count_deltas([(passage.archive_id, tags)])
         async with db_registry.async_session() as session:
+            await adjust_archive_passage_counts_async(session, passage_deltas)
             passage = await passage.create_async(session, actor=actor)
 
             # dual storage: save tags to junction table for efficient queries
             if tags:  # use the deduplicated tags variable
+                await adjust_archive_tag_counts_async(session, tag_deltas)
                 await self._create_tags_for_passage(
                     session=session,
                     passage_id=passage.id,
@@ -267,7 +311,10 @@ class PassageManager:
                     actor=actor,
                 )
 
-            return passage.to_pydantic()
+            created = passage.to_pydantic()
+
+        await self._update_vector_index_async(VectorIndexKind.ARCHIVE, passages=[created])
+        return created
 
     @enforce_types
     @trace_method
@@ -307,7 +354,10 @@ class PassageManager:
 
         with db_registry.session() as session:
             passage.create(session, actor=actor)
-            return passage.to_pydantic()
+            created = passage.to_pydantic()
+
+        self._update_vector_index(VectorIndexKind.SOURCE, passages=[created])
+        return created
 
     @enforce_types
     @trace_method
@@ -347,7 +397,10 @@ class PassageManager:
 
         async with db_registry.async_session() as session:
             passage = await passage.create_async(session, actor=actor)
-            return passage.to_pydantic()
+            created = passage.to_pydantic()
+
+        await self._update_vector_index_async(VectorIndexKind.SOURCE, passages=[created])
+        return created
 
     # DEPRECATED - Use specific methods above
     @enforce_types
@@ -363,6 +416,8 @@ class PassageManager:
         passage = self._preprocess_passage_for_creation(pydantic_passage=pydantic_passage)
 
         with db_registry.session() as session:
+            if isinstance(passage, ArchivalPassage):
+                adjust_archive_passage_counts(session, {passage.archive_id: 1})
             passage.create(session, actor=actor)
             return passage.to_pydantic()
 
@@ -381,6 +436,8 @@ class PassageManager:
         # Common fields for both passage types
         passage = self._preprocess_passage_for_creation(pydantic_passage=pydantic_passage)
         async with db_registry.async_session() as session:
+            if isinstance(passage, ArchivalPassage):
+                await adjust_archive_passage_counts_async(session, {passage.archive_id: 1})
             passage = await passage.create_async(session, actor=actor)
             return passage.to_pydantic()
 
@@ -435,6 +492,12 @@ class PassageManager:
                 raise ValueError("Archival passage cannot have source_id")
 
             data = p.model_dump(to_orm=True)
+
+            # Deduplicate tags if provided (for dual storage consistency)
+            tags = data.get("tags")
+            if tags:
+                tags = list(dict.fromkeys(tags))
+
             common_fields = {
                 "id": data.get("id"),
                 "text": data["text"],
@@ -442,16 +505,33 @@ class PassageManager:
                 "embedding_config": data["embedding_config"],
                 "organization_id": data["organization_id"],
                 "metadata_": data.get("metadata", {}),
-                "tags": data.get("tags"),
+                "tags": tags,
                 "is_deleted": data.get("is_deleted", False),
                 "created_at": data.get("created_at", datetime.now(timezone.utc)),
             }
             archival_fields = {"archive_id": data["archive_id"]}
             archival_passages.append(ArchivalPassage(**common_fields, **archival_fields))
 
+        passage_deltas, tag_deltas = passage_count_deltas((p.archive_id, p.tags) for p in archival_passages)
         async with db_registry.async_session() as session:
+            await adjust_archive_passage_counts_async(session, passage_deltas)
             archival_created = await ArchivalPassage.batch_create_async(items=archival_passages, db_session=session, actor=actor)
-            return [p.to_pydantic() for p in archival_created]
+
+            # dual storage: save tags to junction table for efficient queries
+            passage_tags = [
+                tag
+                for passage in archival_created
+                if passage.tags
+                for tag in self._build_passage_tags(passage.id, passage.archive_id, passage.organization_id, passage.tags)
+            ]
+            if passage_tags:
+                await adjust_archive_tag_counts_async(session, tag_deltas)
+                await PassageTag.batch_create_async(items=passage_tags, db_session=session, actor=actor)
+
+            created = [p.to_pydantic() for p in archival_created]
+
+        await self._update_vector_index_async(VectorIndexKind.ARCHIVE, passages=created)
+        return created
 
     @enforce_types
     @trace_method
@@ -495,7 +575,10 @@ class PassageManager:
 
         async with db_registry.async_session() as session:
             source_created = await SourcePassage.batch_create_async(items=source_passages, db_session=session, actor=actor)
-            return [p.to_pydantic() for p in source_created]
+            created = [p.to_pydantic() for p in source_created]
+
+        await self._update_vector_index_async(VectorIndexKind.SOURCE, passages=created)
+        return created
 
     # DEPRECATED - Use specific methods above
     @enforce_types
@@ -538,6 +621,7 @@ class PassageManager:
 
             results = []
             if agent_passages:
+                await adjust_archive_passage_counts_async(session, passage_count_deltas((p.archive_id, None) for p in agent_passages)[0])
                 agent_created = await ArchivalPassage.batch_create_async(items=agent_passages, db_session=session, actor=actor)
                 results.extend(agent_created)
             if source_passages:
@@ -587,7 +671,12 @@ class PassageManager:
 
         try:
             # Generate embeddings for all chunks using the new async API
-            embeddings = await embedding_client.request_embeddings(text_chunks, agent_state.embedding_config)
+            embeddings = await embed_with_cache(
+                text_chunks,
+                agent_state.embedding_config,
+                lambda texts: embedding_client.request_embeddings(texts, agent_state.embedding_config),
+                organization_id=actor.organization_id,
+            )
 
             passages = []
 
@@ -651,7 +740,12 @@ class PassageManager:
             actor=actor,
         )
 
-        embeddings = await embedding_client.request_embeddings(text_chunks, embedding_config)
+        embeddings = await embed_with_cache(
+            text_chunks,
+            embedding_config,
+            lambda texts: embedding_client.request_embeddings(texts, embedding_config),
+            organization_id=actor.organization_id,
+        )
         return embeddings
 
     @enforce_types
@@ -680,7 +774,11 @@ class PassageManager:
 
             # Commit changes
             curr_passage.update(session, actor=actor)
-            return curr_passage.to_pydantic()
+            updated = curr_passage.to_pydantic()
+
+        if "embedding" in update_data:
+            self._update_vector_index(VectorIndexKind.ARCHIVE, passages=[updated])
+        return updated
 
     @enforce_types
     @trace_method
@@ -714,6 +812,12 @@ class PassageManager:
                 # Delete existing tags from junction table
                 from sqlalchemy import delete
 
+                old_tags = (
+                    await session.execute(select(PassageTag.tag).where(PassageTag.passage_id == passage_id, PassageTag.is_deleted == False))
+                ).scalars()
+                tag_deltas = Counter(new_tags or [])
+                tag_deltas.subtract(old_tags)
+                await adjust_archive_tag_counts_async(session, {curr_passage.archive_id: dict(tag_deltas)})
                 await session.execute(delete(PassageTag).where(PassageTag.passage_id == passage_id))
 
                 # Create new tags in junction table
@@ -736,7 +840,11 @@ class PassageManager:
 
             # Commit changes
             await curr_passage.update_async(session, actor=actor)
-            return curr_passage.to_pydantic()
+            updated = curr_passage.to_pydantic()
+
+        if "embedding" in update_data:
+            await self._update_vector_index_async(VectorIndexKind.ARCHIVE, passages=[updated])
+        return updated
 
     @enforce_types
     @trace_method
@@ -764,7 +872,11 @@ class PassageManager:
 
             # Commit changes
             curr_passage.update(session, actor=actor)
-            return curr_passage.to_pydantic()
+            updated = curr_passage.to_pydantic()
+
+        if "embedding" in update_data:
+            self._update_vector_index(VectorIndexKind.SOURCE, passages=[updated])
+        return updated
 
     @enforce_types
     @trace_method
@@ -792,7 +904,11 @@ class PassageManager:
 
             # Commit changes
             await curr_passage.update_async(session, actor=actor)
-            return curr_passage.to_pydantic()
+            updated = curr_passage.to_pydantic()
+
+        if "embedding" in update_data:
+            await self._update_vector_index_async(VectorIndexKind.SOURCE, passages=[updated])
+        return updated
 
     @enforce_types
     @trace_method
@@ -804,7 +920,10 @@ class PassageManager:
         with db_registry.session() as session:
             try:
                 passage = ArchivalPassage.read(db_session=session, identifier=passage_id, actor=actor)
+                deleted = passage.to_pydantic()
+                adjust_archive_counts_for_deleted_passages(session, [passage_id])
                 passage.hard_delete(session, actor=actor)
+                self._update_vector_index(VectorIndexKind.ARCHIVE, deleted=[deleted])
                 return True
             except NoResultFound:
                 raise NoResultFound(f"Agent passage with id {passage_id} not found.")
@@ -821,8 +940,12 @@ class PassageManager:
                 passage = await ArchivalPassage.read_async(db_session=session, identifier=passage_id, actor=actor)
                 archive_id = passage.archive_id
 
+                deleted = passage.to_pydantic()
+
                 # Delete from SQL first
+                await adjust_archive_counts_for_deleted_passages_async(session, [passage_id])
                 await passage.hard_delete_async(session, actor=actor)
+                await self._update_vector_index_async(VectorIndexKind.ARCHIVE, deleted=[deleted])
 
                 # Check if archive uses Turbopuffer and dual-delete
                 if archive_id:
@@ -852,7 +975,9 @@ class PassageManager:
         with db_registry.session() as session:
             try:
                 passage = SourcePassage.read(db_session=session, identifier=passage_id, actor=actor)
+                deleted = passage.to_pydantic()
                 passage.hard_delete(session, actor=actor)
+                self._update_vector_index(VectorIndexKind.SOURCE, deleted=[deleted])
                 return True
             except NoResultFound:
                 raise NoResultFound(f"Source passage with id {passage_id} not found.")
@@ -867,7 +992,9 @@ class PassageManager:
         async with db_registry.async_session() as session:
             try:
                 passage = await SourcePassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                deleted = passage.to_pydantic()
                 await passage.hard_delete_async(session, actor=actor)
+                await self._update_vector_index_async(VectorIndexKind.SOURCE, deleted=[deleted])
                 return True
             except NoResultFound:
                 raise NoResultFound(f"Source passage with id {passage_id} not found.")
@@ -941,6 +1068,7 @@ class PassageManager:
                 # Try archival passages
                 try:
                     passage = ArchivalPassage.read(db_session=session, identifier=passage_id, actor=actor)
+                    adjust_archive_counts_for_deleted_passages(session, [passage_id])
                     passage.hard_delete(session, actor=actor)
                     return True
                 except NoResultFound:
@@ -971,6 +1099,7 @@ class PassageManager:
                 # Try archival passages
                 try:
                     passage = await ArchivalPassage.read_async(db_session=session, identifier=passage_id, actor=actor)
+                    await adjust_archive_counts_for_deleted_passages_async(session, [passage_id])
                     await passage.hard_delete_async(session, actor=actor)
                     return True
                 except NoResultFound:
@@ -1004,7 +1133,9 @@ class PassageManager:
 
         async with db_registry.async_session() as session:
             # Delete from SQL first
+            await adjust_archive_counts_for_deleted_passages_async(session, [p.id for p in passages])
             await ArchivalPassage.bulk_hard_delete_async(db_session=session, identifiers=[p.id for p in passages], actor=actor)
+            await self._update_vector_index_async(VectorIndexKind.ARCHIVE, deleted=passages)
 
             # Group passages by archive_id for efficient Turbopuffer deletion
             passages_by_archive = {}
@@ -1053,6 +1184,7 @@ class PassageManager:
     ) -> bool:
         async with db_registry.async_session() as session:
             await SourcePassage.bulk_hard_delete_async(db_session=session, identifiers=[p.id for p in passages], actor=actor)
+            await self._update_vector_index_async(VectorIndexKind.SOURCE, deleted=passages)
             return True
 
     # DEPRECATED - Use specific methods above
@@ -1152,6 +1284,27 @@ class PassageManager:
                 # Count all archival passages in the organization
                 return await ArchivalPassage.size_async(db_session=session, actor=actor)
 
+    @enforce_types
+    @trace_method
+    async def agent_passage_count_async(self, agent_id: str, actor: PydanticUser) -> int:
+        """Get the number of passages in an agent's archives from their maintained counters.
+
+        Same result as `agent_passage_size_async(agent_id=...)`, without counting the passages on every call.
+        """
+        async with db_registry.async_session() as session:
+            return await get_agent_passage_count_async(session, agent_id=agent_id, organization_id=actor.organization_id)
+
+    @trace_method
+    async def reconcile_archive_counts_async(self) -> int:
+        """Recount the maintained passage and tag counters of all archives. Returns the number of archives that had drifted."""
+        after_id, drifted = None, 0
+        while True:
+            async with db_registry.async_session() as session:
+                after_id, batch_drifted = await reconcile_archive_counts_async(session, after_id=after_id)
+            drifted += batch_drifted
+            if after_id is None:
+                return drifted
+
     @enforce_types
     @trace_method
     def source_passage_size(
@@ -1220,6 +1373,20 @@ class PassageManager:
             passages = result.scalars().all()
             return [p.to_pydantic() for p in passages]
 
+    @enforce_types
+    @trace_method
+    async def list_passage_texts_by_file_id_async(self, file_id: str, actor: PydanticUser) -> List[Tuple[str, str]]:
+        """
+        List (id, text) of the source passages stored for a file, without loading embeddings.
+        """
+        async with db_registry.async_session() as session:
+            result = await session.execute(
+                select(SourcePassage.id, SourcePassage.text)
+                .where(SourcePassage.file_id == file_id)
+                .where(SourcePassage.organization_id == actor.organization_id)
+            )
+            return [(passage_id, text) for passage_id, text in result.all()]
+
     @enforce_types
     @trace_method
     async def get_unique_tags_for_archive_async(
@@ -1253,6 +1420,17 @@ class PassageManager:
 
             return list(tags)
 
+    @enforce_types
+    @trace_method
+    async def get_archive_tags_async(self, archive_id: str, actor: PydanticUser) -> List[str]:
+        """Get all unique tags for an archive from its maintained tag counts.
+
+        Same result as `get_unique_tags_for_archive_async`, without a DISTINCT scan over the archive's tags.
+        """
+        async with db_registry.async_session() as session:
+            tag_counts = await get_archive_tag_counts_async(session, archive_id=archive_id, organization_id=actor.organization_id)
+            return sorted(tag_counts)
+
     @enforce_types
     @trace_method
     async def get_tag_counts_for_archive_async(
@@ -1285,3 +1463,141 @@ class PassageManager:
             rows = result.all()
 
             return {row.tag: row.count for row in rows}
+
+    # SQLITE VECTOR INDEX METHODS
+    @staticmethod
+    def _vector_index_container(kind: VectorIndexKind):
+        if kind is VectorIndexKind.ARCHIVE:
+            return ArchivalPassage, ArchivalPassage.archive_id
+        return SourcePassage, SourcePassage.source_id
+
+    async def _update_vector_index_async(
+        self,
+        kind: VectorIndexKind,
+        passages: Optional[List[PydanticPassage]] = None,
+        deleted: Optional[List[PydanticPassage]] = None,
+    ) -> None:
+        if not should_use_sqlite_vector_index():
+            return
+        await asyncio.to_thread(self._update_vector_index, kind, passages, deleted)
+
+    def _update_vector_index(
+        self,
+        kind: VectorIndexKind,
+        passages: Optional[List[PydanticPassage]] = None,
+        deleted: Optional[List[PydanticPassage]] = None,
+    ) -> None:
+        """Apply writes to already-built SQLite vector indexes.
+
+        Best effort: an index that misses a write no longer matches the row count / newest `updated_at` in SQL and
+        is rebuilt by the next search, so failures here are only logged.
+        """
+        if not should_use_sqlite_vector_index():
+            return
+
+        def container_id(passage: PydanticPassage) -> Optional[str]:
+            return passage.archive_id if kind is VectorIndexKind.ARCHIVE else passage.source_id
+
+        updates = defaultdict(lambda: ([], []))
+        for passage in deleted or []:
+            updates[container_id(passage)][1].append(passage.id)
+        for passage in passages or []:
+            if passage.embedding is not None:
+                updates[container_id(passage)][0].append(passage)
+
+        for cid, (added, deleted_ids) in updates.items():
+            if cid is None:
+                continue
+            index = get_passage_vector_index(kind, cid)
+            if not index.exists:
+                # built lazily by the first search
+                continue
+            try:
+                if deleted_ids:
+                    index.remove(deleted_ids)
+                if added:
+                    vectors = np.array([p.embedding for p in added], dtype=np.float32)
+                    timestamps = [updated_at_timestamp(p.updated_at) for p in added]
+                    updated_at = max((ts for ts in timestamps if ts is not None), default=None)
+                    index.add([p.id for p in added], vectors, updated_at=updated_at)
+            except Exception as e:
+                logger.warning(f"Failed to update {kind.value} vector index for {cid}, it will be rebuilt on the next search: {e}")
+                index.drop()
+
+    async def _get_synced_vector_index_async(self, kind: VectorIndexKind, container_id: str) -> PassageVectorIndex:
+        """Return the vector index for an archive or source, (re)building it from SQL if it has drifted.
+
+        Drift is detected by comparing the number of embedded passages and their newest `updated_at` against the
+        index, which catches missed inserts and deletes as well as embeddings replaced behind the index's back.
+        """
+        model, container_column = self._vector_index_container(kind)
+        index = get_passage_vector_index(kind, container_id)
+        embedded = (container_column == container_id, model.embedding.isnot(None))
+        fingerprint_query = select(func.count(model.id), func.max(model.updated_at)).where(*embedded)
+
+        async def in_sync(session) -> bool:
+            if not index.exists:
+                return False
+            num_passages, max_updated_at = (await session.execute(fingerprint_query)).one()
+            num_indexed, indexed_updated_at = await asyncio.to_thread(index.fingerprint)
+            if num_indexed != num_passages:
+                return False
+            max_updated_at = updated_at_timestamp(max_updated_at)
+            return max_updated_at is None or (indexed_updated_at is not None and indexed_updated_at >= max_updated_at)
+
+        async with db_registry.async_session() as session:
+            if await in_sync(session):
+                return index
+
+            async with index.rebuild_lock:
+                # another request may have rebuilt it while we waited
+                if await in_sync(session):
+                    return index
+
+                configs = (
+                    await session.execute(select(model.embedding_config).where(container_column == container_id).distinct())
+                ).scalars()
+                dim = max((config.embedding_dim for config in configs if config is not None), default=MAX_EMBEDDING_DIM)
+                logger.info(f"Building {kind.value} vector index for {container_id} (dim {dim})")
+
+                # built privately and swapped in, so other processes keep searching the old index meanwhile
+                staging = index.staging()
+                try:
+                    await asyncio.to_thread(staging.reset, dim)
+                    result = await session.stream(select(model.id, model.embedding, model.updated_at).where(*embedded))
+                    async for rows in result.partitions(VECTOR_INDEX_BUILD_BATCH_SIZE):
+                        vectors = np.stack([np.asarray(row.embedding, dtype=np.float32) for row in rows])
+                        timestamps = [updated_at_timestamp(row.updated_at) for row in rows]
+                        updated_at = max((ts for ts in timestamps if ts is not None), default=None)
+                        await asyncio.to_thread(staging.add, [row.id for row in rows], vectors, False, updated_at)
+                    await asyncio.to_thread(staging.maybe_train)
+                    await asyncio.to_thread(index.swap_in, staging)
+                except BaseException:
+                    await asyncio.to_thread(staging.drop)
+                    staging.lock_path.unlink(missing_ok=True)
+                    raise
+                return index
+
+    @enforce_types
+    @trace_method
+    async def search_vector_index_async(
+        self,
+        kind: VectorIndexKind,
+        container_ids: List[str],
+        query_embedding: List[float],
+        top_k: int,
+    ) -> List[str]:
+        """Rank the passages of archives or sources by similarity using the SQLite vector index.
+
+        Results are candidates only: they are not filtered by date, tags or organization, so callers re-apply
+        their filters in SQL on the returned ids.
+
+        Returns:
+            Up to `top_k` passage ids, most similar first
+        """
+        ranked = []
+        for container_id in container_ids:
+            index = await self._get_synced_vector_index_async(kind, container_id)
+            ranked.extend(await asyncio.to_thread(index.search, query_embedding, top_k))
+        ranked.sort(key=lambda item: item[1])
+        return [passage_id for passage_id, _ in ranked[:top_k]]
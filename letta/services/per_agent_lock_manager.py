@@ -1,22 +1,263 @@
-import threading
-from collections import defaultdict
+import asyncio
+import itertools
+import time
+import uuid
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
 
+from letta.constants import REDIS_AGENT_LOCK_PREFIX
+from letta.data_sources.redis_client import AsyncRedisClient, NoopAsyncRedisClient, get_redis_client
+from letta.errors import AgentLockTimeoutError
+from letta.log import get_logger
+from letta.otel.context import get_ctx_attributes
+from letta.otel.metric_registry import MetricRegistry
 from letta.otel.tracing import trace_method
+from letta.settings import settings
 
+logger = get_logger(__name__)
 
-class PerAgentLockManager:
-    """Manages per-agent locks."""
+# leases held by the current task, so writers deep in the step can check they still own the agent
+_held_leases: ContextVar[Dict[str, "AgentLockLease"]] = ContextVar("held_agent_lock_leases", default={})
+
+
+@dataclass
+class AgentLockLease:
+    """A held per-agent lock.
+
+    `fencing_token` increases monotonically per agent (across workers when redis is configured), so
+    downstream writers can reject work from a holder whose lease has since expired. When `fenced` is set,
+    the token was issued by the store itself and writes to the agent's message_ids are rejected once a
+    newer holder has claimed the agent (see `AgentManager.claim_lock_fencing_token_async`).
+    """
+
+    agent_id: str
+    owner: str
+    fencing_token: int
+    acquired_at: float = field(default_factory=time.monotonic)
+    distributed: bool = False
+    fenced: bool = False
+    lost: bool = False
+
+
+@dataclass
+class LockStats:
+    """Note: approximate, counters are not synchronized."""
+
+    acquisitions: int = 0
+    contended: int = 0
+    timeouts: int = 0
+    lost_leases: int = 0
+    total_wait_ms: float = 0.0
+
+
+class _LocalLock:
+    __slots__ = ("lock", "refcount")
 
     def __init__(self):
-        self.locks = defaultdict(threading.Lock)
+        self.lock = asyncio.Lock()
+        self.refcount = 0
 
-    @trace_method
-    def get_lock(self, agent_id: str) -> threading.Lock:
-        """Retrieve the lock for a specific agent_id."""
-        return self.locks[agent_id]
+
+class PerAgentLockManager:
+    """Manages per-agent locks.
+
+    A process-local asyncio lock is always taken first so coroutines in the same worker queue up without
+    touching redis. When redis is available, a lease (`SET NX PX`) is then taken so other workers and pods
+    are excluded as well; the lease is renewed in the background while held and expires on its own if the
+    holder dies. Locks are reference counted and dropped as soon as nobody holds or waits on them, so the
+    lock table only ever contains agents with in-flight requests.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[AsyncRedisClient] = None,
+        lease_s: Optional[float] = None,
+        retry_interval_s: float = 0.05,
+    ):
+        self._redis_client = redis_client
+        self.lease_s = lease_s or settings.per_agent_lock_lease_seconds
+        self.retry_interval_s = retry_interval_s
+        self._locks: Dict[str, _LocalLock] = {}
+        # process-wide counter, so tokens stay monotonic per agent even after its lock entry is evicted
+        self._local_fencing_tokens = itertools.count(1)
+        self.stats = LockStats()
+
+    async def _get_redis_client(self) -> Optional[AsyncRedisClient]:
+        client = self._redis_client or await get_redis_client()
+        return None if isinstance(client, NoopAsyncRedisClient) else client
+
+    @staticmethod
+    def _lease_key(agent_id: str) -> str:
+        return f"{REDIS_AGENT_LOCK_PREFIX}:{agent_id}"
+
+    @staticmethod
+    def _fence_key(agent_id: str) -> str:
+        return f"{REDIS_AGENT_LOCK_PREFIX}:{agent_id}:fence"
+
+    def is_locked(self, agent_id: str) -> bool:
+        """Whether the agent is locked by this process."""
+        entry = self._locks.get(agent_id)
+        return entry is not None and entry.lock.locked()
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def lock(
+        self,
+        agent_id: str,
+        timeout_s: Optional[float] = None,
+        issue_fencing_token: Optional[Callable[[], Awaitable[int]]] = None,
+    ) -> AsyncIterator[AgentLockLease]:
+        """Hold the lock for `agent_id` for the duration of the context.
+
+        Args:
+            agent_id: The agent to lock
+            timeout_s: Max seconds to wait for the lock, defaults to `settings.per_agent_lock_timeout_seconds`
+            issue_fencing_token: Issues the fencing token of a distributed lease from the store guarding the
+                agent's writes, instead of the redis counter
+
+        Raises:
+            AgentLockTimeoutError: If the lock could not be acquired in time
+        """
+        timeout_s = timeout_s if timeout_s is not None else settings.per_agent_lock_timeout_seconds
+        lease = await self._acquire(agent_id, timeout_s, issue_fencing_token)
+        renew_task = None
+        if lease.distributed:
+            renew_task = asyncio.create_task(self._renew_lease(lease))
+        held_token = _held_leases.set({**_held_leases.get(), agent_id: lease})
+        try:
+            yield lease
+        finally:
+            try:
+                _held_leases.reset(held_token)
+            except ValueError:
+                # released from another context, e.g. once a streamed response has been sent
+                pass
+            if renew_task:
+                renew_task.cancel()
+            await self._release(lease)
 
     @trace_method
-    def clear_lock(self, agent_id: str):
-        """Optionally remove a lock if no longer needed (to prevent unbounded growth)."""
-        if agent_id in self.locks:
-            del self.locks[agent_id]
+    async def _acquire(
+        self, agent_id: str, timeout_s: float, issue_fencing_token: Optional[Callable[[], Awaitable[int]]] = None
+    ) -> AgentLockLease:
+        start = time.monotonic()
+        deadline = start + timeout_s
+
+        entry = self._locks.get(agent_id)
+        if entry is None:
+            entry = self._locks[agent_id] = _LocalLock()
+        entry.refcount += 1
+
+        # someone else already holds or is waiting on this agent
+        contended = entry.refcount > 1
+        acquired = False
+        try:
+            async with asyncio.timeout(timeout_s):
+                await entry.lock.acquire()
+                acquired = True
+        except BaseException as e:
+            # the timeout can fire after the lock was handed to us, don't leak it
+            if acquired:
+                entry.lock.release()
+            self._drop_ref(agent_id, entry)
+            if isinstance(e, TimeoutError):
+                self._raise_timeout(agent_id, timeout_s)
+            raise
+
+        owner = uuid.uuid4().hex
+        try:
+            redis_client = await self._get_redis_client()
+            if redis_client is None:
+                lease = AgentLockLease(agent_id=agent_id, owner=owner, fencing_token=next(self._local_fencing_tokens))
+            else:
+                key = self._lease_key(agent_id)
+                while not await redis_client.set(key, owner, px=int(self.lease_s * 1000), nx=True):
+                    contended = True
+                    if time.monotonic() >= deadline:
+                        self._raise_timeout(agent_id, timeout_s)
+                    await asyncio.sleep(self.retry_interval_s)
+                if issue_fencing_token is not None:
+                    fencing_token = await issue_fencing_token()
+                else:
+                    fencing_token = await redis_client.incr(self._fence_key(agent_id))
+                lease = AgentLockLease(
+                    agent_id=agent_id,
+                    owner=owner,
+                    fencing_token=fencing_token,
+                    distributed=True,
+                    fenced=issue_fencing_token is not None,
+                )
+        except BaseException:
+            entry.lock.release()
+            self._drop_ref(agent_id, entry)
+            raise
+
+        wait_ms = (time.monotonic() - start) * 1000
+        self.stats.acquisitions += 1
+        self.stats.total_wait_ms += wait_ms
+        MetricRegistry().agent_lock_wait_ms_histogram.record(wait_ms, get_ctx_attributes())
+        if contended:
+            self.stats.contended += 1
+            MetricRegistry().agent_lock_contention_counter.add(1, get_ctx_attributes())
+        return lease
+
+    async def _release(self, lease: AgentLockLease) -> None:
+        try:
+            if lease.distributed and not lease.lost:
+                redis_client = await self._get_redis_client()
+                if redis_client is not None:
+                    await redis_client.compare_and_delete(self._lease_key(lease.agent_id), lease.owner)
+        except Exception as e:
+            # the lease will expire on its own
+            logger.warning(f"Failed to release lock lease for agent {lease.agent_id}: {e}")
+        finally:
+            entry = self._locks.get(lease.agent_id)
+            if entry is not None:
+                entry.lock.release()
+                self._drop_ref(lease.agent_id, entry)
+
+    async def _renew_lease(self, lease: AgentLockLease) -> None:
+        interval = self.lease_s / 3
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                redis_client = await self._get_redis_client()
+                renewed = redis_client is not None and await redis_client.compare_and_expire(
+                    self._lease_key(lease.agent_id), lease.owner, int(self.lease_s * 1000)
+                )
+            except Exception as e:
+                logger.warning(f"Failed to renew lock lease for agent {lease.agent_id}: {e}")
+                continue
+            if not renewed:
+                lease.lost = True
+                self.stats.lost_leases += 1
+                logger.warning(f"Lost lock lease for agent {lease.agent_id} (fencing token {lease.fencing_token})")
+                return
+
+    def _drop_ref(self, agent_id: str, entry: _LocalLock) -> None:
+        entry.refcount -= 1
+        if entry.refcount <= 0 and self._locks.get(agent_id) is entry:
+            del self._locks[agent_id]
+
+    def _raise_timeout(self, agent_id: str, timeout_s: float) -> None:
+        self.stats.timeouts += 1
+        raise AgentLockTimeoutError(agent_id=agent_id, timeout_s=timeout_s)
+
+
+_lock_manager: Optional[PerAgentLockManager] = None
+
+
+def get_held_lease(agent_id: str) -> Optional[AgentLockLease]:
+    """The lease the current task holds on `agent_id`, if any."""
+    return _held_leases.get().get(agent_id)
+
+
+def get_per_agent_lock_manager() -> PerAgentLockManager:
+    global _lock_manager
+    if _lock_manager is None:
+        _lock_manager = PerAgentLockManager()
+    return _lock_manager
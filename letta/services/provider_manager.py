@@ -6,6 +6,7 @@ from letta.schemas.enums import ProviderCategory, ProviderType
 from letta.schemas.providers import Provider as PydanticProvider, ProviderCheck, ProviderCreate, ProviderUpdate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.provider_model_catalog import invalidate_provider_catalog, invalidate_provider_catalog_async
 from letta.utils import enforce_types
 
 
@@ -29,7 +30,9 @@ class ProviderManager:
 
             new_provider = ProviderModel(**provider.model_dump(to_orm=True, exclude_unset=True))
             new_provider.create(session, actor=actor)
-            return new_provider.to_pydantic()
+            created_provider = new_provider.to_pydantic()
+        invalidate_provider_catalog(actor.organization_id)
+        return created_provider
 
     @enforce_types
     @trace_method
@@ -50,7 +53,9 @@ class ProviderManager:
 
             new_provider = ProviderModel(**provider.model_dump(to_orm=True, exclude_unset=True))
             await new_provider.create_async(session, actor=actor)
-            return new_provider.to_pydantic()
+            created_provider = new_provider.to_pydantic()
+        await invalidate_provider_catalog_async(actor.organization_id)
+        return created_provider
 
     @enforce_types
     @trace_method
@@ -67,7 +72,9 @@ class ProviderManager:
 
             # Commit the updated provider
             existing_provider.update(session, actor=actor)
-            return existing_provider.to_pydantic()
+            updated_provider = existing_provider.to_pydantic()
+        invalidate_provider_catalog(actor.organization_id)
+        return updated_provider
 
     @enforce_types
     @trace_method
@@ -86,7 +93,9 @@ class ProviderManager:
 
             # Commit the updated provider
             await existing_provider.update_async(session, actor=actor)
-            return existing_provider.to_pydantic()
+            updated_provider = existing_provider.to_pydantic()
+        await invalidate_provider_catalog_async(actor.organization_id)
+        return updated_provider
 
     @enforce_types
     @trace_method
@@ -102,6 +111,7 @@ class ProviderManager:
             existing_provider.delete(session, actor=actor)
 
             session.commit()
+        invalidate_provider_catalog(actor.organization_id)
 
     @enforce_types
     @trace_method
@@ -119,6 +129,7 @@ class ProviderManager:
             await existing_provider.delete_async(session, actor=actor)
 
             await session.commit()
+        await invalidate_provider_catalog_async(actor.organization_id)
 
     @enforce_types
     @trace_method
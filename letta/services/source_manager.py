@@ -4,6 +4,7 @@ from typing import List, Optional, Union
 from sqlalchemy import and_, exists, select
 
 from letta.helpers.pinecone_utils import should_use_pinecone
+from letta.helpers.sqlite_vector_index import VectorIndexKind, drop_passage_vector_index, should_use_sqlite_vector_index
 from letta.helpers.tpuf_client import should_use_tpuf
 from letta.orm import Agent as AgentModel
 from letta.orm.errors import NoResultFound
@@ -15,6 +16,7 @@ from letta.schemas.enums import VectorDBProvider
 from letta.schemas.source import Source as PydanticSource, SourceUpdate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
+from letta.services.helpers.memory_version_helper import bump_memory_version_async
 from letta.utils import enforce_types, printd
 
 
@@ -210,6 +212,7 @@ class SourceManager:
             if update_data:
                 for key, value in update_data.items():
                     setattr(source, key, value)
+                await bump_memory_version_async(session, source_ids=[source_id])
                 await source.update_async(db_session=session, actor=actor)
             else:
                 printd(
@@ -224,8 +227,13 @@ class SourceManager:
         """Delete a source by its ID."""
         async with db_registry.async_session() as session:
             source = await SourceModel.read_async(db_session=session, identifier=source_id)
+            await bump_memory_version_async(session, source_ids=[source_id])
             await source.hard_delete_async(db_session=session, actor=actor)
-            return source.to_pydantic()
+            deleted = source.to_pydantic()
+
+        if should_use_sqlite_vector_index():
+            await asyncio.to_thread(drop_passage_vector_index, VectorIndexKind.SOURCE, source_id)
+        return deleted
 
     @enforce_types
     @trace_method
@@ -148,6 +148,49 @@ class StepManager:
         error_type: Optional[str] = None,
         error_data: Optional[Dict] = None,
     ) -> PydanticStep:
+        step_data = self._build_step_data(
+            actor=actor,
+            agent_id=agent_id,
+            provider_name=provider_name,
+            provider_category=provider_category,
+            model=model,
+            model_endpoint=model_endpoint,
+            context_window_limit=context_window_limit,
+            usage=usage,
+            provider_id=provider_id,
+            job_id=job_id,
+            step_id=step_id,
+            project_id=project_id,
+            stop_reason=stop_reason,
+            status=status,
+            error_type=error_type,
+            error_data=error_data,
+        )
+        async with db_registry.async_session() as session:
+            pydantic_step = await self._insert_step_async(session, step_data)
+            await session.commit()
+            return pydantic_step
+
+    def _build_step_data(
+        self,
+        actor: PydanticUser,
+        agent_id: str,
+        provider_name: str,
+        provider_category: str,
+        model: str,
+        model_endpoint: Optional[str],
+        context_window_limit: int,
+        usage: UsageStatistics,
+        provider_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        step_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        stop_reason: Optional[LettaStopReason] = None,
+        status: Optional[StepStatus] = None,
+        error_type: Optional[str] = None,
+        error_data: Optional[Dict] = None,
+    ) -> Dict:
+        """The column values of a new step row."""
         step_data = {
             "origin": None,
             "organization_id": actor.organization_id,
@@ -174,12 +217,23 @@ class StepManager:
             step_data["id"] = step_id
         if stop_reason:
             step_data["stop_reason"] = stop_reason.stop_reason
-        async with db_registry.async_session() as session:
-            new_step = StepModel(**step_data)
-            await new_step.create_async(session, no_commit=True, no_refresh=True)
-            pydantic_step = new_step.to_pydantic()
-            await session.commit()
-            return pydantic_step
+        return step_data
+
+    async def _insert_step_async(self, session: AsyncSession, step_data: Dict) -> PydanticStep:
+        """Insert a step row built by `_build_step_data` without committing."""
+        new_step = StepModel(**step_data)
+        await new_step.create_async(session, no_commit=True, no_refresh=True)
+        return new_step.to_pydantic()
+
+    async def _update_step_async(self, session: AsyncSession, actor: PydanticUser, step_id: str, values: Dict) -> None:
+        """Set columns of an existing step in `session` without committing."""
+        step = await session.get(StepModel, step_id)
+        if not step:
+            raise NoResultFound(f"Step with id {step_id} does not exist")
+        if step.organization_id != actor.organization_id:
+            raise Exception("Unauthorized")
+        for column, value in values.items():
+            setattr(step, column, value)
 
     @enforce_types
     @trace_method
@@ -398,6 +452,8 @@ class StepManager:
         project_id: Optional[str] = None,
         template_id: Optional[str] = None,
         base_template_id: Optional[str] = None,
+        cache_read_tokens: Optional[int] = None,
+        cache_creation_tokens: Optional[int] = None,
     ) -> PydanticStepMetrics:
         """Record performance metrics for a step.
 
@@ -412,6 +468,8 @@ class StepManager:
             project_id: The ID of the project
             template_id: The ID of the template
             base_template_id: The ID of the base template
+            cache_read_tokens: Prompt tokens read from the provider's prompt cache
+            cache_creation_tokens: Prompt tokens written to the provider's prompt cache
 
         Returns:
             The created step metrics
@@ -437,11 +495,17 @@ class StepManager:
                 "step_ns": step_ns,
                 "template_id": template_id,
                 "base_template_id": base_template_id,
+                "cache_read_tokens": cache_read_tokens,
+                "cache_creation_tokens": cache_creation_tokens,
             }
 
-            metrics = StepMetricsModel(**metrics_data)
-            await metrics.create_async(session)
-            return metrics.to_pydantic()
+            return await self._insert_step_metrics_async(session, metrics_data, no_commit=False)
+
+    async def _insert_step_metrics_async(self, session: AsyncSession, metrics_data: Dict, no_commit: bool = True) -> PydanticStepMetrics:
+        """Insert a step metrics row, by default without committing."""
+        metrics = StepMetricsModel(**metrics_data)
+        await metrics.create_async(session, no_commit=no_commit, no_refresh=no_commit)
+        return metrics.to_pydantic()
 
     def _verify_job_access(
         self,
@@ -0,0 +1,194 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from letta.otel.tracing import trace_method
+from letta.schemas.enums import StepStatus
+from letta.schemas.letta_stop_reason import LettaStopReason
+from letta.schemas.message import Message as PydanticMessage
+from letta.schemas.openai.chat_completion_response import UsageStatistics
+from letta.schemas.step import Step as PydanticStep
+from letta.schemas.step_metrics import StepMetrics as PydanticStepMetrics
+from letta.schemas.user import User as PydanticUser
+from letta.server.db import db_registry
+from letta.services.agent_manager import AgentManager
+from letta.services.job_manager import JobManager
+from letta.services.message_manager import MessageManager
+from letta.services.step_manager import StepManager
+
+
+@dataclass
+class _PendingMessages:
+    messages: List[PydanticMessage]
+    job_id: Optional[str] = None
+    project_id: Optional[str] = None
+    template_id: Optional[str] = None
+
+
+@dataclass
+class StepWriteBuffer:
+    """Unit of work for the database writes of one agent step.
+
+    The agent loop records the step row, the messages it produced, their job associations, the agent's new
+    message_ids and the step metrics here as the step progresses, and `flush_async` writes all of them in a single
+    transaction. Rows are inserted parent first (step, then messages, then the rows pointing at messages), so a step
+    is either persisted with everything it produced or not at all, and a crash can never leave messages pointing at a
+    missing step or message_ids pointing at missing messages.
+
+    The buffer can be flushed again after more writes are recorded; the step row is then updated instead of inserted.
+    """
+
+    actor: PydanticUser
+    step_manager: StepManager
+    message_manager: MessageManager
+    job_manager: JobManager
+    agent_manager: AgentManager
+
+    _step_data: Optional[Dict] = field(default=None, init=False)
+    _step_persisted: bool = field(default=False, init=False)
+    # columns changed after the step row was inserted
+    _step_updates: Dict = field(default_factory=dict, init=False)
+    _pending_messages: List[_PendingMessages] = field(default_factory=list, init=False)
+    _message_ids: Optional[tuple[str, List[str]]] = field(default=None, init=False)
+    _metrics_data: Optional[Dict] = field(default=None, init=False)
+
+    @property
+    def has_pending_writes(self) -> bool:
+        return bool(
+            (self._step_data is not None and not self._step_persisted)
+            or self._step_updates
+            or self._pending_messages
+            or self._message_ids is not None
+            or self._metrics_data is not None
+        )
+
+    def log_step(self, **step_kwargs) -> PydanticStep:
+        """Record a new step row; takes the arguments of `StepManager.log_step_async`."""
+        if not step_kwargs.get("step_id"):
+            step_kwargs["step_id"] = PydanticStep.generate_id()
+        self._step_data = self.step_manager._build_step_data(actor=self.actor, **step_kwargs)
+        self._step_persisted = False
+        self._step_updates = {}
+        return PydanticStep(**self._step_data)
+
+    def mark_step_success(self, usage: UsageStatistics, stop_reason: Optional[LettaStopReason] = None) -> None:
+        self._update_step(
+            status=StepStatus.SUCCESS,
+            completion_tokens=usage.completion_tokens,
+            prompt_tokens=usage.prompt_tokens,
+            total_tokens=usage.total_tokens,
+        )
+        if stop_reason:
+            self._update_step(stop_reason=stop_reason.stop_reason)
+
+    def mark_step_failed(
+        self,
+        error_type: str,
+        error_message: str,
+        error_traceback: str,
+        error_details: Optional[Dict] = None,
+        stop_reason: Optional[LettaStopReason] = None,
+    ) -> None:
+        self._update_step(
+            status=StepStatus.FAILED,
+            error_type=error_type,
+            error_data={"message": error_message, "traceback": error_traceback, "details": error_details},
+        )
+        if stop_reason:
+            self._update_step(stop_reason=stop_reason.stop_reason)
+
+    def set_stop_reason(self, stop_reason: LettaStopReason) -> None:
+        self._update_step(stop_reason=stop_reason.stop_reason)
+
+    def add_messages(
+        self,
+        messages: List[PydanticMessage],
+        job_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        template_id: Optional[str] = None,
+    ) -> None:
+        """Record messages to create; when `job_id` is set, the non-user messages are also added to the job."""
+        if messages:
+            self._pending_messages.append(_PendingMessages(messages, job_id=job_id, project_id=project_id, template_id=template_id))
+
+    def discard_messages(self) -> None:
+        self._pending_messages = []
+        self._message_ids = None
+
+    def set_message_ids(self, agent_id: str, message_ids: List[str]) -> None:
+        self._message_ids = (agent_id, list(message_ids))
+
+    def record_step_metrics(
+        self,
+        step_metrics: PydanticStepMetrics,
+        agent_id: Optional[str] = None,
+        job_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        template_id: Optional[str] = None,
+        base_template_id: Optional[str] = None,
+    ) -> None:
+        self._metrics_data = {
+            "id": step_metrics.id,
+            "organization_id": self.actor.organization_id,
+            "agent_id": agent_id,
+            "job_id": job_id,
+            "project_id": project_id,
+            "llm_request_ns": step_metrics.llm_request_ns,
+            "tool_execution_ns": step_metrics.tool_execution_ns,
+            "step_ns": step_metrics.step_ns,
+            "template_id": template_id,
+            "base_template_id": base_template_id,
+            "cache_read_tokens": step_metrics.cache_read_tokens,
+            "cache_creation_tokens": step_metrics.cache_creation_tokens,
+        }
+
+    @trace_method
+    async def flush_async(self) -> List[PydanticMessage]:
+        """Write everything recorded since the last flush in one transaction and return the created messages."""
+        if not self.has_pending_writes:
+            return []
+
+        pending_messages = self._pending_messages
+        created: List[List[PydanticMessage]] = []
+        async with db_registry.async_session() as session:
+            if self._step_data is not None:
+                if not self._step_persisted:
+                    await self.step_manager._insert_step_async(session, self._step_data)
+                elif self._step_updates:
+                    await self.step_manager._update_step_async(session, self.actor, self._step_data["id"], self._step_updates)
+
+            for pending in pending_messages:
+                orm_messages = self.message_manager._prepare_many_messages(pending.messages, self.actor)
+                created.append(await self.message_manager._insert_many_messages_async(session, orm_messages, self.actor))
+
+            for pending, messages in zip(pending_messages, created):
+                job_message_ids = [m.id for m in messages if m.role != "user"]
+                if pending.job_id and job_message_ids:
+                    await self.job_manager._add_messages_to_job_in_session_async(session, pending.job_id, job_message_ids, self.actor)
+
+            if self._message_ids is not None:
+                agent_id, message_ids = self._message_ids
+                await self.agent_manager._update_message_ids_in_session_async(session, agent_id, message_ids, self.actor)
+
+            if self._metrics_data is not None:
+                await self.step_manager._insert_step_metrics_async(session, self._metrics_data)
+
+            await session.commit()
+
+        self._step_persisted = self._step_data is not None
+        self._step_updates = {}
+        self._pending_messages = []
+        self._message_ids = None
+        self._metrics_data = None
+
+        for pending, messages in zip(pending_messages, created):
+            await self.message_manager._embed_created_messages_async(
+                messages, self.actor, project_id=pending.project_id, template_id=pending.template_id
+            )
+        return [message for messages in created for message in messages]
+
+    def _update_step(self, **values) -> None:
+        if self._step_data is None:
+            return
+        self._step_data.update(values)
+        if self._step_persisted:
+            self._step_updates.update(values)
@@ -1,6 +1,6 @@
 import asyncio
 import re
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 from letta.constants import PINECONE_TEXT_FIELD_NAME
 from letta.functions.types import FileOpenRequest
@@ -19,6 +19,7 @@ from letta.services.agent_manager import AgentManager
 from letta.services.block_manager import BlockManager
 from letta.services.file_manager import FileManager
 from letta.services.file_processor.chunker.line_chunker import LineChunker
+from letta.services.file_processor.chunker.line_index import FileLineIndex, build_line_index, chunk_from_span
 from letta.services.files_agents_manager import FileAgentManager
 from letta.services.job_manager import JobManager
 from letta.services.message_manager import MessageManager
@@ -41,6 +42,8 @@ class LettaFileToolExecutor(ToolExecutor):
     GREP_TIMEOUT_SECONDS = 30  # Max time for grep_files operation
     MAX_CONTEXT_LINES = 1  # Lines of context around matches
     MAX_TOTAL_COLLECTED = 1000  # Reasonable upper limit to prevent memory issues
+    GREP_READ_BATCH_LINES = 256  # Candidate lines read from a file's content per query
+    GREP_FULL_READ_FRACTION = 4  # Read the whole content when more than 1 in this many lines are candidates
 
     def __init__(
         self,
@@ -261,49 +264,75 @@ class LettaFileToolExecutor(ToolExecutor):
         except re.error as e:
             raise ValueError(f"Invalid regex pattern: {e}")
 
-    def _get_context_lines(
-        self,
-        formatted_lines: List[str],
-        match_line_num: int,
-        context_lines: int,
-    ) -> List[str]:
-        """Get context lines around a match from already-chunked lines.
+    async def _load_line_index(self, file_id: str, line_index: Optional[bytes]) -> Tuple[Optional[FileLineIndex], Optional[str]]:
+        """The file's line index, and its content if it had to be loaded to build the index.
 
-        Args:
-            formatted_lines: Already chunked lines from LineChunker (format: "line_num: content")
-            match_line_num: The 1-based line number of the match
-            context_lines: Number of context lines before and after
+        Files stored before line indexes were built are indexed on their first search.
         """
-        if not formatted_lines or context_lines < 0:
-            return []
-
-        # Find the index of the matching line in the formatted_lines list
-        match_formatted_idx = None
-        for i, line in enumerate(formatted_lines):
-            if line and ":" in line:
-                try:
-                    line_num = int(line.split(":", 1)[0].strip())
-                    if line_num == match_line_num:
-                        match_formatted_idx = i
-                        break
-                except ValueError:
-                    continue
+        if line_index is not None:
+            index = FileLineIndex.from_bytes(line_index)
+            if index is not None:
+                return index, None
+
+        file = await self.file_manager.get_file_by_id(file_id=file_id, actor=self.actor, include_content=True)
+        if not file or not file.content:
+            return None, None
+        line_index = await asyncio.to_thread(build_line_index, file, file.content)
+        if line_index is None:
+            return None, None
+        await self.file_manager.set_line_index_async(file_id, line_index, actor=self.actor)
+        return FileLineIndex.from_bytes(line_index), file.content
+
+    async def _read_lines(
+        self, file_id: str, index: FileLineIndex, content: Optional[str], line_idxs: List[int], context_lines: int
+    ) -> Dict[int, str]:
+        """Read the lines and the lines around them (0-based line number -> line as LineChunker produces it).
+
+        Without the file content at hand, only the ranges of the content covering these lines are loaded.
+        """
+        wanted = sorted(
+            {
+                i
+                for line_idx in line_idxs
+                for i in range(max(0, line_idx - context_lines), min(index.num_lines, line_idx + context_lines + 1))
+            }
+        )
 
-        if match_formatted_idx is None:
-            return []
+        # runs of consecutive lines, each read as one range of the content
+        runs = []
+        for i in wanted:
+            if runs and runs[-1][1] == i - 1:
+                runs[-1][1] = i
+            else:
+                runs.append([i, i])
+        ranges = [(int(index.spans[first, 0]), int(index.spans[last, 1])) for first, last in runs]
+        if content is None:
+            texts = await self.file_manager.get_file_content_ranges_async(file_id, ranges, actor=self.actor)
+        else:
+            texts = [content[start:end] for start, end in ranges]
 
-        # Calculate context range with bounds checking
-        start_idx = max(0, match_formatted_idx - context_lines)
-        end_idx = min(len(formatted_lines), match_formatted_idx + context_lines + 1)
+        lines = {}
+        for (first, last), (range_start, _), text in zip(runs, ranges, texts):
+            for i in range(first, last + 1):
+                start, end = int(index.spans[i, 0]), int(index.spans[i, 1])
+                lines[i] = chunk_from_span(text[start - range_start : end - range_start], index.strategy)
+        return lines
 
-        # Extract context lines and add match indicator
-        context_lines_with_indicator = []
-        for i in range(start_idx, end_idx):
-            line = formatted_lines[i]
-            prefix = ">" if i == match_formatted_idx else " "
-            context_lines_with_indicator.append(f"{prefix} {line}")
+    def _get_context_lines(self, lines: Dict[int, str], num_lines: int, match_line_idx: int, context_lines: int) -> List[str]:
+        """Get context lines around a match from lines read with `_read_lines`.
 
-        return context_lines_with_indicator
+        Args:
+            lines: Lines read with `_read_lines`, by 0-based line number
+            num_lines: Number of lines in the file
+            match_line_idx: The 0-based line number of the match
+            context_lines: Number of context lines before and after
+        """
+        if context_lines < 0:
+            return []
+        return [
+            f"{'>' if i == match_line_idx else ' '} {i + 1}: {lines[i]}"
+            for i in range(max(0, match_line_idx - context_lines), min(num_lines, match_line_idx + context_lines + 1))
+        ]
 
     @trace_method
     async def grep_files(
@@ -383,69 +412,72 @@ class LettaFileToolExecutor(ToolExecutor):
         files_skipped = 0
         files_with_matches = set()  # Track files that had matches for LRU policy
 
+        # Line indexes of all files in one query; only the lines that can match are read from the file contents
+        line_indexes = await self.file_manager.get_line_indexes_async([fa.file_id for fa in file_agents], actor=self.actor)
+
         # Use asyncio timeout to prevent hanging
         async def _search_files():
             nonlocal all_matches, total_content_size, files_processed, files_skipped, files_with_matches
 
             for file_agent in file_agents:
-                # Load file content
-                file = await self.file_manager.get_file_by_id(file_id=file_agent.file_id, actor=self.actor, include_content=True)
+                index, content = await self._load_line_index(file_agent.file_id, line_indexes.get(file_agent.file_id))
 
-                if not file or not file.content:
+                if index is None or index.content_bytes == 0:
                     files_skipped += 1
                     self.logger.warning(f"Grep: Skipping file {file_agent.file_name} - no content available")
                     continue
 
                 # Check individual file size
-                content_size = len(file.content.encode("utf-8"))
-                if content_size > self.MAX_FILE_SIZE_BYTES:
+                if index.content_bytes > self.MAX_FILE_SIZE_BYTES:
                     files_skipped += 1
                     self.logger.warning(
-                        f"Grep: Skipping file {file.file_name} - too large ({content_size:,} bytes > {self.MAX_FILE_SIZE_BYTES:,} limit)"
+                        f"Grep: Skipping file {file_agent.file_name} - too large ({index.content_bytes:,} bytes > {self.MAX_FILE_SIZE_BYTES:,} limit)"
                     )
                     continue
 
+                candidates = index.candidate_lines(pattern, regex_flags)
+                if candidates is None or len(candidates) * self.GREP_FULL_READ_FRACTION > index.num_lines:
+                    # Most lines are candidates, reading the whole content is cheaper than reading them one by one
+                    if content is None:
+                        file = await self.file_manager.get_file_by_id(file_id=file_agent.file_id, actor=self.actor, include_content=True)
+                        content = file.content if file else ""
+                    candidates = range(index.num_lines) if candidates is None else candidates.tolist()
+                else:
+                    candidates = candidates.tolist()
+
                 # Check total content size across all files
-                total_content_size += content_size
+                total_content_size += index.content_bytes if content is not None else 0
                 if total_content_size > self.MAX_TOTAL_CONTENT_SIZE:
                     files_skipped += 1
                     self.logger.warning(
-                        f"Grep: Skipping file {file.file_name} - total content size limit exceeded ({total_content_size:,} bytes > {self.MAX_TOTAL_CONTENT_SIZE:,} limit)"
+                        f"Grep: Skipping file {file_agent.file_name} - total content size limit exceeded ({total_content_size:,} bytes > {self.MAX_TOTAL_CONTENT_SIZE:,} limit)"
                     )
                     break
 
                 files_processed += 1
 
-                # Use LineChunker to get all lines with proper formatting
-                chunker = LineChunker()
-                formatted_lines = chunker.chunk_text(file_metadata=file)
-
-                # Remove metadata header
-                if formatted_lines and formatted_lines[0].startswith("[Viewing"):
-                    formatted_lines = formatted_lines[1:]
+                for batch_start in range(0, len(candidates), self.GREP_READ_BATCH_LINES):
+                    batch = candidates[batch_start : batch_start + self.GREP_READ_BATCH_LINES]
+                    lines = await self._read_lines(file_agent.file_id, index, content, batch, context_lines=max(context_lines or 0, 0))
+                    if content is None:
+                        total_content_size += sum(len(line.encode("utf-8")) for line in lines.values())
 
-                # Search for matches in formatted lines
-                for formatted_line in formatted_lines:
-                    if len(all_matches) >= self.MAX_TOTAL_COLLECTED:
-                        # Stop collecting if we hit the upper limit
-                        break
-
-                    # Extract line number and content from formatted line
-                    if ":" in formatted_line:
-                        try:
-                            line_parts = formatted_line.split(":", 1)
-                            line_num = int(line_parts[0].strip())
-                            line_content = line_parts[1].strip() if len(line_parts) > 1 else ""
-                        except (ValueError, IndexError):
-                            continue
+                    # Search for matches in the candidate lines
+                    for line_idx in batch:
+                        if len(all_matches) >= self.MAX_TOTAL_COLLECTED:
+                            # Stop collecting if we hit the upper limit
+                            break
 
-                        if pattern_regex.search(line_content):
+                        if pattern_regex.search(lines[line_idx].strip()):
                             # Mark this file as having matches for LRU tracking
-                            files_with_matches.add(file.file_name)
-                            context = self._get_context_lines(formatted_lines, match_line_num=line_num, context_lines=context_lines or 0)
+                            files_with_matches.add(file_agent.file_name)
+                            context = self._get_context_lines(lines, index.num_lines, line_idx, context_lines=context_lines or 0)
 
                             # Store match data for later pagination
-                            all_matches.append((file.file_name, line_num, context))
+                            all_matches.append((file_agent.file_name, line_idx + 1, context))
+
+                    if len(all_matches) >= self.MAX_TOTAL_COLLECTED:
+                        break
 
                 # Break if we've collected enough matches
                 if len(all_matches) >= self.MAX_TOTAL_COLLECTED:
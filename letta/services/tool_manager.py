@@ -31,6 +31,7 @@ from letta.schemas.tool import Tool as PydanticTool, ToolCreate, ToolUpdate
 from letta.schemas.user import User as PydanticUser
 from letta.server.db import db_registry
 from letta.services.helpers.agent_manager_helper import calculate_multi_agent_tools
+from letta.services.helpers.agent_state_cache import invalidate_agent_states, invalidate_agent_states_async
 from letta.services.mcp.types import SSEServerConfig, StdioServerConfig
 from letta.settings import settings
 from letta.utils import enforce_types, printd
@@ -674,7 +675,10 @@ class ToolManager:
                 tool.tool_type = updated_tool_type
 
             # Save the updated tool to the database
-            return tool.update(db_session=session, actor=actor).to_pydantic()
+            tool = tool.update(db_session=session, actor=actor).to_pydantic()
+        # cached agent states embed their tools
+        invalidate_agent_states()
+        return tool
 
     @enforce_types
     @trace_method
@@ -744,8 +748,10 @@ class ToolManager:
                 tool.tool_type = updated_tool_type
 
             # Save the updated tool to the database
-            tool = await tool.update_async(db_session=session, actor=actor)
-            return tool.to_pydantic()
+            tool = (await tool.update_async(db_session=session, actor=actor)).to_pydantic()
+        # cached agent states embed their tools
+        await invalidate_agent_states_async()
+        return tool
 
     @enforce_types
     @trace_method
@@ -757,6 +763,7 @@ class ToolManager:
                 tool.hard_delete(db_session=session, actor=actor)
             except NoResultFound:
                 raise ValueError(f"Tool with id {tool_id} not found.")
+        invalidate_agent_states()
 
     @enforce_types
     @trace_method
@@ -768,6 +775,7 @@ class ToolManager:
                 await tool.hard_delete_async(db_session=session, actor=actor)
             except NoResultFound:
                 raise ValueError(f"Tool with id {tool_id} not found.")
+        await invalidate_agent_states_async()
 
     @enforce_types
     @trace_method
@@ -985,6 +993,8 @@ class ToolManager:
 
         await session.execute(upsert_stmt)
         await session.commit()
+        if override_existing_tools:
+            await invalidate_agent_states_async()
 
         # fetch results (includes both inserted and skipped tools)
         tool_names = [tool.name for tool in tool_data_list]
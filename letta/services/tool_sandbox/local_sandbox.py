@@ -4,7 +4,7 @@ import os
 import struct
 import sys
 import tempfile
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 from pydantic.config import JsonDict
 
@@ -15,15 +15,13 @@ from letta.schemas.enums import SandboxType
 from letta.schemas.sandbox_config import SandboxConfig
 from letta.schemas.tool import Tool
 from letta.schemas.tool_execution_result import ToolExecutionResult
-from letta.services.helpers.tool_execution_helper import (
-    create_venv_for_local_sandbox,
-    find_python_executable,
-    install_pip_requirements_for_sandbox,
-)
+from letta.services.helpers.tool_execution_helper import create_venv_for_local_sandbox, venv_python_executable
 from letta.services.helpers.tool_parser_helper import parse_stdout_best_effort
 from letta.services.tool_sandbox.base import AsyncToolSandboxBase
+from letta.services.tool_sandbox.local_worker_pool import get_local_sandbox_worker_pool
+from letta.services.tool_sandbox.venv_cache import get_venv_cache
 from letta.settings import tool_settings
-from letta.utils import get_friendly_error_msg, parse_stderr_error_msg, safe_create_task
+from letta.utils import get_friendly_error_msg, parse_stderr_error_msg
 
 logger = get_logger(__name__)
 
@@ -88,8 +86,7 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
         # If using a virtual environment, ensure it's prepared in parallel
         venv_preparation_task = None
         if use_venv:
-            venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
-            venv_preparation_task = safe_create_task(self._prepare_venv(local_configs, venv_path, env), label="prepare_venv")
+            venv_preparation_task = asyncio.create_task(self._prepare_venv(local_configs, env))
 
         # Generate and write execution script (always with markers, since we rely on stdout)
         code = await self.generate_execution_script(agent_state=agent_state, wrap_print_with_markers=True)
@@ -105,16 +102,23 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
 
         temp_file_path = await write_temp_file(sandbox_dir, code)
 
+        cached_venv_path = None
         try:
             # If we started a venv preparation task, wait for it to complete
+            venv_path = None
             if venv_preparation_task:
-                await venv_preparation_task
+                venv_path = await venv_preparation_task
+                if venv_path != os.path.join(sandbox_dir, local_configs.venv_name):
+                    cached_venv_path = venv_path
 
             # Determine the python executable and environment for the subprocess
             exec_env = env.copy()
             if use_venv:
-                venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
-                python_executable = find_python_executable(local_configs)
+                python_executable = venv_python_executable(venv_path)
+                worker_pool = get_local_sandbox_worker_pool()
+                if self.force_recreate_venv and worker_pool is not None:
+                    # warm workers still have modules of the old venv imported
+                    worker_pool.discard(self._worker_pool_key(sbx_config, python_executable))
                 exec_env["VIRTUAL_ENV"] = venv_path
                 exec_env["PATH"] = os.path.join(venv_path, "bin") + ":" + exec_env["PATH"]
             else:
@@ -149,18 +153,41 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
             print(f"Auto-generated code for debugging:\n\n{code}")
             raise e
         finally:
+            if cached_venv_path:
+                get_venv_cache().release(cached_venv_path)
+
             # Clean up the temp file if not debugging
             from letta.settings import settings
 
             if not settings.debug:
                 await asyncio.to_thread(os.remove, temp_file_path)
 
-    async def _prepare_venv(self, local_configs, venv_path: str, env: Dict[str, str]):
+    async def _prepare_venv(self, local_configs, env: Dict[str, str]) -> str:
         """
-        Prepare virtual environment asynchronously (in a background thread).
+        Prepare the virtual environment to run the tool in and return its path.
+
+        Tools with pip requirements, from the sandbox config or the tool itself, run in a cached venv with the
+        requirements installed that is only built once per requirement set (see `venv_cache`). Other tools run in the
+        sandbox's venv, created from its requirements.txt.
         """
+        sandbox_dir = os.path.expanduser(local_configs.sandbox_dir)
+        requirements = [str(requirement) for requirement in local_configs.pip_requirements]
+        if self.tool and self.tool.pip_requirements:
+            requirements += [str(requirement) for requirement in self.tool.pip_requirements]
+
+        if requirements:
+            log_event(name="start acquire_cached_venv", attributes={"requirements": requirements})
+            venv_path = await get_venv_cache().acquire(
+                requirements,
+                requirements_txt_path=os.path.join(sandbox_dir, self.REQUIREMENT_TXT_NAME),
+                env=env,
+                force_rebuild=self.force_recreate_venv,
+            )
+            log_event(name="finish acquire_cached_venv", attributes={"venv_path": venv_path})
+            return venv_path
+
+        venv_path = str(os.path.join(sandbox_dir, local_configs.venv_name))
         if self.force_recreate_venv or not await asyncio.to_thread(os.path.isdir, venv_path):
-            sandbox_dir = os.path.expanduser(local_configs.sandbox_dir)
             log_event(name="start create_venv_for_local_sandbox", attributes={"venv_path": venv_path})
             await asyncio.to_thread(
                 create_venv_for_local_sandbox,
@@ -170,13 +197,7 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
                 force_recreate=self.force_recreate_venv,
             )
             log_event(name="finish create_venv_for_local_sandbox")
-
-        if local_configs.pip_requirements or (self.tool and self.tool.pip_requirements):
-            log_event(name="start install_pip_requirements_for_sandbox", attributes={"local_configs": local_configs.model_dump_json()})
-            await asyncio.to_thread(
-                install_pip_requirements_for_sandbox, local_configs, upgrade=True, user_install_if_no_venv=False, env=env, tool=self.tool
-            )
-            log_event(name="finish install_pip_requirements_for_sandbox", attributes={"local_configs": local_configs.model_dump_json()})
+        return venv_path
 
     async def _execute_tool_subprocess(
         self, sbx_config, python_executable: str, temp_file_path: str, env: Dict[str, str], cwd: str
@@ -189,21 +210,20 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
         try:
             log_event(name="start subprocess")
 
-            process = await asyncio.create_subprocess_exec(
-                python_executable, temp_file_path, env=env, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-            )
-
+            worker_pool = get_local_sandbox_worker_pool()
             try:
-                stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=tool_settings.tool_sandbox_timeout)
+                if worker_pool is None:
+                    returncode, stdout_bytes, stderr_bytes = await self._run_subprocess(python_executable, temp_file_path, env, cwd)
+                else:
+                    returncode, stdout_bytes, stderr_bytes = await worker_pool.run(
+                        key=self._worker_pool_key(sbx_config, python_executable),
+                        python_executable=python_executable,
+                        script_path=temp_file_path,
+                        env=env,
+                        cwd=cwd,
+                        timeout=tool_settings.tool_sandbox_timeout,
+                    )
             except asyncio.TimeoutError:
-                # Terminate the process on timeout
-                if process.returncode is None:
-                    process.terminate()
-                    try:
-                        await asyncio.wait_for(process.wait(), timeout=5)
-                    except asyncio.TimeoutError:
-                        process.kill()
-
                 raise TimeoutError(f"Executing tool {self.tool_name} timed out after {tool_settings.tool_sandbox_timeout} seconds.")
 
             stderr = stderr_bytes.decode("utf-8") if stderr_bytes else ""
@@ -213,7 +233,7 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
             func_result_bytes, stdout_text = self.parse_out_function_results_markers(stdout_bytes)
             func_return, agent_state = parse_stdout_best_effort(func_result_bytes)
 
-            if process.returncode != 0 and func_return is None:
+            if returncode != 0 and func_return is None:
                 exception_name, msg = parse_stderr_error_msg(stderr)
                 func_return = get_friendly_error_msg(
                     function_name=self.tool_name,
@@ -226,7 +246,7 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
                 agent_state=agent_state,
                 stdout=[stdout_text] if stdout_text else [],
                 stderr=[stderr] if stderr else [],
-                status="success" if process.returncode == 0 else "error",
+                status="success" if returncode == 0 else "error",
                 sandbox_config_fingerprint=sbx_config.fingerprint(),
             )
 
@@ -252,6 +272,32 @@ class AsyncToolSandboxLocal(AsyncToolSandboxBase):
                 sandbox_config_fingerprint=sbx_config.fingerprint(),
             )
 
+    async def _run_subprocess(self, python_executable: str, temp_file_path: str, env: Dict[str, str], cwd: str) -> Tuple[int, bytes, bytes]:
+        """
+        Run the script in a new interpreter, terminating it when it exceeds the sandbox timeout.
+        """
+        process = await asyncio.create_subprocess_exec(
+            python_executable, temp_file_path, env=env, cwd=cwd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+
+        try:
+            stdout_bytes, stderr_bytes = await asyncio.wait_for(process.communicate(), timeout=tool_settings.tool_sandbox_timeout)
+        except asyncio.TimeoutError:
+            # Terminate the process on timeout
+            if process.returncode is None:
+                process.terminate()
+                try:
+                    await asyncio.wait_for(process.wait(), timeout=5)
+                except asyncio.TimeoutError:
+                    process.kill()
+            raise
+
+        return process.returncode, stdout_bytes, stderr_bytes
+
+    def _worker_pool_key(self, sbx_config: SandboxConfig, python_executable: str) -> Tuple[str, str, str]:
+        # the python executable identifies the venv, if any
+        return python_executable, sbx_config.fingerprint(), self.user.organization_id
+
     def parse_out_function_results_markers(self, data: bytes) -> tuple[bytes, str]:
         """
         Parse the function results out of the stdout using special markers.
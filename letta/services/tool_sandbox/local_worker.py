@@ -0,0 +1,128 @@
+"""Warm worker process of the local tool sandbox (see `local_worker_pool`).
+
+Runs with the sandbox's python executable, so it only uses the standard library. Requests arrive on stdin, one per
+tool call: a 4 byte big-endian length followed by a JSON object with the script to run, its working directory and
+environment, and the files its stdout and stderr go to. The script is run like `python <script>` would run it and the
+worker answers on stdout with its exit code and the worker's resident memory (`RESPONSE_HEADER`). The worker exits when
+stdin is closed, i.e. when the pool (or the server) goes away.
+"""
+
+import json
+import os
+import runpy
+import struct
+import sys
+import traceback
+
+REQUEST_HEADER = struct.Struct(">I")
+# exit code of the script, resident memory of the worker in bytes
+RESPONSE_HEADER = struct.Struct(">iQ")
+
+
+def _read_exact(stream, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        chunk = stream.read(n - len(data))
+        if not chunk:
+            raise EOFError
+        data += chunk
+    return data
+
+
+def _resident_memory_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        # peak rather than current usage, in bytes on macOS and kilobytes elsewhere
+        max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return max_rss if sys.platform == "darwin" else max_rss * 1024
+
+
+def _exit_code(code) -> int:
+    if code is None:
+        return 0
+    if isinstance(code, int):
+        return code & 0xFF
+    print(code, file=sys.stderr)
+    return 1
+
+
+def _print_script_exception(script: str, e: BaseException) -> None:
+    # leave out the frames of this worker and runpy, as `python <script>` would
+    tb = e.__traceback__
+    while tb is not None and tb.tb_frame.f_code.co_filename != script:
+        tb = tb.tb_next
+    traceback.print_exception(type(e), e, tb or e.__traceback__)
+
+
+def _run_script(request: dict, base_sys_path: list) -> int:
+    script = request["script"]
+    os.environ.clear()
+    os.environ.update(request["env"])
+    os.chdir(request["cwd"])
+    sys.argv = [script]
+    sys.path[:] = [os.path.dirname(script)] + base_sys_path
+
+    stdout_fd = os.open(request["stdout"], os.O_WRONLY | os.O_TRUNC)
+    stderr_fd = os.open(request["stderr"], os.O_WRONLY | os.O_TRUNC)
+    os.dup2(stdout_fd, 1)
+    os.dup2(stderr_fd, 2)
+    os.close(stdout_fd)
+    os.close(stderr_fd)
+    try:
+        runpy.run_path(script, run_name="__main__")
+        return 0
+    except SystemExit as e:
+        return _exit_code(e.code)
+    except BaseException as e:
+        _print_script_exception(script, e)
+        return 1
+    finally:
+        for stream in (sys.stdout, sys.stderr):
+            try:
+                stream.flush()
+            except Exception:
+                pass
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+        os.close(devnull)
+
+
+def main() -> None:
+    # keep the pipes to the pool away from the scripts, which get /dev/null as stdin
+    requests = os.fdopen(os.dup(0), "rb", buffering=0)
+    responses = os.fdopen(os.dup(1), "wb", buffering=0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    os.close(devnull)
+
+    # drop the directory of this file, scripts get their own directory instead
+    base_sys_path = sys.path[1:]
+
+    # warm up what every execution script imports
+    import base64  # noqa: F401
+    import hashlib  # noqa: F401
+    import pickle  # noqa: F401
+
+    try:
+        import pydantic  # noqa: F401
+    except ImportError:
+        pass
+
+    while True:
+        try:
+            (length,) = REQUEST_HEADER.unpack(_read_exact(requests, REQUEST_HEADER.size))
+            request = json.loads(_read_exact(requests, length))
+        except EOFError:
+            return
+        returncode = _run_script(request, base_sys_path)
+        responses.write(RESPONSE_HEADER.pack(returncode, _resident_memory_bytes()))
+
+
+if __name__ == "__main__":
+    main()
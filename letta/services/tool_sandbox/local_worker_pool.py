@@ -0,0 +1,255 @@
+"""Pool of warm worker processes for the local tool sandbox.
+
+Starting a python interpreter and importing what the execution script needs dominates the latency of short tools, so
+instead of one subprocess per call `AsyncToolSandboxLocal` hands its execution scripts to long-lived workers
+(`local_worker.py`) over a pipe. Workers are kept per key, the python executable, venv, sandbox config fingerprint and
+organization, so a worker only ever runs scripts of one organization with the same environment.
+
+A worker runs one script at a time; calls that find no idle worker start a new one. After a call the worker goes back
+to the pool unless it has run `max_calls` scripts, grown beyond `max_memory_bytes` or the pool already holds
+`max_idle_workers` idle workers for its key. Workers that time out or are cancelled are terminated like one-shot
+subprocesses, and idle workers are closed after `idle_timeout_s`.
+"""
+
+import asyncio
+import atexit
+import json
+import os
+import subprocess
+import tempfile
+import time
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from letta.log import get_logger
+from letta.services.tool_sandbox.local_worker import REQUEST_HEADER, RESPONSE_HEADER
+from letta.settings import tool_settings
+
+logger = get_logger(__name__)
+
+WORKER_SCRIPT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "local_worker.py")
+
+
+class LocalSandboxWorker:
+    """A worker process along with the files its scripts write their stdout and stderr to.
+
+    Workers are plain `subprocess.Popen` processes whose pipes are only watched by the event loop while a script runs,
+    so they are not tied to the event loop that started them.
+    """
+
+    def __init__(self, process: subprocess.Popen, stdout_path: str, stderr_path: str):
+        self.process = process
+        self.stdout_path = stdout_path
+        self.stderr_path = stderr_path
+        self.calls = 0
+        self.resident_memory_bytes = 0
+        self.idle_since = time.monotonic()
+
+    @classmethod
+    async def start(cls, python_executable: str, env: Dict[str, str], cwd: str) -> "LocalSandboxWorker":
+        def _start() -> "LocalSandboxWorker":
+            stdout_path, stderr_path = _create_output_files()
+            try:
+                process = subprocess.Popen(
+                    [python_executable, WORKER_SCRIPT_PATH],
+                    env=env,
+                    cwd=cwd,
+                    stdin=subprocess.PIPE,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                )
+            except Exception:
+                _remove_files(stdout_path, stderr_path)
+                raise
+            return cls(process, stdout_path, stderr_path)
+
+        return await asyncio.to_thread(_start)
+
+    @property
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    async def run_script(self, script_path: str, env: Dict[str, str], cwd: str) -> int:
+        """Run the script like `python <script_path>` would and return its exit code."""
+        request = json.dumps(
+            {"script": script_path, "env": env, "cwd": cwd, "stdout": self.stdout_path, "stderr": self.stderr_path}
+        ).encode("utf-8")
+        # an idle worker is blocked reading its stdin, so this does not block for long
+        self.process.stdin.write(REQUEST_HEADER.pack(len(request)) + request)
+        self.process.stdin.flush()
+        self.calls += 1
+        try:
+            header = await self._read_exact(RESPONSE_HEADER.size)
+        except EOFError:
+            # the script ended the worker itself, e.g. with os._exit
+            return await asyncio.to_thread(self.process.wait)
+        returncode, self.resident_memory_bytes = RESPONSE_HEADER.unpack(header)
+        return returncode
+
+    async def _read_exact(self, n: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        fd = self.process.stdout.fileno()
+        data = b""
+        while len(data) < n:
+            readable = loop.create_future()
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            try:
+                await readable
+            finally:
+                loop.remove_reader(fd)
+            chunk = os.read(fd, n - len(data))
+            if not chunk:
+                raise EOFError
+            data += chunk
+        return data
+
+    def read_output(self) -> Tuple[bytes, bytes]:
+        with open(self.stdout_path, "rb") as stdout_file, open(self.stderr_path, "rb") as stderr_file:
+            return stdout_file.read(), stderr_file.read()
+
+    async def stop(self) -> None:
+        """Terminate the worker, killing it if it does not exit within 5 seconds."""
+
+        def _stop():
+            if self.alive:
+                self.process.terminate()
+                try:
+                    self.process.wait(timeout=5)
+                except subprocess.TimeoutExpired:
+                    self.process.kill()
+                    self.process.wait()
+            self._close_pipes()
+
+        await asyncio.to_thread(_stop)
+
+    def close(self) -> None:
+        """Let an idle worker exit on its own by closing its stdin."""
+        self._close_pipes()
+
+    def _close_pipes(self) -> None:
+        for pipe in (self.process.stdin, self.process.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+        self.process.poll()
+        _remove_files(self.stdout_path, self.stderr_path)
+
+
+def _create_output_files() -> Tuple[str, str]:
+    paths = []
+    for suffix in (".stdout", ".stderr"):
+        fd, path = tempfile.mkstemp(prefix="letta-sandbox-worker-", suffix=suffix)
+        os.close(fd)
+        paths.append(path)
+    return paths[0], paths[1]
+
+
+def _remove_files(*paths: str) -> None:
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+class LocalSandboxWorkerPool:
+    """Idle workers per key, see the module docstring."""
+
+    def __init__(self, max_idle_workers: int, max_calls: int, max_memory_bytes: int, idle_timeout_s: float = 300):
+        self.max_idle_workers = max_idle_workers
+        self.max_calls = max_calls
+        self.max_memory_bytes = max_memory_bytes
+        self.idle_timeout_s = idle_timeout_s
+        self._idle: Dict[Hashable, List[LocalSandboxWorker]] = {}
+
+    def idle_worker_count(self, key: Optional[Hashable] = None) -> int:
+        if key is not None:
+            return len(self._idle.get(key, []))
+        return sum(len(workers) for workers in self._idle.values())
+
+    async def run(
+        self, key: Hashable, python_executable: str, script_path: str, env: Dict[str, str], cwd: str, timeout: float
+    ) -> Tuple[int, bytes, bytes]:
+        """Run the script on a worker of `key` and return its exit code, stdout and stderr.
+
+        Raises `asyncio.TimeoutError` after terminating the worker when the script runs longer than `timeout` seconds.
+        """
+        worker = self._acquire_idle(key)
+        if worker is None:
+            worker = await LocalSandboxWorker.start(python_executable, env, cwd)
+        try:
+            try:
+                returncode = await asyncio.wait_for(worker.run_script(script_path, env, cwd), timeout=timeout)
+            except BrokenPipeError:
+                # the idle worker died since it was returned to the pool
+                worker.close()
+                worker = await LocalSandboxWorker.start(python_executable, env, cwd)
+                returncode = await asyncio.wait_for(worker.run_script(script_path, env, cwd), timeout=timeout)
+            stdout, stderr = await asyncio.to_thread(worker.read_output)
+        except BaseException:
+            # timed out or cancelled mid-script, the worker's state is unknown
+            await worker.stop()
+            raise
+        self._release(key, worker)
+        return returncode, stdout, stderr
+
+    def discard(self, key: Hashable) -> None:
+        """Close the idle workers of `key`, e.g. because the venv they run in is recreated."""
+        for worker in self._idle.pop(key, []):
+            worker.close()
+
+    def close(self) -> None:
+        for key in list(self._idle):
+            self.discard(key)
+
+    def _acquire_idle(self, key: Hashable) -> Optional[LocalSandboxWorker]:
+        self._close_expired()
+        workers = self._idle.get(key)
+        while workers:
+            worker = workers.pop()
+            if worker.alive:
+                return worker
+            worker.close()
+        return None
+
+    def _release(self, key: Hashable, worker: LocalSandboxWorker) -> None:
+        workers = self._idle.setdefault(key, [])
+        if (
+            not worker.alive
+            or worker.calls >= self.max_calls
+            or worker.resident_memory_bytes > self.max_memory_bytes
+            or len(workers) >= self.max_idle_workers
+        ):
+            logger.debug(f"Recycling sandbox worker after {worker.calls} calls using {worker.resident_memory_bytes} bytes")
+            worker.close()
+            return
+        worker.idle_since = time.monotonic()
+        workers.append(worker)
+
+    def _close_expired(self) -> None:
+        expires_before = time.monotonic() - self.idle_timeout_s
+        for key, workers in list(self._idle.items()):
+            expired = [worker for worker in workers if worker.idle_since < expires_before]
+            for worker in expired:
+                workers.remove(worker)
+                worker.close()
+            if not workers:
+                del self._idle[key]
+
+
+_worker_pool: Optional[LocalSandboxWorkerPool] = None
+
+
+def get_local_sandbox_worker_pool() -> Optional[LocalSandboxWorkerPool]:
+    """Process-wide worker pool, or None when disabled via `tool_sandbox_worker_pool_size=0`."""
+    global _worker_pool
+    if tool_settings.tool_sandbox_worker_pool_size <= 0:
+        return None
+    if _worker_pool is None:
+        _worker_pool = LocalSandboxWorkerPool(
+            max_idle_workers=tool_settings.tool_sandbox_worker_pool_size,
+            max_calls=tool_settings.tool_sandbox_worker_max_calls,
+            max_memory_bytes=tool_settings.tool_sandbox_worker_max_memory_mb * 1024 * 1024,
+        )
+        atexit.register(_worker_pool.close)
+    return _worker_pool
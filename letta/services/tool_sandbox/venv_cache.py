@@ -0,0 +1,192 @@
+"""Content-addressed cache of virtual environments for local sandbox tools with pip requirements.
+
+Installing a tool's pip requirements used to run pip on every call. Instead, each distinct requirement set gets its own
+venv under `tool_venv_cache_dir`, named by a fingerprint of the sorted requirements, the sandbox's requirements.txt
+and the Python version. The venv is built once, in a worker thread, and every tool with the same requirements uses it;
+later calls only check an in-memory record and never run pip. Builds are serialized per fingerprint with a lock file, so
+processes sharing the cache directory build each venv once as well.
+
+Callers hold a reference to the venv while running a tool in it (`acquire` / `release`). Venvs record when they were
+last used, and a periodic collection removes those without references that nobody has used for `ttl_s` seconds.
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from letta.constants import LETTA_DIR
+from letta.log import get_logger
+from letta.services.helpers.tool_execution_helper import create_venv_with_requirements
+from letta.settings import tool_settings
+from letta.utils import safe_create_task
+
+try:
+    import fcntl
+except ImportError:  # Windows, builds are only serialized within the process
+    fcntl = None
+
+logger = get_logger(__name__)
+
+VENV_READY_MARKER = ".letta-venv-ready"
+# how often a process refreshes the last used time of a venv it uses, and looks for unused venvs
+TOUCH_INTERVAL_S = 3600
+COLLECT_INTERVAL_S = 3600
+
+
+def venv_fingerprint(requirements: List[str], requirements_txt: Optional[str] = None) -> str:
+    """Fingerprint of a venv with `requirements` and the contents of a requirements.txt installed."""
+    key = {
+        "python": [sys.implementation.name, *sys.version_info[:3]],
+        "requirements": sorted(set(requirements)),
+        "requirements_txt": requirements_txt,
+    }
+    return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+
+@contextmanager
+def _file_lock(path: str) -> Iterator[None]:
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+class VenvCache:
+    """Venvs per requirement set, see the module docstring."""
+
+    def __init__(self, root: str, ttl_s: float):
+        self.root = root
+        self.ttl_s = ttl_s
+        self._refs: Counter = Counter()
+        # fingerprint -> when this process last made sure the venv is built and marked it as used (monotonic)
+        self._touched: Dict[str, float] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._last_collected = time.monotonic()
+
+    def venv_path(self, fingerprint: str) -> str:
+        return os.path.join(self.root, fingerprint)
+
+    async def acquire(
+        self, requirements: List[str], requirements_txt_path: Optional[str], env: Dict[str, str], force_rebuild: bool = False
+    ) -> str:
+        """Path of the venv for the requirements, built on first use. Pass it to `release` once done with it."""
+        requirements_txt = await asyncio.to_thread(_read_if_exists, requirements_txt_path) if requirements_txt_path else None
+        fingerprint = venv_fingerprint(requirements, requirements_txt)
+        self._refs[fingerprint] += 1
+        try:
+            touched = self._touched.get(fingerprint)
+            if force_rebuild or touched is None or touched < time.monotonic() - TOUCH_INTERVAL_S:
+                await asyncio.to_thread(
+                    self._ensure_built,
+                    fingerprint,
+                    requirements,
+                    requirements_txt_path if requirements_txt is not None else None,
+                    env,
+                    force_rebuild,
+                )
+                self._touched[fingerprint] = time.monotonic()
+        except BaseException:
+            self._refs[fingerprint] -= 1
+            raise
+        self._maybe_collect()
+        return self.venv_path(fingerprint)
+
+    def release(self, venv_path: str) -> None:
+        fingerprint = os.path.basename(venv_path)
+        self._refs[fingerprint] -= 1
+        if self._refs[fingerprint] <= 0:
+            del self._refs[fingerprint]
+
+    def _lock(self, fingerprint: str) -> threading.Lock:
+        return self._locks.setdefault(fingerprint, threading.Lock())
+
+    def _ensure_built(
+        self,
+        fingerprint: str,
+        requirements: List[str],
+        requirements_txt_path: Optional[str],
+        env: Dict[str, str],
+        force_rebuild: bool,
+    ) -> None:
+        venv_path = self.venv_path(fingerprint)
+        marker_path = os.path.join(venv_path, VENV_READY_MARKER)
+        os.makedirs(self.root, exist_ok=True)
+        with self._lock(fingerprint), _file_lock(venv_path + ".lock"):
+            if os.path.isfile(marker_path) and not force_rebuild:
+                os.utime(marker_path)
+                return
+            # rebuilding, or left behind by a failed build
+            if os.path.isdir(venv_path):
+                shutil.rmtree(venv_path)
+            try:
+                create_venv_with_requirements(venv_path, requirements, requirements_txt_path, env=env)
+            except BaseException:
+                shutil.rmtree(venv_path, ignore_errors=True)
+                raise
+            with open(marker_path, "w"):
+                pass
+
+    def _maybe_collect(self) -> None:
+        if self._last_collected > time.monotonic() - COLLECT_INTERVAL_S:
+            return
+        self._last_collected = time.monotonic()
+        safe_create_task(asyncio.to_thread(self.collect), label="collect_unused_venvs")
+
+    def collect(self) -> List[str]:
+        """Remove venvs that are not referenced in this process and were not used by anyone within the ttl."""
+        if not os.path.isdir(self.root):
+            return []
+        removed = []
+        for fingerprint in os.listdir(self.root):
+            venv_path = self.venv_path(fingerprint)
+            if fingerprint.endswith(".lock") or self._refs[fingerprint] > 0 or not os.path.isdir(venv_path):
+                continue
+            with self._lock(fingerprint), _file_lock(venv_path + ".lock"):
+                if self._refs[fingerprint] > 0 or not self._unused(venv_path):
+                    continue
+                logger.info(f"Removing sandbox venv {venv_path} unused for {self.ttl_s} seconds")
+                shutil.rmtree(venv_path, ignore_errors=True)
+                self._touched.pop(fingerprint, None)
+                removed.append(venv_path)
+        return removed
+
+    def _unused(self, venv_path: str) -> bool:
+        marker_path = os.path.join(venv_path, VENV_READY_MARKER)
+        try:
+            last_used = os.path.getmtime(marker_path if os.path.isfile(marker_path) else venv_path)
+        except FileNotFoundError:
+            return False
+        return last_used < time.time() - self.ttl_s
+
+
+def _read_if_exists(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+_venv_cache: Optional[VenvCache] = None
+
+
+def get_venv_cache() -> VenvCache:
+    """Process-wide venv cache."""
+    global _venv_cache
+    if _venv_cache is None:
+        root = os.path.expanduser(tool_settings.tool_venv_cache_dir or os.path.join(LETTA_DIR, "tool_venvs"))
+        _venv_cache = VenvCache(root=root, ttl_s=tool_settings.tool_venv_cache_ttl_days * 24 * 3600)
+    return _venv_cache
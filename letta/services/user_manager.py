@@ -3,7 +3,6 @@ from typing import List, Optional
 from sqlalchemy import select
 
 from letta.constants import DEFAULT_ORG_ID
-from letta.data_sources.redis_client import get_redis_client
 from letta.helpers.decorators import async_redis_cache
 from letta.log import get_logger
 from letta.orm.errors import NoResultFound
@@ -100,6 +99,7 @@ class UserManager:
 
             # Commit the updated user
             existing_user.update(session)
+            self.get_actor_by_id_async.cache_invalidate_local(self, user_update.id)
             return existing_user.to_pydantic()
 
     @enforce_types
@@ -130,6 +130,7 @@ class UserManager:
             user.hard_delete(session)
 
             session.commit()
+            self.get_actor_by_id_async.cache_invalidate_local(self, user_id)
 
     @enforce_types
     @trace_method
@@ -234,10 +235,4 @@ class UserManager:
         """Invalidates the actor cache on CRUD operations.
         TODO (cliandy): see notes on redis cache decorator
         """
-        try:
-            redis_client = await get_redis_client()
-            cache_key = self.get_actor_by_id_async.cache_key_func(self, actor_id)
-            return (await redis_client.delete(cache_key)) > 0
-        except Exception as e:
-            logger.error(f"Failed to invalidate cache: {e}")
-            return False
+        return await self.get_actor_by_id_async.cache_invalidate(self, actor_id)
@@ -1,7 +1,7 @@
 import os
 from enum import Enum
 from pathlib import Path
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import AliasChoices, Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
@@ -30,6 +30,15 @@ class ToolSettings(BaseSettings):
     tool_sandbox_timeout: float = 180
     tool_exec_venv_name: Optional[str] = None
     tool_exec_autoreload_venv: bool = True
+    # venvs of local sandbox tools with pip requirements, one per requirement set
+    tool_venv_cache_dir: Optional[str] = Field(default=None, description="Directory of cached tool venvs. Defaults to ~/.letta/tool_venvs.")
+    tool_venv_cache_ttl_days: float = Field(default=7, description="Cached tool venvs unused for this long are removed.")
+    # warm worker processes that run local sandbox tools instead of a new interpreter per call
+    tool_sandbox_worker_pool_size: int = Field(
+        default=4, description="Idle workers kept per venv and sandbox config. Set to 0 to start a subprocess per tool call."
+    )
+    tool_sandbox_worker_max_calls: int = Field(default=100, description="Tool calls after which a sandbox worker is replaced.")
+    tool_sandbox_worker_max_memory_mb: int = Field(default=512, description="Resident memory beyond which a sandbox worker is replaced.")
 
     # MCP settings
     mcp_connect_to_server_timeout: float = 30.0
@@ -245,6 +254,11 @@ class Settings(BaseSettings):
     multi_agent_send_message_timeout: int = 20 * 60
     multi_agent_concurrent_sends: int = 50
 
+    # per-agent step locking (serializes concurrent sends to the same agent, across workers when redis is configured)
+    enable_per_agent_lock: bool = Field(default=False, description="Serialize concurrent message sends to the same agent")
+    per_agent_lock_timeout_seconds: float = Field(default=300.0, description="Max seconds to wait for an agent's lock")
+    per_agent_lock_lease_seconds: float = Field(default=30.0, description="TTL of the redis lease, renewed while the lock is held")
+
     # telemetry logging
     otel_exporter_otlp_endpoint: str | None = None  # otel default: "http://localhost:4317"
     otel_preferred_temporality: int | None = Field(
@@ -285,6 +299,12 @@ class Settings(BaseSettings):
     poll_lock_retry_interval_seconds: int = 8 * 60
     batch_job_polling_lookback_weeks: int = 2
     batch_job_polling_batch_size: Optional[int] = None
+    enable_counter_reconciliation: bool = Field(
+        default=True, description="Periodically recount the maintained per-agent message and per-archive passage/tag counters."
+    )
+    counter_reconciliation_interval_seconds: int = Field(
+        default=6 * 60 * 60, description="Seconds between reconciliations of the maintained message and passage counters."
+    )
 
     # for OCR
     mistral_api_key: Optional[str] = None
@@ -306,12 +326,70 @@ class Settings(BaseSettings):
     tpuf_region: str = "gcp-us-central1"
     embed_all_messages: bool = False
 
+    # In-process IVF index for vector search on SQLite (brute-force SQL scan is used when disabled)
+    sqlite_vector_index: bool = Field(default=False, description="Answer SQLite vector queries from an on-disk ANN index")
+    sqlite_vector_index_nprobe: int = Field(default=16, description="Number of IVF lists scanned per query")
+    sqlite_vector_index_ivf_threshold: int = Field(
+        default=20_000, description="Vectors per archive/source before the index switches from exact scan to IVF"
+    )
+
+    # Content-addressed embedding cache: an in-process LRU backed by redis when configured
+    embedding_cache_size: int = Field(default=10_000, description="Embeddings kept in the in-process LRU; 0 disables the cache")
+    embedding_cache_ttl_seconds: int = Field(default=7 * 24 * 3600, description="Expiry of embeddings cached in redis")
+
+    # In-process tier of async_redis_cache, in front of redis (or on its own when redis is not configured)
+    memory_cache_max_bytes: int = Field(
+        default=64 * 1024 * 1024, description="Size of the keys and values kept in the in-process cache tier; 0 disables the tier"
+    )
+    memory_cache_ttl_seconds: int = Field(
+        default=60, description="Upper bound on how long the in-process cache tier serves a value, unless a cached function sets its own"
+    )
+
+    # Per-process cache of agent states served by AgentManager.get_agent_by_id_async
+    agent_state_cache_size: int = Field(default=1_000, description="Agent states kept in process; 0 disables the cache")
+    agent_state_cache_ttl_seconds: int = Field(
+        default=60,
+        description="Upper bound on how long a cached agent state is served when only another process saw the write that changed it",
+    )
+
+    # Per-process snapshots of the models each provider offers, see letta/services/helpers/provider_model_catalog.py
+    provider_catalog_refresh_seconds: int = Field(
+        default=600, description="Age after which a provider's model list is refreshed in the background"
+    )
+    provider_catalog_refresh_jitter: float = Field(
+        default=0.2, description="Fraction by which refresh times are randomly spread so that providers are not all listed at once"
+    )
+    provider_catalog_max_entries: int = Field(default=1_000, description="Provider model lists kept in process")
+    resolved_model_config_cache_size: int = Field(
+        default=1_000, description="LLM and embedding configs resolved from handles kept in process"
+    )
+
+    # Per-agent cache of converted LLM request messages and tool definitions
+    llm_request_prefix_cache_agents: int = Field(
+        default=1_000, description="Agents whose converted request messages are kept in process; 0 disables the cache"
+    )
+
+    # Process-wide embedding scheduler: requests to one endpoint are packed by estimated tokens and share an AIMD concurrency limit
+    embedding_max_tokens_per_request: int = Field(default=300_000, description="Estimated tokens packed into one embedding request")
+    embedding_initial_concurrency: int = Field(default=4, description="Embedding requests in flight per endpoint before adapting")
+    embedding_max_concurrency: int = Field(default=16, description="Upper bound for the adaptive embedding request concurrency")
+    embedding_target_latency_seconds: float = Field(
+        default=5.0, description="Embedding requests faster than this grow the concurrency limit; rate limits halve it"
+    )
+
+    # Token counting for context window overviews: "api" uses provider count_tokens endpoints where available,
+    # "local" uses calibrated offline tokenizers and never leaves the process
+    token_counter_mode: Literal["api", "local"] = Field(default="local", description="Token counting strategy for context windows")
+
     # For encryption
     encryption_key: Optional[str] = None
 
     # File processing timeout settings
     file_processing_timeout_minutes: int = 30
     file_processing_timeout_error_message: str = "File processing timed out after {} minutes. Please try again."
+    file_processing_embedding_concurrency: int = Field(
+        default=4, description="Embedding batches in flight per file while chunks stream from the chunker into the database"
+    )
 
     @property
     def letta_pg_uri(self) -> str:
@@ -1,8 +1,12 @@
+import re
 from typing import Optional, Tuple
 
 from letta.constants import DEFAULT_MESSAGE_TOOL_KWARG
 from letta.local_llm.constants import INNER_THOUGHTS_KWARG
 
+# characters that can change the extractor's state while inside a string
+_STRING_SPECIAL_CHARS = re.compile(r'["\\]')
+
 
 class JSONInnerThoughtsExtractor:
     """
@@ -38,8 +42,9 @@ class JSONInnerThoughtsExtractor:
     def __init__(self, inner_thoughts_key=INNER_THOUGHTS_KWARG, wait_for_first_key=False):
         self.inner_thoughts_key = inner_thoughts_key
         self.wait_for_first_key = wait_for_first_key
-        self.main_buffer = ""
-        self.inner_thoughts_buffer = ""
+        # accumulated output, joined on read (see main_json / inner_thoughts)
+        self.main_buffer = []
+        self.inner_thoughts_buffer = []
         self.state = "start"  # Possible states: start, key, colon, value, comma_or_end, end
         self.in_string = False
         self.escaped = False
@@ -54,6 +59,24 @@ class JSONInnerThoughtsExtractor:
         updates_inner_thoughts = ""
         i = 0
         while i < len(fragment):
+            # Fast path: consume a run of plain characters inside a key or value string at once
+            if self.in_string and not self.escaped and self.state in ("key", "value"):
+                match = _STRING_SPECIAL_CHARS.search(fragment, i)
+                end = match.start() if match else len(fragment)
+                if end > i:
+                    run = fragment[i:end]
+                    if self.state == "key":
+                        self.current_key += run
+                    elif self.is_inner_thoughts_value:
+                        updates_inner_thoughts += run
+                        self.inner_thoughts_buffer.append(run)
+                    elif self.hold_main_json:
+                        self.main_json_held_buffer += run
+                    else:
+                        updates_main_json += run
+                        self.main_buffer.append(run)
+                    i = end
+                    continue
             c = fragment[i]
             if self.escaped:
                 self.escaped = False
@@ -63,20 +86,20 @@ class JSONInnerThoughtsExtractor:
                     elif self.state == "value":
                         if self.is_inner_thoughts_value:
                             updates_inner_thoughts += c
-                            self.inner_thoughts_buffer += c
+                            self.inner_thoughts_buffer.append(c)
                         else:
                             if self.hold_main_json:
                                 self.main_json_held_buffer += c
                             else:
                                 updates_main_json += c
-                                self.main_buffer += c
+                                self.main_buffer.append(c)
                 else:
                     if not self.is_inner_thoughts_value:
                         if self.hold_main_json:
                             self.main_json_held_buffer += c
                         else:
                             updates_main_json += c
-                            self.main_buffer += c
+                            self.main_buffer.append(c)
             elif c == "\\":
                 self.escaped = True
                 if self.in_string:
@@ -85,20 +108,20 @@ class JSONInnerThoughtsExtractor:
                     elif self.state == "value":
                         if self.is_inner_thoughts_value:
                             updates_inner_thoughts += c
-                            self.inner_thoughts_buffer += c
+                            self.inner_thoughts_buffer.append(c)
                         else:
                             if self.hold_main_json:
                                 self.main_json_held_buffer += c
                             else:
                                 updates_main_json += c
-                                self.main_buffer += c
+                                self.main_buffer.append(c)
                 else:
                     if not self.is_inner_thoughts_value:
                         if self.hold_main_json:
                             self.main_json_held_buffer += c
                         else:
                             updates_main_json += c
-                            self.main_buffer += c
+                            self.main_buffer.append(c)
             # NOTE (fix): Streaming JSON can arrive token-by-token from the LLM.
             # In the old implementation we pre-inserted an opening quote after every
             # key's colon (i.e. we emitted '"key":"' immediately). That implicitly
@@ -118,7 +141,7 @@ class JSONInnerThoughtsExtractor:
                             # Release held main_json when starting to process the next key
                             if self.wait_for_first_key and self.hold_main_json and self.inner_thoughts_processed:
                                 updates_main_json += self.main_json_held_buffer
-                                self.main_buffer += self.main_json_held_buffer
+                                self.main_buffer.append(self.main_json_held_buffer)
                                 self.main_json_held_buffer = ""
                                 self.hold_main_json = False
                         elif self.state == "value":
@@ -128,7 +151,7 @@ class JSONInnerThoughtsExtractor:
                                     self.main_json_held_buffer += '"'
                                 else:
                                     updates_main_json += '"'
-                                    self.main_buffer += '"'
+                                    self.main_buffer.append('"')
                     else:
                         if self.state == "key":
                             self.state = "colon"
@@ -142,7 +165,7 @@ class JSONInnerThoughtsExtractor:
                                     self.main_json_held_buffer += '"'
                                 else:
                                     updates_main_json += '"'
-                                    self.main_buffer += '"'
+                                    self.main_buffer.append('"')
                             self.state = "comma_or_end"
                 else:
                     self.escaped = False
@@ -152,26 +175,26 @@ class JSONInnerThoughtsExtractor:
                         elif self.state == "value":
                             if self.is_inner_thoughts_value:
                                 updates_inner_thoughts += '"'
-                                self.inner_thoughts_buffer += '"'
+                                self.inner_thoughts_buffer.append('"')
                             else:
                                 if self.hold_main_json:
                                     self.main_json_held_buffer += '"'
                                 else:
                                     updates_main_json += '"'
-                                    self.main_buffer += '"'
+                                    self.main_buffer.append('"')
             elif self.in_string:
                 if self.state == "key":
                     self.current_key += c
                 elif self.state == "value":
                     if self.is_inner_thoughts_value:
                         updates_inner_thoughts += c
-                        self.inner_thoughts_buffer += c
+                        self.inner_thoughts_buffer.append(c)
                     else:
                         if self.hold_main_json:
                             self.main_json_held_buffer += c
                         else:
                             updates_main_json += c
-                            self.main_buffer += c
+                            self.main_buffer.append(c)
             else:
                 # NOTE (fix): Do NOT pre-insert an opening quote after ':' any more.
                 # The value may not be a string; we only emit quotes when we actually
@@ -192,7 +215,7 @@ class JSONInnerThoughtsExtractor:
                             self.main_json_held_buffer += key_colon
                         else:
                             updates_main_json += key_colon
-                            self.main_buffer += key_colon
+                            self.main_buffer.append(key_colon)
                 elif c == "," and self.state == "comma_or_end":
                     if self.is_inner_thoughts_value:
                         # Inner thoughts value ended
@@ -204,7 +227,7 @@ class JSONInnerThoughtsExtractor:
                             self.main_json_held_buffer += c
                         else:
                             updates_main_json += c
-                            self.main_buffer += c
+                            self.main_buffer.append(c)
                         self.state = "start"
                 elif c == "{":
                     if not self.is_inner_thoughts_value:
@@ -212,25 +235,25 @@ class JSONInnerThoughtsExtractor:
                             self.main_json_held_buffer += c
                         else:
                             updates_main_json += c
-                            self.main_buffer += c
+                            self.main_buffer.append(c)
                 elif c == "}":
                     self.state = "end"
                     if self.hold_main_json:
                         self.main_json_held_buffer += c
                     else:
                         updates_main_json += c
-                        self.main_buffer += c
+                        self.main_buffer.append(c)
                 else:
                     if self.state == "value":
                         if self.is_inner_thoughts_value:
                             updates_inner_thoughts += c
-                            self.inner_thoughts_buffer += c
+                            self.inner_thoughts_buffer.append(c)
                         else:
                             if self.hold_main_json:
                                 self.main_json_held_buffer += c
                             else:
                                 updates_main_json += c
-                                self.main_buffer += c
+                                self.main_buffer.append(c)
             i += 1
 
         return updates_main_json, updates_inner_thoughts
@@ -242,11 +265,11 @@ class JSONInnerThoughtsExtractor:
 
     @property
     def main_json(self):
-        return self.main_buffer
+        return "".join(self.main_buffer)
 
     @property
     def inner_thoughts(self):
-        return self.inner_thoughts_buffer
+        return "".join(self.inner_thoughts_buffer)
 
 
 class FunctionArgumentsStreamHandler:
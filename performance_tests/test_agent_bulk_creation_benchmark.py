@@ -0,0 +1,66 @@
+import os
+import time
+import uuid
+
+import pytest
+
+from letta.config import LettaConfig
+from letta.schemas.agent import CreateAgent
+from letta.schemas.block import CreateBlock
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.schemas.llm_config import LLMConfig
+from letta.server.server import SyncServer
+
+NUM_AGENTS = int(os.getenv("LETTA_BENCHMARK_NUM_AGENTS", 10_000))
+# agents created one by one to compare against, extrapolated to NUM_AGENTS
+NUM_SEQUENTIAL_AGENTS = int(os.getenv("LETTA_BENCHMARK_NUM_SEQUENTIAL_AGENTS", 100))
+
+
+@pytest.fixture(scope="module")
+def server():
+    config = LettaConfig.load()
+    config.save()
+    return SyncServer(init_with_default_org_and_user=False)
+
+
+@pytest.fixture(scope="module")
+def actor(server):
+    org = server.organization_manager.create_default_organization()
+    actor = server.user_manager.create_default_user(org_id=org.id)
+    server.tool_manager.upsert_base_tools(actor=actor)
+    return actor
+
+
+def _create_agent_request(run_id: str, i: int) -> CreateAgent:
+    return CreateAgent(
+        name=f"bulk_benchmark_{run_id}_{i}",
+        memory_blocks=[CreateBlock(label="human", value=f"User {i}"), CreateBlock(label="persona", value="I am a helpful assistant")],
+        llm_config=LLMConfig.default_config("gpt-4o-mini"),
+        embedding_config=EmbeddingConfig.default_config(provider="openai"),
+        tags=["benchmark", f"agent-{i}"],
+        include_base_tools=True,
+    )
+
+
+@pytest.mark.asyncio(loop_scope="module")
+async def test_bulk_agent_creation(server, actor):
+    """Measures creating NUM_AGENTS agents with one create_agents_async call against creating them one by one."""
+    run_id = uuid.uuid4().hex[:6]
+
+    requests = [_create_agent_request(run_id, i) for i in range(NUM_SEQUENTIAL_AGENTS)]
+    start = time.perf_counter()
+    for request in requests:
+        await server.agent_manager.create_agent_async(request, actor=actor)
+    sequential_per_agent = (time.perf_counter() - start) / NUM_SEQUENTIAL_AGENTS
+
+    requests = [_create_agent_request(run_id, NUM_SEQUENTIAL_AGENTS + i) for i in range(NUM_AGENTS)]
+    start = time.perf_counter()
+    agents = await server.agent_manager.create_agents_async(requests, actor=actor)
+    bulk_elapsed = time.perf_counter() - start
+
+    assert [agent.name for agent in agents] == [request.name for request in requests]
+    assert all(len(agent.memory.blocks) == 2 and agent.tools and agent.message_ids for agent in agents)
+
+    print(f"\n{NUM_AGENTS} agents")
+    print(f"  one by one: {sequential_per_agent * 1000:.1f} ms per agent (~{sequential_per_agent * NUM_AGENTS:.0f} s for all)")
+    print(f"  bulk:       {bulk_elapsed / NUM_AGENTS * 1000:.1f} ms per agent ({bulk_elapsed:.1f} s for all)")
@@ -0,0 +1,76 @@
+import os
+import statistics
+import time
+
+import pytest
+
+from letta.functions.functions import parse_source_code
+from letta.functions.schema_generator import generate_schema
+from letta.schemas.enums import SandboxType
+from letta.schemas.sandbox_config import LocalSandboxConfig, SandboxConfig
+from letta.schemas.tool import Tool
+from letta.schemas.user import User
+from letta.services.tool_sandbox.local_sandbox import AsyncToolSandboxLocal
+from letta.settings import tool_settings
+
+NUM_CALLS = int(os.getenv("LETTA_BENCHMARK_NUM_TOOL_CALLS", 50))
+ORG_ID = "org-00000000-0000-4000-8000-000000000000"
+
+
+def add_integers(x: int, y: int) -> int:
+    """
+    Add two integers.
+
+    Args:
+        x (int): The first integer to add.
+        y (int): The second integer to add.
+
+    Returns:
+        int: The result of adding x and y.
+    """
+    return x + y
+
+
+async def _measure(sandbox_config: SandboxConfig, tool: Tool, user: User) -> list[float]:
+    latencies = []
+    for i in range(NUM_CALLS):
+        sandbox = AsyncToolSandboxLocal(
+            tool.name, {"x": i, "y": 1}, user=user, tool_object=tool, sandbox_config=sandbox_config, sandbox_env_vars={}
+        )
+        start = time.perf_counter()
+        result = await sandbox.run()
+        latencies.append(time.perf_counter() - start)
+        assert result.func_return == i + 1, result
+    return latencies
+
+
+def _summary(latencies: list[float]) -> str:
+    p95 = statistics.quantiles(latencies, n=20)[-1]
+    return f"p50 {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms"
+
+
+@pytest.mark.asyncio
+async def test_worker_pool_vs_one_shot_latency(tmp_path, monkeypatch):
+    """Compares tool call latency of the local sandbox with warm workers against a new interpreter per call."""
+    user = User(name="benchmark", organization_id=ORG_ID)
+    tool = Tool(
+        name=add_integers.__name__,
+        description="",
+        source_type="python",
+        tags=[],
+        source_code=parse_source_code(add_integers),
+        json_schema=generate_schema(add_integers, None),
+    )
+    sandbox_config = SandboxConfig(
+        type=SandboxType.LOCAL, organization_id=ORG_ID, config=LocalSandboxConfig(sandbox_dir=str(tmp_path)).model_dump()
+    )
+
+    monkeypatch.setattr(tool_settings, "tool_sandbox_worker_pool_size", 0)
+    one_shot = await _measure(sandbox_config, tool, user)
+
+    monkeypatch.setattr(tool_settings, "tool_sandbox_worker_pool_size", 4)
+    pooled = await _measure(sandbox_config, tool, user)
+
+    print(f"\n{NUM_CALLS} calls of {tool.name}")
+    print(f"  one-shot subprocess: {_summary(one_shot)}")
+    print(f"  worker pool:         {_summary(pooled)} (first call {pooled[0] * 1000:.1f} ms)")
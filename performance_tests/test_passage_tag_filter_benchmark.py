@@ -0,0 +1,125 @@
+import os
+import random
+import statistics
+import time
+import uuid
+
+import pytest
+from sqlalchemy import insert
+
+from letta.config import LettaConfig
+from letta.orm.passage import ArchivalPassage
+from letta.orm.passage_tag import PassageTag
+from letta.schemas.agent import CreateAgent
+from letta.schemas.embedding_config import EmbeddingConfig
+from letta.schemas.enums import TagMatchMode
+from letta.schemas.llm_config import LLMConfig
+from letta.server.db import db_registry
+from letta.server.server import SyncServer
+
+NUM_PASSAGES = int(os.getenv("LETTA_BENCHMARK_NUM_PASSAGES", 1_000_000))
+NUM_TAGS = int(os.getenv("LETTA_BENCHMARK_NUM_TAGS", 3_000))
+TAGS_PER_PASSAGE = 3
+INSERT_BATCH_SIZE = 10_000
+NUM_QUERIES = 20
+LIMIT = 50
+
+
+@pytest.fixture(scope="module")
+def server():
+    config = LettaConfig.load()
+    config.save()
+    return SyncServer(init_with_default_org_and_user=False)
+
+
+@pytest.fixture(scope="module")
+def actor(server):
+    org = server.organization_manager.create_default_organization()
+    return server.user_manager.create_default_user(org_id=org.id)
+
+
+@pytest.fixture(scope="module")
+async def seeded_archive(server, actor):
+    """Bulk-inserts passages and junction rows directly, bypassing embedding."""
+    agent = await server.agent_manager.create_agent_async(
+        agent_create=CreateAgent(
+            name=f"tag_benchmark_{uuid.uuid4().hex[:6]}",
+            memory_blocks=[],
+            llm_config=LLMConfig.default_config("gpt-4o-mini"),
+            embedding_config=EmbeddingConfig.default_config(provider="openai"),
+            include_base_tools=False,
+        ),
+        actor=actor,
+    )
+    archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+        agent_id=agent.id, agent_name=agent.name, actor=actor
+    )
+
+    rng = random.Random(0)
+    tag_pool = [f"tag-{i}" for i in range(NUM_TAGS)]
+    embedding_config = EmbeddingConfig.default_config(provider="openai").model_dump()
+
+    async with db_registry.async_session() as session:
+        for start in range(0, NUM_PASSAGES, INSERT_BATCH_SIZE):
+            passages, passage_tags = [], []
+            for _ in range(min(INSERT_BATCH_SIZE, NUM_PASSAGES - start)):
+                passage_id = f"passage-{uuid.uuid4()}"
+                tags = rng.sample(tag_pool, TAGS_PER_PASSAGE)
+                passages.append(
+                    {
+                        "id": passage_id,
+                        "text": f"benchmark passage {start}",
+                        "embedding_config": embedding_config,
+                        "metadata_": {},
+                        "tags": tags,
+                        "archive_id": archive.id,
+                        "organization_id": actor.organization_id,
+                    }
+                )
+                passage_tags.extend(
+                    {
+                        "id": f"passage-tag-{uuid.uuid4()}",
+                        "tag": tag,
+                        "passage_id": passage_id,
+                        "archive_id": archive.id,
+                        "organization_id": actor.organization_id,
+                    }
+                    for tag in tags
+                )
+            await session.execute(insert(ArchivalPassage), passages)
+            await session.execute(insert(PassageTag), passage_tags)
+        await session.commit()
+
+    return agent, tag_pool
+
+
+@pytest.mark.parametrize("tag_match_mode", [TagMatchMode.ANY, TagMatchMode.ALL])
+@pytest.mark.asyncio(loop_scope="module")
+async def test_tag_filtered_passage_query(server, actor, seeded_archive, tag_match_mode):
+    """Measures latency of tag-filtered archival queries now that the filter runs before LIMIT in SQL."""
+    agent, tag_pool = seeded_archive
+    rng = random.Random(1)
+
+    latencies, result_sizes = [], []
+    for _ in range(NUM_QUERIES):
+        tags = rng.sample(tag_pool, 2)
+        start = time.perf_counter()
+        results = await server.agent_manager.query_agent_passages_async(
+            actor=actor, agent_id=agent.id, limit=LIMIT, tags=tags, tag_match_mode=tag_match_mode
+        )
+        latencies.append(time.perf_counter() - start)
+        result_sizes.append(len(results))
+
+        for passage, _, _ in results:
+            if tag_match_mode == TagMatchMode.ALL:
+                assert set(tags).issubset(passage.tags)
+            else:
+                assert set(tags) & set(passage.tags)
+
+    print(f"\n{tag_match_mode.value}: {NUM_PASSAGES} passages, {NUM_TAGS} tags")
+    print(f"  latency median {statistics.median(latencies) * 1000:.1f} ms, max {max(latencies) * 1000:.1f} ms")
+    print(f"  results per query: mean {statistics.mean(result_sizes):.1f} (limit {LIMIT})")
+
+    if tag_match_mode == TagMatchMode.ANY and NUM_PASSAGES * TAGS_PER_PASSAGE / NUM_TAGS >= LIMIT:
+        # selective tags still fill the page since the filter is applied before LIMIT
+        assert min(result_sizes) == LIMIT
@@ -0,0 +1,71 @@
+import json
+import statistics
+import time
+
+from faker import Faker
+
+from letta.server.rest_api.json_parser import IncrementalJSONParser, OptimisticJSONParser, PydanticJSONParser, string_delta
+
+ARGUMENTS_BYTES = 50_000
+DELTA_SIZE = 8
+NUM_ROUNDS = 3
+
+
+def _build_arguments(size: int) -> str:
+    fake = Faker()
+    Faker.seed(0)
+    thoughts = fake.paragraph(nb_sentences=4)
+    message = ""
+    while len(message) < size:
+        message += fake.paragraph(nb_sentences=6) + "\n"
+    return json.dumps({"inner_thoughts": thoughts, "message": message[:size], "request_heartbeat": True})
+
+
+def _deltas(text: str) -> list[str]:
+    return [text[i : i + DELTA_SIZE] for i in range(0, len(text), DELTA_SIZE)]
+
+
+def _stream_reparse(parser, deltas: list[str]) -> str:
+    """How the streaming interfaces used to work: re-parse the accumulated buffer on every delta and diff the message."""
+    buffer, previous, streamed = "", "", []
+    for delta in deltas:
+        buffer += delta
+        current = parser.parse(buffer).get("message", "")
+        streamed.append(current[len(previous) :])
+        previous = current
+    return "".join(streamed)
+
+
+def _stream_incremental(deltas: list[str]) -> str:
+    parser = IncrementalJSONParser()
+    return "".join(string_delta(parser.feed(delta), "message") for delta in deltas)
+
+
+def _median_seconds(fn, *args) -> tuple[float, str]:
+    timings, result = [], None
+    for _ in range(NUM_ROUNDS):
+        start = time.perf_counter()
+        result = fn(*args)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def test_incremental_vs_reparsing_50kb_argument_stream():
+    """Streams 50KB of send_message arguments in small deltas through the incremental parser and the re-parsing parsers."""
+    arguments = _build_arguments(ARGUMENTS_BYTES)
+    deltas = _deltas(arguments)
+    expected = json.loads(arguments)["message"]
+
+    incremental_s, incremental_message = _median_seconds(_stream_incremental, deltas)
+    pydantic_s, _ = _median_seconds(_stream_reparse, PydanticJSONParser(), deltas)
+    optimistic_s, _ = _median_seconds(_stream_reparse, OptimisticJSONParser(), deltas[: len(deltas) // 10])
+
+    print(f"\n{len(deltas)} deltas of {DELTA_SIZE} chars ({len(arguments)} bytes)")
+    print(f"IncrementalJSONParser:            median {incremental_s * 1000:.1f} ms")
+    print(f"PydanticJSONParser re-parse:      median {pydantic_s * 1000:.1f} ms")
+    print(f"OptimisticJSONParser re-parse:    median {optimistic_s * 1000:.1f} ms (first 10% of the stream)")
+
+    # diffing re-parsed prefixes goes wrong whenever a delta ends inside an escape sequence (the partial string
+    # shrinks), so only the incremental stream is expected to reproduce the message exactly
+    assert incremental_message == expected
+    assert incremental_s < pydantic_s
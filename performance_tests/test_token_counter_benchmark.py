@@ -0,0 +1,59 @@
+import os
+import statistics
+import time
+
+import pytest
+from faker import Faker
+
+from letta.llm_api.anthropic_client import AnthropicClient
+from letta.services.context_window_calculator.token_counter import AnthropicTokenCounter, ApproximateTokenCounter, TokenMemo
+
+MODEL = os.getenv("LETTA_BENCHMARK_ANTHROPIC_MODEL", "claude-3-5-haiku-20241022")
+NUM_MESSAGES = 200
+NUM_ROUNDS = 10
+
+
+def _build_conversation(n: int) -> list[dict]:
+    fake = Faker()
+    Faker.seed(0)
+    messages = []
+    for i in range(n):
+        role = "user" if i % 2 == 0 else "assistant"
+        messages.append({"role": role, "content": fake.paragraph(nb_sentences=6)})
+    return messages
+
+
+@pytest.mark.skipif(not os.getenv("ANTHROPIC_API_KEY"), reason="Requires ANTHROPIC_API_KEY to compare against count_tokens")
+@pytest.mark.asyncio
+async def test_local_vs_api_token_counting():
+    """Compares accuracy and latency of the calibrated local counter against the Anthropic count_tokens API.
+
+    Each round appends one message to the conversation, mirroring how the context window grows between steps.
+    """
+    conversation = _build_conversation(NUM_MESSAGES + NUM_ROUNDS)
+    api_counter = AnthropicTokenCounter(AnthropicClient(), MODEL)
+    local_counter = ApproximateTokenCounter(provider="anthropic", model=MODEL, memo=TokenMemo())
+
+    api_latencies, local_latencies, errors = [], [], []
+    for round_idx in range(NUM_ROUNDS):
+        messages = conversation[: NUM_MESSAGES + round_idx]
+
+        start = time.perf_counter()
+        api_count = await api_counter.count_message_tokens(messages)
+        api_latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        local_count = await local_counter.count_message_tokens(messages)
+        local_latencies.append(time.perf_counter() - start)
+
+        errors.append(abs(local_count - api_count) / api_count)
+        # feed the recorded API count back so later rounds use the calibrated multiplier
+        ApproximateTokenCounter.calibrate("anthropic", local_count=round(local_count / local_counter.multiplier), api_count=api_count)
+
+    print(f"\nAPI   count_tokens: median {statistics.median(api_latencies) * 1000:.1f} ms")
+    print(f"Local count:        median {statistics.median(local_latencies) * 1000:.2f} ms")
+    print(f"Relative error:     mean {statistics.mean(errors):.2%}, last {errors[-1]:.2%}")
+    print(f"Memo hit rate:      {local_counter.memo.hits / max(1, local_counter.memo.hits + local_counter.memo.misses):.2%}")
+
+    assert errors[-1] < 0.15
+    assert statistics.median(local_latencies) < statistics.median(api_latencies)
@@ -6,6 +6,7 @@ from typing import Generator
 import pytest
 from anthropic.types.beta.messages import BetaMessageBatch, BetaMessageBatchRequestCounts
 
+from letta.helpers.embedding_cache import get_embedding_cache
 from letta.server.db import db_registry
 from letta.services.organization_manager import OrganizationManager
 from letta.services.user_manager import UserManager
@@ -46,6 +47,15 @@ async def cleanup_db_connections():
         pass
 
 
+@pytest.fixture(autouse=True)
+def clear_embedding_cache():
+    """Keep embeddings cached by one test from satisfying another test's mocked embedding requests."""
+    cache = get_embedding_cache()
+    if cache is not None:
+        cache.clear()
+    yield
+
+
 @pytest.fixture
 def disable_e2b_api_key() -> Generator[None, None, None]:
     """
@@ -0,0 +1,139 @@
+import asyncio
+
+import pytest
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.helpers import memory_cache as memory_cache_module
+from letta.helpers.decorators import async_redis_cache
+from letta.helpers.memory_cache import MemoryCache, get_memory_cache
+from letta.schemas.user import User as PydanticUser
+from letta.settings import settings
+
+
+@pytest.fixture(autouse=True)
+def _fresh_memory_cache(monkeypatch):
+    monkeypatch.setattr(memory_cache_module, "_memory_cache", None)
+    yield
+    monkeypatch.setattr(memory_cache_module, "_memory_cache", None)
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    @async_redis_cache(key_func=lambda self, text: f"length:{text}", prefix="test_cache")
+    async def length(self, text: str) -> int:
+        self.calls += 1
+        return len(text)
+
+    @async_redis_cache(key_func=lambda self, user_id: f"user:{user_id}", prefix="test_cache", model_class=PydanticUser)
+    async def user(self, user_id: str) -> PydanticUser:
+        self.calls += 1
+        return PydanticUser(id=user_id, name="name", organization_id="org-00000000-0000-4000-8000-000000000000")
+
+
+@pytest.mark.asyncio
+async def test_results_are_cached_in_process():
+    counter = Counter()
+    misses, memory_hits = Counter.length.cache_stats.misses, Counter.length.cache_stats.tier_hits.get("memory", 0)
+
+    assert await counter.length("hello") == 5
+    assert await counter.length("hello") == 5
+    assert await counter.length("hello") == 5
+
+    assert counter.calls == 1
+    assert Counter.length.cache_stats.misses - misses == 1
+    assert Counter.length.cache_stats.tier_hits["memory"] - memory_hits == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_models_are_not_shared():
+    counter = Counter()
+    user_id = "user-00000000-0000-4000-8000-000000000001"
+    first = await counter.user(user_id)
+    first.name = "mutated"
+
+    second = await counter.user(user_id)
+    assert counter.calls == 1
+    assert second.name == "name"
+    assert second is not first
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_the_in_process_value():
+    counter = Counter()
+    await counter.length("abc")
+    assert await Counter.length.cache_invalidate(counter, "abc")
+    await counter.length("abc")
+    assert counter.calls == 2
+
+    assert Counter.length.cache_invalidate_local(counter, "abc")
+    await counter.length("abc")
+    assert counter.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_memory_tier_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "memory_cache_max_bytes", 0)
+    if not isinstance(await get_redis_client(), NoopAsyncRedisClient):
+        pytest.skip("redis is configured")
+
+    counter = Counter()
+    await counter.length("abc")
+    await counter.length("abc")
+    assert counter.calls == 2
+    assert get_memory_cache() is None
+
+
+@pytest.mark.asyncio
+async def test_fill_racing_an_invalidation_is_dropped():
+    counter = Counter()
+    release = asyncio.Event()
+
+    class Slow:
+        @async_redis_cache(key_func=lambda self: "slow", prefix="test_cache")
+        async def value(self) -> int:
+            counter.calls += 1
+            await release.wait()
+            return counter.calls
+
+    slow = Slow()
+    pending = asyncio.create_task(slow.value())
+    await asyncio.sleep(0)
+    # the value being computed may predate this invalidation, so it must not be cached
+    await Slow.value.cache_invalidate(slow)
+    release.set()
+    assert await pending == 1
+
+    assert await slow.value() == 2
+
+
+def test_memory_cache_is_bounded_by_size():
+    cache = MemoryCache(max_bytes=30)
+    cache.set("a", "x" * 9, ttl_s=60)
+    cache.set("b", "x" * 9, ttl_s=60)
+    cache.set("c", "x" * 9, ttl_s=60)
+    assert cache.size_bytes == 30
+
+    cache.get("a")
+    cache.set("d", "x" * 9, ttl_s=60)
+    # "b" was the least recently used entry
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.size_bytes == 30
+
+    # entries larger than the whole cache are not kept
+    assert not cache.set("e", "x" * 30, ttl_s=60)
+    assert len(cache) == 3
+
+
+def test_memory_cache_entries_expire(monkeypatch):
+    now = 1000.0
+    monkeypatch.setattr(memory_cache_module.time, "monotonic", lambda: now)
+    cache = MemoryCache(max_bytes=1024)
+    cache.set("a", "1", ttl_s=10)
+    assert cache.get("a") == "1"
+
+    now += 10
+    assert cache.get("a") is None
+    assert cache.size_bytes == 0
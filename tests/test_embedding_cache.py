@@ -0,0 +1,96 @@
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from letta.data_sources.redis_client import AsyncRedisClient
+from letta.helpers.embedding_cache import EmbeddingCache, embed_with_cache, get_embedding_cache
+from letta.schemas.embedding_config import EmbeddingConfig
+
+
+class InMemoryRedisClient(AsyncRedisClient):
+    # noinspection PyMissingConstructor
+    def __init__(self):
+        self.values = {}
+
+    async def mget(self, *keys):
+        return [self.values.get(key) for key in keys]
+
+    async def mset(self, mapping, ex=None):
+        self.values.update(mapping)
+
+
+ORG_ID = "org-00000000-0000-4000-8000-000000000000"
+
+
+def _embedding_config(
+    model: str = "text-embedding-3-small", dim: int = 4, endpoint_type: str = "openai", endpoint: str = "https://api.openai.com/v1"
+) -> EmbeddingConfig:
+    return EmbeddingConfig(
+        embedding_model=model,
+        embedding_endpoint_type=endpoint_type,
+        embedding_endpoint=endpoint,
+        embedding_dim=dim,
+    )
+
+
+async def _fake_embed(texts):
+    return [[float(len(text)), 1.0, 2.0, 3.0] for text in texts]
+
+
+@pytest.mark.asyncio
+async def test_only_uncached_distinct_texts_are_embedded():
+    embed = AsyncMock(side_effect=_fake_embed)
+    config = _embedding_config()
+
+    first = await embed_with_cache(["a", "bb", "a"], config, embed, organization_id=ORG_ID)
+    second = await embed_with_cache(["bb", "ccc", "a"], config, embed, organization_id=ORG_ID)
+
+    assert [call.args[0] for call in embed.call_args_list] == [["a", "bb"], ["ccc"]]
+    assert first == [[1.0, 1.0, 2.0, 3.0], [2.0, 1.0, 2.0, 3.0], [1.0, 1.0, 2.0, 3.0]]
+    assert second == [[2.0, 1.0, 2.0, 3.0], [3.0, 1.0, 2.0, 3.0], [1.0, 1.0, 2.0, 3.0]]
+    assert get_embedding_cache().stats.hits == 2
+
+
+@pytest.mark.asyncio
+async def test_key_includes_model_dimension_endpoint_and_organization():
+    embed = AsyncMock(side_effect=_fake_embed)
+
+    await embed_with_cache(["text"], _embedding_config(), embed, organization_id=ORG_ID)
+    await embed_with_cache(["text"], _embedding_config(model="text-embedding-3-large"), embed, organization_id=ORG_ID)
+    await embed_with_cache(["text"], _embedding_config(dim=8), embed, organization_id=ORG_ID)
+    await embed_with_cache(["text"], _embedding_config(endpoint_type="azure"), embed, organization_id=ORG_ID)
+    await embed_with_cache(["text"], _embedding_config(endpoint="http://localhost:8000/v1"), embed, organization_id=ORG_ID)
+    await embed_with_cache(["text"], _embedding_config(), embed, organization_id="org-other")
+
+    assert embed.await_count == 6
+
+
+@pytest.mark.asyncio
+async def test_lru_evicts_least_recently_used():
+    cache = EmbeddingCache(max_entries=2, ttl_s=60)
+    vectors = [np.full(4, i, dtype=np.float32) for i in range(3)]
+
+    await cache.set_many(["k0", "k1"], vectors[:2])
+    await cache.get_many(["k0"])
+    await cache.set_many(["k2"], vectors[2:])
+
+    found = await cache.get_many(["k0", "k1", "k2"])
+    assert found[1] is None
+    assert found[0].tolist() == vectors[0].tolist() and found[2].tolist() == vectors[2].tolist()
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_survives_process_cache_loss():
+    redis_client = InMemoryRedisClient()
+    embed = AsyncMock(side_effect=_fake_embed)
+    config = _embedding_config()
+
+    with patch("letta.helpers.embedding_cache.get_redis_client", new=AsyncMock(return_value=redis_client)):
+        await embed_with_cache(["persisted"], config, embed, organization_id=ORG_ID)
+        get_embedding_cache().clear()
+        result = await embed_with_cache(["persisted"], config, embed, organization_id=ORG_ID)
+
+    assert embed.await_count == 1
+    assert len(redis_client.values) == 1
+    assert result == [[9.0, 1.0, 2.0, 3.0]]
@@ -0,0 +1,106 @@
+import asyncio
+from unittest.mock import Mock
+
+import openai
+import pytest
+
+from letta.services.file_processor.embedder.embedding_scheduler import AIMDLimiter, EmbeddingScheduler, estimate_tokens
+
+
+def _scheduler(max_inputs: int = 100, max_tokens: int = 10_000, initial_limit: int = 1, max_limit: int = 4) -> EmbeddingScheduler:
+    return EmbeddingScheduler(
+        max_inputs=max_inputs,
+        max_tokens=max_tokens,
+        limiter=AIMDLimiter(initial_limit=initial_limit, max_limit=max_limit, target_latency_s=1.0),
+    )
+
+
+class RecordingEndpoint:
+    def __init__(self, delay_s: float = 0.0):
+        self.delay_s = delay_s
+        self.requests = []
+
+    async def __call__(self, inputs):
+        self.requests.append(list(inputs))
+        await asyncio.sleep(self.delay_s)
+        return [[float(len(text))] for text in inputs]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_requests():
+    scheduler = _scheduler()
+    endpoint = RecordingEndpoint()
+
+    results = await asyncio.gather(*(scheduler.embed([f"file {i} chunk a", f"file {i} chunk bb"], endpoint) for i in range(3)))
+
+    assert len(endpoint.requests) == 1
+    assert results[2] == [[float(len("file 2 chunk a"))], [float(len("file 2 chunk bb"))]]
+
+
+@pytest.mark.asyncio
+async def test_batches_are_packed_by_estimated_tokens():
+    texts = ["x" * 30 for _ in range(10)]
+    scheduler = _scheduler(max_tokens=3 * estimate_tokens(texts[0]))
+    endpoint = RecordingEndpoint()
+
+    await scheduler.embed(texts, endpoint)
+
+    assert [len(request) for request in endpoint.requests] == [3, 3, 3, 1]
+
+
+@pytest.mark.asyncio
+async def test_token_limit_error_splits_only_the_failed_batch():
+    scheduler = _scheduler()
+    requests = []
+
+    async def endpoint(inputs):
+        requests.append(len(inputs))
+        if len(inputs) > 2:
+            raise Exception("Requested 319270 tokens, max 300000 tokens per request")
+        return [[1.0] for _ in inputs]
+
+    assert len(await scheduler.embed([f"chunk {i}" for i in range(4)], endpoint)) == 4
+    assert requests == [4, 2, 2]
+
+
+@pytest.mark.asyncio
+async def test_rate_limits_halve_concurrency_and_are_retried(monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _no_wait(asyncio.sleep))
+    scheduler = _scheduler(max_inputs=1, initial_limit=4)
+    rate_limited = openai.RateLimitError(message="Rate limit", response=Mock(status_code=429), body=None)
+    calls = 0
+
+    async def endpoint(inputs):
+        nonlocal calls
+        calls += 1
+        if calls <= 2:
+            raise rate_limited
+        return [[1.0] for _ in inputs]
+
+    assert len(await scheduler.embed(["a", "b", "c", "d"], endpoint)) == 4
+    assert calls == 6
+    assert scheduler.limiter.limit < 4
+
+
+@pytest.mark.asyncio
+async def test_fast_requests_grow_concurrency_up_to_the_limit():
+    limiter = AIMDLimiter(initial_limit=1, max_limit=3, target_latency_s=1.0)
+    for _ in range(20):
+        await limiter.acquire()
+        await limiter.release(latency_s=0.01)
+    assert limiter.limit == 3
+
+    await limiter.acquire()
+    await limiter.release(latency_s=5.0)
+    assert limiter.limit == 3
+
+    await limiter.acquire()
+    await limiter.release(latency_s=0.01, throttled=True)
+    assert limiter.limit == 1.5
+
+
+def _no_wait(sleep):
+    async def no_wait(delay, *args, **kwargs):
+        return await sleep(0, *args, **kwargs)
+
+    return no_wait
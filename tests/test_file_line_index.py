@@ -0,0 +1,68 @@
+import random
+import re
+
+import pytest
+
+from letta.schemas.file import FileMetadata
+from letta.services.file_processor.chunker import line_index
+from letta.services.file_processor.chunker.line_chunker import LineChunker
+from letta.services.file_processor.chunker.line_index import FileLineIndex, chunk_from_span, chunk_spans, required_literals
+
+TEXTS = [
+    "  Hello World.  Next Sentence!\n\n Third one?  yes\n",
+    "def f():\n    return 1  \n\n\tx = 'İstanbul'\r\nKelvin K\x0cform feed separated",
+    "   \n  \n",
+    "single line",
+]
+
+WORDS = ["alpha", "Beta", "gamma", "DELTA", "İnci", "straße", "KELVIN", "foo_bar", "x1y2", "  indented"]
+
+
+def _chunks(text: str, file_name: str) -> list[str]:
+    file = FileMetadata(file_name=file_name, source_id="source-1", content=text)
+    return [line.split(": ", 1)[1] for line in LineChunker().chunk_text(file, add_metadata=False)]
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("file_name", ["notes.md", "script.py", "data.json", "plain.txt"])
+def test_spans_match_line_chunker(text, file_name):
+    strategy = LineChunker()._determine_chunking_strategy(FileMetadata(file_name=file_name, source_id="source-1"))
+    assert [chunk_from_span(text[start:end], strategy) for start, end in chunk_spans(text, strategy)] == _chunks(text, file_name)
+
+
+def test_required_literals():
+    assert required_literals("Hello World") == ["hello world"]
+    assert required_literals(r"\bdef\s+(foo_\w+)\(") == ["def", "foo_"]
+    assert required_literals("(?:abcd){2,}x") == ["abcd"]
+    # optional parts, alternatives and short literals are not required
+    assert required_literals("(?:abcd)?|xyz") == []
+    assert required_literals("a.b") == []
+    assert required_literals("[unclosed") == []
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    ["alpha", "ALPHA beta", "inci", "kelvin", "gam+a", "(delta|beta)", "^foo_bar x1y2$", r"\bbeta\b\s+gamma", "İnci", "a.pha", "zzz"],
+)
+def test_candidates_include_every_matching_line(monkeypatch, pattern):
+    # small segments, so that queries span several of them
+    monkeypatch.setattr(line_index, "SEGMENT_MAX_CHARS", 2_000)
+    rnd = random.Random(0)
+    text = "\n".join(" ".join(rnd.choice(WORDS) for _ in range(rnd.randint(0, 6))) for _ in range(2_000))
+    strategy = LineChunker()._determine_chunking_strategy(FileMetadata(file_name="words.txt", source_id="source-1"))
+
+    index = FileLineIndex.from_bytes(FileLineIndex.build(text, strategy).to_bytes())
+    assert len(index.segments) > 1
+    lines = [text[start:end] for start, end in index.spans.tolist()]
+    assert lines == _chunks(text, "words.txt")
+
+    regex = re.compile(pattern, re.IGNORECASE | re.MULTILINE)
+    matching = [i for i, line in enumerate(lines) if regex.search(line.strip())]
+    candidates = index.candidate_lines(pattern, re.IGNORECASE | re.MULTILINE)
+    if candidates is None:
+        assert not required_literals(pattern, re.IGNORECASE)
+    else:
+        assert set(matching) <= set(candidates.tolist())
+        assert candidates.tolist() == sorted(candidates.tolist())
+        # no literal occurs on every line
+        assert len(candidates) < len(lines)
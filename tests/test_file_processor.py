@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import AsyncMock, Mock, patch
 
 import openai
@@ -291,3 +292,120 @@ class TestFileProcessorWithPinecone:
                         assert call_args.kwargs["file_id"] == mock_file.id
                         assert call_args.kwargs["source_id"] == mock_file.source_id
                         assert len(call_args.kwargs["chunks"]) > 0
+
+
+class TestFileProcessorPipeline:
+    """Test suite for the streaming chunk -> embed -> insert pipeline"""
+
+    @pytest.fixture
+    def file_processor(self):
+        from letta.services.file_processor.file_processor import FileProcessor
+        from letta.services.file_processor.parser.markitdown_parser import MarkitdownFileParser
+
+        embedding_config = EmbeddingConfig(
+            embedding_model="text-embedding-3-small",
+            embedding_endpoint_type="openai",
+            embedding_endpoint="https://api.openai.com/v1",
+            embedding_dim=3,
+            embedding_chunk_size=300,
+            batch_size=2,
+        )
+        with patch("letta.services.file_processor.embedder.openai_embedder.LLMClient.create"):
+            embedder = OpenAIEmbedder(embedding_config)
+        embedder.client = Mock()
+        embedder.client.request_embeddings = AsyncMock(side_effect=lambda inputs, embedding_config: [[0.1, 0.2, 0.3] for _ in inputs])
+
+        actor = Mock()
+        actor.organization_id = "test_org"
+        return FileProcessor(file_parser=MarkitdownFileParser(), embedder=embedder, actor=actor)
+
+    @pytest.fixture
+    def file_metadata(self):
+        from letta.schemas.enums import FileProcessingStatus
+        from letta.schemas.file import FileMetadata
+
+        return FileMetadata(file_name="test.txt", source_id="source-87654321", processing_status=FileProcessingStatus.EMBEDDING)
+
+    @pytest.mark.asyncio
+    async def test_batches_are_inserted_in_order_with_progress(self, file_processor, file_metadata):
+        pages = [f"This is page number {i} of the document." for i in range(7)]
+        inserted_batches, progress = [], []
+
+        async def create_many(passages, file_metadata, actor):
+            # finish batches out of order to exercise reordering
+            await asyncio.sleep(0.01 * (len(inserted_batches) % 2))
+            inserted_batches.append([p.text for p in passages])
+            return passages
+
+        async def update_status(**kwargs):
+            progress.append(kwargs)
+            return file_metadata
+
+        with (
+            patch.object(file_processor.passage_manager, "list_passage_texts_by_file_id_async", new=AsyncMock(return_value=[])),
+            patch.object(file_processor.passage_manager, "create_many_source_passages_async", new=create_many),
+            patch.object(file_processor.file_manager, "update_file_status", new=update_status),
+        ):
+            passages = await file_processor._chunk_embed_and_insert(file_metadata=file_metadata, pages=pages, source_id="source-87654321")
+
+        assert [text for batch in inserted_batches for text in batch] == pages
+        assert all(len(batch) <= 2 for batch in inserted_batches)
+        assert [p.text for p in passages] == pages
+        assert all(p.embedding is None for p in passages)
+
+        embedded_counts = [call["chunks_embedded"] for call in progress if "chunks_embedded" in call]
+        assert embedded_counts == sorted(embedded_counts)
+        assert embedded_counts[-1] == len(pages)
+        assert any(call.get("total_chunks") == len(pages) for call in progress)
+
+    @pytest.mark.asyncio
+    async def test_resume_skips_stored_chunks_and_deletes_stale(self, file_processor, file_metadata):
+        pages = [f"This is page number {i} of the document." for i in range(5)]
+        stored = [("passage-0", pages[0]), ("passage-3", pages[3]), ("passage-stale", "Text from an older version of the file.")]
+        update_status = AsyncMock(return_value=file_metadata)
+        delete_passage = AsyncMock(return_value=True)
+
+        with (
+            patch.object(file_processor.passage_manager, "list_passage_texts_by_file_id_async", new=AsyncMock(return_value=stored)),
+            patch.object(
+                file_processor.passage_manager,
+                "create_many_source_passages_async",
+                new=AsyncMock(side_effect=lambda passages, file_metadata, actor: passages),
+            ),
+            patch.object(file_processor.passage_manager, "delete_source_passage_by_id_async", new=delete_passage),
+            patch.object(file_processor.file_manager, "update_file_status", new=update_status),
+        ):
+            passages = await file_processor._chunk_embed_and_insert(file_metadata=file_metadata, pages=pages, source_id="source-87654321")
+
+        embedded_inputs = [
+            text for call in file_processor.embedder.client.request_embeddings.call_args_list for text in call.kwargs["inputs"]
+        ]
+        assert embedded_inputs == [pages[1], pages[2], pages[4]]
+        assert [p.text for p in passages] == [pages[1], pages[2], pages[4]]
+        delete_passage.assert_awaited_once_with(passage_id="passage-stale", actor=file_processor.actor)
+        assert update_status.call_args.kwargs["chunks_embedded"] == len(pages)
+
+    @pytest.mark.asyncio
+    async def test_resume_reuses_pieces_of_resplit_chunks(self, file_processor, file_metadata):
+        from letta.services.file_processor.chunker.llama_index_chunker import LlamaIndexChunker
+
+        pages = [f"First half of page {i}. | Second half of page {i}." for i in range(3)]
+        # page 1 was re-split by the embedding fallback in the interrupted run
+        stored = [("passage-0", pages[0]), ("passage-1a", "First half of page 1."), ("passage-1b", "Second half of page 1.")]
+        delete_passage = AsyncMock(return_value=True)
+
+        with (
+            patch.object(LlamaIndexChunker, "default_chunk_text", new=lambda self, text: text.split(" | ")),
+            patch.object(file_processor.passage_manager, "list_passage_texts_by_file_id_async", new=AsyncMock(return_value=stored)),
+            patch.object(
+                file_processor.passage_manager,
+                "create_many_source_passages_async",
+                new=AsyncMock(side_effect=lambda passages, file_metadata, actor: passages),
+            ),
+            patch.object(file_processor.passage_manager, "delete_source_passage_by_id_async", new=delete_passage),
+            patch.object(file_processor.file_manager, "update_file_status", new=AsyncMock(return_value=file_metadata)),
+        ):
+            passages = await file_processor._chunk_embed_and_insert(file_metadata=file_metadata, pages=pages, source_id="source-87654321")
+
+        assert [p.text for p in passages] == [pages[2]]
+        delete_passage.assert_not_awaited()
@@ -0,0 +1,93 @@
+import json
+import random
+
+import pytest
+
+from letta.server.rest_api.json_parser import IncrementalJSONParser, JSONEventType, PydanticJSONParser, string_delta
+
+DOCUMENTS = [
+    {"inner_thoughts": "Thinking about it", "message": "Hello there!", "request_heartbeat": True},
+    {"a": [1, -2.5, 3e10, None, False, {"b": "c"}], "d": {}, "e": [], "f": ""},
+    {"escapes": 'quote " backslash \\ slash / newline \n tab \t', "unicode": "é 世界 😀"},
+    {"nested": {"deeper": {"deepest": ["x", ["y", ["z"]]]}}, "number": 0},
+    [1, "two", {"three": 3}],
+]
+
+
+def _chunks(text: str, rng: random.Random):
+    i = 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        yield text[i : i + size]
+        i += size
+
+
+@pytest.mark.parametrize("document", DOCUMENTS)
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_chunked_parse_matches_json_loads(document, ensure_ascii):
+    text = json.dumps(document, ensure_ascii=ensure_ascii)
+    rng = random.Random(0)
+    for _ in range(50):
+        parser = IncrementalJSONParser()
+        for chunk in _chunks(text, rng):
+            parser.feed(chunk)
+        assert parser.value == document
+
+
+def test_string_deltas_stream_only_new_characters():
+    parser = IncrementalJSONParser()
+    inner_thoughts, message = [], []
+    for chunk in ['{"inner_thou', 'ghts": "Let me', " think", '", "mess', 'age": "Hi', ' \\"you\\"', '!"}']:
+        events = parser.feed(chunk)
+        inner_thoughts.append(string_delta(events, "inner_thoughts"))
+        message.append(string_delta(events, "message"))
+
+    assert inner_thoughts == ["", "Let me", " think", "", "", "", ""]
+    assert message == ["", "", "", "", "Hi", ' "you"', "!"]
+
+
+def test_events_report_keys_and_completed_values():
+    parser = IncrementalJSONParser()
+    events = parser.feed('{"a": {"b": [true, 12]}, "c": "d"}')
+
+    assert [e.value for e in events if e.type == JSONEventType.KEY] == ["a", "b", "c"]
+    completed = {e.path: e.value for e in events if e.type == JSONEventType.VALUE}
+    assert completed[("a", "b", 0)] is True
+    assert completed[("a", "b", 1)] == 12
+    assert completed[("c",)] == "d"
+    assert completed[()] == {"a": {"b": [True, 12]}, "c": "d"}
+
+
+def test_unicode_escape_split_across_chunks():
+    parser = IncrementalJSONParser()
+    deltas = [string_delta(parser.feed(chunk), "m") for chunk in ['{"m": "\\u', "00e9\\ud8", "3d\\ude", '00"}']]
+
+    assert deltas == ["", "é", "", "😀"]
+    assert parser.value == {"m": "é😀"}
+
+
+def test_partial_value_matches_pydantic_parser():
+    # string values only: numbers and literals that are still being read are left out by the incremental parser
+    text = json.dumps({"inner_thoughts": "abc def", "message": "long message body", "tags": ["a", "b"]})
+    incremental, reference = IncrementalJSONParser(), PydanticJSONParser()
+    for end in range(1, len(text) + 1):
+        assert incremental.parse(text[:end]) == reference.parse(text[:end]), text[:end]
+
+
+def test_parse_restarts_when_input_does_not_extend_previous():
+    parser = IncrementalJSONParser()
+    assert parser.parse('{"a": "b') == {"a": "b"}
+    assert parser.parse('{"x": 1}') == {"x": 1}
+    assert parser.parse("") == {}
+
+
+def test_trailing_text_is_ignored():
+    parser = IncrementalJSONParser()
+    parser.feed('{"a": 1} trailing')
+    assert parser.value == {"a": 1}
+
+
+@pytest.mark.parametrize("text", ['{"a" 1}', '{"a": tru}', "[1,, 2]", '{"a": "\\x"}', "}"])
+def test_malformed_input_raises(text):
+    with pytest.raises(ValueError):
+        IncrementalJSONParser().feed(text)
@@ -1,14 +1,21 @@
+import json
+import os
 from datetime import datetime, timezone
 from unittest.mock import AsyncMock, patch
 
 import pytest
 
 # Import your AnthropicClient and related types
+from letta.adapters.letta_llm_request_adapter import LettaLLMRequestAdapter
 from letta.llm_api.anthropic_client import AnthropicClient
+from letta.llm_api.request_prefix_cache import clear_request_prefix_caches
 from letta.schemas.enums import MessageRole
+from letta.schemas.letta_message_content import TextContent
 from letta.schemas.llm_config import LLMConfig
 from letta.schemas.message import Message as PydanticMessage
 
+SAMPLE_RESPONSE_JSONS_DIR = os.path.join(os.path.dirname(__file__), "..", "letta", "llm_api", "sample_response_jsons")
+
 
 @pytest.fixture
 def llm_config():
@@ -101,3 +108,74 @@ async def test_send_llm_batch_request_async_mismatched_keys(anthropic_client, mo
     mismatched_tools = {"agent-2": []}  # Different agent ID than in the messages mapping.
     with pytest.raises(ValueError, match="Agent mappings for messages and tools must use the same agent_ids."):
         await anthropic_client.send_llm_batch_request_async(mock_agent_messages, mismatched_tools, mock_agent_llm_config)
+
+
+def _agent_history(agent_id: str, system: str, turns: int) -> list[PydanticMessage]:
+    messages = [PydanticMessage(role=MessageRole.system, agent_id=agent_id, content=[TextContent(text=system)])]
+    for i in range(turns):
+        messages.append(PydanticMessage(role=MessageRole.user, agent_id=agent_id, content=[TextContent(text=f"hello {i}")]))
+        messages.append(PydanticMessage(role=MessageRole.assistant, agent_id=agent_id, content=[TextContent(text=f"hi {i}")]))
+    return messages
+
+
+def _cache_breakpoints(request_data: dict) -> list[str]:
+    """Where a request places its `cache_control` breakpoints, in prompt order."""
+    breakpoints = [f"tool:{t['name']}" for t in request_data.get("tools", []) if "cache_control" in t]
+    breakpoints += [f"system:{i}" for i, block in enumerate(request_data["system"]) if "cache_control" in block]
+    for i, message in enumerate(request_data["messages"]):
+        if isinstance(message["content"], list):
+            breakpoints += [f"message:{i}" for block in message["content"] if "cache_control" in block]
+    return breakpoints
+
+
+def test_prompt_cache_breakpoints(anthropic_client, mock_agent_tools):
+    clear_request_prefix_caches()
+    llm_config = LLMConfig(
+        model="claude-3-5-sonnet-20241022",
+        model_endpoint_type="anthropic",
+        model_endpoint="https://api.anthropic.com/v1",
+        context_window=200000,
+        put_inner_thoughts_in_kwargs=True,
+    )
+    system = "<base_instructions>Be helpful.</base_instructions>\n<memory_blocks>human: Chad</memory_blocks>"
+    messages = _agent_history("agent-1", system, turns=2)
+    tools = mock_agent_tools["agent-1"]
+
+    # first step: tools, the static base instructions and the end of the history
+    request_data = anthropic_client.build_request_data(messages, llm_config, tools)
+    assert request_data["system"][0]["text"] + request_data["system"][1]["text"] == system
+    assert _cache_breakpoints(request_data) == ["tool:get_weather", "system:0", "message:3"]
+
+    # next step: the end of the previous history is marked as well, so its cache entry is read
+    messages += _agent_history("agent-1", system, turns=3)[5:]
+    request_data = anthropic_client.build_request_data(messages, llm_config, tools)
+    assert _cache_breakpoints(request_data) == ["tool:get_weather", "system:0", "message:3", "message:5"]
+
+    # a memory rebuild rewrites the system message: nothing after the base instructions can be read from the cache
+    messages[0] = messages[0].model_copy(update={"content": [TextContent(text=system.replace("Chad", "Chad Smith"))]})
+    messages += _agent_history("agent-1", system, turns=4)[7:]
+    request_data = anthropic_client.build_request_data(messages, llm_config, tools)
+    assert _cache_breakpoints(request_data) == ["tool:get_weather", "system:0", "message:7"]
+    clear_request_prefix_caches()
+
+
+@pytest.mark.asyncio
+async def test_prompt_cache_usage_from_recorded_response(anthropic_client, llm_config, mock_agent_messages):
+    with open(os.path.join(SAMPLE_RESPONSE_JSONS_DIR, "anthropic_prompt_cache.json")) as f:
+        response_data = json.load(f)
+    llm_config.put_inner_thoughts_in_kwargs = False
+    response = anthropic_client.convert_response_to_chat_completion(response_data, mock_agent_messages["agent-1"], llm_config)
+
+    # Anthropic's input_tokens excludes the prompt tokens read from and written to the cache
+    assert response.usage.prompt_tokens == 214 + 388 + 4721
+    assert response.usage.total_tokens == 214 + 388 + 4721 + 67
+    assert response.usage.prompt_tokens_details.cached_tokens == 4721
+    assert response.usage.prompt_tokens_details.cache_creation_tokens == 388
+
+    adapter = LettaLLMRequestAdapter(llm_client=anthropic_client, llm_config=llm_config)
+    with patch.object(anthropic_client, "request_async", AsyncMock(return_value=response_data)):
+        async for _ in adapter.invoke_llm(request_data={}, messages=mock_agent_messages["agent-1"], tools=[], use_assistant_message=False):
+            pass
+    assert adapter.usage.prompt_tokens == 214 + 388 + 4721
+    assert adapter.usage.cache_read_tokens == 4721
+    assert adapter.usage.cache_creation_tokens == 388
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import sys
+
+import pytest
+
+from letta.services.tool_sandbox.local_worker_pool import LocalSandboxWorkerPool
+
+KEY = (sys.executable, "fingerprint", "org-00000000-0000-4000-8000-000000000000")
+
+
+@pytest.fixture
+def pool():
+    pool = LocalSandboxWorkerPool(max_idle_workers=2, max_calls=3, max_memory_bytes=1024**3)
+    yield pool
+    pool.close()
+
+
+async def _run(pool: LocalSandboxWorkerPool, tmp_path, code: str, env=None, timeout: float = 30):
+    script_path = tmp_path / f"script_{len(os.listdir(tmp_path))}.py"
+    script_path.write_text(code)
+    return await pool.run(
+        key=KEY,
+        python_executable=sys.executable,
+        script_path=str(script_path),
+        env=env if env is not None else {"PATH": os.environ["PATH"]},
+        cwd=str(tmp_path),
+        timeout=timeout,
+    )
+
+
+@pytest.mark.asyncio
+async def test_worker_is_reused_with_fresh_environment(pool, tmp_path):
+    code = "import os, sys\nprint(os.getpid(), os.environ.get('SECRET'), sys.path[0] == os.path.dirname(__file__), __name__)"
+
+    returncode, stdout, stderr = await _run(pool, tmp_path, code, env={"SECRET": "first"})
+    assert returncode == 0 and stderr == b""
+    pid, secret, script_dir_first, name = stdout.decode().split()
+    assert (secret, script_dir_first, name) == ("first", "True", "__main__")
+    assert pool.idle_worker_count(KEY) == 1
+
+    returncode, stdout, _ = await _run(pool, tmp_path, code, env={})
+    assert returncode == 0
+    assert stdout.decode().split()[:2] == [pid, "None"]
+
+
+@pytest.mark.asyncio
+async def test_script_errors_and_exit_codes(pool, tmp_path):
+    returncode, stdout, stderr = await _run(pool, tmp_path, "print('before')\nraise ValueError('bad input')")
+    assert returncode == 1
+    assert stdout == b"before\n"
+    assert stderr.decode().splitlines()[-1] == "ValueError: bad input"
+    assert "local_worker.py" not in stderr.decode()
+
+    returncode, _, _ = await _run(pool, tmp_path, "import sys\nsys.exit(3)")
+    assert returncode == 3
+    assert pool.idle_worker_count(KEY) == 1
+
+    # a script that ends the worker itself
+    returncode, stdout, _ = await _run(pool, tmp_path, "import os, sys\nsys.stdout.write('partial')\nsys.stdout.flush()\nos._exit(5)")
+    assert (returncode, stdout) == (5, b"partial")
+    assert pool.idle_worker_count(KEY) == 0
+
+    returncode, _, _ = await _run(pool, tmp_path, "pass")
+    assert returncode == 0
+
+
+@pytest.mark.asyncio
+async def test_timeout_terminates_worker(pool, tmp_path):
+    with pytest.raises(asyncio.TimeoutError):
+        await _run(pool, tmp_path, "import time\ntime.sleep(30)", timeout=0.5)
+    assert pool.idle_worker_count() == 0
+
+    returncode, stdout, _ = await _run(pool, tmp_path, "print('ok')")
+    assert (returncode, stdout) == (0, b"ok\n")
+
+
+@pytest.mark.asyncio
+async def test_workers_are_recycled_after_max_calls(pool, tmp_path):
+    pids = [(await _run(pool, tmp_path, "import os\nprint(os.getpid())"))[1] for _ in range(4)]
+    assert len(set(pids[:3])) == 1
+    assert pids[3] != pids[0]
+
+
+@pytest.mark.asyncio
+async def test_workers_are_recycled_on_memory_growth(tmp_path):
+    pool = LocalSandboxWorkerPool(max_idle_workers=2, max_calls=100, max_memory_bytes=200 * 1024**2)
+    try:
+        _, first_pid, _ = await _run(pool, tmp_path, "import os\nprint(os.getpid())")
+        _, pid, _ = await _run(pool, tmp_path, "import builtins, os\nbuiltins.LEAK = b'x' * (300 * 1024**2)\nprint(os.getpid())")
+        assert pid == first_pid
+        assert pool.idle_worker_count(KEY) == 0
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_use_separate_workers(pool, tmp_path):
+    code = "import os, time\ntime.sleep(0.5)\nprint(os.getpid())"
+    results = await asyncio.gather(*[_run(pool, tmp_path, code) for _ in range(3)])
+    assert len({stdout for _, stdout, _ in results}) == 3
+    assert pool.idle_worker_count(KEY) == 2
@@ -35,10 +35,12 @@ from letta.constants import (
     LETTA_TOOL_EXECUTION_DIR,
     LETTA_TOOL_SET,
     LOCAL_ONLY_MULTI_AGENT_TOOLS,
+    MAX_EMBEDDING_DIM,
     MCP_TOOL_TAG_NAME_PREFIX,
     MULTI_AGENT_TOOLS,
 )
 from letta.data_sources.redis_client import NoopAsyncRedisClient, get_redis_client
+from letta.errors import AgentLockLostError
 from letta.functions.functions import derive_openai_json_schema, parse_source_code
 from letta.functions.mcp_client.types import MCPTool
 from letta.helpers import ToolRulesSolver
@@ -82,15 +84,19 @@ from letta.schemas.pip_requirement import PipRequirement
 from letta.schemas.run import Run as PydanticRun
 from letta.schemas.sandbox_config import E2BSandboxConfig, LocalSandboxConfig, SandboxConfigCreate, SandboxConfigUpdate
 from letta.schemas.source import Source as PydanticSource, SourceUpdate
+from letta.schemas.step_metrics import StepMetrics as PydanticStepMetrics
 from letta.schemas.tool import Tool as PydanticTool, ToolCreate, ToolUpdate
 from letta.schemas.tool_rule import InitToolRule
+from letta.schemas.usage import LettaUsageStatistics
 from letta.schemas.user import User as PydanticUser, UserUpdate
 from letta.server.db import db_registry
 from letta.server.server import SyncServer
 from letta.services.block_manager import BlockManager
 from letta.services.helpers.agent_manager_helper import calculate_base_tools, calculate_multi_agent_tools, validate_agent_exists_async
+from letta.services.helpers.agent_state_cache import get_agent_state_cache
+from letta.services.per_agent_lock_manager import PerAgentLockManager
 from letta.services.step_manager import FeedbackType
-from letta.settings import settings, tool_settings
+from letta.settings import model_settings, settings, tool_settings
 from letta.utils import calculate_file_defaults_based_on_context_window
 from tests.helpers.utils import comprehensive_agent_checks, validate_context_window_overview
 from tests.utils import random_string
@@ -791,6 +797,53 @@ async def test_create_get_list_agent(server: SyncServer, comprehensive_test_agen
     assert len(list_agents) == 0
 
 
+@pytest.mark.asyncio
+async def test_create_agents_bulk(server: SyncServer, default_user, print_tool, default_source, default_block):
+    def create_agent_request(i: int) -> CreateAgent:
+        return CreateAgent(
+            name=f"bulk_agent_{i}",
+            system="test system",
+            memory_blocks=[
+                CreateBlock(label="human", value=f"BananaBoy {i}"),
+                CreateBlock(label="persona", value="I am a helpful assistant"),
+            ],
+            llm_config=LLMConfig.default_config("gpt-4o-mini"),
+            embedding_config=EmbeddingConfig.default_config(provider="openai"),
+            block_ids=[default_block.id],
+            tool_ids=[print_tool.id],
+            source_ids=[default_source.id],
+            tags=["bulk", f"agent-{i}"],
+            description="test_description",
+            metadata={"test_key": "test_value"},
+            tool_rules=[InitToolRule(tool_name=print_tool.name)],
+            initial_message_sequence=[MessageCreate(role=MessageRole.user, content="hello world")] if i % 2 else None,
+            tool_exec_environment_variables={"test_env_var_key_a": f"test_env_var_value_{i}"},
+            include_base_tools=False,
+        )
+
+    requests = [create_agent_request(i) for i in range(5)]
+    created_agents = await server.agent_manager.create_agents_async(requests, actor=default_user)
+
+    assert [agent.name for agent in created_agents] == [request.name for request in requests]
+    for agent, request in zip(created_agents, requests):
+        comprehensive_agent_checks(agent, request, actor=default_user)
+        # every agent has its own memory blocks next to the shared one
+        assert {block.value for block in agent.memory.blocks} == {block.value for block in request.memory_blocks} | {default_block.value}
+
+        # the states are returned with their initial messages, which are stored like those of single agents
+        fetched_agent = await server.agent_manager.get_agent_by_id_async(agent_id=agent.id, actor=default_user)
+        assert fetched_agent.message_ids == agent.message_ids
+        init_messages = await server.message_manager.get_messages_by_ids_async(message_ids=agent.message_ids, actor=default_user)
+        assert [message.id for message in init_messages] == agent.message_ids
+        assert request.memory_blocks[0].value in init_messages[0].content[0].text
+        assert await server.message_manager.size_async(agent_id=agent.id, actor=default_user) == len(agent.message_ids)
+        if request.initial_message_sequence:
+            assert len(init_messages) == 2
+            assert request.initial_message_sequence[0].content in init_messages[1].content[0].text
+
+    assert await server.agent_manager.create_agents_async([], actor=default_user) == []
+
+
 @pytest.mark.asyncio
 async def test_create_agent_include_base_tools(server: SyncServer, default_user):
     """Test agent creation with include_default_source=True"""
@@ -1269,6 +1322,63 @@ async def test_update_agent_file_fields(server: SyncServer, comprehensive_test_a
     assert updated_agent.per_file_view_window_char_limit == 150_000
 
 
+@pytest.mark.asyncio
+async def test_get_agent_by_id_is_cached_until_the_agent_changes(server: SyncServer, sarah_agent, default_user, default_block, print_tool):
+    cache = get_agent_state_cache()
+    await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+    hits = cache.stats.hits
+
+    agent_state = await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+    assert cache.stats.hits - hits == 1
+    # callers get copies they are free to mutate
+    agent_state.name = "mutated"
+    agent_state.tags.append("mutated")
+    cached = await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+    assert cached.name == sarah_agent.name and "mutated" not in cached.tags
+    assert cached == await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+
+    # writes to the agent row, its memory, its tools and the tools themselves are all visible on the next read
+    await server.agent_manager.update_agent_async(sarah_agent.id, UpdateAgent(name="renamed"), actor=default_user)
+    assert (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).name == "renamed"
+
+    await server.agent_manager.attach_block_async(agent_id=sarah_agent.id, block_id=default_block.id, actor=default_user)
+    await server.block_manager.update_block_async(default_block.id, BlockUpdate(value="updated value"), actor=default_user)
+    memory = (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).memory
+    assert memory.get_block(default_block.label).value == "updated value"
+
+    await server.agent_manager.attach_tool_async(agent_id=sarah_agent.id, tool_id=print_tool.id, actor=default_user)
+    tools = (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).tools
+    assert print_tool.id in [tool.id for tool in tools]
+
+    await server.tool_manager.update_tool_by_id_async(print_tool.id, ToolUpdate(description="new description"), actor=default_user)
+    tools = (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).tools
+    assert next(tool for tool in tools if tool.id == print_tool.id).description == "new description"
+
+    await server.agent_manager.detach_tool_async(agent_id=sarah_agent.id, tool_id=print_tool.id, actor=default_user)
+    tools = (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).tools
+    assert print_tool.id not in [tool.id for tool in tools]
+
+    await server.agent_manager.delete_agent_async(sarah_agent.id, actor=default_user)
+    with pytest.raises(NoResultFound):
+        await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+
+
+@pytest.mark.asyncio
+async def test_get_agent_by_id_caches_relationship_subsets(
+    server: SyncServer, sarah_agent, default_user, other_user_different_org, print_tool
+):
+    await server.agent_manager.attach_tool_async(agent_id=sarah_agent.id, tool_id=print_tool.id, actor=default_user)
+    full = await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)
+    partial = await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user, include_relationships=["tags"])
+    assert partial.tools == [] and full.tools != []
+    assert await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user, include_relationships=["tags"]) == partial
+    assert (await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=default_user)).tools == full.tools
+
+    # cached states are still scoped to the actor's organization
+    with pytest.raises(NoResultFound):
+        await server.agent_manager.get_agent_by_id_async(sarah_agent.id, actor=other_user_different_org)
+
+
 # ======================================================================================================================
 # AgentManager Tests - Listing
 # ======================================================================================================================
@@ -2374,6 +2484,52 @@ async def test_list_agents_query_text_pagination(server: SyncServer, default_use
 # ======================================================================================================================
 
 
+@pytest.mark.asyncio
+async def test_superseded_lock_holder_cannot_write_message_ids(server: SyncServer, sarah_agent, default_user):
+    lock_manager = PerAgentLockManager(redis_client=AsyncMock())
+    message_ids = await server.agent_manager.get_agent_message_ids_async(agent_id=sarah_agent.id, actor=default_user)
+
+    async def claim():
+        return await server.agent_manager.claim_lock_fencing_token_async(agent_id=sarah_agent.id, actor=default_user)
+
+    async with lock_manager.lock(sarah_agent.id, issue_fencing_token=claim) as lease:
+        assert lease.fenced
+        await server.agent_manager.update_message_ids_async(agent_id=sarah_agent.id, message_ids=message_ids, actor=default_user)
+
+        # another worker takes over the agent after this lease expired
+        assert await claim() == lease.fencing_token + 1
+        with pytest.raises(AgentLockLostError):
+            await server.agent_manager.update_message_ids_async(agent_id=sarah_agent.id, message_ids=message_ids[:1], actor=default_user)
+        with pytest.raises(AgentLockLostError):
+            await server.agent_manager.reset_messages_async(agent_id=sarah_agent.id, actor=default_user)
+
+    assert await server.agent_manager.get_agent_message_ids_async(agent_id=sarah_agent.id, actor=default_user) == message_ids
+
+
+@pytest.mark.asyncio
+async def test_get_agents_with_in_context_messages_batches_message_loads(server: SyncServer, sarah_agent, charles_agent, default_user):
+    message_manager = server.agent_manager.message_manager
+    get_messages_by_ids_async = message_manager.get_messages_by_ids_async
+    calls = []
+
+    async def get_messages(message_ids, actor):
+        calls.append(message_ids)
+        return await get_messages_by_ids_async(message_ids=message_ids, actor=actor)
+
+    message_manager.get_messages_by_ids_async = get_messages
+    try:
+        agents, in_context_messages = await server.agent_manager.get_agents_with_in_context_messages_async(
+            [sarah_agent.id, charles_agent.id, "agent-00000000-0000-4000-8000-000000000000"], actor=default_user
+        )
+    finally:
+        del message_manager.get_messages_by_ids_async
+
+    assert len(calls) == 1
+    assert set(agents) == set(in_context_messages) == {sarah_agent.id, charles_agent.id}
+    for agent in (sarah_agent, charles_agent):
+        assert [message.id for message in in_context_messages[agent.id]] == agent.message_ids
+
+
 @pytest.mark.asyncio
 async def test_reset_messages_no_messages(server: SyncServer, sarah_agent, default_user):
     """
@@ -2759,6 +2915,150 @@ async def test_refresh_memory_async(server: SyncServer, default_user):
     assert any([block.value == "test2" for block in agent.memory.blocks])
 
 
+@pytest.mark.asyncio
+async def test_memory_version_bumps_on_memory_writes(
+    server: SyncServer, default_user, sarah_agent, default_block, default_source, default_file
+):
+    async def memory_version():
+        return await server.agent_manager.get_memory_version_async(agent_id=sarah_agent.id, actor=default_user)
+
+    version = await memory_version()
+
+    async def assert_bumped():
+        nonlocal version
+        new_version = await memory_version()
+        assert new_version > version
+        version = new_version
+
+    await server.agent_manager.attach_block_async(agent_id=sarah_agent.id, block_id=default_block.id, actor=default_user)
+    await assert_bumped()
+    await server.block_manager.update_block_async(block_id=default_block.id, block_update=BlockUpdate(value="v2"), actor=default_user)
+    await assert_bumped()
+    await server.agent_manager.attach_source_async(agent_id=sarah_agent.id, source_id=default_source.id, actor=default_user)
+    await assert_bumped()
+    await server.source_manager.update_source(
+        source_id=default_source.id, source_update=SourceUpdate(description="new"), actor=default_user
+    )
+    await assert_bumped()
+    await server.file_agent_manager.attach_file(
+        agent_id=sarah_agent.id,
+        file_id=default_file.id,
+        file_name=default_file.file_name,
+        source_id=default_file.source_id,
+        actor=default_user,
+        visible_content="hello",
+        max_files_open=sarah_agent.max_files_open,
+    )
+    await assert_bumped()
+    await server.file_agent_manager.close_all_other_files(agent_id=sarah_agent.id, keep_file_names=[], actor=default_user)
+    await assert_bumped()
+    await server.agent_manager.update_agent_async(sarah_agent.id, UpdateAgent(tool_rules=[]), actor=default_user)
+    await assert_bumped()
+    await server.agent_manager.detach_block_async(agent_id=sarah_agent.id, block_id=default_block.id, actor=default_user)
+    await assert_bumped()
+
+    # writes that do not change the compiled memory leave the version alone
+    await server.agent_manager.update_agent_async(sarah_agent.id, UpdateAgent(description="unrelated"), actor=default_user)
+    await server.file_agent_manager.mark_access(agent_id=sarah_agent.id, file_id=default_file.id, actor=default_user)
+    assert await memory_version() == version
+
+
+@pytest.mark.asyncio
+async def test_rebuild_memory_skips_unchanged_memory_version(server: SyncServer, default_user, sarah_agent, default_block, monkeypatch):
+    from letta.agents.letta_agent_v2 import LettaAgentV2
+
+    # the agent loop only sets up its summarizer agent when an openai key is configured
+    monkeypatch.setattr(model_settings, "openai_api_key", model_settings.openai_api_key or "sk-test")
+    await server.agent_manager.attach_block_async(agent_id=sarah_agent.id, block_id=default_block.id, actor=default_user)
+    agent_state = await server.agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    agent_loop = LettaAgentV2(agent_state=agent_state, actor=default_user)
+
+    refreshes = []
+    refresh_memory_async = agent_loop.agent_manager.refresh_memory_async
+
+    async def counting_refresh_memory_async(agent_state, actor):
+        refreshes.append(agent_state.id)
+        return await refresh_memory_async(agent_state=agent_state, actor=actor)
+
+    agent_loop.agent_manager.refresh_memory_async = counting_refresh_memory_async
+
+    messages = await server.message_manager.get_messages_by_ids_async(message_ids=agent_state.message_ids, actor=default_user)
+    messages = await agent_loop._rebuild_memory(messages, num_messages=None, num_archival_memories=None)
+    messages = await agent_loop._rebuild_memory(messages, num_messages=None, num_archival_memories=None)
+    assert len(refreshes) == 1
+
+    await server.block_manager.update_block_async(
+        block_id=default_block.id, block_update=BlockUpdate(value="a brand new value"), actor=default_user
+    )
+    messages = await agent_loop._rebuild_memory(messages, num_messages=None, num_archival_memories=None)
+    assert len(refreshes) == 2
+    assert "a brand new value" in messages[0].content[0].text
+
+
+async def _run_agent_step(server: SyncServer, agent, actor, tool_call=None, error=None):
+    from letta.adapters.letta_llm_adapter import LettaLLMAdapter
+    from letta.agents.letta_agent_v2 import LettaAgentV2
+    from letta.helpers.datetime_helpers import get_utc_timestamp_ns
+    from letta.schemas.openai.chat_completion_response import FunctionCall, ToolCall
+
+    class FakeLLMAdapter(LettaLLMAdapter):
+        async def invoke_llm(
+            self, request_data, messages, tools, use_assistant_message, requires_approval_tools=[], step_id=None, actor=None
+        ):
+            if error:
+                raise error
+            self.tool_call = tool_call
+            self.usage = LettaUsageStatistics(step_count=1, completion_tokens=1, prompt_tokens=2, total_tokens=3)
+            self.llm_request_finish_timestamp_ns = get_utc_timestamp_ns()
+            yield None
+
+    if tool_call is None:
+        tool_call = ToolCall(id="call-1", function=FunctionCall(name="send_message", arguments=json.dumps({"message": "hello"})))
+    agent_state = await server.agent_manager.get_agent_by_id_async(agent_id=agent.id, actor=actor)
+    agent_loop = LettaAgentV2(agent_state=agent_state, actor=actor)
+    in_context_messages = await server.message_manager.get_messages_by_ids_async(message_ids=agent_state.message_ids, actor=actor)
+    input_message = PydanticMessage(agent_id=agent.id, role=MessageRole.user, content=[TextContent(text="hi")])
+    response = agent_loop._step(
+        messages=in_context_messages + [input_message],
+        llm_adapter=FakeLLMAdapter(llm_client=agent_loop.llm_client, llm_config=agent_state.llm_config),
+        input_messages_to_persist=[input_message],
+    )
+    async for _ in response:
+        pass
+    return agent_loop, input_message
+
+
+async def test_agent_step_writes_step_and_messages_together(server: SyncServer, default_user, sarah_agent, monkeypatch):
+    monkeypatch.setattr(model_settings, "openai_api_key", model_settings.openai_api_key or "sk-test")
+    agent_loop, input_message = await _run_agent_step(server, sarah_agent, default_user)
+
+    step_id = agent_loop.response_messages[0].step_id
+    step = await server.step_manager.get_step_async(step_id=step_id, actor=default_user)
+    assert step.status == StepStatus.SUCCESS
+    assert step.total_tokens == 3
+    assert (await server.step_manager.get_step_metrics_async(step_id=step_id, actor=default_user)).step_ns > 0
+
+    assert await server.message_manager.get_message_by_id_async(message_id=input_message.id, actor=default_user) is not None
+    for message in agent_loop.response_messages:
+        assert (await server.message_manager.get_message_by_id_async(message_id=message.id, actor=default_user)).step_id == step_id
+
+
+async def test_agent_step_failure_writes_failed_step_only(server: SyncServer, default_user, sarah_agent, monkeypatch):
+    from letta.errors import LLMError
+
+    monkeypatch.setattr(model_settings, "openai_api_key", model_settings.openai_api_key or "sk-test")
+    steps_before = await server.step_manager.list_steps_async(agent_id=sarah_agent.id, actor=default_user)
+
+    with pytest.raises(LLMError):
+        await _run_agent_step(server, sarah_agent, default_user, error=LLMError("provider unavailable"))
+
+    steps = await server.step_manager.list_steps_async(agent_id=sarah_agent.id, actor=default_user)
+    assert len(steps) == len(steps_before) + 1
+    failed_step = next(step for step in steps if step.id not in {s.id for s in steps_before})
+    assert failed_step.status == StepStatus.FAILED
+    assert failed_step.stop_reason == StopReasonType.llm_api_error
+
+
 # ======================================================================================================================
 # Agent Manager - Passages Tests
 # ======================================================================================================================
@@ -2994,6 +3294,88 @@ async def test_list_source_passages_only(server: SyncServer, default_user, defau
     assert all(p.archive_id is None for p in source_passages)
 
 
+@pytest.mark.asyncio
+async def test_maintained_counters_follow_message_and_passage_writes(server: SyncServer, default_user, sarah_agent, default_archive):
+    message_manager, passage_manager = server.message_manager, server.passage_manager
+    await server.archive_manager.attach_agent_to_archive_async(
+        agent_id=sarah_agent.id, archive_id=default_archive.id, is_owner=True, actor=default_user
+    )
+
+    async def assert_counters_match():
+        assert await message_manager.agent_message_count_async(agent_id=sarah_agent.id, actor=default_user) == (
+            await message_manager.size_async(agent_id=sarah_agent.id, actor=default_user)
+        )
+        assert await passage_manager.agent_passage_count_async(agent_id=sarah_agent.id, actor=default_user) == (
+            await passage_manager.agent_passage_size_async(agent_id=sarah_agent.id, actor=default_user)
+        )
+        assert await passage_manager.get_archive_tags_async(archive_id=default_archive.id, actor=default_user) == (
+            await passage_manager.get_unique_tags_for_archive_async(archive_id=default_archive.id, actor=default_user)
+        )
+
+    # first reads count and store the counters
+    await assert_counters_match()
+
+    messages = await message_manager.create_many_messages_async(
+        [PydanticMessage(agent_id=sarah_agent.id, role="user", content=[TextContent(text=f"message {i}")]) for i in range(3)],
+        actor=default_user,
+    )
+    await message_manager.delete_message_by_id_async(messages[0].id, actor=default_user)
+    await message_manager.delete_messages_by_ids_async([messages[1].id], actor=default_user)
+
+    def passage(text, tags):
+        return PydanticPassage(
+            text=text,
+            archive_id=default_archive.id,
+            organization_id=default_user.organization_id,
+            embedding=[0.1],
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            tags=tags,
+        )
+
+    first = await passage_manager.create_agent_passage_async(passage("first", ["a", "b"]), actor=default_user)
+    others = await passage_manager.create_many_archival_passages_async(
+        [passage("second", ["b", "c"]), passage("third", None)], actor=default_user
+    )
+    await passage_manager.update_agent_passage_by_id_async(first.id, passage("first", ["d"]), actor=default_user)
+    await passage_manager.delete_agent_passage_by_id_async(others[0].id, actor=default_user)
+    await assert_counters_match()
+    assert await passage_manager.get_archive_tags_async(archive_id=default_archive.id, actor=default_user) == ["d"]
+
+    await server.agent_manager.reset_messages_async(agent_id=sarah_agent.id, actor=default_user)
+    await passage_manager.delete_agent_passages_async([first, others[1]], actor=default_user)
+    await assert_counters_match()
+
+
+@pytest.mark.asyncio
+async def test_counter_reconciliation_corrects_drift(server: SyncServer, default_user, sarah_agent, default_archive):
+    from letta.orm.agent import Agent as AgentModel
+    from letta.orm.archive import Archive as ArchiveModel
+    from letta.server.db import db_registry
+
+    await server.archive_manager.attach_agent_to_archive_async(
+        agent_id=sarah_agent.id, archive_id=default_archive.id, is_owner=True, actor=default_user
+    )
+    num_messages = await server.message_manager.agent_message_count_async(agent_id=sarah_agent.id, actor=default_user)
+    assert await server.passage_manager.agent_passage_count_async(agent_id=sarah_agent.id, actor=default_user) == 0
+    assert await server.passage_manager.get_archive_tags_async(archive_id=default_archive.id, actor=default_user) == []
+
+    # writes that bypass the managers leave the counters stale
+    async with db_registry.async_session() as session:
+        await session.execute(AgentModel.__table__.update().where(AgentModel.id == sarah_agent.id).values(message_count=1000))
+        await session.execute(
+            ArchiveModel.__table__.update().where(ArchiveModel.id == default_archive.id).values(passage_count=7, tag_counts={"stale": 1})
+        )
+        await session.commit()
+
+    assert await server.message_manager.reconcile_agent_message_counts_async() >= 1
+    assert await server.passage_manager.reconcile_archive_counts_async() >= 1
+
+    assert await server.message_manager.agent_message_count_async(agent_id=sarah_agent.id, actor=default_user) == num_messages
+    assert await server.passage_manager.agent_passage_count_async(agent_id=sarah_agent.id, actor=default_user) == 0
+    assert await server.passage_manager.get_archive_tags_async(archive_id=default_archive.id, actor=default_user) == []
+    assert await server.message_manager.reconcile_agent_message_counts_async() == 0
+
+
 # ======================================================================================================================
 # Organization Manager Tests
 # ======================================================================================================================
@@ -3167,6 +3549,56 @@ def test_create_agent_passage_specific(server: SyncServer, default_user, sarah_a
     assert sorted(passage.tags) == sorted(["python", "test", "agent"])
 
 
+@pytest.mark.asyncio
+async def test_selective_tag_filter_fills_limit(server: SyncServer, default_user, sarah_agent):
+    """Tag filters apply before LIMIT, for passages created through the sync, bulk and single insert paths."""
+    archive = await server.archive_manager.get_or_create_default_archive_for_agent_async(
+        agent_id=sarah_agent.id, agent_name=sarah_agent.name, actor=default_user
+    )
+
+    def make_passage(text, tags=None):
+        return PydanticPassage(
+            text=text,
+            archive_id=archive.id,
+            organization_id=default_user.organization_id,
+            embedding=[0.1],
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            tags=tags,
+        )
+
+    # rare tagged passages are surrounded by untagged ones, so filtering after LIMIT would return a short page
+    await server.passage_manager.create_many_archival_passages_async([make_passage(f"untagged {i}") for i in range(10)], default_user)
+    server.passage_manager.create_agent_passage(make_passage("rare sync", ["rare", "pinned"]), actor=default_user)
+    await server.passage_manager.create_many_archival_passages_async(
+        [make_passage(f"rare bulk {i}", ["rare", "pinned"] if i % 2 else ["rare"]) for i in range(4)], default_user
+    )
+    await server.passage_manager.create_agent_passage_async(make_passage("rare single", ["rare", "pinned"]), actor=default_user)
+    await server.passage_manager.create_many_archival_passages_async([make_passage(f"untagged late {i}") for i in range(10)], default_user)
+
+    for ascending in (True, False):
+        any_results = await server.agent_manager.query_agent_passages_async(
+            actor=default_user, agent_id=sarah_agent.id, limit=5, tags=["rare"], tag_match_mode=TagMatchMode.ANY, ascending=ascending
+        )
+        assert len(any_results) == 5
+        assert all("rare" in passage.tags for passage, _, _ in any_results)
+
+        all_results = await server.agent_manager.query_agent_passages_async(
+            actor=default_user,
+            agent_id=sarah_agent.id,
+            limit=3,
+            tags=["rare", "pinned"],
+            tag_match_mode=TagMatchMode.ALL,
+            ascending=ascending,
+        )
+        assert len(all_results) == 3
+        assert all({"rare", "pinned"} <= set(passage.tags) for passage, _, _ in all_results)
+
+    all_pinned = await server.agent_manager.query_agent_passages_async(
+        actor=default_user, agent_id=sarah_agent.id, limit=10, tags=["rare", "pinned"], tag_match_mode=TagMatchMode.ALL
+    )
+    assert {passage.text for passage, _, _ in all_pinned} == {"rare sync", "rare bulk 1", "rare bulk 3", "rare single"}
+
+
 def test_create_source_passage_specific(server: SyncServer, default_user, default_file, default_source):
     """Test creating a source passage using the new source-specific method."""
     passage = server.passage_manager.create_source_passage(
@@ -3191,6 +3623,115 @@ def test_create_source_passage_specific(server: SyncServer, default_user, defaul
     assert sorted(passage.tags) == sorted(["document", "test", "source"])
 
 
+@pytest.mark.asyncio
+@pytest.mark.skipif(not USING_SQLITE, reason="The on-disk vector index only serves SQLite")
+async def test_sqlite_vector_index_follows_source_passage_writes(
+    server: SyncServer, default_user, default_file, default_source, tmp_path, monkeypatch
+):
+    from letta.helpers import sqlite_vector_index
+    from letta.orm.passage import SourcePassage
+
+    monkeypatch.setattr(settings, "sqlite_vector_index", True)
+    monkeypatch.setattr(settings, "letta_dir", str(tmp_path))
+    monkeypatch.setattr(sqlite_vector_index, "_indexes", {})
+
+    def embedding(axis):
+        vector = [0.0] * MAX_EMBEDDING_DIM
+        vector[axis] = 1.0
+        return vector
+
+    passages = [
+        server.passage_manager.create_source_passage(
+            PydanticPassage(
+                text=f"passage {axis}",
+                source_id=default_source.id,
+                file_id=default_file.id,
+                organization_id=default_user.organization_id,
+                embedding=embedding(axis),
+                embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            ),
+            file_metadata=default_file,
+            actor=default_user,
+        )
+        for axis in range(3)
+    ]
+
+    async def nearest(axis):
+        ranked = await server.passage_manager.search_vector_index_async(
+            sqlite_vector_index.VectorIndexKind.SOURCE, [default_source.id], embedding(axis), top_k=1
+        )
+        return ranked[0]
+
+    assert await nearest(0) == passages[0].id
+
+    # the sync update path keeps the built index current
+    server.passage_manager.update_source_passage_by_id(
+        passage_id=passages[0].id, passage=PydanticPassage(**{**passages[0].model_dump(), "embedding": embedding(5)}), actor=default_user
+    )
+    assert await nearest(5) == passages[0].id
+
+    # an embedding replaced behind the index's back keeps the row count, but bumps updated_at
+    with db_registry.session() as session:
+        row = session.get(SourcePassage, passages[1].id)
+        row.embedding = embedding(6)
+        row.updated_at = datetime.now(timezone.utc) + timedelta(seconds=1)
+        session.commit()
+    assert await nearest(6) == passages[1].id
+    assert await nearest(1) != passages[1].id
+
+    index_path = tmp_path / "vector_index" / "source" / default_source.id
+    assert index_path.exists()
+    await server.source_manager.delete_source(source_id=default_source.id, actor=default_user)
+    assert not index_path.exists()
+
+
+@pytest.mark.skipif(not USING_SQLITE, reason="Batched cosine ranking only runs on SQLite")
+async def test_sqlite_vector_search_ranks_past_id_batches(server: SyncServer, default_user, default_file, default_source, monkeypatch):
+    from letta.services import agent_manager as agent_manager_module
+
+    monkeypatch.setattr(settings, "sqlite_vector_index", False)
+    monkeypatch.setattr(agent_manager_module, "SQLITE_PASSAGE_ID_BATCH_SIZE", 3)
+
+    def embedding(axis):
+        vector = [0.0] * MAX_EMBEDDING_DIM
+        vector[axis] = 1.0
+        return vector
+
+    passages = await server.passage_manager.create_many_source_passages_async(
+        passages=[
+            PydanticPassage(
+                text=f"passage {i}",
+                source_id=default_source.id,
+                file_id=default_file.id,
+                organization_id=default_user.organization_id,
+                embedding=embedding(0 if i % 2 else 1),
+                embedding_config=DEFAULT_EMBEDDING_CONFIG,
+                created_at=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=i),
+            )
+            for i in range(10)
+        ],
+        file_metadata=default_file,
+        actor=default_user,
+    )
+    monkeypatch.setattr(agent_manager_module, "embed_passage_query", AsyncMock(return_value=embedding(0)))
+
+    for ascending in (True, False):
+        ranked = await server.agent_manager.query_source_passages_async(
+            actor=default_user,
+            source_id=default_source.id,
+            query_text="anything",
+            embed_query=True,
+            embedding_config=DEFAULT_EMBEDDING_CONFIG,
+            ascending=ascending,
+            limit=7,
+        )
+        # exact matches first, then ties broken by created_at in the requested direction
+        in_order = sorted(passages, key=lambda p: p.created_at, reverse=not ascending)
+        matches = [p.id for p in in_order if p.text[-1] in "13579"]
+        others = [p.id for p in in_order if p.text[-1] not in "13579"]
+        assert [p.id for p in ranked] == matches + others[:2]
+
+
 def test_create_agent_passage_validation(server: SyncServer, default_user, default_source, sarah_agent):
     """Test that agent passage creation validates inputs correctly."""
     # Should fail if archive_id is missing
@@ -5696,6 +6237,18 @@ def test_message_get_by_id(server: SyncServer, hello_world_message_fixture, defa
     assert retrieved.content[0].text == hello_world_message_fixture.content[0].text
 
 
+async def test_message_token_counts_are_org_scoped(server: SyncServer, hello_world_message_fixture, default_user, other_user_different_org):
+    """Cached token counts can only be written by, and are only returned to, the message's organization"""
+    message_id = hello_world_message_fixture.id
+
+    await server.message_manager.update_message_token_counts_async(token_counts={message_id: 99}, actor=other_user_different_org)
+    assert await server.message_manager.get_message_token_counts_async(message_ids=[message_id], actor=default_user) == {message_id: None}
+
+    await server.message_manager.update_message_token_counts_async(token_counts={message_id: 12}, actor=default_user)
+    assert await server.message_manager.get_message_token_counts_async(message_ids=[message_id], actor=default_user) == {message_id: 12}
+    assert await server.message_manager.get_message_token_counts_async(message_ids=[message_id], actor=other_user_different_org) == {}
+
+
 def test_message_update(server: SyncServer, hello_world_message_fixture, default_user, other_user):
     """Test updating a message"""
     new_text = "Updated text"
@@ -5845,6 +6398,36 @@ def test_message_listing_text_search(server: SyncServer, hello_world_message_fix
     assert len(search_results) == 0
 
 
+@pytest.mark.asyncio
+async def test_iter_messages_for_agent(server: SyncServer, hello_world_message_fixture, default_user, sarah_agent):
+    """Test exporting messages in keyset-paginated batches"""
+    create_test_messages(server, hello_world_message_fixture, default_user)
+    expected = await server.message_manager.list_messages_for_agent_async(agent_id=sarah_agent.id, actor=default_user, limit=1000)
+
+    batches = [
+        batch
+        async for batch in server.message_manager.iter_messages_for_agent_async(agent_id=sarah_agent.id, actor=default_user, batch_size=2)
+    ]
+    assert all(len(batch) <= 2 for batch in batches)
+    assert [m for batch in batches for m in batch] == expected
+
+    # the export can continue after a given message and be filtered like the listing
+    after = [
+        m
+        async for batch in server.message_manager.iter_messages_for_agent_async(
+            agent_id=sarah_agent.id, actor=default_user, after=expected[2].id, roles=[MessageRole.user], batch_size=2
+        )
+        for m in batch
+    ]
+    assert after == [m for m in expected[3:] if m.role == MessageRole.user]
+
+    with pytest.raises(NoResultFound):
+        async for _ in server.message_manager.iter_messages_for_agent_async(
+            agent_id="agent-00000000-0000-4000-8000-000000000000", actor=default_user
+        ):
+            pass
+
+
 # ======================================================================================================================
 # Block Manager Tests - Basic
 # ======================================================================================================================
@@ -8450,6 +9033,54 @@ async def test_upsert_file_content_basic(server: SyncServer, default_user, defau
     assert orm_file.updated_at >= orm_file.created_at
 
 
+async def test_grep_files_reads_only_candidate_lines(server: SyncServer, default_user, default_source, sarah_agent, monkeypatch):
+    """grep_files finds matches through the line index stored with the content, without loading whole files."""
+    from letta.services.tool_executor.files_tool_executor import LettaFileToolExecutor
+
+    text = "\n".join(f"line {i} {'needle' if i % 100 == 7 else 'hay'}" for i in range(1_000))
+    meta = PydanticFileMetadata(file_name="haystack.txt", file_type="text/plain", source_id=default_source.id)
+    created = await server.file_manager.create_file(file_metadata=meta, actor=default_user, text=text)
+    assert (await server.file_manager.get_line_indexes_async([created.id], actor=default_user))[created.id] is not None
+    assert await server.file_manager.get_file_content_ranges_async(created.id, [(0, 6), (7, 15)], actor=default_user) == ["line 0", "line 1 h"]
+
+    await server.file_agent_manager.attach_file(
+        agent_id=sarah_agent.id,
+        file_id=created.id,
+        file_name=created.file_name,
+        source_id=created.source_id,
+        actor=default_user,
+        max_files_open=sarah_agent.max_files_open,
+    )
+    executor = LettaFileToolExecutor(
+        message_manager=server.message_manager,
+        agent_manager=server.agent_manager,
+        block_manager=server.block_manager,
+        job_manager=server.job_manager,
+        passage_manager=server.passage_manager,
+        actor=default_user,
+    )
+
+    async def _no_full_content(*args, include_content=False, **kwargs):
+        raise AssertionError("grep_files loaded the whole file")
+
+    with monkeypatch.context() as patched:
+        patched.setattr(executor.file_manager, "get_file_by_id", _no_full_content)
+        result = await executor.grep_files(sarah_agent, pattern="NEEDLE", context_lines=1)
+    assert result.startswith("Found 10 total matches across 1 files (showing matches 1-10 of 10)")
+    assert "=== haystack.txt:8 ===\n  7: line 6 hay\n> 8: line 7 needle\n  9: line 8 hay" in result
+    assert "=== haystack.txt:998 ===\n  997: line 996 hay\n> 998: line 997 needle\n  999: line 998 hay" in result
+
+    # files stored before line indexes existed are indexed on their first search
+    await server.file_manager.set_line_index_async(created.id, None, actor=default_user)
+    assert await executor.grep_files(sarah_agent, pattern="NEEDLE", context_lines=1) == result
+    assert (await server.file_manager.get_line_indexes_async([created.id], actor=default_user))[created.id] is not None
+
+    # patterns without literals to narrow the lines by search the whole content
+    result = await executor.grep_files(sarah_agent, pattern=r"line \d+ n", context_lines=0)
+    assert result.startswith("Found 10 total matches")
+    assert "=== haystack.txt:108 ===\n> 108: line 107 needle" in result
+
+
 async def test_get_organization_sources_metadata(server, default_user):
     """Test getting organization sources metadata with aggregated file information."""
     # Create test sources
@@ -9891,6 +10522,8 @@ async def test_step_manager_record_metrics(server: SyncServer, sarah_agent, defa
         project_id=sarah_agent.project_id,
         template_id="template-id",
         base_template_id="base-template-id",
+        cache_read_tokens=4721,
+        cache_creation_tokens=388,
     )
 
     # Verify the metrics were recorded correctly
@@ -9903,6 +10536,8 @@ async def test_step_manager_record_metrics(server: SyncServer, sarah_agent, defa
     assert metrics.project_id == sarah_agent.project_id
     assert metrics.template_id == "template-id"
     assert metrics.base_template_id == "base-template-id"
+    assert metrics.cache_read_tokens == 4721
+    assert metrics.cache_creation_tokens == 388
 
 
 async def test_step_manager_record_metrics_nonexistent_step(server: SyncServer, default_user):
@@ -9920,6 +10555,102 @@ async def test_step_manager_record_metrics_nonexistent_step(server: SyncServer,
         )
 
 
+def _new_step_write_buffer(server: SyncServer, actor):
+    from letta.services.step_write_buffer import StepWriteBuffer
+
+    return StepWriteBuffer(
+        actor=actor,
+        step_manager=server.step_manager,
+        message_manager=server.message_manager,
+        job_manager=server.job_manager,
+        agent_manager=server.agent_manager,
+    )
+
+
+def _log_buffered_step(step_writes, agent, job_id=None):
+    return step_writes.log_step(
+        agent_id=agent.id,
+        provider_name="openai",
+        provider_category="base",
+        model="gpt-4o-mini",
+        model_endpoint="https://api.openai.com/v1",
+        context_window_limit=8192,
+        usage=UsageStatistics(completion_tokens=0, prompt_tokens=0, total_tokens=0),
+        job_id=job_id,
+        project_id=agent.project_id,
+        status=StepStatus.PENDING,
+    )
+
+
+async def test_step_write_buffer_flushes_step_in_one_transaction(server: SyncServer, sarah_agent, default_run, default_user, monkeypatch):
+    """The step row, its messages, their job links, the new message_ids and the metrics are written in one session."""
+    step_writes = _new_step_write_buffer(server, default_user)
+    step = _log_buffered_step(step_writes, sarah_agent, job_id=default_run.id)
+    assert step.status == StepStatus.PENDING
+
+    messages = [
+        PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.user, content=[TextContent(text="hi")], step_id=step.id),
+        PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.assistant, content=[TextContent(text="hello")], step_id=step.id),
+    ]
+    step_writes.add_messages(messages, job_id=default_run.id)
+    message_ids = sarah_agent.message_ids + [m.id for m in messages]
+    step_writes.set_message_ids(sarah_agent.id, message_ids)
+    step_writes.mark_step_success(
+        UsageStatistics(completion_tokens=10, prompt_tokens=20, total_tokens=30), LettaStopReason(stop_reason=StopReasonType.end_turn)
+    )
+    step_writes.record_step_metrics(
+        PydanticStepMetrics(id=step.id, llm_request_ns=5, step_ns=10, cache_read_tokens=7), agent_id=sarah_agent.id
+    )
+
+    sessions = []
+    async_session = db_registry.async_session
+
+    def counting_async_session(*args, **kwargs):
+        sessions.append(1)
+        return async_session(*args, **kwargs)
+
+    monkeypatch.setattr(db_registry, "async_session", counting_async_session)
+    persisted = await step_writes.flush_async()
+    monkeypatch.undo()
+
+    assert len(sessions) == 1
+    assert [m.id for m in persisted] == [m.id for m in messages]
+    assert not step_writes.has_pending_writes
+
+    persisted_step = await server.step_manager.get_step_async(step_id=step.id, actor=default_user)
+    assert persisted_step.status == StepStatus.SUCCESS
+    assert persisted_step.stop_reason == StopReasonType.end_turn
+    assert persisted_step.total_tokens == 30
+    metrics = await server.step_manager.get_step_metrics_async(step_id=step.id, actor=default_user)
+    assert metrics.step_ns == 10
+    assert metrics.cache_read_tokens == 7
+    job_messages = server.job_manager.get_job_messages(job_id=default_run.id, actor=default_user)
+    assert [m.id for m in job_messages] == [messages[1].id]
+    agent = await server.agent_manager.get_agent_by_id_async(agent_id=sarah_agent.id, actor=default_user)
+    assert agent.message_ids == message_ids
+
+    # later writes update the step row that is already persisted
+    step_writes.set_stop_reason(LettaStopReason(stop_reason=StopReasonType.max_steps))
+    await step_writes.flush_async()
+    persisted_step = await server.step_manager.get_step_async(step_id=step.id, actor=default_user)
+    assert persisted_step.stop_reason == StopReasonType.max_steps
+
+
+async def test_step_write_buffer_failed_flush_writes_nothing(server: SyncServer, sarah_agent, default_user):
+    """A flush that fails part way leaves neither the step nor its messages behind."""
+    step_writes = _new_step_write_buffer(server, default_user)
+    step = _log_buffered_step(step_writes, sarah_agent)
+    message = PydanticMessage(agent_id=sarah_agent.id, role=MessageRole.assistant, content=[TextContent(text="hello")], step_id=step.id)
+    step_writes.add_messages([message], job_id="job-00000000-0000-4000-8000-000000000000")
+
+    with pytest.raises(NoResultFound):
+        await step_writes.flush_async()
+
+    with pytest.raises(NoResultFound):
+        await server.step_manager.get_step_async(step_id=step.id, actor=default_user)
+    assert await server.message_manager.get_message_by_id_async(message_id=message.id, actor=default_user) is None
+
+
 def test_job_usage_stats_get_nonexistent_job(server: SyncServer, default_user):
     """Test getting usage statistics for a nonexistent job."""
     job_manager = server.job_manager
@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+
+from letta.data_sources.redis_client import NoopAsyncRedisClient
+from letta.errors import AgentLockTimeoutError
+from letta.services.per_agent_lock_manager import PerAgentLockManager, get_held_lease
+
+
+class FakeRedisClient(NoopAsyncRedisClient):
+    """In-memory stand-in for the lease operations used by the lock manager (no expiry)."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def set(self, key, value, ex=None, px=None, nx=False, xx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def incr(self, key):
+        self.store[key] = int(self.store.get(key, 0)) + 1
+        return self.store[key]
+
+    async def compare_and_delete(self, key, expected):
+        if self.store.get(key) == expected:
+            del self.store[key]
+            return 1
+        return 0
+
+    async def compare_and_expire(self, key, expected, px):
+        return int(self.store.get(key) == expected)
+
+
+def _shared_redis_managers(n: int):
+    """Simulates n workers sharing one redis."""
+    redis_client = FakeRedisClient()
+    # the fake subclasses the noop client only for its interface; make the manager treat it as real
+    managers = [PerAgentLockManager(redis_client=redis_client, retry_interval_s=0.001) for _ in range(n)]
+    for manager in managers:
+        manager._get_redis_client = lambda rc=redis_client: asyncio.sleep(0, result=rc)
+    return redis_client, managers
+
+
+@pytest.fixture
+def lock_manager():
+    return PerAgentLockManager(redis_client=NoopAsyncRedisClient())
+
+
+async def test_same_agent_is_serialized(lock_manager):
+    active = 0
+    max_active = 0
+
+    async def work():
+        nonlocal active, max_active
+        async with lock_manager.lock("agent-1"):
+            active += 1
+            max_active = max(max_active, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+    await asyncio.gather(*(work() for _ in range(5)))
+    assert max_active == 1
+    assert lock_manager.stats.acquisitions == 5
+    assert lock_manager.stats.contended == 4
+
+
+async def test_different_agents_do_not_block(lock_manager):
+    async with lock_manager.lock("agent-1"):
+        async with lock_manager.lock("agent-2", timeout_s=0.1):
+            assert lock_manager.is_locked("agent-1")
+            assert lock_manager.is_locked("agent-2")
+
+
+async def test_idle_locks_are_evicted(lock_manager):
+    for i in range(10):
+        async with lock_manager.lock(f"agent-{i}"):
+            pass
+    assert len(lock_manager) == 0
+
+
+async def test_timeout_raises_and_cleans_up(lock_manager):
+    async with lock_manager.lock("agent-1"):
+        with pytest.raises(AgentLockTimeoutError):
+            async with lock_manager.lock("agent-1", timeout_s=0.01):
+                pass
+    assert lock_manager.stats.timeouts == 1
+    assert len(lock_manager) == 0
+
+
+async def test_fencing_tokens_increase(lock_manager):
+    tokens = []
+    for _ in range(3):
+        async with lock_manager.lock("agent-1") as lease:
+            tokens.append(lease.fencing_token)
+    assert tokens == sorted(tokens) and len(set(tokens)) == 3
+
+
+async def test_redis_lease_excludes_other_workers():
+    redis_client, (worker_a, worker_b) = _shared_redis_managers(2)
+
+    async with worker_a.lock("agent-1") as lease_a:
+        assert lease_a.distributed
+        with pytest.raises(AgentLockTimeoutError):
+            async with worker_b.lock("agent-1", timeout_s=0.02):
+                pass
+        # other agents are unaffected
+        async with worker_b.lock("agent-2", timeout_s=0.02):
+            pass
+
+    async with worker_b.lock("agent-1", timeout_s=0.1) as lease_b:
+        assert lease_b.fencing_token > lease_a.fencing_token
+    assert "agent:lock:agent-1" not in redis_client.store
+
+
+async def test_held_lease_is_visible_to_the_holding_task(lock_manager):
+    async with lock_manager.lock("agent-1") as lease:
+        assert get_held_lease("agent-1") is lease
+
+        async def other_request():
+            return get_held_lease("agent-1")
+
+        # tasks started while holding the lock inherit it, unrelated tasks do not
+        assert await asyncio.create_task(other_request()) is lease
+    assert get_held_lease("agent-1") is None
+
+
+async def test_fencing_token_issuer_is_used_for_distributed_leases():
+    _, (worker,) = _shared_redis_managers(1)
+
+    async def issue():
+        return 42
+
+    async with worker.lock("agent-1", issue_fencing_token=issue) as lease:
+        assert lease.fenced and lease.fencing_token == 42
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timezone
+
+import pytest
+
+from letta.schemas.enums import ProviderCategory, ProviderType
+from letta.schemas.llm_config import LLMConfig
+from letta.schemas.providers import Provider
+from letta.services.helpers.provider_model_catalog import ProviderModelCatalog
+
+ORG_ID = "org-00000000-0000-4000-8000-000000000000"
+OTHER_ORG_ID = "org-00000000-0000-4000-8000-000000000001"
+
+# provider name -> models returned (or exception raised) by its next listings
+RESPONSES = {}
+LISTINGS = []
+
+
+class FakeProvider(Provider):
+    provider_type: ProviderType = ProviderType.openai
+    provider_category: ProviderCategory = ProviderCategory.byok
+
+    async def list_llm_models_async(self) -> list[LLMConfig]:
+        LISTINGS.append((self.organization_id, self.name))
+        await asyncio.sleep(0.05)
+        response = RESPONSES[self.name]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    async def list_embedding_models_async(self):
+        return []
+
+
+def _llm_config(model: str, provider_name: str = "fake") -> LLMConfig:
+    return LLMConfig(
+        model=model,
+        model_endpoint_type="openai",
+        model_endpoint="https://api.example.com/v1",
+        context_window=8192,
+        handle=f"{provider_name}/{model}",
+    )
+
+
+@pytest.fixture(autouse=True)
+def reset_provider():
+    RESPONSES.clear()
+    LISTINGS.clear()
+    RESPONSES["fake"] = [_llm_config("model-a")]
+
+
+def _catalog(**kwargs) -> ProviderModelCatalog:
+    return ProviderModelCatalog(**{"refresh_interval_s": 600, "jitter": 0.2, "max_entries": 10, "max_resolved_configs": 10, **kwargs})
+
+
+@pytest.mark.asyncio
+async def test_models_are_listed_once_per_organization():
+    catalog = _catalog()
+    provider = FakeProvider(name="fake", organization_id=ORG_ID)
+
+    results = await asyncio.gather(*[catalog.list_llm_models(provider) for _ in range(3)])
+    assert [[model.handle for model in models] for models in results] == [["fake/model-a"]] * 3
+    assert await catalog.list_llm_models(provider) == results[0]
+    assert LISTINGS == [(ORG_ID, "fake")]
+
+    await catalog.list_llm_models(FakeProvider(name="fake", organization_id=OTHER_ORG_ID))
+    assert LISTINGS == [(ORG_ID, "fake"), (OTHER_ORG_ID, "fake")]
+
+    # callers get copies they may change
+    results[0][0].context_window = 1
+    assert (await catalog.list_llm_models(provider))[0].context_window == 8192
+
+
+@pytest.mark.asyncio
+async def test_stale_snapshots_are_served_while_refreshing():
+    catalog = _catalog(refresh_interval_s=0.1, jitter=0)
+    provider = FakeProvider(name="fake", organization_id=ORG_ID)
+    await catalog.list_llm_models(provider)
+
+    RESPONSES["fake"] = [_llm_config("model-b")]
+    await asyncio.sleep(0.15)
+    assert [model.handle for model in await catalog.list_llm_models(provider)] == ["fake/model-a"]
+    await asyncio.sleep(0.1)
+    assert [model.handle for model in await catalog.list_llm_models(provider)] == ["fake/model-b"]
+    assert len(LISTINGS) == 2
+
+
+@pytest.mark.asyncio
+async def test_provider_errors_serve_previous_models():
+    catalog = _catalog(refresh_interval_s=0.1, jitter=0)
+    provider = FakeProvider(name="fake", organization_id=ORG_ID)
+    await catalog.list_llm_models(provider)
+
+    RESPONSES["fake"] = RuntimeError("provider is down")
+    await asyncio.sleep(0.15)
+    await catalog.list_llm_models(provider)
+    await asyncio.sleep(0.1)
+    assert [model.handle for model in await catalog.list_llm_models(provider)] == ["fake/model-a"]
+
+    RESPONSES["broken"] = RuntimeError("provider is down")
+    assert await catalog.list_llm_models(FakeProvider(name="broken", organization_id=ORG_ID)) == []
+
+
+@pytest.mark.asyncio
+async def test_invalidation_and_provider_updates():
+    catalog = _catalog()
+    provider = FakeProvider(name="fake", id="provider-1", organization_id=ORG_ID)
+    other_org_provider = FakeProvider(name="fake", id="provider-2", organization_id=OTHER_ORG_ID)
+    await catalog.list_llm_models(provider)
+    await catalog.list_llm_models(other_org_provider)
+    catalog.put_resolved_config("llm", ORG_ID, "handle=fake/model-a", _llm_config("model-a"))
+
+    RESPONSES["fake"] = [_llm_config("model-b")]
+    assert catalog.delete(ORG_ID)
+    assert catalog.get_resolved_config("llm", ORG_ID, "handle=fake/model-a") is None
+    assert [model.handle for model in await catalog.list_llm_models(provider)] == ["fake/model-b"]
+    assert [model.handle for model in await catalog.list_llm_models(other_org_provider)] == ["fake/model-a"]
+
+    # updated by another process
+    RESPONSES["fake"] = [_llm_config("model-c")]
+    updated_provider = provider.model_copy(update={"updated_at": datetime.now(timezone.utc)})
+    assert [model.handle for model in await catalog.list_llm_models(updated_provider)] == ["fake/model-c"]
+    assert len(LISTINGS) == 4
+
+
+@pytest.mark.asyncio
+async def test_catalog_is_bounded():
+    catalog = _catalog(max_entries=2, max_resolved_configs=2)
+    for name in ("first", "second", "third"):
+        RESPONSES[name] = [_llm_config("model-a", name)]
+        await catalog.list_llm_models(FakeProvider(name=name, organization_id=ORG_ID))
+        catalog.put_resolved_config("llm", ORG_ID, name, _llm_config("model-a", name))
+
+    await catalog.list_llm_models(FakeProvider(name="first", organization_id=ORG_ID))
+    assert [name for _, name in LISTINGS] == ["first", "second", "third", "first"]
+    assert catalog.get_resolved_config("llm", ORG_ID, "first") is None
+    assert catalog.get_resolved_config("llm", ORG_ID, "third").handle == "third/model-a"
@@ -0,0 +1,182 @@
+import copy
+import json
+
+import pytest
+
+from letta.llm_api.anthropic_client import AnthropicClient
+from letta.llm_api.openai_client import OpenAIClient
+from letta.llm_api.request_prefix_cache import clear_request_prefix_caches, get_request_prefix_cache
+from letta.schemas.enums import MessageRole
+from letta.schemas.letta_message_content import TextContent
+from letta.schemas.llm_config import LLMConfig
+from letta.schemas.message import Message as PydanticMessage
+from letta.settings import settings
+
+AGENT_ID = "agent-00000000-0000-4000-8000-000000000000"
+
+TOOLS = [
+    {
+        "name": "send_message",
+        "description": "Sends a message to the human user.",
+        "parameters": {
+            "type": "object",
+            "properties": {"message": {"type": "string", "description": "Message contents."}},
+            "required": ["message"],
+        },
+    },
+    {
+        "name": "get_weather",
+        "description": "Fetch current weather data",
+        "parameters": {
+            "type": "object",
+            "properties": {"location": {"type": "string", "description": "The location to get weather for"}},
+            "required": ["location"],
+        },
+    },
+]
+
+LLM_CONFIGS = {
+    "openai": LLMConfig(
+        model="gpt-4o-mini",
+        model_endpoint_type="openai",
+        model_endpoint="https://api.openai.com/v1",
+        context_window=128000,
+        put_inner_thoughts_in_kwargs=True,
+    ),
+    "anthropic": LLMConfig(
+        model="claude-3-5-sonnet-20241022",
+        model_endpoint_type="anthropic",
+        model_endpoint="https://api.anthropic.com/v1",
+        context_window=200000,
+        put_inner_thoughts_in_kwargs=True,
+    ),
+    "google": LLMConfig(
+        model="gemini-1.5-pro",
+        model_endpoint_type="google_vertex",
+        model_endpoint="https://us-central1-aiplatform.googleapis.com/v1",
+        context_window=1000000,
+        put_inner_thoughts_in_kwargs=True,
+    ),
+}
+
+
+def _client(provider: str):
+    if provider == "google":
+        pytest.importorskip("google.genai")
+        from letta.llm_api.google_vertex_client import GoogleVertexClient
+
+        return GoogleVertexClient()
+    return {"openai": OpenAIClient, "anthropic": AnthropicClient}[provider]()
+
+
+@pytest.fixture(autouse=True)
+def _clear_caches():
+    clear_request_prefix_caches()
+    yield
+    clear_request_prefix_caches()
+
+
+def _turn(i: int) -> list[PydanticMessage]:
+    call_id = f"call_{i}"
+    return [
+        PydanticMessage(
+            role=MessageRole.user,
+            agent_id=AGENT_ID,
+            content=[TextContent(text=json.dumps({"type": "user_message", "message": f"hello {i}"}))],
+        ),
+        PydanticMessage(
+            role=MessageRole.assistant,
+            agent_id=AGENT_ID,
+            content=[TextContent(text=f"thinking about {i}")],
+            tool_calls=[
+                {"id": call_id, "type": "function", "function": {"name": "send_message", "arguments": json.dumps({"message": f"hi {i}"})}}
+            ],
+        ),
+        PydanticMessage(
+            role=MessageRole.tool,
+            agent_id=AGENT_ID,
+            name="send_message",
+            tool_call_id=call_id,
+            content=[TextContent(text=json.dumps({"status": "OK", "message": None}))],
+        ),
+    ]
+
+
+def _history(turns: int) -> list[PydanticMessage]:
+    messages = [PydanticMessage(role=MessageRole.system, agent_id=AGENT_ID, content=[TextContent(text="You are a helpful assistant.")])]
+    for i in range(turns):
+        messages.extend(_turn(i))
+    return messages
+
+
+def _build(provider: str, messages: list[PydanticMessage]) -> dict:
+    return _client(provider).build_request_data(messages, LLM_CONFIGS[provider].model_copy(), tools=copy.deepcopy(TOOLS))
+
+
+def _build_uncached(provider: str, messages: list[PydanticMessage], monkeypatch) -> dict:
+    with monkeypatch.context() as m:
+        m.setattr(settings, "llm_request_prefix_cache_agents", 0)
+        return _build(provider, messages)
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "google"])
+def test_cached_requests_match_uncached_requests(provider, monkeypatch):
+    messages = _history(3)
+    assert _build(provider, messages) == _build_uncached(provider, messages, monkeypatch)
+
+    # steps append to the history, and a memory rebuild rewrites the system message in place
+    messages.extend(_turn(3))
+    messages[0] = messages[0].model_copy(update={"content": [TextContent(text="You are a helpful assistant. <memory>new</memory>")]})
+    assert _build(provider, messages) == _build_uncached(provider, messages, monkeypatch)
+
+
+@pytest.mark.parametrize("provider", ["openai", "anthropic", "google"])
+def test_only_new_messages_are_converted(provider):
+    messages = _history(3)
+    _build(provider, messages)
+    stats = get_request_prefix_cache(AGENT_ID).stats
+    misses = stats.misses
+
+    messages.extend(_turn(3))
+    _build(provider, messages)
+
+    # three new messages; the tool definitions are unchanged
+    assert stats.misses - misses == 3
+
+
+def test_request_dicts_are_not_shared_with_the_cache():
+    messages = _history(2)
+    first = _build("anthropic", messages)
+    first["messages"][1]["content"].append({"type": "text", "text": "mutated"})
+    first["tools"][0]["name"] = "mutated"
+
+    second = _build("anthropic", messages)
+    assert "mutated" not in json.dumps(second)
+
+
+def test_stable_prefix_length():
+    cache = get_request_prefix_cache(AGENT_ID)
+    messages = _history(2)
+
+    def convert(m):
+        return m.to_openai_dict()
+
+    assert cache.convert_messages(messages, "openai", convert).stable_prefix_length == 0
+    assert cache.convert_messages(messages, "openai", convert).stable_prefix_length == len(messages)
+
+    messages.extend(_turn(2))
+    assert cache.convert_messages(messages, "openai", convert).stable_prefix_length == len(messages) - 3
+
+    # editing a message ends the stable prefix there
+    messages[4] = messages[4].model_copy(update={"content": [TextContent(text="edited")]})
+    assert cache.convert_messages(messages, "openai", convert).stable_prefix_length == 4
+
+
+def test_cache_is_bounded_by_agents(monkeypatch):
+    monkeypatch.setattr(settings, "llm_request_prefix_cache_agents", 2)
+    first = get_request_prefix_cache("agent-a")
+    get_request_prefix_cache("agent-b")
+    get_request_prefix_cache("agent-c")
+
+    assert get_request_prefix_cache("agent-a") is not first
+    assert get_request_prefix_cache(None) is None
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from letta.constants import MAX_EMBEDDING_DIM
+from letta.orm.sqlite_functions import CosineTopK, adapt_array, cosine_distance
+
+
+def _padded(rng: np.random.Generator, dim: int = 1536) -> np.ndarray:
+    return np.pad(rng.standard_normal(dim).astype(np.float32), (0, MAX_EMBEDDING_DIM - dim))
+
+
+def test_cosine_top_k_matches_udf_ordering():
+    rng = np.random.default_rng(0)
+    rows = [_padded(rng) for _ in range(2500)]
+    blobs = [adapt_array(row) for row in rows]
+    ids = [f"passage-{i}" for i in range(len(rows))]
+    query = _padded(rng)
+
+    scorer = CosineTopK(query, k=10)
+    for start in range(0, len(blobs), 1000):
+        scorer.add(ids[start : start + 1000], blobs[start : start + 1000])
+    results = scorer.result()
+
+    query_blob = adapt_array(query)
+    expected = sorted(range(len(rows)), key=lambda i: cosine_distance(blobs[i], query_blob))[:10]
+    assert [passage_id for passage_id, _ in results] == [ids[i] for i in expected]
+    for (_, distance), i in zip(results, expected):
+        assert distance == pytest.approx(cosine_distance(blobs[i], query_blob), abs=1e-5)
+
+
+def test_cosine_top_k_reads_only_query_prefix():
+    rng = np.random.default_rng(1)
+    rows = [_padded(rng, dim=8) for _ in range(20)]
+    scorer = CosineTopK(rows[3], k=3)
+    assert scorer.row_size == 8 * 4
+
+    # prefixes, as selected with substr() in SQL
+    scorer.add([f"passage-{i}" for i in range(20)], [adapt_array(row)[: scorer.row_size] for row in rows])
+    assert scorer.result()[0] == ("passage-3", pytest.approx(0.0, abs=1e-6))
+
+
+def test_cosine_top_k_ranks_invalid_rows_last():
+    rng = np.random.default_rng(2)
+    rows = [_padded(rng) for _ in range(3)]
+    scorer = CosineTopK(rows[0], k=3)
+    scorer.add(["missing", "truncated", "passage-0"], [None, b"\x00" * 8, adapt_array(rows[0])])
+
+    assert [passage_id for passage_id, _ in scorer.result()] == ["passage-0", "missing", "truncated"]
+
+
+def test_cosine_top_k_keeps_earlier_rows_on_ties():
+    rng = np.random.default_rng(3)
+    row = _padded(rng)
+    ids = [f"passage-{i}" for i in range(50)]
+    scorer = CosineTopK(row, k=5)
+    for start in range(0, len(ids), 10):
+        scorer.add(ids[start : start + 10], [adapt_array(row)] * 10)
+
+    assert [passage_id for passage_id, _ in scorer.result()] == ids[:5]
@@ -0,0 +1,154 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from letta.helpers.sqlite_vector_index import PassageVectorIndex
+
+DIM = 32
+
+
+def _random_vectors(n: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).standard_normal((n, DIM)).astype(np.float32)
+
+
+def _exact_top_k(vectors: np.ndarray, query: np.ndarray, k: int) -> list:
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+    return list(np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k])
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = PassageVectorIndex(tmp_path / "archive" / "test", nprobe=8, ivf_threshold=10_000)
+    index.reset(DIM)
+    return index
+
+
+def test_exact_search_matches_brute_force(index):
+    vectors = _random_vectors(500)
+    ids = [f"passage-{i}" for i in range(len(vectors))]
+    index.add(ids, vectors)
+
+    query = _random_vectors(1, seed=1)[0]
+    results = index.search(query, top_k=10)
+
+    assert [passage_id for passage_id, _ in results] == [ids[i] for i in _exact_top_k(vectors, query, 10)]
+    distances = [distance for _, distance in results]
+    assert distances == sorted(distances)
+
+
+def test_padded_vectors_and_queries(index):
+    vectors = _random_vectors(20)
+    padded = np.pad(vectors, ((0, 0), (0, 100)))
+    index.add([f"passage-{i}" for i in range(20)], padded)
+
+    results = index.search(np.pad(vectors[3], (0, 100)).tolist(), top_k=1)
+    assert results[0][0] == "passage-3"
+    assert results[0][1] == pytest.approx(0.0, abs=1e-5)
+
+    with pytest.raises(ValueError):
+        index.add(["passage-bad"], np.ones((1, DIM + 4), dtype=np.float32))
+
+
+def test_remove_upsert_and_reload(index, tmp_path):
+    vectors = _random_vectors(100)
+    ids = [f"passage-{i}" for i in range(100)]
+    index.add(ids, vectors)
+
+    assert index.remove(["passage-0", "passage-1", "missing"]) == 2
+    # re-adding an id replaces its vector
+    index.add(["passage-2"], -vectors[2:3])
+    assert len(index) == 98
+
+    reloaded = PassageVectorIndex(tmp_path / "archive" / "test")
+    assert len(reloaded) == 98
+    result_ids = [passage_id for passage_id, _ in reloaded.search(vectors[0], top_k=100)]
+    assert "passage-0" not in result_ids and "passage-1" not in result_ids
+    assert reloaded.search(-vectors[2], top_k=1)[0][0] == "passage-2"
+
+
+def test_compaction_keeps_live_vectors(index):
+    vectors = _random_vectors(3000)
+    ids = [f"passage-{i}" for i in range(3000)]
+    index.add(ids, vectors)
+    index.remove(ids[:2000])
+
+    assert index.num_rows == 1000
+    assert len(index) == 1000
+    assert index.search(vectors[2500], top_k=1)[0][0] == "passage-2500"
+
+
+def test_ivf_recall(tmp_path):
+    # clustered data, as real embeddings are
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((50, DIM))
+    vectors = (centers[rng.integers(0, 50, 20_000)] + 0.3 * rng.standard_normal((20_000, DIM))).astype(np.float32)
+    ids = [f"passage-{i}" for i in range(len(vectors))]
+
+    index = PassageVectorIndex(tmp_path / "source" / "test", nprobe=16, ivf_threshold=10_000)
+    index.reset(DIM)
+    for start in range(0, len(vectors), 5000):
+        index.add(ids[start : start + 5000], vectors[start : start + 5000], train=False)
+    index.maybe_train()
+    assert index._centroids is not None
+
+    recalls = []
+    for seed in range(10):
+        query = vectors[seed * 97] + 0.1 * rng.standard_normal(DIM).astype(np.float32)
+        expected = {ids[i] for i in _exact_top_k(vectors, query, 10)}
+        found = {passage_id for passage_id, _ in index.search(query, top_k=10)}
+        recalls.append(len(expected & found) / 10)
+    assert np.mean(recalls) >= 0.9
+
+
+def test_fingerprint_tracks_newest_update_and_survives_compaction(index, tmp_path):
+    vectors = _random_vectors(1100)
+    index.add([f"passage-{i}" for i in range(1100)], vectors, updated_at=100.0)
+    index.add(["passage-0"], vectors[:1], updated_at=50.0)
+    assert index.fingerprint() == (1100, 100.0)
+
+    index.remove([f"passage-{i}" for i in range(600)])
+    assert PassageVectorIndex(tmp_path / "archive" / "test").fingerprint() == (500, 100.0)
+
+
+def test_rebuild_is_swapped_in_for_other_readers(index, tmp_path):
+    vectors = _random_vectors(50)
+    index.add([f"old-{i}" for i in range(50)], vectors)
+    other_process = PassageVectorIndex(tmp_path / "archive" / "test")
+
+    staging = index.staging()
+    staging.reset(DIM)
+    staging.add([f"new-{i}" for i in range(50)], vectors)
+    # the live index is untouched until the rebuild is swapped in
+    assert other_process.search(vectors[0], top_k=1)[0][0] == "old-0"
+
+    index.swap_in(staging)
+    assert other_process.search(vectors[0], top_k=1)[0][0] == "new-0"
+    assert len(index) == 50
+    assert sorted(path.name for path in (tmp_path / "archive").iterdir()) == ["test", "test.lock"]
+
+
+def _add_from_other_process(path, worker: int) -> None:
+    index = PassageVectorIndex(path)
+    for batch in range(20):
+        vectors = np.full((5, DIM), worker * 100 + batch + 1, dtype=np.float32)
+        vectors[:, worker] += 1000
+        index.add([f"worker-{worker}-{batch}-{i}" for i in range(5)], vectors)
+
+
+def test_concurrent_writers_in_separate_processes(index, tmp_path):
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_add_from_other_process, args=(index.path, worker)) for worker in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    reloaded = PassageVectorIndex(tmp_path / "archive" / "test")
+    assert len(reloaded) == 4 * 20 * 5
+    for worker in range(4):
+        query = np.zeros(DIM, dtype=np.float32)
+        query[worker] = 1.0
+        # every id still lines up with the vector its writer appended
+        assert all(passage_id.startswith(f"worker-{worker}-") for passage_id, _ in reloaded.search(query, top_k=100))
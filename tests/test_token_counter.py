@@ -0,0 +1,154 @@
+import pytest
+
+from letta.schemas.openai.chat_completion_request import FunctionSchema, Tool
+from letta.services.context_window_calculator.token_counter import ApproximateTokenCounter, TokenMemo
+
+
+@pytest.fixture
+def memo():
+    return TokenMemo(max_size=16)
+
+
+@pytest.fixture
+def counter(memo):
+    return ApproximateTokenCounter(provider="openai", model="gpt-4", memo=memo)
+
+
+async def test_count_text_tokens_matches_tiktoken(counter):
+    text = "The quick brown fox jumps over the lazy dog."
+    assert await counter.count_text_tokens("") == 0
+    assert await counter.count_text_tokens(text) == len(counter.encoding.encode(text))
+
+
+async def test_message_counts_are_memoized_per_message(counter, memo):
+    messages = [{"role": "user", "content": f"message number {i}"} for i in range(4)]
+    first = await counter.count_message_tokens(messages)
+    assert memo.misses == 4 and memo.hits == 0
+
+    # appending a message should only tokenize the new one
+    messages.append({"role": "assistant", "content": "a reply"})
+    second = await counter.count_message_tokens(messages)
+    assert memo.misses == 5 and memo.hits == 4
+    assert second > first
+
+
+async def test_memo_is_bounded():
+    memo = TokenMemo(max_size=2)
+    for i in range(5):
+        memo.set(str(i), i)
+    assert len(memo) == 2
+    assert memo.get("0") is None
+    assert memo.get("4") == 4
+
+
+async def test_count_tool_tokens(counter):
+    tools = [
+        Tool(
+            type="function",
+            function=FunctionSchema(
+                name="send_message",
+                description="Sends a message to the human user.",
+                parameters={"type": "object", "properties": {"message": {"type": "string"}}, "required": ["message"]},
+            ),
+        )
+    ]
+    assert await counter.count_tool_tokens([]) == 0
+    assert await counter.count_tool_tokens(tools) > 0
+
+
+async def test_calibration_scales_counts(memo, monkeypatch):
+    monkeypatch.setattr(ApproximateTokenCounter, "_calibration", {"anthropic": 1.0})
+    counter = ApproximateTokenCounter(provider="anthropic", memo=memo)
+    text = "calibrate me " * 50
+    raw = await counter.count_text_tokens(text)
+
+    for _ in range(50):
+        ApproximateTokenCounter.calibrate("anthropic", local_count=100, api_count=120)
+    assert counter.multiplier == pytest.approx(1.2, rel=0.01)
+    assert await counter.count_text_tokens(text) == pytest.approx(raw * 1.2, rel=0.02)
+
+
+async def test_incremental_message_counting_uses_cached_counts(counter):
+    from letta.schemas.enums import MessageRole
+    from letta.schemas.letta_message_content import TextContent
+    from letta.schemas.message import Message
+    from letta.services.context_window_calculator.context_window_calculator import ContextWindowCalculator
+
+    class RecordingMessageManager:
+        def __init__(self):
+            self.persisted = {}
+
+        async def update_message_token_counts_async(self, token_counts, actor):
+            self.persisted.update(token_counts)
+
+    cached = Message(role=MessageRole.user, content=[TextContent(text="already counted")], num_tokens=42)
+    fresh = Message(role=MessageRole.assistant, content=[TextContent(text="brand new reply")])
+    manager = RecordingMessageManager()
+
+    total = await ContextWindowCalculator.count_messages_incrementally([cached, fresh], counter, manager, actor=None)
+
+    assert list(manager.persisted) == [fresh.id]
+    assert fresh.num_tokens == manager.persisted[fresh.id]
+    assert total == counter.scale(42 + fresh.num_tokens)
+
+
+async def test_counts_only_context_window_loads_uncounted_messages(counter):
+    from unittest.mock import Mock
+
+    from letta.schemas.enums import MessageRole
+    from letta.schemas.letta_message_content import TextContent
+    from letta.schemas.message import Message
+    from letta.services.context_window_calculator.context_window_calculator import ContextWindowCalculator
+
+    messages = [Message(role=MessageRole.user, content=[TextContent(text=f"message {i}")], num_tokens=10) for i in range(5)]
+    messages.append(Message(role=MessageRole.assistant, content=[TextContent(text="not counted yet")]))
+
+    class RecordingMessageManager:
+        def __init__(self):
+            self.loaded = []
+
+        async def get_message_token_counts_async(self, message_ids, actor):
+            return {m.id: m.num_tokens for m in messages if m.id in message_ids}
+
+        async def get_messages_by_ids_async(self, message_ids, actor):
+            self.loaded.extend(message_ids)
+            return [m.model_copy() for m in messages if m.id in message_ids]
+
+        async def update_message_token_counts_async(self, token_counts, actor):
+            pass
+
+    system = Message(role=MessageRole.system, content=[TextContent(text="system prompt")])
+    agent_state = Mock(message_ids=[system.id] + [m.id for m in messages], system="system prompt", tools=[])
+    agent_state.llm_config.context_window = 8192
+    manager = RecordingMessageManager()
+
+    overview = await ContextWindowCalculator().calculate_context_window(
+        agent_state=agent_state,
+        actor=None,
+        token_counter=counter,
+        message_manager=manager,
+        system_message_compiled=system,
+        num_archival_memories=0,
+        num_messages=6,
+        include_messages=False,
+    )
+
+    # only the possible summary message and the uncounted message are loaded
+    assert manager.loaded == [messages[0].id, messages[-1].id]
+    assert overview.messages == []
+    assert overview.num_messages == 7
+    assert overview.num_tokens_messages == counter.scale(50 + counter.count_raw_message_tokens(messages[-1]))
+
+
+async def test_record_usage_calibrates_from_request_payload(memo, monkeypatch):
+    monkeypatch.setattr(ApproximateTokenCounter, "_calibration", {"openai": 1.0})
+    request_data = {
+        "messages": [{"role": "system", "content": "You are a helpful agent. " * 20}, {"role": "user", "content": "hello " * 30}],
+        "tools": [{"type": "function", "function": {"name": "send_message", "parameters": {"type": "object"}}}],
+    }
+    raw = ApproximateTokenCounter(provider="openai", memo=memo).count_raw_request_tokens(request_data)
+    assert raw > 0
+
+    for _ in range(50):
+        ApproximateTokenCounter.record_usage("openai", request_data, prompt_tokens=int(raw * 1.1))
+    assert ApproximateTokenCounter(provider="openai").multiplier == pytest.approx(1.1, rel=0.01)
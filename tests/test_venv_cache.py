@@ -0,0 +1,102 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from letta.services.tool_sandbox import venv_cache
+from letta.services.tool_sandbox.venv_cache import VENV_READY_MARKER, VenvCache, venv_fingerprint
+
+
+@pytest.fixture
+def builds(monkeypatch):
+    """Records venv builds instead of creating venvs and running pip."""
+    builds = []
+
+    def _create_venv_with_requirements(venv_path, requirements, requirements_txt_path=None, env=None):
+        time.sleep(0.1)
+        builds.append((os.path.basename(venv_path), sorted(requirements), requirements_txt_path))
+        if "broken" in requirements:
+            os.makedirs(venv_path)
+            raise RuntimeError("Failed to install pip packages (broken).")
+        os.makedirs(os.path.join(venv_path, "bin"))
+
+    monkeypatch.setattr(venv_cache, "create_venv_with_requirements", _create_venv_with_requirements)
+    return builds
+
+
+def test_venv_fingerprint():
+    assert venv_fingerprint(["numpy==1.26.0", "requests"]) == venv_fingerprint(["requests", "numpy==1.26.0", "requests"])
+    assert venv_fingerprint(["requests"]) != venv_fingerprint(["requests==2.31.0"])
+    assert venv_fingerprint(["requests"]) != venv_fingerprint(["requests"], requirements_txt="tqdm\n")
+
+
+@pytest.mark.asyncio
+async def test_venv_is_built_once_per_requirement_set(tmp_path, builds):
+    cache = VenvCache(root=str(tmp_path), ttl_s=3600)
+
+    paths = await asyncio.gather(*[cache.acquire(["requests", "numpy"], None, env={}) for _ in range(3)])
+    assert len(set(paths)) == 1
+    assert os.path.isfile(os.path.join(paths[0], VENV_READY_MARKER))
+    assert builds == [(os.path.basename(paths[0]), ["numpy", "requests"], None)]
+
+    # same set in a different order, from a fresh process sharing the directory
+    other_process_cache = VenvCache(root=str(tmp_path), ttl_s=3600)
+    assert await other_process_cache.acquire(["numpy", "requests"], None, env={}) == paths[0]
+    assert len(builds) == 1
+
+    assert await cache.acquire(["cowsay"], None, env={}) != paths[0]
+    assert len(builds) == 2
+
+    assert await cache.acquire(["requests", "numpy"], None, env={}, force_rebuild=True) == paths[0]
+    assert len(builds) == 3
+
+
+@pytest.mark.asyncio
+async def test_requirements_txt_is_part_of_the_fingerprint(tmp_path, builds):
+    cache = VenvCache(root=str(tmp_path / "venvs"), ttl_s=3600)
+    requirements_txt_path = tmp_path / "requirements.txt"
+
+    without_file = await cache.acquire(["requests"], str(requirements_txt_path), env={})
+    assert builds[-1][2] is None
+
+    requirements_txt_path.write_text("tqdm\n")
+    with_file = await cache.acquire(["requests"], str(requirements_txt_path), env={})
+    assert with_file != without_file
+    assert builds[-1][2] == str(requirements_txt_path)
+
+
+@pytest.mark.asyncio
+async def test_failed_builds_are_not_cached(tmp_path, builds):
+    cache = VenvCache(root=str(tmp_path), ttl_s=3600)
+
+    for _ in range(2):
+        with pytest.raises(RuntimeError, match="broken"):
+            await cache.acquire(["broken"], None, env={})
+    assert len(builds) == 2
+    assert [name for name in os.listdir(tmp_path) if not name.endswith(".lock")] == []
+
+
+@pytest.mark.asyncio
+async def test_unused_venvs_are_collected(tmp_path, builds):
+    cache = VenvCache(root=str(tmp_path), ttl_s=3600)
+    in_use = await cache.acquire(["requests"], None, env={})
+    unused = await cache.acquire(["cowsay"], None, env={})
+    recently_used = await cache.acquire(["numpy"], None, env={})
+    cache.release(unused)
+    cache.release(recently_used)
+
+    two_hours_ago = time.time() - 7200
+    for venv_path in (in_use, unused):
+        os.utime(os.path.join(venv_path, VENV_READY_MARKER), (two_hours_ago, two_hours_ago))
+
+    assert cache.collect() == [unused]
+    assert os.path.isdir(in_use) and os.path.isdir(recently_used)
+
+    cache.release(in_use)
+    assert cache.collect() == [in_use]
+
+    # collected venvs are rebuilt on their next use
+    assert await cache.acquire(["cowsay"], None, env={}) == unused
+    assert os.path.isdir(unused)
+    assert len(builds) == 4